@@ -0,0 +1,190 @@
+"""Load test for the local HTTP API.
+
+Usage:
+    python -m codiet.benchmarks.load_test --scale 1k --clients 32 --requests 5000
+
+Starts a CatalogueServer on a free localhost port over a synthetic database
+(or targets a running server with --port), then runs a number of concurrent
+keep-alive clients which each send a mix of search, fetch, nutrient and plan
+requests. Reports the overall throughput and the p50 and p99 latency of each
+kind of request.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from urllib.parse import quote
+
+import numpy as np
+
+from codiet.benchmarks.run_benchmarks import DEFAULT_WORK_DIR, get_synthetic_database
+from codiet.benchmarks.synthetic import SCALES
+from codiet.db.database_service import DatabaseService
+from codiet.server import DEFAULT_HOST, CatalogueServer
+
+# The share of each kind of request in the mix
+REQUEST_MIX = {
+    "search": 0.2,
+    "ingredient": 0.3,
+    "recipe": 0.2,
+    "nutrients": 0.25,
+    "plan": 0.05,
+}
+PLAN_PROFILE = {"name": "load test", "meal_times": ["08:00", "12:30", "19:00"], "days": 3}
+
+
+def build_requests(
+    ingredient_names: list[str], recipe_names: list[str], count: int, seed: int = 0
+) -> list[tuple[str, str, str, bytes]]:
+    """Returns a random mix of (kind, method, target, body) requests."""
+    rng = random.Random(seed)
+    kinds = rng.choices(list(REQUEST_MIX), weights=list(REQUEST_MIX.values()), k=count)
+    requests = []
+    for kind in kinds:
+        if kind == "search":
+            text = rng.choice(ingredient_names)[:4]
+            requests.append((kind, "GET", f"/ingredients?q={quote(text)}", b""))
+        elif kind == "ingredient":
+            requests.append((kind, "GET", f"/ingredients/{quote(rng.choice(ingredient_names))}", b""))
+        elif kind == "recipe":
+            requests.append((kind, "GET", f"/recipes/{quote(rng.choice(recipe_names))}", b""))
+        elif kind == "nutrients":
+            requests.append((kind, "GET", f"/recipes/{quote(rng.choice(recipe_names))}/nutrients", b""))
+        else:
+            requests.append((kind, "POST", "/plans", json.dumps(PLAN_PROFILE).encode("utf-8")))
+    return requests
+
+
+async def send_request(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, method: str, target: str, body: bytes
+) -> int:
+    """Sends a request on a keep-alive connection and returns the status."""
+    writer.write(
+        f"{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1")
+        + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def run_clients(
+    host: str, port: int, requests: list[tuple[str, str, str, bytes]], clients: int
+) -> tuple[float, list[tuple[str, int, float]]]:
+    """Sends the requests across the clients.
+    Returns the elapsed time and the (kind, status, seconds) of each request."""
+    queue = list(reversed(requests))
+    results = []
+
+    async def client() -> None:
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while queue:
+                kind, method, target, body = queue.pop()
+                start = time.perf_counter()
+                status = await send_request(reader, writer, method, target, body)
+                results.append((kind, status, time.perf_counter() - start))
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return time.perf_counter() - start, results
+
+
+def summarise(elapsed: float, results: list[tuple[str, int, float]]) -> dict:
+    """Returns the throughput and latency percentiles of the results."""
+    summary = {
+        "requests": len(results),
+        "errors": sum(1 for _, status, _ in results if status != 200),
+        "elapsed_s": elapsed,
+        "throughput_rps": len(results) / elapsed,
+        "latency_ms": {},
+    }
+    kinds = sorted({kind for kind, _, _ in results})
+    for kind in ["all"] + kinds:
+        seconds = np.array([s for k, _, s in results if kind in ("all", k)]) * 1000
+        summary["latency_ms"][kind] = {
+            "count": len(seconds),
+            "p50": float(np.percentile(seconds, 50)),
+            "p99": float(np.percentile(seconds, 99)),
+        }
+    return summary
+
+
+def format_summary(summary: dict) -> str:
+    """Returns the summary as a table."""
+    lines = [
+        f"{summary['requests']} requests in {summary['elapsed_s']:.2f} s, "
+        f"{summary['throughput_rps']:.0f} requests/s, {summary['errors']} errors",
+        f"{'request':<12}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}",
+    ]
+    for kind, latency in summary["latency_ms"].items():
+        lines.append(f"{kind:<12}{latency['count']:>8}{latency['p50']:>10.2f}{latency['p99']:>10.2f}")
+    return "\n".join(lines)
+
+
+async def run_load_test(
+    db_path: str, snapshot_path: str, num_requests: int, clients: int, seed: int, port: int | None
+) -> dict:
+    """Runs the load test, against a running server if a port is given,
+    otherwise against a server started here."""
+    with DatabaseService(db_path) as db_service:
+        ingredient_names = db_service.fetch_all_ingredient_names()
+        recipe_names = db_service.fetch_all_recipe_names()
+    requests = build_requests(ingredient_names, recipe_names, num_requests, seed)
+    if port is not None:
+        elapsed, results = await run_clients(DEFAULT_HOST, port, requests, clients)
+        return summarise(elapsed, results)
+    server = CatalogueServer(db_path=db_path, snapshot_path=snapshot_path, port=0)
+    await server.start()
+    try:
+        elapsed, results = await run_clients(server.host, server.port, requests, clients)
+        summary = summarise(elapsed, results)
+        summary["cache_hits"] = server.cache.hits
+        summary["cache_misses"] = server.cache.misses
+        return summary
+    finally:
+        await server.close()
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="CoDiet HTTP API load test.")
+    parser.add_argument("--scale", choices=list(SCALES), default="1k")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR)
+    parser.add_argument("--db", help="Database to serve, instead of a synthetic one.")
+    parser.add_argument("--port", type=int, help="Port of a running server to target.")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--output", help="Path to write the JSON results to.")
+    args = parser.parse_args()
+
+    db_path = args.db or get_synthetic_database(args.work_dir, args.scale, args.seed)
+    snapshot_path = os.path.splitext(db_path)[0] + ".snapshot"
+    summary = asyncio.run(
+        run_load_test(db_path, snapshot_path, args.requests, args.clients, args.seed, args.port)
+    )
+    print(format_summary(summary))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(summary, file, indent=2)
+    sys.exit(1 if summary["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
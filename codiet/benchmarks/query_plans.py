@@ -0,0 +1,409 @@
+"""EXPLAIN QUERY PLAN regression checks over every Repository query.
+
+Usage:
+    python -m codiet.benchmarks.query_plans --scale 10k --output plans.json
+
+Every public Repository method is called against a synthetic database
+through a recording Database, which captures each statement it runs and the
+parameters it runs with. Each statement is then explained, and is flagged
+if a hot-path method scans a catalogue-sized table rather than searching an
+index. Each method is also timed, so the report gives the latency of every
+query at scale, and each statement's time is split into preparing and
+executing it. The process exits non-zero if any statement is flagged.
+"""
+
+import argparse
+import inspect
+import json
+import re
+import sqlite3
+import sys
+import time
+from typing import Callable
+
+from codiet.benchmarks.run_benchmarks import DEFAULT_WORK_DIR, get_synthetic_database
+from codiet.benchmarks.synthetic import SCALES
+from codiet.db.database import Database
+from codiet.db.repository import Repository
+from codiet.db.statements import STATEMENTS, normalise_sql
+from codiet.utils.nutrients import ENERGY_NUTRIENT_NAME
+
+# Tables whose size is fixed by the reference data, not the catalogue,
+# so scanning them is cheap at any scale
+REFERENCE_TABLES = {
+    "global_flag_list",
+    "global_leaf_nutrients",
+    "global_group_nutrients",
+    "nutrient_aliases",
+    "global_recipe_tags",
+    "unit_conversions",
+    "nutrient_energy_factors",
+    "change_version",
+    "recipe_nutrient_totals_state",
+}
+# Bulk methods, which read whole tables and are expected to scan them
+BULK_METHOD_PREFIXES = ("fetch_all_", "iter_")
+BULK_METHODS = {"rebuild_ingredient_nutrient_densities"}
+# The number of times each method is timed
+LATENCY_REPEATS = 5
+
+
+class QuerySamples:
+    """Real IDs and names from the database, used as query arguments."""
+
+    def __init__(self, repo: Repository):
+        self.ingredient_id = 1
+        self.ingredient_name = repo.fetch_ingredient_name(self.ingredient_id)
+        self.ingredient_ids = list(range(1, 51))
+        self.ingredient_names = [repo.fetch_ingredient_name(id) for id in self.ingredient_ids]
+        self.recipe_id = repo.fetch_all_recipe_ids()[0]
+        self.recipe_name = repo.fetch_recipe_name(self.recipe_id)
+        self.recipe_ids = repo.fetch_all_recipe_ids()[:50]
+        self.recipe_names = [repo.fetch_recipe_name(id) for id in self.recipe_ids]
+        self.new_recipe_id = repo.fetch_max_recipe_id() + 1
+        self.flag_id, self.flag_name = repo.fetch_all_global_flag_rows()[0]
+        self.tag_id, self.tag_name = repo.fetch_all_global_recipe_tag_rows()[0]
+        self.leaf_nutrient_name = repo.fetch_all_leaf_nutrient_rows()[0][1]
+        self.protein_ids = repo.fetch_leaf_nutrient_ids("protein")
+        self.change_version = repo.fetch_change_version()[1]
+
+
+# The arguments each Repository method is called with
+REPOSITORY_CALLS: dict[str, Callable[[QuerySamples], tuple]] = {
+    "fetch_flag_id": lambda s: (s.flag_name,),
+    "fetch_all_global_flag_names": lambda s: (),
+    "fetch_all_group_nutrient_names": lambda s: (),
+    "fetch_all_leaf_nutrient_names": lambda s: (),
+    "fetch_ingredient_name": lambda s: (s.ingredient_id,),
+    "fetch_ingredient_id_by_name": lambda s: (s.ingredient_name,),
+    "fetch_all_ingredient_names": lambda s: (),
+    "fetch_all_global_recipe_tags": lambda s: (),
+    "fetch_recipe_tags_for_recipe": lambda s: (s.recipe_id,),
+    "fetch_ingredient_description": lambda s: (s.ingredient_id,),
+    "fetch_ingredient_cost": lambda s: (s.ingredient_id,),
+    "fetch_ingredient_density": lambda s: (s.ingredient_id,),
+    "fetch_ingredient_pc_mass": lambda s: (s.ingredient_id,),
+    "fetch_ingredient_flags": lambda s: (s.ingredient_id,),
+    "fetch_ingredient_gi": lambda s: (s.ingredient_id,),
+    "fetch_ingredient_nutrients": lambda s: (s.ingredient_id,),
+    "fetch_all_ingredient_quantity_data": lambda s: (),
+    "fetch_all_ingredient_gis": lambda s: (),
+    "fetch_all_ingredient_nutrient_quantities": lambda s: (),
+    "fetch_all_unconvertible_ingredient_nutrient_rows": lambda s: (),
+    "fetch_all_nutrient_group_leaf_rows": lambda s: (),
+    "fetch_all_ingredient_flag_values": lambda s: (),
+    "fetch_all_global_flag_rows": lambda s: (),
+    "fetch_all_leaf_nutrient_rows": lambda s: (),
+    "fetch_leaf_nutrient_ids": lambda s: ("protein",),
+    "fetch_all_ingredient_nutrient_densities": lambda s: (),
+    "fetch_ingredient_ids_by_nutrient_density": lambda s: (s.protein_ids, 0.2, None),
+    "rebuild_ingredient_nutrient_densities": lambda s: (),
+    "fetch_recipe_name": lambda s: (s.recipe_id,),
+    "fetch_recipe_id": lambda s: (s.recipe_name,),
+    "fetch_all_recipe_names": lambda s: (),
+    "fetch_all_recipe_ids": lambda s: (),
+    "fetch_all_recipe_ingredient_quantities": lambda s: (),
+    "fetch_all_recipe_ingredient_tolerance_rows": lambda s: (),
+    "fetch_ingredient_ids_by_names": lambda s: (s.ingredient_names,),
+    "fetch_existing_ingredient_ids": lambda s: (s.ingredient_ids,),
+    "fetch_recipe_ids_by_names": lambda s: (s.recipe_names,),
+    "fetch_max_recipe_id": lambda s: (),
+    "iter_recipe_base_rows": lambda s: (),
+    "iter_recipe_ingredient_rows": lambda s: (),
+    "iter_recipe_serve_time_rows": lambda s: (),
+    "iter_recipe_tag_rows": lambda s: (),
+    "fetch_recipe_ids_using_ingredients": lambda s: (s.ingredient_ids,),
+    "fetch_recipe_description": lambda s: (s.recipe_id,),
+    "fetch_recipe_instructions": lambda s: (s.recipe_id,),
+    "fetch_recipe_ingredients": lambda s: (s.recipe_id,),
+    "fetch_recipe_serve_times": lambda s: (s.recipe_id,),
+    "fetch_all_recipe_serve_times": lambda s: (),
+    "fetch_all_global_recipe_tag_rows": lambda s: (),
+    "fetch_all_recipe_tag_ids": lambda s: (),
+    "fetch_recipe_ids_by_serve_time": lambda s: (12 * 60,),
+    "fetch_recipe_nutrient_totals": lambda s: (s.recipe_id,),
+    "fetch_recipe_ids_by_nutrient_ranges": lambda s: (
+        [(ENERGY_NUTRIENT_NAME, None, 600.0), ("protein", 30.0, None)],
+    ),
+    "iter_recipe_nutrient_total_rows": lambda s: (),
+    "fetch_recipe_nutrient_totals_version": lambda s: (),
+    "fetch_change_version": lambda s: (),
+    "fetch_changes_since": lambda s: (max(s.change_version - 100, 0),),
+    "insert_global_flag": lambda s: ("query plan flag",),
+    "insert_global_leaf_nutrient": lambda s: ("query plan leaf nutrient", None),
+    "insert_global_group_nutrient": lambda s: ("query plan group nutrient", None),
+    "insert_global_group_nutrient_alias": lambda s: ("query plan group alias", 1),
+    "insert_global_leaf_nutrient_alias": lambda s: ("query plan leaf alias", 1),
+    "insert_ingredient_name": lambda s: ("Query Plan Ingredient",),
+    "insert_recipe_name": lambda s: ("Query Plan Recipe",),
+    "insert_global_recipe_tag": lambda s: ("query plan tag",),
+    "insert_recipe_base_rows": lambda s: ([(s.new_recipe_id, "Query Plan Recipe", None, None)],),
+    "insert_recipe_ingredient_rows": lambda s: (
+        [(s.recipe_id, s.ingredient_id, 100.0, "g", 0.0, 0.0)],
+    ),
+    "insert_recipe_serve_time_rows": lambda s: ([(s.recipe_id, 7 * 60, 9 * 60)],),
+    "insert_recipe_tag_rows": lambda s: ([(s.recipe_id, s.tag_id)],),
+    "refresh_recipe_nutrient_totals": lambda s: (s.recipe_ids,),
+    "update_recipe_nutrient_totals_version": lambda s: (s.change_version,),
+    "update_ingredient_name": lambda s: (s.ingredient_id, "Query Plan Ingredient"),
+    "update_ingredient_description": lambda s: (s.ingredient_id, "Description"),
+    "update_ingredient_cost": lambda s: (s.ingredient_id, 1.0, "GBP", "g", 100.0),
+    "update_ingredient_density": lambda s: (s.ingredient_id, "g", 1.0, "ml", 1.0),
+    "update_ingredient_pc_mass": lambda s: (s.ingredient_id, 1.0, "g", 50.0),
+    "update_ingredient_flags": lambda s: (s.ingredient_id, {s.flag_name: True}),
+    "update_ingredient_gi": lambda s: (s.ingredient_id, 50.0),
+    "update_ingredient_nutrient_quantity": lambda s: (
+        s.ingredient_id, s.leaf_nutrient_name, "g", 1.0, "g", 100.0,
+    ),
+    "update_recipe_name": lambda s: (s.recipe_id, "Query Plan Recipe"),
+    "update_recipe_description": lambda s: (s.recipe_id, "Description"),
+    "update_recipe_instructions": lambda s: (s.recipe_id, "Instructions"),
+    "update_recipe_ingredients": lambda s: (
+        s.recipe_id,
+        {s.ingredient_id: {"qty_value": 100.0, "qty_unit": "g", "qty_utol": 0.0, "qty_ltol": 0.0}},
+    ),
+    "update_recipe_ingredient_field": lambda s: (s.recipe_id, s.ingredient_id, "qty_value", 150.0),
+    "update_recipe_serve_times": lambda s: (s.recipe_id, [(7 * 60, 9 * 60)]),
+    "update_recipe_tags": lambda s: (s.recipe_id, [s.tag_name]),
+    "update_recipe_base_rows": lambda s: ([(s.recipe_name, "Description", None, s.recipe_id)],),
+    "delete_recipe_associations": lambda s: (s.recipe_ids,),
+    "delete_ingredient_by_name": lambda s: (s.ingredient_name,),
+    "delete_recipe_by_name": lambda s: (s.recipe_name,),
+    "delete_ingredients_by_ids": lambda s: (s.ingredient_ids,),
+    "delete_recipes_by_ids": lambda s: (s.recipe_ids,),
+}
+
+
+class RecordingDatabase(Database):
+    """A Database which records every statement run through it."""
+
+    def __init__(self, db_path: str):
+        super().__init__(db_path)
+        self.method: str | None = None
+        # (method, query, params) of every statement run
+        self.statements: list[tuple[str | None, str, tuple]] = []
+
+    def execute(self, query, params=()):
+        self.statements.append((self.method, query, tuple(params)))
+        return super().execute(query, params)
+
+    def executemany(self, query, rows):
+        rows = list(rows)
+        # Explain the statement with the first row's parameters
+        self.statements.append((self.method, query, tuple(rows[0]) if rows else ()))
+        return super().executemany(query, rows)
+
+
+def list_repository_methods() -> list[str]:
+    """Returns the name of every public Repository method."""
+    return [
+        name for name, _ in inspect.getmembers(Repository, inspect.isfunction)
+        if not name.startswith("_")
+    ]
+
+
+def is_bulk_method(method: str) -> bool:
+    """Returns True if the method is expected to read whole tables."""
+    return method.startswith(BULK_METHOD_PREFIXES) or method in BULK_METHODS
+
+
+def build_alias_map(connection: sqlite3.Connection, queries: list[str]) -> dict[str, str]:
+    """Returns a map from every table name and alias in the queries, and in
+    the database's views, to the table it names."""
+    view_sql = [row[0] for row in connection.execute("SELECT sql FROM sqlite_master WHERE type = 'view';")]
+    aliases = {}
+    pattern = re.compile(
+        r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|LEFT\b|CROSS\b|INNER\b"
+        r"|GROUP\b|ORDER\b|USING\b|WITH\b)(\w+))?",
+        re.IGNORECASE,
+    )
+    for sql in view_sql + queries:
+        for table, alias in pattern.findall(sql):
+            aliases[table] = table
+            if alias:
+                aliases[alias] = table
+    return aliases
+
+
+def find_full_scans(
+    plan: list[str], aliases: dict[str, str], catalogue_tables: set[str]
+) -> list[str]:
+    """Returns the catalogue-sized tables the plan scans without an index search."""
+    scans = []
+    for detail in plan:
+        match = re.match(r"SCAN (\S+)", detail)
+        if match is None:
+            continue
+        table = aliases.get(match.group(1), match.group(1))
+        if table not in catalogue_tables:
+            continue
+        # Virtual tables (the serve time R*Tree) search when given a constraint
+        virtual = re.search(r"VIRTUAL TABLE INDEX (\d+)", detail)
+        if virtual is not None and int(virtual.group(1)) != 0:
+            continue
+        scans.append(table)
+    return scans
+
+
+def unique_statements(
+    statements: list[tuple[str | None, str, tuple]]
+) -> list[tuple[str, str, tuple]]:
+    """Returns the first recording of each distinct statement of each method."""
+    unique = {}
+    for method, query, params in statements:
+        if method is not None:
+            unique.setdefault((method, normalise_sql(query)), (method, query, params))
+    return list(unique.values())
+
+
+def explain(connection: sqlite3.Connection, query: str, params: tuple) -> list[str]:
+    """Returns the detail lines of the statement's query plan."""
+    return [row[3] for row in connection.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+
+
+def time_statement(
+    connection: sqlite3.Connection, query: str, params: tuple, repeats: int
+) -> float:
+    """Returns the fastest of the repeated runs of the statement in ms,
+    rolling back after each run."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        connection.execute(query, params).fetchall()
+        timings.append(time.perf_counter() - start)
+        connection.rollback()
+    return 1000 * min(timings)
+
+
+def time_prepare_and_execute(db_path: str, query: str, params: tuple, repeats: int) -> dict:
+    """Returns the time to prepare and to execute the statement, in ms.
+    The statement is run on a connection without a statement cache, which
+    prepares it every time, and on one with it cached, which doesn't; the
+    difference is the prepare time."""
+    timings = {}
+    for cached_statements in (0, STATEMENTS.get_cache_size()):
+        connection = sqlite3.connect(db_path, cached_statements=cached_statements)
+        connection.execute("PRAGMA foreign_keys = ON")
+        try:
+            # Warm the cache, where there is one
+            time_statement(connection, query, params, 1)
+            timings[cached_statements] = time_statement(connection, query, params, repeats)
+        finally:
+            connection.close()
+    uncached, cached = timings.values()
+    return {"prepare_ms": max(uncached - cached, 0.0), "execute_ms": cached}
+
+
+def check_query_plans(db_path: str, repeats: int = LATENCY_REPEATS) -> dict:
+    """Runs every Repository method against the database, explaining and
+    timing the statements it issues. Every change is rolled back.
+
+    Returns:
+        A dict with the per-statement plans, the per-method latencies, the
+        statements which scan catalogue tables on hot paths, and any public
+        Repository methods the harness doesn't know how to call.
+    """
+    db = RecordingDatabase(db_path)
+    repo = Repository(db)
+    samples = QuerySamples(repo)
+    db.statements.clear()
+    methods = list_repository_methods()
+    latencies = {}
+    for method in methods:
+        if method not in REPOSITORY_CALLS:
+            continue
+        args = REPOSITORY_CALLS[method](samples)
+        timings = []
+        for repeat in range(repeats):
+            # Only record the statements from the first call
+            db.method = method if repeat == 0 else None
+            start = time.perf_counter()
+            result = getattr(repo, method)(*args)
+            # Drain the cursors returned by the streaming methods
+            if isinstance(result, sqlite3.Cursor):
+                list(result)
+            timings.append(time.perf_counter() - start)
+            db.connection.rollback()
+        latencies[method] = {"min_ms": 1000 * min(timings), "mean_ms": 1000 * sum(timings) / repeats}
+
+    # Explain every distinct statement
+    statements = unique_statements(db.statements)
+    tables = {
+        row[0] for row in db.connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%';"
+        )
+    }
+    catalogue_tables = tables - REFERENCE_TABLES
+    aliases = build_alias_map(db.connection, [query for _, query, _ in statements])
+    plans = []
+    for method, query, params in statements:
+        plan = explain(db.connection, query, params)
+        scans = find_full_scans(plan, aliases, catalogue_tables)
+        plans.append({
+            "method": method,
+            "name": STATEMENTS.name_of(query),
+            "sql": normalise_sql(query),
+            "plan": plan,
+            "scans": scans,
+            "ok": len(scans) == 0 or is_bulk_method(method),
+        })
+    db.connection.rollback()
+    db.connection.close()
+    # Split each statement's time into preparing and executing it
+    for plan, (_, query, params) in zip(plans, statements):
+        plan.update(time_prepare_and_execute(db_path, query, params, repeats))
+    return {
+        "plans": plans,
+        "latencies": latencies,
+        "violations": [plan for plan in plans if not plan["ok"]],
+        "uncovered_methods": [method for method in methods if method not in REPOSITORY_CALLS],
+    }
+
+
+def format_report(results: dict) -> str:
+    """Returns a human readable summary of the plan check."""
+    lines = [f"{'method':<44}{'min ms':>10}{'mean ms':>10}  plan"]
+    for method, latency in sorted(results["latencies"].items(), key=lambda item: -item[1]["mean_ms"]):
+        method_plans = [plan for plan in results["plans"] if plan["method"] == method]
+        verdict = "ok"
+        if any(not plan["ok"] for plan in method_plans):
+            verdict = "SCAN " + ", ".join(sorted({t for p in method_plans for t in p["scans"]}))
+        elif any(plan["scans"] for plan in method_plans):
+            verdict = "bulk scan"
+        lines.append(f"{method:<44}{latency['min_ms']:>10.3f}{latency['mean_ms']:>10.3f}  {verdict}")
+    lines += ["", f"{'statement':<56}{'prepare ms':>12}{'execute ms':>12}"]
+    for plan in sorted(results["plans"], key=lambda plan: -plan["prepare_ms"]):
+        name = plan["name"] or f"{plan['method']} (unregistered)"
+        lines.append(f"{name:<56}{plan['prepare_ms']:>12.3f}{plan['execute_ms']:>12.3f}")
+    if results["violations"]:
+        lines += ["", "Hot-path statements scanning catalogue tables:"]
+        for plan in results["violations"]:
+            lines.append(f"  {plan['method']}: {plan['sql'][:100]}")
+            lines += [f"      {detail}" for detail in plan["plan"]]
+    if results["uncovered_methods"]:
+        lines += ["", "Repository methods with no entry in REPOSITORY_CALLS:"]
+        lines += [f"  {method}" for method in results["uncovered_methods"]]
+    return "\n".join(lines)
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="CoDiet query plan regression check.")
+    parser.add_argument("--scale", choices=list(SCALES), default="10k")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR)
+    parser.add_argument("--output", help="Path to write the JSON results to.")
+    args = parser.parse_args()
+
+    db_path = get_synthetic_database(args.work_dir, args.scale, args.seed)
+    results = check_query_plans(db_path)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=4)
+    print(format_report(results))
+    if results["violations"] or results["uncovered_methods"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
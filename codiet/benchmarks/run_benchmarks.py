@@ -0,0 +1,392 @@
+"""Repeatable scaling benchmarks over synthetic catalogues.
+
+Usage:
+    python -m codiet.benchmarks.run_benchmarks run --scale 10k --output results.json
+    python -m codiet.benchmarks.run_benchmarks compare before.json after.json
+
+Each run records its results, with the git revision, as JSON so that runs
+on different revisions can be compared.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+import numpy as np
+
+from codiet.benchmarks.synthetic import (
+    SCALES,
+    build_synthetic_database,
+    generate_ingredient_datafiles,
+    generate_recipe_datafiles,
+    write_datafiles,
+)
+from codiet.db.autosave import AutosaveQueue
+from codiet.db.database_service import DatabaseService
+from codiet.db_construction import populate_database
+from codiet.db_construction.create_schema import create_schema
+from codiet.optimiser.catalogue import Catalogue
+from codiet.optimiser.costs import CostEngine
+from codiet.optimiser.glycaemic import GlycaemicEngine
+from codiet.optimiser.objectives import (
+    CostObjective,
+    GlycaemicLoadObjective,
+    NutrientTargetObjective,
+    evaluate_plans,
+)
+from codiet.optimiser.planner import MealPlanner, PlanProfile
+from codiet.optimiser.portions import PortionFitter
+from codiet.optimiser.search import PlanOptimiser
+from codiet.optimiser.snapshot import export_snapshot, load_snapshot
+
+# Where the synthetic databases are kept between runs
+DEFAULT_WORK_DIR = os.path.join(tempfile.gettempdir(), "codiet_benchmarks")
+# The largest catalogue pushed through the datafile build, which is slow
+MAX_BUILD_SCALE = 250
+
+
+def time_function(func: Callable[[], object], iterations: int) -> dict:
+    """Times a function over a number of iterations."""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        "iterations": iterations,
+        "total_s": sum(timings),
+        "mean_ms": 1000 * sum(timings) / iterations,
+        "min_ms": 1000 * min(timings),
+    }
+
+
+def get_synthetic_database(work_dir: str, scale: str, seed: int) -> str:
+    """Returns the path to a synthetic database, building it if required."""
+    os.makedirs(work_dir, exist_ok=True)
+    db_path = os.path.join(work_dir, f"synthetic_{scale}_{seed}.db")
+    if not os.path.exists(db_path):
+        num_ingredients, num_recipes = SCALES[scale]
+        build_synthetic_database(db_path, num_ingredients, num_recipes, seed)
+    return db_path
+
+
+def benchmark_load(db_path: str, rng: random.Random) -> dict:
+    """Benchmark loading ingredients, recipes and the whole catalogue."""
+    with DatabaseService(db_path) as db_service:
+        ingredient_names = rng.sample(db_service.fetch_all_ingredient_names(), 50)
+        recipe_names = rng.sample(db_service.fetch_all_recipe_names(), 20)
+        return {
+            "load_ingredient": time_function(
+                lambda: [db_service.fetch_ingredient_by_name(name) for name in ingredient_names], 1
+            ),
+            "load_recipe": time_function(
+                lambda: [db_service.fetch_recipe_by_name(name) for name in recipe_names], 1
+            ),
+            "load_catalogue": time_function(lambda: Catalogue.from_database(db_service), 3),
+            "export_snapshot": time_function(
+                lambda: export_snapshot(db_service, db_path, f"{db_path}.snapshot"), 1
+            ),
+            "load_catalogue_snapshot": time_function(
+                lambda: Catalogue.from_snapshot(load_snapshot(f"{db_path}.snapshot")), 3
+            ),
+        }
+
+
+def benchmark_save(db_path: str, rng: random.Random) -> dict:
+    """Benchmark saving ingredients and recipes.
+    The entities are saved unchanged, so the database is not altered."""
+    with DatabaseService(db_path) as db_service:
+        ingredients = [
+            db_service.fetch_ingredient_by_name(name)
+            for name in rng.sample(db_service.fetch_all_ingredient_names(), 20)
+        ]
+        recipes = [
+            db_service.fetch_recipe_by_name(name)
+            for name in rng.sample(db_service.fetch_all_recipe_names(), 20)
+        ]
+
+        def save_ingredients():
+            for ingredient in ingredients:
+                db_service.update_ingredient(ingredient)
+            db_service.commit()
+
+        def save_recipes():
+            for recipe in recipes:
+                db_service.update_recipe(recipe)
+            db_service.commit()
+
+        return {
+            "save_ingredient": time_function(save_ingredients, 1),
+            "save_recipe": time_function(save_recipes, 1),
+        }
+
+
+def benchmark_autosave(db_path: str, rng: random.Random, num_edits: int = 50) -> dict:
+    """Benchmark a burst of edits to one recipe ingredient quantity, saved by
+    rewriting the recipe per edit, against queueing them for autosave.
+    The last edit restores the quantity, so the database is not altered."""
+    with DatabaseService(db_path) as db_service:
+        recipe = db_service.fetch_recipe_by_name(rng.choice(db_service.fetch_all_recipe_names()))
+    ingredient_id, quantity = next(iter(recipe.ingredient_quantities.items()))
+    values = [float(i) for i in range(1, num_edits)] + [quantity.qty_value]
+
+    def rewrite_per_edit():
+        for value in values:
+            recipe.update_ingredient_quantity_value(ingredient_id, value)
+            with DatabaseService(db_path) as db_service:
+                db_service.update_recipe(recipe)
+                db_service.commit()
+
+    def queue_edits():
+        queue = AutosaveQueue(db_path, interval=60)
+        for value in values:
+            queue.put(
+                ("recipe_ingredient", recipe.id, ingredient_id, "qty_value"),
+                "update_recipe_ingredient_field",
+                recipe.id,
+                ingredient_id,
+                "qty_value",
+                value,
+            )
+        queue.stop()
+
+    return {
+        "edit_burst_rewrites": time_function(rewrite_per_edit, 1),
+        "edit_burst_autosave": time_function(queue_edits, 1),
+    }
+
+
+def benchmark_search(db_path: str, rng: random.Random) -> dict:
+    """Benchmark fuzzy searching the ingredient names."""
+    # Imported here, as fuzzywuzzy is only needed for this benchmark
+    from codiet.utils.search import filter_text
+    with DatabaseService(db_path) as db_service:
+        ingredient_names = db_service.fetch_all_ingredient_names()
+    search_terms = [name.split(" ")[-2][:5].lower() for name in rng.sample(ingredient_names, 3)]
+    return {
+        "search_ingredient_names": time_function(
+            lambda: [filter_text(term, ingredient_names) for term in search_terms], 1
+        ),
+    }
+
+
+def benchmark_nutrient_search(db_path: str) -> dict:
+    """Benchmark the SQL nutrient aggregation and the nutrient range searches."""
+    with DatabaseService(db_path) as db_service:
+        return {
+            "refresh_recipe_nutrient_totals": time_function(
+                db_service.refresh_recipe_nutrient_totals, 1
+            ),
+            "search_ingredients_by_nutrient": time_function(
+                lambda: db_service.fetch_ingredient_ids_by_nutrient_density(
+                    "protein", min_grams_per_gram=0.2
+                ), 10
+            ),
+            "search_recipes_by_nutrients": time_function(
+                lambda: db_service.fetch_recipe_ids_by_nutrient_ranges(
+                    {"energy": (None, 600), "protein": (30, None)}
+                ), 10
+            ),
+        }
+
+
+def benchmark_build(work_dir: str, scale: str, seed: int) -> dict:
+    """Benchmark building a database from datafiles.
+    Capped at MAX_BUILD_SCALE, since the datafile build is slow."""
+    num_ingredients, num_recipes = (min(n, MAX_BUILD_SCALE) for n in SCALES[scale])
+    build_dir = tempfile.mkdtemp(dir=work_dir)
+    ingredient_dir = os.path.join(build_dir, "ingredient_data")
+    recipe_dir = os.path.join(build_dir, "recipe_data")
+    write_datafiles(generate_ingredient_datafiles(num_ingredients, seed), ingredient_dir)
+    write_datafiles(generate_recipe_datafiles(num_recipes, num_ingredients, seed), recipe_dir)
+    db_path = os.path.join(build_dir, "build.db")
+
+    def build():
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        create_schema(db_path)
+        populate_database.push_flags_to_db(db_path)
+        populate_database.push_nutrients_to_db(db_path)
+        populate_database.push_global_recipe_tags_to_db(db_path)
+        populate_database.push_ingredients_to_db(db_path, ingredient_dir)
+        populate_database.push_recipes_to_db(db_path, recipe_dir)
+
+    result = time_function(build, 1)
+    result["entities"] = num_ingredients + num_recipes
+    return {"build_from_datafiles": result}
+
+
+def benchmark_plan_evaluation(db_path: str, rng: random.Random) -> dict:
+    """Benchmark scoring a population of candidate plans."""
+    with DatabaseService(db_path) as db_service:
+        catalogue = Catalogue.from_database(db_service)
+    objectives = [CostObjective(CostEngine(catalogue))]
+    # A population of week-long plans of three meals a day
+    plans = np.random.default_rng(rng.randrange(2**32)).integers(
+        0, catalogue.num_recipes, size=(10000, 21)
+    )
+    return {
+        "price_catalogue": time_function(lambda: CostEngine(catalogue).recipe_costs, 10),
+        "evaluate_plans": time_function(lambda: evaluate_plans(plans, objectives), 10),
+    }
+
+
+def benchmark_portion_fitting(db_path: str, rng: random.Random) -> dict:
+    """Benchmark fitting recipes to an energy and macro target, one recipe
+    at a time as the recipe editor does, and the whole catalogue at once."""
+    snapshot = load_snapshot(os.path.splitext(db_path)[0] + ".snapshot", db_path)
+    fitter = PortionFitter(snapshot)
+    target_names = ["energy", "protein", "fat", "carbohydrate"]
+    targets = np.array([600.0, 30.0, 20.0, 70.0])
+    recipe_ids = fitter.catalogue.recipe_ids
+    return {
+        "fit_one_recipe": time_function(
+            lambda: fitter.fit_recipes([rng.choice(recipe_ids)], target_names, targets), 100
+        ),
+        "fit_all_recipes": time_function(lambda: fitter.fit_recipes(recipe_ids, target_names, targets), 3),
+    }
+
+
+def benchmark_candidate_prefilter(db_path: str) -> dict:
+    """Benchmark pre-filtering the candidates of a week of tagged meals with
+    nutrient targets, and searching for plans with and without it. Without
+    the pre-filter, unsuitable recipes are left to the search's constraints."""
+    snapshot = load_snapshot(os.path.splitext(db_path)[0] + ".snapshot", db_path)
+    planner = MealPlanner(snapshot)
+    profile = PlanProfile.from_dict({
+        "name": "Benchmark",
+        "meal_times": ["08:00", "12:30", "18:30"],
+        "days": 7,
+        "tags": ["meal"],
+        "meal_tags": {"08:00": ["meal/savory/breakfast"]},
+        "nutrient_targets": {"energy": 2000, "protein": 60},
+    })
+    _, report = planner.prefilter.filter(profile)
+    results = {
+        "candidate_prefilter": {
+            **time_function(lambda: planner.prefilter.filter(profile), 10),
+            "log10_search_space": report["log10_search_space"],
+        }
+    }
+    for name, prefilter in [("plan_search_unfiltered", False), ("plan_search_prefiltered", True)]:
+        optimiser = PlanOptimiser(planner, prefilter=prefilter)
+        timing = time_function(lambda: optimiser.optimise(profile), 3)
+        result = optimiser.optimise(profile)
+        results[name] = {**timing, "generations": result["generations"], "objectives": result["objectives"]}
+    return results
+
+
+def benchmark_glycaemic_load(db_path: str, rng: random.Random) -> dict:
+    """Benchmark calculating every recipe's glycaemic load, and scoring a
+    population of plans on glycaemic load against scoring them on macros."""
+    snapshot = load_snapshot(os.path.splitext(db_path)[0] + ".snapshot", db_path)
+    planner = MealPlanner(snapshot)
+    # A population of week-long plans of three meals a day
+    plans = np.random.default_rng(rng.randrange(2**32)).integers(
+        0, planner.catalogue.num_recipes, size=(10000, 21)
+    )
+    macro_names = ["energy", "protein", "fat", "carbohydrate"]
+    macros = [NutrientTargetObjective(
+        planner.recipe_target_totals(macro_names), np.array([2000.0, 60.0, 70.0, 250.0]), 3
+    )]
+    glycaemic = [GlycaemicLoadObjective(planner.glycaemic_engine, 7)]
+    return {
+        "recipe_glycaemic_loads": time_function(
+            lambda: GlycaemicEngine(snapshot, planner.catalogue).recipe_loads, 10
+        ),
+        "evaluate_plans_macros": time_function(lambda: evaluate_plans(plans, macros), 10),
+        "evaluate_plans_glycaemic": time_function(lambda: evaluate_plans(plans, glycaemic), 10),
+    }
+
+
+def get_git_revision() -> str | None:
+    """Returns the current git revision, if there is one."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(scale: str, seed: int = 0, work_dir: str = DEFAULT_WORK_DIR) -> dict:
+    """Runs every benchmark at the given scale and returns the results."""
+    db_path = get_synthetic_database(work_dir, scale, seed)
+    rng = random.Random(seed)
+    results = {}
+    results.update(benchmark_load(db_path, rng))
+    results.update(benchmark_save(db_path, rng))
+    results.update(benchmark_autosave(db_path, rng))
+    results.update(benchmark_search(db_path, rng))
+    results.update(benchmark_nutrient_search(db_path))
+    results.update(benchmark_build(work_dir, scale, seed))
+    results.update(benchmark_plan_evaluation(db_path, rng))
+    results.update(benchmark_portion_fitting(db_path, rng))
+    results.update(benchmark_candidate_prefilter(db_path))
+    results.update(benchmark_glycaemic_load(db_path, rng))
+    num_ingredients, num_recipes = SCALES[scale]
+    return {
+        "revision": get_git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "scale": scale,
+        "num_ingredients": num_ingredients,
+        "num_recipes": num_recipes,
+        "seed": seed,
+        "benchmarks": results,
+    }
+
+
+def compare_results(before: dict, after: dict) -> list[str]:
+    """Returns a line per benchmark comparing the mean times of two runs."""
+    lines = [f"{'benchmark':<28}{'before ms':>12}{'after ms':>12}{'ratio':>8}"]
+    for name, after_result in after["benchmarks"].items():
+        before_result = before["benchmarks"].get(name)
+        if before_result is None:
+            lines.append(f"{name:<28}{'-':>12}{after_result['mean_ms']:>12.2f}{'-':>8}")
+            continue
+        ratio = after_result["mean_ms"] / before_result["mean_ms"]
+        lines.append(
+            f"{name:<28}{before_result['mean_ms']:>12.2f}{after_result['mean_ms']:>12.2f}{ratio:>8.2f}"
+        )
+    return lines
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="CoDiet scaling benchmarks.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks.")
+    run_parser.add_argument("--scale", choices=list(SCALES), default="1k")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR)
+    run_parser.add_argument("--output", help="Path to write the JSON results to.")
+    compare_parser = subparsers.add_parser("compare", help="Compare two sets of results.")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = run_benchmarks(args.scale, args.seed, args.work_dir)
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump(results, file, indent=4)
+        for name, result in results["benchmarks"].items():
+            print(f"{name:<28}{result['mean_ms']:>12.2f} ms")
+    else:
+        with open(args.before) as file:
+            before = json.load(file)
+        with open(args.after) as file:
+            after = json.load(file)
+        print("\n".join(compare_results(before, after)))
+
+
+if __name__ == "__main__":
+    main()
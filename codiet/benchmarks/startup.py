@@ -0,0 +1,110 @@
+"""Benchmark of the application's cold start time, up to the first paint.
+
+Usage:
+    python -m codiet.benchmarks.startup --runs 5 --output startup.json
+
+Each run starts a fresh interpreter, so imports are measured cold. The Qt
+offscreen platform is used, so no display is needed.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Modules which should not be imported before the first paint
+HEAVY_MODULES = ["fuzzywuzzy", "pymoo", "openai", "numpy"]
+
+
+def _run_child() -> None:
+    """Starts the application, and prints the timings once the window paints."""
+    timings = {"start": time.time()}
+
+    from PyQt6.QtCore import QEvent, QObject
+    from PyQt6.QtWidgets import QApplication
+
+    from codiet.views import load_stylesheet
+    from codiet.views.main_window_view import MainWindowView
+    from codiet.controllers.main_window_ctrl import MainWindowCtrl
+    timings["imported"] = time.time()
+
+    app = QApplication(sys.argv)
+    app.setStyleSheet(load_stylesheet("main.qss"))
+    window = MainWindowView()
+    main_window_ctrl = MainWindowCtrl(window)
+    timings["constructed"] = time.time()
+
+    class FirstPaintFilter(QObject):
+        """Records the time of the first paint event, then quits."""
+
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint and "painted" not in timings:
+                timings["painted"] = time.time()
+                timings["heavy_modules_loaded"] = [
+                    name for name in HEAVY_MODULES if name in sys.modules
+                ]
+                app.quit()
+            return False
+
+    paint_filter = FirstPaintFilter()
+    window.installEventFilter(paint_filter)
+    window.show()
+    app.exec()
+    print(json.dumps(timings))
+
+
+def measure_startup() -> dict:
+    """Starts the application in a fresh interpreter and returns its timings in ms."""
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    launched = time.time()
+    output = subprocess.check_output(
+        [sys.executable, "-m", "codiet.benchmarks.startup", "--child"], env=env, text=True
+    )
+    timings = json.loads(output.strip().splitlines()[-1])
+    return {
+        "interpreter_ms": 1000 * (timings["start"] - launched),
+        "import_ms": 1000 * (timings["imported"] - timings["start"]),
+        "construct_ms": 1000 * (timings["constructed"] - timings["imported"]),
+        "first_paint_ms": 1000 * (timings["painted"] - launched),
+        "heavy_modules_loaded": timings["heavy_modules_loaded"],
+    }
+
+
+def run_startup_benchmark(runs: int = 5) -> dict:
+    """Measures the cold start time over a number of runs."""
+    results = [measure_startup() for _ in range(runs)]
+    summary = {}
+    for key in ["interpreter_ms", "import_ms", "construct_ms", "first_paint_ms"]:
+        values = [result[key] for result in results]
+        summary[key] = {"mean": sum(values) / runs, "min": min(values)}
+    summary["heavy_modules_loaded"] = results[-1]["heavy_modules_loaded"]
+    return {"runs": runs, "startup": summary}
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="CoDiet startup benchmark.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Path to write the JSON results to.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _run_child()
+        return
+
+    results = run_startup_benchmark(args.runs)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=4)
+    for key, value in results["startup"].items():
+        if key == "heavy_modules_loaded":
+            print(f"{key:<20}{', '.join(value) or 'none'}")
+        else:
+            print(f"{key:<20}{value['mean']:>10.1f} ms (min {value['min']:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
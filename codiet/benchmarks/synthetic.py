@@ -0,0 +1,311 @@
+"""Seeded generator for synthetic ingredient and recipe catalogues.
+
+Synthetic ingredients are perturbed copies of the real ingredient datafiles,
+so their nutrient, flag, GI and cost distributions follow the real data.
+Synthetic recipes draw their ingredients, serve times and tags at random.
+The output is either datafiles in the same format as ingredient_data and
+recipe_data, or a ready-built database.
+"""
+
+import json
+import os
+import random
+import sqlite3
+
+from codiet.db_construction import (
+    INGREDIENT_DATA_DIR,
+    GLOBAL_RECIPE_TAG_DATA_FILEPATH,
+)
+from codiet.db_construction import populate_database
+from codiet.db_construction.create_schema import create_schema
+from codiet.utils.strings import convert_to_snake_case
+from codiet.utils.tags import flatten_tree
+from codiet.utils.time import (
+    convert_minutes_to_time_string,
+    convert_time_string_interval_to_minute_interval,
+)
+
+# The ingredient and recipe counts for each named scale
+SCALES = {
+    "1k": (1000, 1000),
+    "10k": (10000, 10000),
+    "100k": (100000, 100000),
+}
+
+# Words used to make the synthetic ingredient names unique but searchable
+_NAME_MODIFIERS = [
+    "Organic", "Fresh", "Frozen", "Dried", "Smoked", "Roasted", "Raw",
+    "Tinned", "Wild", "Free Range", "Reduced Fat", "Wholemeal", "Sweet",
+]
+
+# Typical serve time windows, as (start, end) minutes past midnight
+_SERVE_TIME_WINDOWS = [
+    (6 * 60, 11 * 60),  # breakfast
+    (11 * 60 + 30, 14 * 60 + 30),  # lunch
+    (17 * 60 + 30, 21 * 60 + 30),  # dinner
+    (9 * 60, 23 * 60),  # snacks
+    (22 * 60, 2 * 60),  # late night, wrapping past midnight
+]
+
+# The probability of flipping each flag copied from a source ingredient
+_FLAG_FLIP_PROBABILITY = 0.05
+# The spread of the multiplicative noise applied to copied values
+_VALUE_SIGMA = 0.25
+
+
+def load_source_ingredient_datafiles(ingredient_data_dir: str = INGREDIENT_DATA_DIR) -> list[dict]:
+    """Load the real ingredient datafiles used as the source distribution."""
+    datafiles = []
+    for filename in sorted(os.listdir(ingredient_data_dir)):
+        with open(os.path.join(ingredient_data_dir, filename)) as file:
+            datafiles.append(json.load(file))
+    return datafiles
+
+
+def _jitter(rng: random.Random, value: float | None) -> float | None:
+    """Apply multiplicative log-normal noise to a value, preserving None and zero."""
+    if value is None:
+        return None
+    return round(value * rng.lognormvariate(0, _VALUE_SIGMA), 6)
+
+
+def _jitter_gi(rng: random.Random, gi: float | None) -> float | None:
+    """Apply noise to a GI value, keeping it on the 0-100 scale."""
+    if gi is None:
+        return None
+    return min(100.0, round(gi * rng.lognormvariate(0, _VALUE_SIGMA), 1))
+
+
+def generate_ingredient_datafiles(
+    num_ingredients: int, seed: int = 0, source_datafiles: list[dict] | None = None
+) -> list[dict]:
+    """Generate synthetic ingredient datafiles.
+
+    Each ingredient is a copy of a randomly chosen real ingredient, with
+    noise applied to its nutrient, cost and GI values and a small chance of
+    each flag being flipped.
+    """
+    rng = random.Random(seed)
+    if source_datafiles is None:
+        source_datafiles = load_source_ingredient_datafiles()
+    datafiles = []
+    for i in range(num_ingredients):
+        source = rng.choice(source_datafiles)
+        modifier = rng.choice(_NAME_MODIFIERS)
+        datafile = {
+            "name": f"{modifier} {source['name']} {i + 1}",
+            "description": source["description"],
+            "cost": dict(source["cost"], cost_value=_jitter(rng, source["cost"]["cost_value"])),
+            "bulk": json.loads(json.dumps(source["bulk"])),
+            "flags": {
+                flag: (not value) if rng.random() < _FLAG_FLIP_PROBABILITY else value
+                for flag, value in source["flags"].items()
+            },
+            "GI": _jitter_gi(rng, source["GI"]),
+            "nutrients": {
+                nutrient_name: {
+                    "ntr_qty_value": _jitter(rng, nutrient_data["ntr_qty_value"]),
+                    "ntr_qty_unit": nutrient_data["ntr_qty_unit"],
+                    "ing_qty_value": nutrient_data["ing_qty_value"],
+                    "ing_qty_unit": nutrient_data["ing_qty_unit"],
+                }
+                for nutrient_name, nutrient_data in source["nutrients"].items()
+            },
+        }
+        datafiles.append(datafile)
+    return datafiles
+
+
+def _generate_recipe_ingredient(rng: random.Random, ingredient_id: int) -> dict:
+    """Generate a recipe ingredient quantity, with tolerances of up to 30%."""
+    qty_value = round(rng.lognormvariate(4.2, 0.6), 1)
+    return {
+        "id": ingredient_id,
+        "qty_unit": "g",
+        "qty_value": qty_value,
+        "qty_upper_tol": round(rng.uniform(0, 30), 1),
+        "qty_lower_tol": round(rng.uniform(0, 30), 1),
+    }
+
+
+def generate_recipe_datafiles(
+    num_recipes: int, num_ingredients: int, seed: int = 0
+) -> list[dict]:
+    """Generate synthetic recipe datafiles.
+
+    Ingredients are referenced by ID, where the synthetic ingredients are
+    numbered from 1 in the order they were generated.
+    """
+    rng = random.Random(seed + 1)
+    with open(GLOBAL_RECIPE_TAG_DATA_FILEPATH) as file:
+        tags = flatten_tree(json.load(file))
+    datafiles = []
+    for i in range(num_recipes):
+        # Pick a handful of distinct ingredients
+        ingredient_ids = rng.sample(range(1, num_ingredients + 1), min(num_ingredients, rng.randint(2, 12)))
+        # Pick one or two serve windows, shifted by up to half an hour
+        serve_times = []
+        for start, end in rng.sample(_SERVE_TIME_WINDOWS, rng.randint(1, 2)):
+            shift = rng.choice([-30, -15, 0, 15, 30])
+            start, end = (start + shift) % 1440, (end + shift) % 1440
+            serve_times.append(
+                f"{convert_minutes_to_time_string(start)}-{convert_minutes_to_time_string(end)}"
+            )
+        recipe_tags = rng.sample(tags, rng.randint(1, 3))
+        datafiles.append({
+            "name": f"{recipe_tags[0].split('/')[-1].title()} Recipe {i + 1}",
+            "description": "A synthetic recipe.",
+            "instructions": "1. Combine the ingredients.",
+            "ingredients": {
+                str(ingredient_id): _generate_recipe_ingredient(rng, ingredient_id)
+                for ingredient_id in ingredient_ids
+            },
+            "serve_times": serve_times,
+            "tags": recipe_tags,
+        })
+    return datafiles
+
+
+def write_datafiles(datafiles: list[dict], data_dir: str) -> None:
+    """Write datafiles into a directory, one .json file per entity."""
+    os.makedirs(data_dir, exist_ok=True)
+    for datafile in datafiles:
+        filepath = os.path.join(data_dir, f"{convert_to_snake_case(datafile['name'])}.json")
+        with open(filepath, "w") as file:
+            json.dump(datafile, file, indent=4)
+
+
+def build_synthetic_database(
+    db_path: str, num_ingredients: int, num_recipes: int, seed: int = 0
+) -> None:
+    """Build a database populated with a synthetic catalogue.
+
+    The global flags, nutrients and recipe tags are pushed through the normal
+    population functions. The synthetic ingredients and recipes are then bulk
+    inserted, since pushing 100k entities one at a time takes far too long
+    to be a practical fixture.
+    """
+    # Start from an empty database
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    create_schema(db_path)
+    populate_database.push_flags_to_db(db_path)
+    populate_database.push_nutrients_to_db(db_path)
+    populate_database.push_global_recipe_tags_to_db(db_path)
+    # Generate the catalogue
+    ingredients = generate_ingredient_datafiles(num_ingredients, seed)
+    recipes = generate_recipe_datafiles(num_recipes, num_ingredients, seed)
+    # Bulk insert it
+    connection = sqlite3.connect(db_path)
+    with connection:
+        _insert_ingredients(connection, ingredients)
+        _insert_recipes(connection, recipes)
+    connection.close()
+
+
+def _insert_ingredients(connection: sqlite3.Connection, ingredients: list[dict]) -> None:
+    """Bulk insert ingredient datafiles, numbering them from 1."""
+    flag_ids = dict(connection.execute("SELECT flag_name, flag_id FROM global_flag_list;").fetchall())
+    nutrient_ids = dict(
+        connection.execute("SELECT nutrient_name, nutrient_id FROM global_leaf_nutrients;").fetchall()
+    )
+    connection.executemany(
+        """
+        INSERT INTO ingredient_base (
+            ingredient_id, ingredient_name, ingredient_description, ingredient_gi,
+            cost_unit, cost_value, cost_qty_unit, cost_qty_value,
+            density_mass_unit, density_mass_value, density_vol_unit, density_vol_value,
+            pc_qty, pc_mass_unit, pc_mass_value
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+        """,
+        (
+            (
+                i + 1, data["name"], data["description"], data["GI"],
+                data["cost"]["cost_unit"], data["cost"]["cost_value"],
+                data["cost"]["qty_unit"], data["cost"]["qty_value"],
+                data["bulk"]["density"]["mass_unit"], data["bulk"]["density"]["mass_value"],
+                data["bulk"]["density"]["vol_unit"], data["bulk"]["density"]["vol_value"],
+                data["bulk"]["piece_mass"]["pc_qty"], data["bulk"]["piece_mass"]["mass_unit"],
+                data["bulk"]["piece_mass"]["mass_value"],
+            )
+            for i, data in enumerate(ingredients)
+        ),
+    )
+    connection.executemany(
+        "INSERT INTO ingredient_flags (ingredient_id, flag_id, flag_value) VALUES (?, ?, ?);",
+        (
+            (i + 1, flag_ids[flag], value)
+            for i, data in enumerate(ingredients)
+            for flag, value in data["flags"].items()
+            if flag in flag_ids
+        ),
+    )
+    connection.executemany(
+        """
+        INSERT INTO ingredient_nutrients (
+            ingredient_id, nutrient_id, ntr_qty_unit, ntr_qty_value, ing_qty_unit, ing_qty_value
+        ) VALUES (?, ?, ?, ?, ?, ?);
+        """,
+        (
+            (
+                i + 1, nutrient_ids[nutrient_name],
+                nutrient_data["ntr_qty_unit"], nutrient_data["ntr_qty_value"],
+                nutrient_data["ing_qty_unit"], nutrient_data["ing_qty_value"],
+            )
+            for i, data in enumerate(ingredients)
+            for nutrient_name, nutrient_data in data["nutrients"].items()
+            if nutrient_name in nutrient_ids
+        ),
+    )
+
+
+def _insert_recipes(connection: sqlite3.Connection, recipes: list[dict]) -> None:
+    """Bulk insert recipe datafiles, numbering them from 1."""
+    tag_ids = dict(
+        connection.execute("SELECT recipe_tag_name, recipe_tag_id FROM global_recipe_tags;").fetchall()
+    )
+    connection.executemany(
+        """
+        INSERT INTO recipe_base (recipe_id, recipe_name, recipe_description, recipe_instructions)
+        VALUES (?, ?, ?, ?);
+        """,
+        (
+            (i + 1, data["name"], data["description"], data["instructions"])
+            for i, data in enumerate(recipes)
+        ),
+    )
+    connection.executemany(
+        """
+        INSERT INTO recipe_ingredients (
+            recipe_id, ingredient_id, qty_value, qty_unit, qty_tol_upper, qty_tol_lower
+        ) VALUES (?, ?, ?, ?, ?, ?);
+        """,
+        (
+            (
+                i + 1, ingredient["id"], ingredient["qty_value"], ingredient["qty_unit"],
+                ingredient["qty_upper_tol"], ingredient["qty_lower_tol"],
+            )
+            for i, data in enumerate(recipes)
+            for ingredient in data["ingredients"].values()
+        ),
+    )
+    connection.executemany(
+        """
+        INSERT INTO recipe_serve_times (recipe_id, serve_time_start, serve_time_end)
+        VALUES (?, ?, ?);
+        """,
+        (
+            (i + 1, *convert_time_string_interval_to_minute_interval(serve_time))
+            for i, data in enumerate(recipes)
+            for serve_time in data["serve_times"]
+        ),
+    )
+    connection.executemany(
+        "INSERT INTO recipe_tags (recipe_id, recipe_tag_id) VALUES (?, ?);",
+        (
+            (i + 1, tag_ids[tag])
+            for i, data in enumerate(recipes)
+            for tag in data["tags"]
+        ),
+    )
+
@@ -0,0 +1,365 @@
+"""Headless command line interface for batch jobs.
+
+Runs the nutrition, pricing, planning and build calculations against the
+database without the GUI, so none of it imports Qt. Results are streamed
+one record at a time as CSV or JSON Lines, and job files are processed in
+chunks across a pool of worker processes, each of which maps the catalogue
+snapshot rather than querying the database.
+
+Usage:
+    python -m codiet.cli nutrients --output nutrients.csv
+    python -m codiet.cli price --baskets baskets.jsonl --format jsonl
+    python -m codiet.cli plan profiles.jsonl --workers 8
+    python -m codiet.cli --format jsonl plan profiles.jsonl > plans.jsonl
+    python -m codiet.cli --format jsonl plan profiles.jsonl --optimise
+    python -m codiet.cli shop plans.jsonl --output shopping.csv
+    python -m codiet.cli build
+
+Job files are JSON Lines. Each basket is {"name": ..., "ingredients":
+{ingredient name: grams}}, and each profile is {"name": ..., "meal_times":
+["HH:MM", ...], "days": ..., "flags": [...], "max_repeats": ...}, with
+optional required "tags": [...] and "meal_tags": {"HH:MM": [...]},
+"excluded_recipe_ids": [...] and, for the optimiser, "nutrient_targets":
+{nutrient name: daily target}, "minimise_glycaemic_load": true and
+"max_daily_glycaemic_load": .... With --optimise, each plan is searched for
+against cost, the nutrient targets and glycaemic load, starting from the
+archived result of the closest earlier problem. The shop command reads
+plans as written by the plan command, {"name": ..., "recipe_ids": [...]},
+and lists the ingredients to buy for each plan.
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Callable, Iterable, Iterator, TextIO
+
+import numpy as np
+
+from codiet.db import DB_PATH, PLAN_ARCHIVE_PATH, SNAPSHOT_PATH
+from codiet.db.database_service import DatabaseService
+from codiet.optimiser.costs import CostEngine
+from codiet.optimiser.catalogue import Catalogue
+from codiet.optimiser.planner import init_planner_worker, plan_in_worker
+from codiet.optimiser.search import init_optimiser_worker, optimise_in_worker
+from codiet.optimiser.shopping import aggregate_plan_ingredients, expand_plans, round_to_packs
+from codiet.optimiser.snapshot import CatalogueSnapshot, load_snapshot
+
+# The most jobs sent to a worker at a time
+JOB_CHUNK_SIZE = 64
+# Optimising a plan takes seconds, so each is sent to a worker on its own
+OPTIMISE_CHUNK_SIZE = 1
+# The number of chunks queued per worker, bounding memory on large job files
+CHUNKS_PER_WORKER = 2
+
+# Per-process state, set up once by the worker initialisers
+_worker_state: dict = {}
+
+
+def write_records(
+    records: Iterable[dict], fmt: str, file: TextIO, fieldnames: list[str] | None = None
+) -> int:
+    """Streams the records to the file as CSV or JSON Lines.
+    CSV fieldnames default to the keys of the first record.
+    Returns the number of records written."""
+    count = 0
+    writer = None
+    for record in records:
+        if fmt == "jsonl":
+            file.write(json.dumps(record) + "\n")
+        else:
+            if writer is None:
+                writer = csv.DictWriter(
+                    file, fieldnames=fieldnames or list(record), extrasaction="ignore"
+                )
+                writer.writeheader()
+            writer.writerow(record)
+        count += 1
+    return count
+
+
+def read_jobs(path: str) -> Iterator[dict]:
+    """Yields the jobs in a JSON Lines file, skipping blank lines."""
+    with open(path) as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _run_chunk(func: Callable[[dict], dict], jobs: list[dict]) -> list[dict]:
+    """Runs a chunk of jobs, returning an error record for any that fail."""
+    results = []
+    for job in jobs:
+        try:
+            results.append(func(job))
+        except (KeyError, ValueError, TypeError) as e:
+            results.append({"name": job.get("name"), "error": str(e)})
+    return results
+
+
+def chunk_jobs(jobs: Iterable[dict], workers: int, chunk_size: int) -> Iterator[list[dict]]:
+    """Yields the jobs in chunks of up to the chunk size. Job files too short
+    to queue full chunks for every worker are split evenly across them
+    instead, so a short file doesn't all run on one worker."""
+    jobs = iter(jobs)
+    # Read ahead as many jobs as the workers can have queued
+    queued = max(workers, 1) * CHUNKS_PER_WORKER
+    head = list(islice(jobs, queued * chunk_size))
+    if len(head) < queued * chunk_size:
+        chunk_size = max(math.ceil(len(head) / queued), 1)
+    jobs = chain(head, jobs)
+    return iter(lambda: list(islice(jobs, chunk_size)), [])
+
+
+def run_jobs(
+    func: Callable[[dict], dict],
+    jobs: Iterable[dict],
+    workers: int,
+    initializer: Callable,
+    initargs: tuple = (),
+    chunk_size: int = JOB_CHUNK_SIZE,
+) -> Iterator[dict]:
+    """Yields the result of each job, in job order.
+
+    The jobs are read lazily and sent to the workers in chunks, with only a
+    few chunks in flight per worker, so job files of any size stream through
+    in constant memory. With a single worker the jobs run in this process.
+    """
+    chunks = chunk_jobs(jobs, workers, chunk_size)
+    if workers <= 1:
+        initializer(*initargs)
+        for chunk in chunks:
+            yield from _run_chunk(func, chunk)
+        return
+    with ProcessPoolExecutor(workers, initializer=initializer, initargs=initargs) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_run_chunk, func, chunk))
+            # Wait for the oldest chunk once the queue is full
+            if len(pending) >= workers * CHUNKS_PER_WORKER:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _init_pricer(snapshot_path: str, db_path: str) -> None:
+    """Maps the snapshot and loads the ingredient names in a worker."""
+    catalogue = Catalogue.from_snapshot(CatalogueSnapshot(snapshot_path))
+    _worker_state["cost_engine"] = CostEngine(catalogue)
+    with DatabaseService(db_path) as db_service:
+        _worker_state["ingredient_ids"] = db_service.fetch_ingredient_ids_by_names(
+            db_service.fetch_all_ingredient_names()
+        )
+
+
+def _price_job(job: dict) -> dict:
+    """Prices one basket of ingredient quantities in grams."""
+    cost_engine = _worker_state["cost_engine"]
+    ingredient_ids = _worker_state["ingredient_ids"]
+    names = list(job["ingredients"])
+    unknown = [name for name in names if name not in ingredient_ids]
+    if unknown:
+        raise ValueError(f"Unknown ingredients: {', '.join(unknown)}.")
+    cols = cost_engine.catalogue.ingredient_positions([ingredient_ids[name] for name in names])
+    grams = np.array([job["ingredients"][name] for name in names], dtype=np.float64)
+    costs, incomplete = cost_engine.price_quantities(
+        rows=np.zeros(len(names), dtype=np.int64), cols=cols, grams=grams, num_rows=1
+    )
+    return {"name": job["name"], "cost": float(costs[0]), "incomplete": bool(incomplete[0])}
+
+
+def _format_plan(result: dict) -> dict:
+    """Flattens the lists in a plan result for CSV output."""
+    if "error" in result:
+        return result
+    return {
+        **result,
+        "recipe_ids": " ".join(str(id) for id in result["recipe_ids"]),
+        "meal_times": " ".join(result["meal_times"]),
+    }
+
+
+def nutrient_records(db_path: str) -> Iterator[dict]:
+    """Yields the nutrient totals of every recipe, bringing them up to date first."""
+    with DatabaseService(db_path) as db_service:
+        db_service.sync_recipe_nutrient_totals()
+        for recipe_id, recipe_name, totals in db_service.iter_recipe_nutrient_totals():
+            yield {"recipe_id": recipe_id, "recipe_name": recipe_name, **totals}
+
+
+def recipe_price_records(db_path: str, snapshot_path: str) -> Iterator[dict]:
+    """Yields the cost of every recipe in the catalogue."""
+    snapshot = load_snapshot(snapshot_path, db_path)
+    cost_engine = CostEngine(Catalogue.from_snapshot(snapshot))
+    recipe_index = cost_engine.catalogue.recipe_index
+    with DatabaseService(db_path) as db_service:
+        for recipe_id, recipe_name in db_service.iter_recipe_names():
+            position = recipe_index[recipe_id]
+            yield {
+                "recipe_id": recipe_id,
+                "recipe_name": recipe_name,
+                "cost": float(cost_engine.recipe_costs[position]),
+                "incomplete": bool(cost_engine.recipe_costs_incomplete[position]),
+            }
+
+
+def _parse_recipe_ids(recipe_ids: list[int] | str) -> list[int]:
+    """Returns the recipe IDs of a plan, which CSV output flattens to a string."""
+    if isinstance(recipe_ids, str):
+        return [int(id) for id in recipe_ids.split()]
+    return [int(id) for id in recipe_ids]
+
+
+def shopping_list_records(
+    db_path: str, snapshot_path: str, plans: Iterable[dict], combine: bool = False
+) -> Iterator[dict]:
+    """Yields the ingredients to buy for each plan, or for every plan
+    together if combined. Plans which failed to generate are skipped."""
+    plans = [plan for plan in plans if "error" not in plan]
+    plan_names = ["all"] if combine else [plan["name"] for plan in plans]
+    cost_engine = CostEngine(Catalogue.from_snapshot(load_snapshot(snapshot_path, db_path)))
+    catalogue = cost_engine.catalogue
+    plan_rows, recipe_positions = expand_plans(
+        catalogue, [_parse_recipe_ids(plan["recipe_ids"]) for plan in plans]
+    )
+    if combine:
+        plan_rows = np.zeros_like(plan_rows)
+    rows, cols, grams, incomplete = aggregate_plan_ingredients(catalogue, plan_rows, recipe_positions)
+    packs = round_to_packs(cost_engine, cols, grams)
+    with DatabaseService(db_path) as db_service:
+        ingredient_names = {
+            id: name for name, id in db_service.fetch_ingredient_ids_by_names(
+                db_service.fetch_all_ingredient_names()
+            ).items()
+        }
+        # Express each quantity in the unit the ingredient is bought in
+        cost_units = {row[0]: (row[2], row[3]) for row in db_service.fetch_all_ingredient_quantity_data()}
+    for i in range(len(rows)):
+        ingredient_id = int(catalogue.ingredient_ids[cols[i]])
+        unit, pack_size = cost_units[ingredient_id]
+        if unit is None or not pack_size or np.isnan(packs["pack_grams"][i]):
+            unit, pack_size, grams_per_unit = "g", None, 1.0
+        else:
+            grams_per_unit = packs["pack_grams"][i] / pack_size
+        yield {
+            "plan": plan_names[rows[i]],
+            "ingredient_id": ingredient_id,
+            "ingredient_name": ingredient_names[ingredient_id],
+            "grams": float(grams[i]),
+            "quantity": float(grams[i] / grams_per_unit),
+            "unit": unit,
+            "pack_size": pack_size,
+            "packs": None if np.isnan(packs["packs"][i]) else int(packs["packs"][i]),
+            "pack_cost": None if np.isnan(packs["pack_cost"][i]) else float(packs["pack_cost"][i]),
+            "exact_cost": None if np.isnan(packs["exact_cost"][i]) else float(packs["exact_cost"][i]),
+            "incomplete": bool(incomplete[i]),
+        }
+
+
+def run_command(args: argparse.Namespace, output: TextIO) -> int:
+    """Runs the parsed subcommand, writing its records to the output.
+    Returns the number of records written."""
+    if args.command == "build":
+        # Imported here, as the build pulls in the datafile tooling
+        from codiet.db_construction.populate_database import build_database
+        build_database(args.db, args.snapshot)
+        return 0
+    if args.command == "nutrients":
+        fieldnames = None
+        if args.format == "csv":
+            with DatabaseService(args.db) as db_service:
+                fieldnames = ["recipe_id", "recipe_name"] + (
+                    db_service.fetch_all_group_nutrient_names()
+                    + db_service.fetch_all_leaf_nutrient_names()
+                )
+        return write_records(nutrient_records(args.db), args.format, output, fieldnames)
+    # The remaining commands work from an up to date snapshot
+    load_snapshot(args.snapshot, args.db).close()
+    if args.command == "price":
+        if args.baskets is None:
+            return write_records(recipe_price_records(args.db, args.snapshot), args.format, output)
+        records = run_jobs(
+            _price_job, read_jobs(args.baskets), args.workers, _init_pricer, (args.snapshot, args.db)
+        )
+        return write_records(records, args.format, output, ["name", "cost", "incomplete", "error"])
+    if args.command == "plan":
+        if args.optimise:
+            records = run_jobs(
+                optimise_in_worker, read_jobs(args.profiles), args.workers,
+                init_optimiser_worker, (args.snapshot, args.archive), OPTIMISE_CHUNK_SIZE,
+            )
+            fieldnames = ["name", "cost", "recipe_ids", "meal_times", "generations", "warm_start", "error"]
+        else:
+            records = run_jobs(
+                plan_in_worker, read_jobs(args.profiles), args.workers, init_planner_worker, (args.snapshot,)
+            )
+            fieldnames = ["name", "cost", "recipe_ids", "meal_times", "error"]
+        if args.format == "csv":
+            records = map(_format_plan, records)
+        return write_records(records, args.format, output, fieldnames)
+    if args.command == "shop":
+        records = shopping_list_records(args.db, args.snapshot, read_jobs(args.plans), args.combine)
+        return write_records(records, args.format, output)
+    raise ValueError(f"Unknown command {args.command}.")
+
+
+def add_common_arguments(parser: argparse.ArgumentParser, suppress_defaults: bool = False) -> None:
+    """Adds the options shared by every command. The subcommands' copies
+    suppress their defaults, so they only override an option given before
+    the subcommand when it is given again after it."""
+
+    def default(value):
+        return argparse.SUPPRESS if suppress_defaults else value
+
+    parser.add_argument("--db", default=default(DB_PATH), help="Path to the database.")
+    parser.add_argument("--snapshot", default=default(SNAPSHOT_PATH), help="Path to the catalogue snapshot.")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default=default("csv"))
+    parser.add_argument("--output", default=default(None), help="Path to write the records to, defaults to stdout.")
+    parser.add_argument("--workers", type=int, default=default(os.cpu_count() or 1))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Returns the argument parser for the command line. The common options
+    can be given before or after the subcommand."""
+    parser = argparse.ArgumentParser(description="CoDiet headless batch jobs.")
+    add_common_arguments(parser)
+    common = argparse.ArgumentParser(add_help=False)
+    add_common_arguments(common, suppress_defaults=True)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("nutrients", parents=[common], help="Report the nutrient totals of every recipe.")
+    price_parser = subparsers.add_parser("price", parents=[common], help="Price every recipe, or a file of baskets.")
+    price_parser.add_argument("--baskets", help="JSON Lines file of baskets to price.")
+    plan_parser = subparsers.add_parser("plan", parents=[common], help="Generate a meal plan for each profile.")
+    plan_parser.add_argument("profiles", help="JSON Lines file of plan profiles.")
+    plan_parser.add_argument("--optimise", action="store_true", help="Search for plans against every objective.")
+    plan_parser.add_argument("--archive", default=PLAN_ARCHIVE_PATH, help="Path to the optimiser's archive.")
+    shop_parser = subparsers.add_parser("shop", parents=[common], help="List the ingredients to buy for each plan.")
+    shop_parser.add_argument("plans", help="JSON Lines file of plans, as written by the plan command.")
+    shop_parser.add_argument("--combine", action="store_true", help="List every plan's ingredients together.")
+    subparsers.add_parser("build", parents=[common], help="Build the database and snapshot from the datafiles.")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point."""
+    args = build_parser().parse_args(argv)
+    if args.output:
+        with open(args.output, "w", newline="") as output:
+            count = run_command(args, output)
+    else:
+        try:
+            count = run_command(args, sys.stdout)
+        except BrokenPipeError:
+            # The reader stopped early, e.g. piped into head
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return
+    print(f"{count} records written.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
+import copy
+
 from PyQt6.QtWidgets import QListWidgetItem
 
+from codiet.db.autosave import autosave
 from codiet.db.database_service import DatabaseService
+from codiet.db.instrumentation import profiled_action
+from codiet.db.reference_data import reference_data
 from codiet.models.ingredients import Ingredient
 from codiet.models.nutrients import IngredientNutrientQuantity
 from codiet.views.ingredient_editor_view import IngredientEditorView
@@ -36,11 +41,10 @@ class IngredientEditorCtrl:
             parent=self.view
         )
 
-        # Cache searchable lists
+        # Cache searchable lists, using any prefetched copies
         self._leaf_nutrient_names: list[str] = []
         self._ingredient_names: list[str] = []
-        self._cache_leaf_nutrient_names()
-        self._cache_ingredient_names()
+        self.sync_reference_data()
 
         # Connect the module controllers
         self.search_column_ctrl = SearchColumnCtrl(
@@ -74,8 +78,7 @@ class IngredientEditorCtrl:
         # If there are no leaf ingredients cached
         if len(self._leaf_nutrient_names) == 0:
             # Fetch the leaf nutrient names from the database
-            with DatabaseService() as db_service:
-                self._leaf_nutrient_names = db_service.fetch_all_leaf_nutrient_names()
+            self._cache_leaf_nutrient_names()
         return self._leaf_nutrient_names
 
     def load_ingredient_instance(self, ingredient: Ingredient):
@@ -108,26 +111,35 @@ class IngredientEditorCtrl:
         # Set the nutrients        
         self.ingredient_nutrient_editor_ctrl.load_all_nutrient_quantities()
 
+    def sync_reference_data(self) -> None:
+        """Recache the searchable lists, refetching any changed in the database
+        since they were cached."""
+        reference_data.sync()
+        self._leaf_nutrient_names = reference_data.get("leaf_nutrient_names")
+        self._ingredient_names = reference_data.get("ingredient_names")
+
     def _cache_leaf_nutrient_names(self) -> None:
         """Cache the leaf nutrient names."""
-        with DatabaseService() as db_service:
-            self._leaf_nutrient_names = db_service.fetch_all_leaf_nutrient_names()
+        self._leaf_nutrient_names = reference_data.refresh("leaf_nutrient_names")
 
     def _cache_ingredient_names(self) -> None:
         """Cache the ingredient names."""
-        with DatabaseService() as db_service:
-            self._ingredient_names = db_service.fetch_all_ingredient_names()
+        self._ingredient_names = reference_data.refresh("ingredient_names")
 
+    @profiled_action("select ingredient")
     def _on_ingredient_selected(self, list_item:QListWidgetItem) -> None:
         """Handler for selecting an ingredient."""
         # Grab the selected ingredient name from the search widget
         ingredient_name = list_item.text()
+        # Save any queued edits, so they are fetched back
+        autosave.flush()
         # Fetch the ingredient from the database
         with DatabaseService() as db_service:
             ingredient = db_service.fetch_ingredient_by_name(ingredient_name)
         # Load the ingredient into the view
         self.load_ingredient_instance(ingredient)
 
+    @profiled_action("add ingredient")
     def _on_add_new_ingredient_clicked(self) -> None:
         """Handler for adding a new ingredient."""
         # Create a new ingredient instance
@@ -146,17 +158,25 @@ class IngredientEditorCtrl:
         if self.view.ingredient_search.result_is_selected is False:
             self.delete_ingredient_selection_needed_popup.show()
         else:
+            ingredient_name = self.view.ingredient_search.selected_result
+            # Find the recipes the ingredient will be removed from
+            with DatabaseService() as db_service:
+                recipe_names = db_service.fetch_recipe_names_using_ingredient(ingredient_name) # type: ignore
             # Set the ingredient name in the confirmation dialog
-            self.delete_ingredient_confirmation_popup.message = (
-                f"Are you sure you want to delete {self.view.ingredient_search.selected_result}?"
-            )
+            message = f"Are you sure you want to delete {ingredient_name}?"
+            if len(recipe_names) > 0:
+                message += f" It will also be removed from {len(recipe_names)} recipe(s)."
+            self.delete_ingredient_confirmation_popup.message = message
             # Show the confirmation dialog
             self.delete_ingredient_confirmation_popup.show()
 
+    @profiled_action("delete ingredient")
     def _on_confirm_delete_ingredient_clicked(self) -> None:
         """Handler for confirming the deletion of an ingredient."""
         # Grab the selected ingredient name from the search widget
         ingredient_name = self.view.ingredient_search.selected_result
+        # Save any queued edits first, so none are written to a deleted ingredient
+        autosave.flush()
         # Delete the ingredient from the database
         with DatabaseService() as db_service:
             db_service.delete_ingredient_by_name(ingredient_name) # type: ignore
@@ -183,12 +203,15 @@ class IngredientEditorCtrl:
         # Show the dialog
         self.ingredient_name_editor_dialog.show()
 
+    @profiled_action("save ingredient name")
     def _on_ingredient_name_accepted(self, name:str) -> None:
         """Handler for accepting the new ingredient name."""
         # Set the name on the ingredient
         self.ingredient.name = self.ingredient_name_editor_dialog.name
         # If the ingredient has an id already, then we must be updating
         if self.ingredient.id is not None:
+            # Save any queued edits first, so they can't land after this rewrite
+            autosave.flush()
             with DatabaseService() as db_service:
                 db_service.update_ingredient(self.ingredient)
                 db_service.commit()
@@ -207,125 +230,91 @@ class IngredientEditorCtrl:
         # Hide the new ingredient dialog
         self.ingredient_name_editor_dialog.hide()
 
+    @profiled_action("save ingredient description")
     def _on_ingredient_description_changed(self, description: str):
         """Handler for changes to the ingredient description."""
         # Update the ingredient description
         self.ingredient.description = description
-        # If the ingredient id is not None, update the database
-        if self.ingredient.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_ingredient(self.ingredient)
-                db_service.commit()
+        # Queue the change to be saved in the background
+        self._autosave_ingredient("description")
 
     def _on_ingredient_cost_value_changed(self, value: float|None):
         """Handler for changes to the ingredient cost."""
         # Update the ingredient cost
         self.ingredient.cost_value = value
-        # If the ingredient id is not None, update the database
-        if self.ingredient.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_ingredient(self.ingredient)
-                db_service.commit()
+        # Queue the change to be saved in the background
+        self._autosave_ingredient("cost")
 
     def _on_ingredient_cost_quantity_changed(self, value: float|None):
         """Handler for changes to the ingredient quantity associated with the cost data."""
         # Update the ingredient cost quantity
         self.ingredient.cost_qty_value = value
-        # If the ingredient id is not None, update the database
-        if self.ingredient.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_ingredient(self.ingredient)
-                db_service.commit()
+        # Queue the change to be saved in the background
+        self._autosave_ingredient("cost")
 
     def _on_ingredient_cost_qty_unit_changed(self, unit: str):
         """Handler for changes to the ingredient cost unit."""
         # Update the ingredient cost unit
         self.ingredient.cost_qty_unit = unit
-        # If the ingredient id is not None, update the database
-        if self.ingredient.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_ingredient(self.ingredient)
-                db_service.commit()
+        # Queue the change to be saved in the background
+        self._autosave_ingredient("cost")
 
     def _on_ingredient_density_vol_value_changed(self, value: float|None):
         """Handler for changes to the ingredient density volume value."""
         # Update the ingredient density volume value
         self.ingredient.density_vol_value = value
-        # If the ingredient id is not None, update the database
-        if self.ingredient.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_ingredient(self.ingredient)
-                db_service.commit()
+        # Queue the change to be saved in the background
+        self._autosave_ingredient("density")
 
     def _on_ingredient_density_vol_unit_changed(self, value: str):
         """Handler for changes to the ingredient density volume unit."""
         # Update the ingredient density volume unit
         self.ingredient.density_vol_unit = value
-        # If the ingredient id is not None, update the database
-        if self.ingredient.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_ingredient(self.ingredient)
-                db_service.commit()
+        # Queue the change to be saved in the background
+        self._autosave_ingredient("density")
 
     def _on_ingredient_density_mass_value_changed(self, value: float|None):
         """Handler for changes to the ingredient density mass value."""
         # Update the ingredient density mass value
         self.ingredient.density_mass_value = value
-        # If the ingredient id is not None, update the database
-        if self.ingredient.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_ingredient(self.ingredient)
-                db_service.commit()
+        # Queue the change to be saved in the background
+        self._autosave_ingredient("density")
 
     def _on_ingredient_density_mass_unit_changed(self, value: str):
         """Handler for changes to the ingredient density mass unit."""
         # Update the ingredient density mass unit
         self.ingredient.density_mass_unit = value
-        # If the ingredient id is not None, update the database
-        if self.ingredient.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_ingredient(self.ingredient)
-                db_service.commit()
+        # Queue the change to be saved in the background
+        self._autosave_ingredient("density")
 
     def _on_ingredient_num_pieces_changed(self, value: float|None):
         """Handler for changes to the ingredient piece count."""
         # Update the ingredient piece count
         self.ingredient.pc_qty = value
-        # If the ingredient id is not None, update the database
-        if self.ingredient.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_ingredient(self.ingredient)
-                db_service.commit()
+        # Queue the change to be saved in the background
+        self._autosave_ingredient("pc_mass")
 
     def _on_ingredient_pc_mass_value_changed(self, value: float|None):
         """Handler for changes to the ingredient piece mass value."""
         # Update the ingredient piece mass value
         self.ingredient.pc_mass_value = value
-        # If the ingredient id is not None, update the database
-        if self.ingredient.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_ingredient(self.ingredient)
-                db_service.commit()
+        # Queue the change to be saved in the background
+        self._autosave_ingredient("pc_mass")
 
     def _on_ingredient_pc_mass_unit_changed(self, value: str):
         """Handler for changes to the ingredient piece mass unit."""
         # Update the ingredient piece mass unit
         self.ingredient.pc_mass_unit = value
-        # If the ingredient id is not None, update the database
-        if self.ingredient.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_ingredient(self.ingredient)
-                db_service.commit()
+        # Queue the change to be saved in the background
+        self._autosave_ingredient("pc_mass")
 
+    @profiled_action("save ingredient flag")
     def _on_flag_changed(self, flag_name: str, flag_value: bool):
         """Handler for changes to the ingredient flags."""
         # Update the ingredient flags
         self.ingredient.set_flag(flag_name, flag_value)
-        # If the ingredient id is not None, update the database
-        if self.ingredient.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_ingredient(self.ingredient)
-                db_service.commit()
+        # Queue the change to be saved in the background
+        self._autosave_ingredient("flags")
 
     def _on_select_all_flags_clicked(self):
         """Handler for selecting all flags."""
@@ -333,11 +322,8 @@ class IngredientEditorCtrl:
         self.ingredient.set_all_flags_true()
         # Select all flags on the view
         self.view.flag_editor.set_all_flags_true()
-        # If the ingredient id is not None, update the database
-        if self.ingredient.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_ingredient(self.ingredient)
-                db_service.commit()
+        # Queue the change to be saved in the background
+        self._autosave_ingredient("flags")
 
     def _on_deselect_all_flags_clicked(self):
         """Handler for deselecting all flags."""
@@ -345,11 +331,8 @@ class IngredientEditorCtrl:
         self.ingredient.set_all_flags_false()
         # Deselect all flags on the view
         self.view.flag_editor.set_all_flags_false()
-        # If the ingredient id is not None, update the database
-        if self.ingredient.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_ingredient(self.ingredient)
-                db_service.commit()
+        # Queue the change to be saved in the background
+        self._autosave_ingredient("flags")
 
     def _on_invert_selection_flags_clicked(self):
         """Handler for inverting the selected flags."""
@@ -359,11 +342,8 @@ class IngredientEditorCtrl:
             self.ingredient.set_flag(flag, not self.ingredient.flags[flag])
         # Invert on the view
         self.view.flag_editor.invert_flags()
-        # If the ingredient id is not None, update the database
-        if self.ingredient.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_ingredient(self.ingredient)
-                db_service.commit()
+        # Queue the change to be saved in the background
+        self._autosave_ingredient("flags")
 
     def _on_clear_selection_flags_clicked(self):
         """Handler for clearing the selected flags."""
@@ -371,34 +351,58 @@ class IngredientEditorCtrl:
         self.ingredient.set_all_flags_false()
         # Clear all flags on the view
         self.view.flag_editor.set_all_flags_false()
-        # If the ingredient id is not None, update the database
-        if self.ingredient.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_ingredient(self.ingredient)
-                db_service.commit()
+        # Queue the change to be saved in the background
+        self._autosave_ingredient("flags")
 
     def _on_gi_value_changed(self, value:float|None):
         """Handler for changes to the ingredient GI value."""
         # Update the ingredient GI value
         self.ingredient.gi = value
-        # If the ingredient id is not None, update the database
-        if self.ingredient.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_ingredient(self.ingredient)
-                db_service.commit()
+        # Queue the change to be saved in the background
+        self._autosave_ingredient("gi")
 
+    @profiled_action("save ingredient nutrient")
     def _on_nutrient_qty_changed(self, nutrient_quantity: IngredientNutrientQuantity):
         """Handler for changes to the ingredient nutrient quantities."""
         # Update the nutrient quantity on the ingredient
         self.ingredient.update_nutrient_quantity(nutrient_quantity)
-        # If the ingredient id is not None, update the database
+        # If the ingredient id is not None, queue the change to be saved.
+        # The editor keeps changing the same instance, so queue a copy.
         if self.ingredient.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_ingredient_nutrient_quantity(
-                    ingredient_id=self.ingredient.id, 
-                    nutrient_quantity=nutrient_quantity
-                )
-                db_service.commit()
+            autosave.put(
+                ("ingredient", self.ingredient.id, f"nutrient:{nutrient_quantity.nutrient_name}"),
+                "update_ingredient_nutrient_quantity",
+                self.ingredient.id,
+                copy.copy(nutrient_quantity),
+            )
+
+    def _autosave_ingredient(self, field: str) -> None:
+        """Queues one field of the ingredient (description, cost, density,
+        pc_mass, flags or gi) to be saved in the background, if the
+        ingredient is in the database. Later edits to the field replace it."""
+        ingredient = self.ingredient
+        if ingredient.id is None:
+            return
+        if field == "description":
+            args = (ingredient.description,)
+        elif field == "cost":
+            args = (ingredient.cost_value, ingredient.cost_unit, ingredient.cost_qty_unit, ingredient.cost_qty_value)
+        elif field == "density":
+            args = (
+                ingredient.density_mass_unit,
+                ingredient.density_mass_value,
+                ingredient.density_vol_unit,
+                ingredient.density_vol_value,
+            )
+        elif field == "pc_mass":
+            args = (ingredient.pc_qty, ingredient.pc_mass_unit, ingredient.pc_mass_value)
+        elif field == "flags":
+            args = (dict(ingredient.flags),)
+        elif field == "gi":
+            args = (ingredient.gi,)
+        else:
+            raise ValueError(f"Unknown ingredient field {field}.")
+        autosave.put(("ingredient", ingredient.id, field), f"update_ingredient_{field}", ingredient.id, *args)
 
     def _connect_delete_ingredient_dialog(self) -> None:
         """Connect the signals for the delete ingredient dialog."""
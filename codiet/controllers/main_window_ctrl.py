@@ -1,14 +1,10 @@
-from codiet.utils.search import filter_text
 from codiet.models.recipes import Recipe
-from codiet.db.database_service import DatabaseService
+from codiet.db.instrumentation import profiled_action
+from codiet.db.reference_data import reference_data
 from codiet.views.dialog_box_views import ErrorDialogBoxView
 from codiet.views.main_window_view import MainWindowView
 from codiet.views.ingredient_editor_view import IngredientEditorView
-from codiet.views.recipe_editor_view import RecipeEditorView
-from codiet.views.meal_planner_view import MealPlannerView
 from codiet.controllers.ingredient_editor_ctrl import IngredientEditorCtrl
-from codiet.controllers.recipe_editor_ctrl import RecipeEditorCtrl
-from codiet.controllers.meal_planner_ctrl import MealPlannerCtrl
 
 
 class MainWindowCtrl:
@@ -17,37 +13,61 @@ class MainWindowCtrl:
     def __init__(self, view: MainWindowView):
         self.view = view  # stash the main window view
 
-        # Add the pages to the view
+        # Only the ingredient editor is shown at startup, so build it now.
+        # The other pages are built the first time they are navigated to.
         self.view.add_page("ingredient-editor", IngredientEditorView())
-        self.view.add_page("recipe-editor", RecipeEditorView())
-        self.view.add_page("meal-planner", MealPlannerView())
+        self._recipe_editor_ctrl = None
+        self._meal_planner_ctrl = None
 
         # Init popup windows
         self.error_popup = ErrorDialogBoxView(parent=self.view)
 
         # Instantiate the controllers
         self.ingredient_editor_ctrl = IngredientEditorCtrl(self.view._pages["ingredient-editor"])
-        self.recipe_editor_ctrl = RecipeEditorCtrl(self.view._pages["recipe-editor"])
-        self.meal_planner_ctrl = MealPlannerCtrl(self.view._pages["meal-planner"])
 
         # Connect up the signals
         self._connect_menu_bar_signals()
 
-        # Cache names for search
-        self.ingredient_names = []
-        self.recipe_names = []
-
-        # Since the ingredient editor is showing first, 
-        # load an ingredient instance into the editor
-        with DatabaseService() as db_service:
-            self.ingredient_editor_ctrl.load_ingredient_instance(
-                db_service.create_empty_ingredient()
-            )
+        # Since the ingredient editor is showing first, load the
+        # empty ingredient its controller created into the editor
+        self.ingredient_editor_ctrl.load_ingredient_instance(
+            self.ingredient_editor_ctrl.ingredient
+        )
         # Select the ingredient button on the nav bar
         self.view.btn_ingredients.select()
 
+    @property
+    def recipe_editor_ctrl(self):
+        """Returns the recipe editor controller, building the page on first use."""
+        if self._recipe_editor_ctrl is None:
+            # Imported here to keep them off the startup path
+            from codiet.views.recipe_editor_view import RecipeEditorView
+            from codiet.controllers.recipe_editor_ctrl import RecipeEditorCtrl
+            self.view.add_page("recipe-editor", RecipeEditorView())
+            self._recipe_editor_ctrl = RecipeEditorCtrl(self.view._pages["recipe-editor"])
+        return self._recipe_editor_ctrl
+
+    @property
+    def meal_planner_ctrl(self):
+        """Returns the meal planner controller, building the page on first use."""
+        if self._meal_planner_ctrl is None:
+            # Imported here to keep them off the startup path
+            from codiet.views.meal_planner_view import MealPlannerView
+            from codiet.controllers.meal_planner_ctrl import MealPlannerCtrl
+            self.view.add_page("meal-planner", MealPlannerView())
+            self._meal_planner_ctrl = MealPlannerCtrl(self.view._pages["meal-planner"])
+        return self._meal_planner_ctrl
+
+    def start_background_prefetch(self) -> None:
+        """Prefetch the reference data the other pages need.
+        Called once the window has been painted, so it doesn't delay startup."""
+        reference_data.prefetch_in_background()
+
+    @profiled_action("show ingredient editor")
     def _on_ingredients_clicked(self):
         """Handle the user clicking the ingredients button."""
+        # Pick up any changes made to the searchable lists since last shown
+        self.ingredient_editor_ctrl.sync_reference_data()
         # Show the editor
         self.view.show_page("ingredient-editor")
         # Deselect the other nav buttons
@@ -55,8 +75,11 @@ class MainWindowCtrl:
         # Highlight the ingredients button
         self.view.btn_ingredients.select()
 
+    @profiled_action("show recipe editor")
     def _on_recipes_clicked(self):
         """Handle the user clicking the New Recipe button."""
+        # Pick up any changes made to the searchable lists since last shown
+        self.recipe_editor_ctrl.sync_reference_data()
         # Put a new recipe in the editor
         self.recipe_editor_ctrl.load_recipe_instance(Recipe())
         # Show the editor
@@ -66,8 +89,11 @@ class MainWindowCtrl:
         # Highlight the recipes button
         self.view.btn_recipes.select()
 
+    @profiled_action("show meal planner")
     def _on_meal_planner_clicked(self):
         """Handle the user clicking the Meal Planner button."""
+        # Make sure the page has been built
+        self.meal_planner_ctrl
         self.view.show_page("meal-planner")
         # Deselect the other nav buttons
         self.view.deselect_all_nav_buttons()
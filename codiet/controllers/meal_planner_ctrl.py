@@ -1,7 +1,27 @@
+from datetime import datetime
+
+from codiet.db.database_service import DatabaseService
+from codiet.utils.intervals import IntervalIndex
+from codiet.utils.time import convert_datetime_to_minutes
 from codiet.views.meal_planner_view import MealPlannerView
 
 class MealPlannerCtrl:
     """Controller for the Meal Planner page."""
     def __init__(self, view: MealPlannerView):
         self.view = view
-        
\ No newline at end of file
+        # Cache the serve time index, so candidate recipes can be
+        # found for each meal slot without going back to the database
+        self._serve_time_index: IntervalIndex[int] | None = None
+
+    def get_recipe_ids_for_meal_time(self, meal_time: datetime) -> set[int]:
+        """Returns the IDs of the recipes which can be served at the meal time."""
+        # Build the index on first use
+        if self._serve_time_index is None:
+            self._cache_serve_time_index()
+        assert self._serve_time_index is not None
+        return self._serve_time_index.query(convert_datetime_to_minutes(meal_time))
+
+    def _cache_serve_time_index(self) -> None:
+        """Cache the recipe serve time index."""
+        with DatabaseService() as db_service:
+            self._serve_time_index = db_service.build_serve_time_index()
@@ -5,7 +5,10 @@ from PyQt6.QtWidgets import (
     QListWidgetItem,
 )
 
+from codiet.db.autosave import autosave
 from codiet.db.database_service import DatabaseService
+from codiet.db.instrumentation import profiled_action
+from codiet.db.reference_data import reference_data
 from codiet.utils.time import (
     convert_datetime_interval_to_time_string_interval,
     convert_time_string_interval_to_datetime_interval,
@@ -35,13 +38,11 @@ class RecipeEditorCtrl:
         self.view = view
         self.recipe = Recipe()
 
-        # Cache some searchable things
+        # Cache some searchable things, using any prefetched copies
         self._recipe_names: list[str] = []
         self._all_ingredient_names: list[str] = []
+        self.sync_reference_data()
         self._recipe_types: list[str] = []
-        # Run the caching functions for the first time
-        self._cache_recipe_names()
-        self._cache_ingredient_names()
 
         # Configure name editor
         self.recipe_name_editor_view = EntityNameDialogView(
@@ -139,25 +140,34 @@ class RecipeEditorCtrl:
         # Update the recipe tag field
         self.recipe_tag_editor_ctrl.update_recipe_tags(recipe.tags)
 
+    def sync_reference_data(self) -> None:
+        """Recache the searchable lists, refetching any changed in the database
+        since they were cached."""
+        reference_data.sync()
+        self._recipe_names = reference_data.get("recipe_names")
+        self._all_ingredient_names = reference_data.get("ingredient_names")
+
     def _cache_recipe_names(self) -> None:
         """Cache the recipe names."""
-        with DatabaseService() as db_service:
-            self._recipe_names = db_service.fetch_all_recipe_names()
+        self._recipe_names = reference_data.refresh("recipe_names")
 
     def _cache_ingredient_names(self) -> None:
         """Cache the ingredient names."""
-        with DatabaseService() as db_service:
-            self._all_ingredient_names = db_service.fetch_all_ingredient_names()
+        self._all_ingredient_names = reference_data.refresh("ingredient_names")
 
+    @profiled_action("select recipe")
     def _on_recipe_selected(self, list_item: QListWidgetItem) -> None:
         """Handle a recipe being selected."""
         recipe_name = list_item.text()
+        # Save any queued edits, so they are fetched back
+        autosave.flush()
         # Fetch the recipe from the database
         with DatabaseService() as db_service:
             recipe = db_service.fetch_recipe_by_name(recipe_name)
         # Load the recipe into the editor
         self.load_recipe_instance(recipe)
 
+    @profiled_action("add recipe")
     def _on_add_recipe_clicked(self) -> None:
         """Handle the add recipe button being clicked."""
         # Load a new recipe instance
@@ -200,8 +210,11 @@ class RecipeEditorCtrl:
             )
             confirm_dialog_box_view.show()
 
+    @profiled_action("delete recipe")
     def _on_delete_recipe(self, recipe_name: str) -> None:
         """Handler for deleting a recipe."""
+        # Save any queued edits first, so the recipe is fetched as edited
+        autosave.flush()
         # Fetch the recipe from the database
         with DatabaseService() as db_service:
             recipe = db_service.fetch_recipe_by_name(recipe_name)
@@ -268,12 +281,15 @@ class RecipeEditorCtrl:
             # Disable the OK button
             self.recipe_name_editor_view.disable_ok_button()
 
+    @profiled_action("save recipe name")
     def _on_recipe_name_accepted(self, name:str) -> None:
         """Handle the recipe name being accepted."""
         # Set the name on the recipe
         self.recipe.name = name
         # If the recipe has an ID, update it in the database
         if self.recipe.id is not None:
+            # Save any queued edits first, so they can't land after this rewrite
+            autosave.flush()
             with DatabaseService() as db_service:
                 db_service.update_recipe(self.recipe)
                 db_service.commit()
@@ -304,21 +320,27 @@ class RecipeEditorCtrl:
         """Handle the recipe description being changed."""
         # Update the description on the model
         self.recipe.description = description
-        # Update the description in the database
+        # Queue the change to be saved in the background
         if self.recipe.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_recipe(self.recipe)
-                db_service.commit()
+            autosave.put(
+                ("recipe", self.recipe.id, "description"),
+                "update_recipe_description",
+                self.recipe.id,
+                description,
+            )
 
     def _on_recipe_instructions_changed(self, instructions:str|None) -> None:
         """Handle the recipe instructions being changed."""
         # Update the instructions on the model
         self.recipe.instructions = instructions
-        # Update the instructions in the database
+        # Queue the change to be saved in the background
         if self.recipe.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_recipe(self.recipe)
-                db_service.commit()
+            autosave.put(
+                ("recipe", self.recipe.id, "instructions"),
+                "update_recipe_instructions",
+                self.recipe.id,
+                instructions,
+            )
 
     def _on_add_ingredient_clicked(self) -> None:
         """Handle the add ingredient button being clicked."""
@@ -328,6 +350,7 @@ class RecipeEditorCtrl:
         self.ingredient_search_column_view.clear_search_term()
         self.ingredients_editor_popup.show()
 
+    @profiled_action("add recipe ingredient")
     def _on_ingredient_selected(self, list_item: QListWidgetItem) -> None:
         """Handler for an ingredient being selected"""
         ingredient_name = list_item.text()
@@ -365,6 +388,8 @@ class RecipeEditorCtrl:
         self.recipe.add_ingredient_quantity(ingredient_quantity)
         # Update the recipe in the database
         if self.recipe.id is not None:
+            # Save any queued edits first, so they can't land after this rewrite
+            autosave.flush()
             with DatabaseService() as db_service:
                 db_service.update_recipe(self.recipe)
                 db_service.commit()
@@ -393,49 +418,54 @@ class RecipeEditorCtrl:
             self.view.ingredients_editor.remove_ingredient_quantity(ingredient_id)
             # Update the recipe in the database
             if self.recipe.id is not None:
+                # Save any queued edits first, so they can't land after this rewrite
+                autosave.flush()
                 with DatabaseService() as db_service:
                     db_service.update_recipe(self.recipe)
                     db_service.commit()
 
+    @profiled_action("save recipe ingredient quantity")
     def _on_ingredient_qty_changed(self, ingredient_id: int, qty: float) -> None:
         """Handle the ingredient quantity being changed."""
         # Update the ingredient quantity in the recipe
         self.recipe.update_ingredient_quantity_value(ingredient_id, qty)
-        # Update the recipe in the database
-        if self.recipe.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_recipe(self.recipe)
-                db_service.commit()
+        # Queue just this field to be saved in the background
+        self._autosave_ingredient_field(ingredient_id, "qty_value", qty)
 
     def _on_ingredient_qty_unit_changed(self, ingredient_id: int, unit: str) -> None:
         """Handle the ingredient quantity unit being changed."""
         # Update the ingredient quantity unit in the recipe
         self.recipe.update_ingredient_quantity_unit(ingredient_id, unit)
-        # Update the recipe in the database
-        if self.recipe.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_recipe(self.recipe)
-                db_service.commit()
+        # Queue just this field to be saved in the background
+        self._autosave_ingredient_field(ingredient_id, "qty_unit", unit)
 
     def _on_ingredient_qty_utol_changed(self, ingredient_id: int, utol: float) -> None:
         """Handle the ingredient quantity upper tolerance being changed."""
         # Update the ingredient quantity upper tolerance in the recipe
         self.recipe.update_ingredient_quantity_utol(ingredient_id, utol)
-        # Update the recipe in the database
-        if self.recipe.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_recipe(self.recipe)
-                db_service.commit()
+        # Queue just this field to be saved in the background
+        self._autosave_ingredient_field(ingredient_id, "qty_utol", utol)
 
     def _on_ingredient_qty_ltol_changed(self, ingredient_id: int, ltol: float) -> None:
         """Handle the ingredient quantity lower tolerance being changed."""
         # Update the ingredient quantity lower tolerance in the recipe
         self.recipe.update_ingredient_quantity_ltol(ingredient_id, ltol)
-        # Update the recipe in the database
-        if self.recipe.id is not None:
-            with DatabaseService() as db_service:
-                db_service.update_recipe(self.recipe)
-                db_service.commit()
+        # Queue just this field to be saved in the background
+        self._autosave_ingredient_field(ingredient_id, "qty_ltol", ltol)
+
+    def _autosave_ingredient_field(self, ingredient_id: int, field: str, value: float | str | None) -> None:
+        """Queues one field of an ingredient quantity on the recipe to be saved,
+        if the recipe is in the database. Later edits to the field replace it."""
+        if self.recipe.id is None:
+            return
+        autosave.put(
+            ("recipe_ingredient", self.recipe.id, ingredient_id, field),
+            "update_recipe_ingredient_field",
+            self.recipe.id,
+            ingredient_id,
+            field,
+            value,
+        )
 
     def _on_add_serve_time_clicked(self) -> None:
         """Handle the addition of a serve time."""
@@ -469,10 +499,13 @@ class RecipeEditorCtrl:
             self.view.serve_time_intervals_editor_view.remove_time_interval(index)
             # Remove the serve time from the database
             if self.recipe.id is not None:
+                # Save any queued edits first, so they can't land after this rewrite
+                autosave.flush()
                 with DatabaseService() as db_service:
                     db_service.update_recipe(self.recipe)
                     db_service.commit()            
 
+    @profiled_action("save recipe serve time")
     def _on_serve_time_provided(self, start_time: str, end_time: str) -> None:
         """Handle a serve time being provided."""
         # Validate the strings as times
@@ -497,18 +530,23 @@ class RecipeEditorCtrl:
         )
         # Update the recipe in the database
         if self.recipe.id is not None:
+            # Save any queued edits first, so they can't land after this rewrite
+            autosave.flush()
             with DatabaseService() as db_service:
                 db_service.update_recipe(self.recipe)
                 db_service.commit()
         # Hide the popup
         self.serve_time_popup.hide()
 
+    @profiled_action("save recipe tag")
     def _on_recipe_tag_added(self, tag:str) -> None:
         """Handle a recipe tag being added."""
         # Add the tag to the recipe
         self.recipe.add_recipe_tag(tag)
         # Update the recipe in the database
         if self.recipe.id is not None:
+            # Save any queued edits first, so they can't land after this rewrite
+            autosave.flush()
             with DatabaseService() as db_service:
                 db_service.update_recipe(self.recipe)
                 db_service.commit()
@@ -519,6 +557,8 @@ class RecipeEditorCtrl:
         self.recipe.remove_recipe_tag(tag)
         # Update the recipe in the database
         if self.recipe.id is not None:
+            # Save any queued edits first, so they can't land after this rewrite
+            autosave.flush()
             with DatabaseService() as db_service:
                 db_service.update_recipe(self.recipe)
                 db_service.commit()
@@ -2,7 +2,7 @@ from typing import Callable
 
 from PyQt6.QtWidgets import QListWidgetItem
 
-from codiet.db.database_service import DatabaseService
+from codiet.db.reference_data import reference_data
 from codiet.views.dialog_box_views import OkDialogBoxView
 from codiet.views.tags import RecipeTagEditorView, RecipeTagSelectorPopup
 from codiet.controllers.search import SearchColumnCtrl
@@ -20,9 +20,8 @@ class RecipeTagEditorCtrl():
         self.on_tag_added = on_tag_added
         self.on_tag_removed = on_tag_removed
 
-        # Cache the global recipe tags
-        self._recipe_tags:list[str] = []
-        self._cache_recipe_tags()
+        # Cache the global recipe tags, using any prefetched copy
+        self._recipe_tags:list[str] = reference_data.get("global_recipe_tags")
 
         # Add the controller for the search column
         tag_search_ctrl = SearchColumnCtrl(
@@ -43,8 +42,7 @@ class RecipeTagEditorCtrl():
 
     def _cache_recipe_tags(self) -> None:
         """Cache the global recipe tags."""
-        with DatabaseService() as db_service:
-            self._recipe_tags = db_service.fetch_all_global_recipe_tags()
+        self._recipe_tags = reference_data.refresh("global_recipe_tags")
 
     def _on_add_recipe_tag_clicked(self) -> None:
         """Handle the add recipe tag button clicked event."""
@@ -1,3 +1,8 @@
 import os
 
-DB_PATH = os.path.join("codiet", "db", "codiet.db")
\ No newline at end of file
+DB_PATH = os.path.join("codiet", "db", "codiet.db")
+SNAPSHOT_PATH = os.path.join("codiet", "db", "codiet.snapshot")
+PLAN_ARCHIVE_PATH = os.path.join("codiet", "db", "plan_archive.db")
+# Stamped on the database as it is built, and bumped whenever the schema
+# changes, so a database built from an older schema is rebuilt, not misread
+SCHEMA_VERSION = 1
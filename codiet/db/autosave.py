@@ -0,0 +1,149 @@
+"""Background autosave of the editors' field-level edits.
+
+Every edit in the ingredient and recipe editors used to rewrite the whole
+entity in its own transaction on the GUI thread, so typing a quantity or a
+description rewrote every field, ingredient and nutrient once per keystroke.
+Instead, the editors queue just the field which changed, keyed by the entity,
+its ID and the field. A later edit to the same field replaces the queued one,
+so a burst of edits coalesces into a single write of the final value. A
+daemon thread flushes the queue every interval, writing the whole batch in
+one transaction, and the editors flush it themselves before anything which
+reads or rewrites the same rows. At most one interval of edits is unsaved
+at any time, so a crash loses little.
+"""
+
+import sqlite3
+import threading
+from typing import Any
+
+from codiet.db import DB_PATH
+from codiet.db.database_service import DatabaseService
+from codiet.db.instrumentation import profiled_action
+
+# Seconds between background flushes
+AUTOSAVE_INTERVAL = 0.5
+
+
+class AutosaveQueue:
+    """Thread-safe queue of field-level edits, written in batches."""
+
+    def __init__(self, db_path: str = DB_PATH, interval: float = AUTOSAVE_INTERVAL):
+        self.db_path = db_path
+        self.interval = interval
+        # The DatabaseService call queued for each edited field, in the order
+        # the fields were first edited
+        self._pending: dict[tuple, tuple[str, tuple]] = {}
+        self._lock = threading.Lock()
+        # Held while writing, so flushes from the editors and the thread
+        # can't write their batches out of order
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.stats = {"queued": 0, "coalesced": 0, "written": 0, "failed": 0, "flushes": 0}
+        # The last exception raised writing the queue
+        self.last_error: Exception | None = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def put(self, key: tuple, method: str, *args: Any) -> None:
+        """Queues a call of the named DatabaseService method, replacing any
+        call already queued under the key, and starts the background thread
+        if it isn't running.
+
+        Args:
+            key: Names the field edited, such as (entity, id, field).
+            method: The DatabaseService method writing the field.
+            args: The arguments of the method. They are read when the queue
+                is flushed, so must not be changed after being queued.
+        """
+        with self._lock:
+            self.stats["queued"] += 1
+            if key in self._pending:
+                self.stats["coalesced"] += 1
+            self._pending[key] = (method, args)
+        self.start()
+
+    @profiled_action("autosave flush")
+    def flush(self) -> int:
+        """Writes every queued edit in one transaction, and returns how many
+        were written. If the batch fails, each edit is written on its own and
+        any which still fail are dropped, so one bad edit can't hold up the
+        rest. If the database can't be written to, the batch is queued again."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if len(batch) == 0:
+                return 0
+            written = 0
+            try:
+                with DatabaseService(self.db_path) as db_service:
+                    try:
+                        for method, args in batch.values():
+                            getattr(db_service, method)(*args)
+                        db_service.commit()
+                        written = len(batch)
+                    except sqlite3.OperationalError:
+                        raise
+                    except Exception as e:
+                        db_service.rollback()
+                        self.last_error = e
+                        written = self._write_each(db_service, batch)
+            except sqlite3.OperationalError as e:
+                # The database is locked or missing, so try again next time
+                self.last_error = e
+                self._requeue(batch)
+            with self._lock:
+                self.stats["written"] += written
+                self.stats["flushes"] += 1
+            return written
+
+    def start(self) -> None:
+        """Starts the background flushing thread, if it isn't running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the background thread, and writes anything still queued.
+        Called as the application quits."""
+        self._stopped.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def _run(self) -> None:
+        """Flushes the queue every interval, until stopped."""
+        while not self._stopped.wait(self.interval):
+            self.flush()
+
+    def _write_each(self, db_service: DatabaseService, batch: dict[tuple, tuple[str, tuple]]) -> int:
+        """Writes each edit of the batch in its own transaction, dropping
+        those which fail, and returns how many were written."""
+        written = 0
+        for method, args in batch.values():
+            try:
+                getattr(db_service, method)(*args)
+                db_service.commit()
+                written += 1
+            except Exception as e:
+                db_service.rollback()
+                self.last_error = e
+                with self._lock:
+                    self.stats["failed"] += 1
+        return written
+
+    def _requeue(self, batch: dict[tuple, tuple[str, tuple]]) -> None:
+        """Puts an unwritten batch back on the queue, ahead of anything queued
+        since, which is newer so replaces the batch's edit of the same field."""
+        with self._lock:
+            self._pending = {**batch, **self._pending}
+
+
+# The queue shared by the application's editors
+autosave = AutosaveQueue()
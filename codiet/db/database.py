@@ -1,16 +1,51 @@
 import sqlite3
 
+from codiet.db import SCHEMA_VERSION, instrumentation
+from codiet.db.statements import STATEMENTS
+from codiet.db_construction.migrate_schema import can_migrate, migrate_database
+from codiet.exceptions.database_exceptions import SchemaVersionError
+
 class Database:
     def __init__(self, DB_PATH):
-        self.connection = sqlite3.connect(DB_PATH)
+        # Size the statement cache to hold every Repository statement
+        self.connection = sqlite3.connect(DB_PATH, cached_statements=STATEMENTS.get_cache_size())
+        # Enforce the foreign keys, so deletes cascade to dependent rows
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        # Upgrade a database built from an older version of the schema, and
+        # refuse one which can't be, but not an empty one, which is yet to be built
+        schema_version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if schema_version != SCHEMA_VERSION and self._has_tables():
+            if not can_migrate(schema_version):
+                self.connection.close()
+                raise SchemaVersionError(DB_PATH, schema_version, SCHEMA_VERSION)
+            try:
+                migrate_database(self.connection, schema_version)
+            except Exception:
+                self.connection.close()
+                raise
         self.cursor = self.connection.cursor()
             
+    def _has_tables(self) -> bool:
+        """Returns True if any tables have been created in the database."""
+        return self.connection.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone() is not None
+
     def execute(self, query, params=()):
+        # Route through the profiler, if profiling is switched on
+        profiler = instrumentation.get_profiler()
+        if profiler is not None:
+            return profiler.execute(self.connection, query, params)
         return self.connection.execute(query, params)
 
+    def executemany(self, query, rows):
+        # Route through the profiler, if profiling is switched on
+        profiler = instrumentation.get_profiler()
+        if profiler is not None:
+            return profiler.executemany(self.connection, query, rows)
+        return self.connection.executemany(query, rows)
+
     def fetch_all(self, query, params=()):
         with self.connection:
-            return self.connection.execute(query, params).fetchall()
+            return self.execute(query, params).fetchall()
 
     def commit(self):
-        self.connection.commit()
\ No newline at end of file
+        self.connection.commit()
@@ -1,25 +1,47 @@
+from datetime import datetime
+from itertools import groupby
+from typing import Callable, Iterator
+
 from codiet.utils.time import (
-    convert_datetime_interval_to_time_string_interval,
-    convert_time_string_interval_to_datetime_interval,
+    convert_datetime_to_minutes,
+    convert_datetime_interval_to_minute_interval,
+    convert_minute_interval_to_datetime_interval,
+    convert_minute_interval_to_time_string_interval,
+    convert_time_string_interval_to_minute_interval,
 )
+from codiet.utils.intervals import IntervalIndex
+from codiet.utils.nutrients import ENERGY_NUTRIENT_NAME
 from codiet.models.ingredients import (
     Ingredient,
     IngredientNutrientQuantity,
     IngredientQuantity,
 )
 from codiet.models.recipes import Recipe
+from codiet.exceptions.recipe_exceptions import (
+    RecipeNameExistsError,
+    RecipeIngredientNotFoundError,
+)
 from codiet.db.repository import Repository
 from codiet.db import DB_PATH
 from codiet.db.database import Database
 from codiet.db.repository import Repository
 
+# The recipe_ingredients column holding each field of an ingredient quantity
+RECIPE_INGREDIENT_COLUMNS = {
+    "qty_value": "qty_value",
+    "qty_unit": "qty_unit",
+    "qty_utol": "qty_tol_upper",
+    "qty_ltol": "qty_tol_lower",
+}
+
+
 
 class DatabaseService:
     """Service for interacting with the database."""
 
-    def __init__(self):
+    def __init__(self, db_path: str = DB_PATH):
         # Init the database
-        self._repo = Repository(Database(DB_PATH))
+        self._repo = Repository(Database(db_path))
 
     def __enter__(self):
         return self
@@ -98,6 +120,99 @@ class DatabaseService:
             # Re-raise any exceptions
             raise e
 
+    def insert_recipe_records(self, records: list[dict], replace: bool = False) -> list[int]:
+        """Bulk inserts recipes from records in the recipe datafile format,
+        and returns their IDs. Ingredients are referenced by name where the
+        record gives one, otherwise by ID. If replace is set, recipes which
+        already exist are overwritten, otherwise they raise an exception.
+        The changes are not committed.
+        """
+        # Check the recipe names are set and unique
+        names = [record["name"] for record in records]
+        seen = set()
+        for name in names:
+            if name is None or name.strip() == "":
+                raise ValueError("Recipe name must be set.")
+            if name in seen:
+                raise RecipeNameExistsError(name)
+            seen.add(name)
+        # Find any recipes which already exist
+        existing_ids = self._repo.fetch_recipe_ids_by_names(names)
+        if len(existing_ids) > 0 and not replace:
+            raise RecipeNameExistsError(next(iter(existing_ids)))
+
+        # Resolve the ingredients, tags and serve times in bulk
+        ingredient_entries = [
+            (record["name"], entry)
+            for record in records
+            for entry in record["ingredients"].values()
+        ]
+        ingredient_ids_by_name = self._repo.fetch_ingredient_ids_by_names(
+            list({entry["name"] for _, entry in ingredient_entries if entry.get("name")})
+        )
+        known_ingredient_ids = self._repo.fetch_existing_ingredient_ids(
+            list({entry["id"] for _, entry in ingredient_entries if not entry.get("name")})
+        )
+        tag_ids = {name: id for id, name in self._repo.fetch_all_global_recipe_tag_rows()}
+
+        # Give the new recipes the next free IDs
+        next_id = self._repo.fetch_max_recipe_id() + 1
+        recipe_ids = []
+        for name in names:
+            if name in existing_ids:
+                recipe_ids.append(existing_ids[name])
+            else:
+                recipe_ids.append(next_id)
+                next_id += 1
+
+        # Build the rows for each table
+        base_rows, update_rows = [], []
+        ingredient_rows, serve_time_rows, tag_rows = [], [], []
+        for recipe_id, record in zip(recipe_ids, records):
+            row = (record["name"], record.get("description"), record.get("instructions"))
+            if record["name"] in existing_ids:
+                update_rows.append((*row, recipe_id))
+            else:
+                base_rows.append((recipe_id, *row))
+            for entry in record["ingredients"].values():
+                if entry.get("name"):
+                    if entry["name"] not in ingredient_ids_by_name:
+                        raise RecipeIngredientNotFoundError(record["name"], entry["name"])
+                    ingredient_id = ingredient_ids_by_name[entry["name"]]
+                else:
+                    if entry["id"] not in known_ingredient_ids:
+                        raise RecipeIngredientNotFoundError(record["name"], entry["id"])
+                    ingredient_id = entry["id"]
+                ingredient_rows.append((
+                    recipe_id, ingredient_id, entry["qty_value"], entry["qty_unit"],
+                    entry["qty_upper_tol"], entry["qty_lower_tol"],
+                ))
+            for serve_time in record.get("serve_times", []):
+                serve_time_rows.append(
+                    (recipe_id, *convert_time_string_interval_to_minute_interval(serve_time))
+                )
+            for tag in record.get("tags", []):
+                if tag not in tag_ids:
+                    raise ValueError(f"Recipe tag '{tag}' does not exist.")
+                tag_rows.append((recipe_id, tag_ids[tag]))
+
+        try:
+            # Write the recipes
+            self._repo.insert_recipe_base_rows(base_rows)
+            self._repo.update_recipe_base_rows(update_rows)
+            # Clear out the old associations of any recipes being replaced
+            self._repo.delete_recipe_associations([row[-1] for row in update_rows])
+            # Write the associations
+            self._repo.insert_recipe_ingredient_rows(ingredient_rows)
+            self._repo.insert_recipe_serve_time_rows(serve_time_rows)
+            self._repo.insert_recipe_tag_rows(tag_rows)
+        except Exception as e:
+            # Roll back the transaction if an exception occurs
+            self._repo._db.connection.rollback()
+            # Re-raise any exceptions
+            raise e
+        return recipe_ids
+
     def insert_global_recipe_tag(self, recipe_tag_name: str) -> int:
         """Inserts a global recipe tag into the database."""
         # Action the insertion
@@ -190,10 +305,89 @@ class DatabaseService:
         """Returns the name of the ingredient with the given ID."""
         return self._repo.fetch_ingredient_name(id)
 
+    def fetch_ingredient_ids_by_names(self, names: list[str]) -> dict[str, int]:
+        """Returns a dict of ingredient IDs keyed by name, for the given names
+        which exist in the database."""
+        return self._repo.fetch_ingredient_ids_by_names(names)
+
     def fetch_ingredient_id_by_name(self, name: str) -> int:
         """Returns the ID of the ingredient with the given name."""
         return self._repo.fetch_ingredient_id_by_name(name)
 
+    def fetch_all_ingredient_quantity_data(self) -> list[tuple]:
+        """Returns the raw cost, density and piece mass data of every
+        ingredient, ordered by ingredient ID, for bulk processing."""
+        return self._repo.fetch_all_ingredient_quantity_data()
+
+    def fetch_all_ingredient_gis(self) -> list[tuple[int, float | None]]:
+        """Returns the (ingredient_id, gi) of every ingredient, ordered by ID."""
+        return self._repo.fetch_all_ingredient_gis()
+
+    def fetch_all_ingredient_nutrient_quantities(self) -> list[tuple]:
+        """Returns the raw (ingredient_id, nutrient_id, ntr_qty_value, ntr_qty_unit,
+        ing_qty_value, ing_qty_unit) data of every ingredient nutrient, for bulk processing."""
+        return self._repo.fetch_all_ingredient_nutrient_quantities()
+
+    def fetch_all_unconvertible_ingredient_nutrient_rows(self) -> list[tuple[int, int, str, str]]:
+        """Returns the (ingredient_id, nutrient_id, ntr_qty_unit, ing_qty_unit) of every
+        populated ingredient nutrient whose units can't be converted to grams per gram,
+        such as a volume for an ingredient with no density."""
+        return self._repo.fetch_all_unconvertible_ingredient_nutrient_rows()
+
+    def fetch_all_ingredient_flag_values(self) -> list[tuple[int, int, int]]:
+        """Returns the raw (ingredient_id, flag_id, flag_value) data of every
+        ingredient flag, for bulk processing."""
+        return self._repo.fetch_all_ingredient_flag_values()
+
+    def fetch_all_global_flag_rows(self) -> list[tuple[int, str]]:
+        """Returns the (flag_id, flag_name) of every global flag, ordered by ID."""
+        return self._repo.fetch_all_global_flag_rows()
+
+    def fetch_all_leaf_nutrient_rows(self) -> list[tuple[int, str]]:
+        """Returns the (nutrient_id, nutrient_name) of every leaf nutrient, ordered by ID."""
+        return self._repo.fetch_all_leaf_nutrient_rows()
+
+    def fetch_all_nutrient_group_leaf_rows(self) -> list[tuple[int, str]]:
+        """Returns the (leaf_id, group_name) of every group each leaf nutrient
+        belongs to, directly or through other groups."""
+        return self._repo.fetch_all_nutrient_group_leaf_rows()
+
+    def fetch_all_ingredient_nutrient_densities(self) -> list[tuple[int, int, float]]:
+        """Returns the (ingredient_id, nutrient_id, grams_per_gram) of every
+        ingredient nutrient which can be converted, for bulk processing."""
+        return self._repo.fetch_all_ingredient_nutrient_densities()
+
+    def fetch_ingredient_ids_by_nutrient_density(
+        self,
+        nutrient_name: str,
+        min_grams_per_gram: float | None = None,
+        max_grams_per_gram: float | None = None,
+    ) -> list[int]:
+        """Returns the IDs of the ingredients containing between the given grams
+        of the nutrient per gram of ingredient. Group nutrients are the total of
+        their leaf nutrients, and ingredients without data are not matched.
+        For example, more than 20g of protein per 100g is
+        fetch_ingredient_ids_by_nutrient_density("protein", min_grams_per_gram=0.2).
+        """
+        nutrient_ids = self._repo.fetch_leaf_nutrient_ids(nutrient_name)
+        if len(nutrient_ids) == 0:
+            raise ValueError(f"Unknown nutrient: {nutrient_name}")
+        return self._repo.fetch_ingredient_ids_by_nutrient_density(
+            nutrient_ids, min_grams_per_gram, max_grams_per_gram
+        )
+
+    def rebuild_ingredient_nutrient_densities(self) -> None:
+        """Recomputes the ingredient nutrient densities from scratch.
+        They are normally kept current by triggers."""
+        try:
+            self._repo.rebuild_ingredient_nutrient_densities()
+            self._repo.connection.commit()
+        except Exception as e:
+            # Roll back the transaction if an exception occurs
+            self._repo._db.connection.rollback()
+            # Re-raise any exceptions
+            raise e
+
     def fetch_ingredient_flags(
         self, ingredient_name: str | None = None, ingredient_id: int | None = None
     ) -> dict[str, bool]:
@@ -218,10 +412,31 @@ class DatabaseService:
         """Returns the name of the recipe with the given ID."""
         return self._repo.fetch_recipe_name(id)
 
+    def fetch_recipe_ids_by_names(self, names: list[str]) -> dict[str, int]:
+        """Returns a dict of recipe IDs keyed by name, for the given names
+        which exist in the database."""
+        return self._repo.fetch_recipe_ids_by_names(names)
+
     def fetch_all_recipe_names(self) -> list[str]:
         """Returns a list of all the recipes in the database."""
         return self._repo.fetch_all_recipe_names()
 
+    def fetch_all_recipe_ids(self) -> list[int]:
+        """Returns a list of all the recipe IDs in the database, in order."""
+        return self._repo.fetch_all_recipe_ids()
+
+    def fetch_all_recipe_ingredient_quantities(self) -> list[tuple[int, int, float | None, str]]:
+        """Returns the raw (recipe_id, ingredient_id, qty_value, qty_unit)
+        data of every recipe ingredient, for bulk processing."""
+        return self._repo.fetch_all_recipe_ingredient_quantities()
+
+    def fetch_all_recipe_ingredient_tolerance_rows(
+        self,
+    ) -> list[tuple[int, int, float | None, str, float | None, float | None]]:
+        """Returns the raw (recipe_id, ingredient_id, qty_value, qty_unit, qty_tol_lower,
+        qty_tol_upper) data of every recipe ingredient, for bulk processing."""
+        return self._repo.fetch_all_recipe_ingredient_tolerance_rows()
+
     def fetch_recipe_by_name(self, name: str) -> Recipe:
         """Returns the recipe with the given name."""
         # Init a fresh recipe instance
@@ -256,15 +471,15 @@ class DatabaseService:
         # Add the ingredient quanities list to the recipe
         recipe.ingredient_quantities = ingredient_quantities
         # Fetch the serve times
-        # First fetch the raw strings
+        # First fetch the raw minute intervals
         raw_serve_times = self._repo.fetch_recipe_serve_times(recipe.id)
         # Init a list to hold the serve times
         serve_times = []
-        # Cycle through the raw strings
+        # Cycle through the raw minute intervals
         for raw_serve_time in raw_serve_times:
-            # Convert the string to a tuple of datetime objects
+            # Convert the minutes to a tuple of datetime objects
             serve_times.append(
-                convert_time_string_interval_to_datetime_interval(raw_serve_time)
+                convert_minute_interval_to_datetime_interval(raw_serve_time)
             )
         recipe.serve_times = serve_times
         # Fetch the recipe tags
@@ -272,10 +487,213 @@ class DatabaseService:
 
         return recipe
 
+    def iter_recipe_records(self) -> Iterator[dict]:
+        """Yields every recipe as a record in the recipe datafile format,
+        in ID order. The recipes are streamed from the database, so the whole
+        catalogue is never held in memory at once."""
+        # Group each association stream by recipe. All of the streams are
+        # ordered by recipe ID, so they can be advanced in step.
+        streams = [
+            groupby(self._repo.iter_recipe_ingredient_rows(), key=lambda row: row[0]),
+            groupby(self._repo.iter_recipe_serve_time_rows(), key=lambda row: row[0]),
+            groupby(self._repo.iter_recipe_tag_rows(), key=lambda row: row[0]),
+        ]
+        pending = [next(stream, None) for stream in streams]
+
+        def take(stream_index: int, recipe_id: int) -> list[tuple]:
+            """Returns the rows of the stream belonging to the recipe."""
+            # Skip any rows left behind by deleted recipes
+            while pending[stream_index] is not None and pending[stream_index][0] < recipe_id:
+                pending[stream_index] = next(streams[stream_index], None)
+            group = pending[stream_index]
+            if group is None or group[0] != recipe_id:
+                return []
+            # Read the group before advancing, which invalidates it
+            rows = list(group[1])
+            pending[stream_index] = next(streams[stream_index], None)
+            return rows
+
+        for recipe_id, name, description, instructions in self._repo.iter_recipe_base_rows():
+            ingredient_rows = take(0, recipe_id)
+            serve_time_rows = take(1, recipe_id)
+            tag_rows = take(2, recipe_id)
+            yield {
+                "name": name,
+                "description": description,
+                "instructions": instructions,
+                "ingredients": {
+                    str(row[1]): {
+                        "id": row[1],
+                        "name": row[2],
+                        "qty_unit": row[3],
+                        "qty_value": row[4],
+                        "qty_upper_tol": row[5],
+                        "qty_lower_tol": row[6],
+                    }
+                    for row in ingredient_rows
+                },
+                "serve_times": [
+                    convert_minute_interval_to_time_string_interval((row[1], row[2]))
+                    for row in serve_time_rows
+                ],
+                "tags": [row[1] for row in tag_rows],
+            }
+
+    def fetch_recipe_ids_by_serve_time(self, serve_time: datetime) -> list[int]:
+        """Returns the IDs of the recipes which can be served at the given time."""
+        return self._repo.fetch_recipe_ids_by_serve_time(
+            convert_datetime_to_minutes(serve_time)
+        )
+
+    def fetch_recipe_names_by_serve_time(self, serve_time: datetime) -> list[str]:
+        """Returns the names of the recipes which can be served at the given time."""
+        return [
+            self._repo.fetch_recipe_name(recipe_id)
+            for recipe_id in self.fetch_recipe_ids_by_serve_time(serve_time)
+        ]
+
+    def build_serve_time_index(self) -> IntervalIndex[int]:
+        """Returns an in-memory interval index of recipe IDs by serve time.
+        Query it with minutes past midnight to find the servable recipes.
+        """
+        return IntervalIndex(
+            (start, end, recipe_id)
+            for recipe_id, start, end in self._repo.fetch_all_recipe_serve_times()
+        )
+
     def fetch_all_global_recipe_tags(self) -> list[str]:
         """Returns a list of all the recipe tags in the database."""
         return self._repo.fetch_all_global_recipe_tags()
 
+    def fetch_all_global_recipe_tag_rows(self) -> list[tuple[int, str]]:
+        """Returns the (recipe_tag_id, recipe_tag_name) of every global recipe tag, ordered by ID."""
+        return self._repo.fetch_all_global_recipe_tag_rows()
+
+    def fetch_all_recipe_tag_ids(self) -> list[tuple[int, int]]:
+        """Returns the raw (recipe_id, recipe_tag_id) data of every recipe tag,
+        for bulk processing."""
+        return self._repo.fetch_all_recipe_tag_ids()
+
+    def fetch_all_recipe_serve_times(self) -> list[tuple[int, int, int]]:
+        """Returns the raw (recipe_id, start, end) minute data of every recipe
+        serve time, for bulk processing."""
+        return self._repo.fetch_all_recipe_serve_times()
+
+    def fetch_change_version(self) -> tuple[str, int]:
+        """Returns the (database_id, version) of the database.
+        Data cached at one version is current while both are unchanged."""
+        return self._repo.fetch_change_version()
+
+    def fetch_changes_since(self, version: int) -> dict[str, dict[int, str]]:
+        """Returns the entities changed after the given version, as a dict of
+        {entity_id: operation} dicts keyed by entity type ("ingredient",
+        "recipe", "flag", "leaf_nutrient", "group_nutrient", "nutrient_alias",
+        "recipe_tag"). The operation is "I", "U" or "D" for the latest change.
+        Only meaningful while the database ID is unchanged."""
+        changes: dict[str, dict[int, str]] = {}
+        for entity_type, entity_id, operation, _ in self._repo.fetch_changes_since(version):
+            changes.setdefault(entity_type, {})[entity_id] = operation
+        return changes
+
+    def fetch_recipe_ids_using_ingredients(self, ingredient_ids: list[int]) -> list[int]:
+        """Returns the IDs of the recipes using any of the given ingredients."""
+        return self._repo.fetch_recipe_ids_using_ingredients(ingredient_ids)
+
+    def fetch_recipe_names_using_ingredient(self, ingredient_name: str) -> list[str]:
+        """Returns the names of the recipes using the given ingredient."""
+        ingredient_id = self._repo.fetch_ingredient_id_by_name(ingredient_name)
+        return [
+            self._repo.fetch_recipe_name(recipe_id)
+            for recipe_id in self._repo.fetch_recipe_ids_using_ingredients([ingredient_id])
+        ]
+
+    def iter_recipe_names(self) -> Iterator[tuple[int, str]]:
+        """Yields the (recipe_id, recipe_name) of every recipe, in ID order."""
+        for row in self._repo.iter_recipe_base_rows():
+            yield row[0], row[1]
+
+    def iter_recipe_nutrient_totals(self) -> Iterator[tuple[int, str, dict[str, float]]]:
+        """Yields the (recipe_id, recipe_name, totals) of every recipe, in ID
+        order, where totals are the cached nutrient totals keyed by nutrient
+        name. Call sync_recipe_nutrient_totals first to bring them up to date."""
+        rows = self._repo.iter_recipe_nutrient_total_rows()
+        for (recipe_id, recipe_name), group in groupby(rows, key=lambda row: row[:2]):
+            yield recipe_id, recipe_name, {row[2]: row[3] for row in group if row[2] is not None}
+
+    def fetch_recipe_nutrient_totals(self, recipe_id: int) -> dict[str, float]:
+        """Returns the cached nutrient totals of the recipe, keyed by nutrient name.
+        Totals are in grams, except energy which is in kcal."""
+        return self._repo.fetch_recipe_nutrient_totals(recipe_id)
+
+    def fetch_recipe_ids_by_nutrient_ranges(
+        self, ranges: dict[str, tuple[float | None, float | None]]
+    ) -> list[int]:
+        """Returns the IDs of the recipes whose nutrient totals lie within every
+        range, where ranges maps nutrient names to (min, max) bounds, either of
+        which may be None. Totals are in grams, except energy which is in kcal.
+        For example, recipes under 600 kcal with at least 30g of protein are
+        fetch_recipe_ids_by_nutrient_ranges({"energy": (None, 600), "protein": (30, None)}).
+        Reads the cached totals, so call sync_recipe_nutrient_totals after edits.
+        Raises ValueError for an unknown nutrient.
+        """
+        for nutrient_name in ranges:
+            if nutrient_name == ENERGY_NUTRIENT_NAME:
+                continue
+            if len(self._repo.fetch_leaf_nutrient_ids(nutrient_name)) == 0:
+                raise ValueError(f"Unknown nutrient: {nutrient_name}")
+        if len(ranges) == 0:
+            return self._repo.fetch_all_recipe_ids()
+        return self._repo.fetch_recipe_ids_by_nutrient_ranges(
+            [(name, bounds[0], bounds[1]) for name, bounds in ranges.items()]
+        )
+
+    def refresh_recipe_nutrient_totals(self, recipe_ids: list[int] | None = None) -> None:
+        """Recomputes the cached nutrient totals of the given recipes, or of
+        every recipe if none are given, and commits."""
+        try:
+            if recipe_ids is None:
+                _, version = self._repo.fetch_change_version()
+                self._repo.refresh_recipe_nutrient_totals()
+                self._repo.update_recipe_nutrient_totals_version(version)
+            else:
+                self._repo.refresh_recipe_nutrient_totals(recipe_ids)
+            self._repo.connection.commit()
+        except Exception as e:
+            # Roll back the transaction if an exception occurs
+            self._repo._db.connection.rollback()
+            # Re-raise any exceptions
+            raise e
+
+    def sync_recipe_nutrient_totals(self) -> None:
+        """Brings the cached recipe nutrient totals up to date, using the change
+        log to recompute only the recipes which have changed."""
+        _, version = self._repo.fetch_change_version()
+        totals_version = self._repo.fetch_recipe_nutrient_totals_version()
+        if totals_version == version:
+            return
+        if totals_version is None:
+            self.refresh_recipe_nutrient_totals()
+            return
+        changes = self.fetch_changes_since(totals_version)
+        # Nutrient changes can affect any recipe
+        if "leaf_nutrient" in changes or "group_nutrient" in changes:
+            self.refresh_recipe_nutrient_totals()
+            return
+        # Ingredient changes affect the recipes using them
+        recipe_ids = set(changes.get("recipe", {}))
+        recipe_ids.update(
+            self._repo.fetch_recipe_ids_using_ingredients(list(changes.get("ingredient", {})))
+        )
+        try:
+            self._repo.refresh_recipe_nutrient_totals(sorted(recipe_ids))
+            self._repo.update_recipe_nutrient_totals_version(version)
+            self._repo.connection.commit()
+        except Exception as e:
+            # Roll back the transaction if an exception occurs
+            self._repo._db.connection.rollback()
+            # Re-raise any exceptions
+            raise e
+
     def update_ingredient(self, ingredient: Ingredient):
         """Updates the given ingredient in the database."""
         # If the ingredient ID is not present, raise an exception
@@ -348,6 +766,75 @@ class DatabaseService:
             ing_qty_unit=nutrient_quantity.ingredient_quantity_unit,
         )
 
+    def update_ingredient_description(self, ingredient_id: int, description: str | None) -> None:
+        """Updates just the description of the ingredient."""
+        self._repo.update_ingredient_description(ingredient_id, description)
+
+    def update_ingredient_cost(
+            self,
+            ingredient_id: int,
+            cost_value: float | None,
+            cost_unit: str | None,
+            qty_unit: str | None,
+            qty_value: float | None,
+        ) -> None:
+        """Updates just the cost data of the ingredient."""
+        self._repo.update_ingredient_cost(ingredient_id, cost_value, cost_unit, qty_unit, qty_value)
+
+    def update_ingredient_density(
+            self,
+            ingredient_id: int,
+            dens_mass_unit: str,
+            dens_mass_value: float | None,
+            dens_vol_unit: str,
+            dens_vol_value: float | None,
+        ) -> None:
+        """Updates just the density data of the ingredient."""
+        self._repo.update_ingredient_density(
+            ingredient_id, dens_mass_unit, dens_mass_value, dens_vol_unit, dens_vol_value
+        )
+
+    def update_ingredient_pc_mass(
+            self,
+            ingredient_id: int,
+            pc_qty: float | None,
+            pc_mass_unit: str | None,
+            pc_mass_value: float | None,
+        ) -> None:
+        """Updates just the piece mass data of the ingredient."""
+        self._repo.update_ingredient_pc_mass(ingredient_id, pc_qty, pc_mass_unit, pc_mass_value)
+
+    def update_ingredient_flags(self, ingredient_id: int, flags: dict[str, bool]) -> None:
+        """Updates just the flags of the ingredient."""
+        self._repo.update_ingredient_flags(ingredient_id, flags)
+
+    def update_ingredient_gi(self, ingredient_id: int, gi: float | None) -> None:
+        """Updates just the GI of the ingredient."""
+        self._repo.update_ingredient_gi(ingredient_id, gi)
+
+    def update_recipe_description(self, recipe_id: int, description: str | None) -> None:
+        """Updates just the description of the recipe."""
+        self._repo.update_recipe_description(recipe_id, description)
+
+    def update_recipe_instructions(self, recipe_id: int, instructions: str | None) -> None:
+        """Updates just the instructions of the recipe."""
+        self._repo.update_recipe_instructions(recipe_id, instructions)
+
+    def update_recipe_ingredient_field(
+            self,
+            recipe_id: int,
+            ingredient_id: int,
+            field: str,
+            value: float | str | None,
+        ) -> None:
+        """Updates one field of an ingredient quantity on the recipe, where the
+        field is one of qty_value, qty_unit, qty_utol or qty_ltol."""
+        if field not in RECIPE_INGREDIENT_COLUMNS:
+            raise ValueError(f"Unknown recipe ingredient field {field}.")
+        self._repo.update_recipe_ingredient_field(
+            recipe_id, ingredient_id, RECIPE_INGREDIENT_COLUMNS[field], value
+        )
+
     def update_recipe(self, recipe: Recipe):
         """Updates the given recipe in the database."""
         # Check the recipe ID is set, otherwise raise an exception
@@ -389,11 +876,11 @@ class DatabaseService:
                 ingredients=ingredient_quantities,
             )
             # Update the recipe serve times
-            # Need to convert the datetime objects to a list of strings
+            # Need to convert the datetime objects to minute intervals
             serve_times = []
             for serve_time in recipe.serve_times:
                 serve_times.append(
-                    convert_datetime_interval_to_time_string_interval(serve_time)
+                    convert_datetime_interval_to_minute_interval(serve_time)
                 )
             # Submit the serve times to the repo method
             self._repo.update_recipe_serve_times(
@@ -412,13 +899,39 @@ class DatabaseService:
             raise e
 
     def delete_ingredient_by_name(self, ingredient_name: str):
-        """Deletes the given ingredient from the database."""
-        self._repo.delete_ingredient_by_name(ingredient_name)
+        """Deletes the given ingredient from the database, removing it from
+        any recipes which use it, and commits."""
+        self._delete(self._repo.delete_ingredient_by_name, ingredient_name)
 
     def delete_recipe_by_name(self, recipe_name: str):
-        """Deletes the given recipe from the database."""
-        self._repo.delete_recipe_by_name(recipe_name)
+        """Deletes the given recipe from the database, and commits."""
+        self._delete(self._repo.delete_recipe_by_name, recipe_name)
+
+    def delete_ingredients_by_ids(self, ingredient_ids: list[int]):
+        """Deletes the given ingredients in a single transaction, removing them
+        from any recipes which use them, and commits."""
+        self._delete(self._repo.delete_ingredients_by_ids, ingredient_ids)
+
+    def delete_recipes_by_ids(self, recipe_ids: list[int]):
+        """Deletes the given recipes in a single transaction, and commits."""
+        self._delete(self._repo.delete_recipes_by_ids, recipe_ids)
+
+    def _delete(self, delete: Callable, *args) -> None:
+        """Runs a repository delete as one transaction.
+        The cascading foreign keys remove the dependent rows in the same statement."""
+        try:
+            delete(*args)
+            self._repo.connection.commit()
+        except Exception as e:
+            # Roll back the transaction if an exception occurs
+            self._repo._db.connection.rollback()
+            # Re-raise any exceptions
+            raise e
 
     def commit(self):
         """Commits the current transaction."""
         self._repo.connection.commit()
+
+    def rollback(self):
+        """Rolls back the current transaction."""
+        self._repo.connection.rollback()
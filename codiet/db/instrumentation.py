@@ -0,0 +1,329 @@
+"""Opt-in profiling of the SQL passing through Database.execute.
+
+Profiling is switched on by setting the CODIET_DB_PROFILE environment
+variable before the application starts. The report is printed to stderr on
+exit, or written as JSON to the path given by CODIET_DB_PROFILE_OUTPUT.
+
+For every statement the profiler records the number of executions, the
+cumulative time and the rows returned, and which Repository method issued
+it. Controller actions are wrapped with the profiled_action decorator, so
+each action reports the queries it triggered, which makes N+1 patterns
+(one action, many executions of the same statement) easy to spot.
+"""
+
+import atexit
+import functools
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from codiet.db.statements import STATEMENTS, normalise_sql
+
+# The environment variable which switches profiling on
+PROFILE_ENV_VAR = "CODIET_DB_PROFILE"
+# The environment variable giving a path to write the JSON report to
+PROFILE_OUTPUT_ENV_VAR = "CODIET_DB_PROFILE_OUTPUT"
+# The module whose functions are reported as the callers of each statement
+_REPOSITORY_MODULE = "codiet.db.repository"
+# Statements run more than this many times in one action are flagged
+N_PLUS_ONE_THRESHOLD = 10
+
+
+class QueryStats:
+    """Accumulated statistics for one statement."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.rows = 0
+        self.callers: dict[str, int] = {}
+
+    def to_dict(self) -> dict:
+        """Returns the statistics as a JSON-serialisable dict."""
+        return {
+            "count": self.count,
+            "total_ms": 1000 * self.total_time,
+            "mean_ms": 1000 * self.total_time / self.count if self.count else 0.0,
+            "max_ms": 1000 * self.max_time,
+            "rows": self.rows,
+            "callers": self.callers,
+        }
+
+
+class ActionSpan:
+    """The queries run during one controller action."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.total_time = 0.0
+        self.query_time = 0.0
+        self.queries = 0
+        self.statement_counts: dict[str, int] = {}
+
+    def to_dict(self) -> dict:
+        """Returns the span as a JSON-serialisable dict."""
+        return {
+            "count": self.count,
+            "total_ms": 1000 * self.total_time,
+            "query_ms": 1000 * self.query_time,
+            "queries": self.queries,
+            "queries_per_action": self.queries / self.count if self.count else 0.0,
+        }
+
+
+class QueryProfiler:
+    """Collects statistics on the statements run through Database.execute."""
+
+    def __init__(self):
+        self.statements: dict[str, QueryStats] = {}
+        self.actions: dict[str, ActionSpan] = {}
+        self._lock = threading.Lock()
+        # Each thread tracks its own stack of open actions
+        self._local = threading.local()
+
+    def _action_stack(self) -> list[tuple[ActionSpan, dict[str, int]]]:
+        """Returns the open actions on the current thread."""
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def execute(
+        self, connection: sqlite3.Connection, query: str, params=()
+    ) -> "ProfiledCursor":
+        """Executes the query on the connection and records its timing."""
+        start = time.perf_counter()
+        cursor = connection.execute(query, params)
+        elapsed = time.perf_counter() - start
+        stats = self._record(query, elapsed, _find_repository_caller())
+        return ProfiledCursor(cursor, self, stats)
+
+    def executemany(self, connection: sqlite3.Connection, query: str, rows) -> sqlite3.Cursor:
+        """Executes the query once per row and records the total timing.
+        The rows written are recorded against the statement."""
+        start = time.perf_counter()
+        cursor = connection.executemany(query, rows)
+        elapsed = time.perf_counter() - start
+        stats = self._record(query, elapsed, _find_repository_caller())
+        with self._lock:
+            stats.rows += max(cursor.rowcount, 0)
+        return cursor
+
+    def record_fetch(self, stats: QueryStats, elapsed: float, rows: int) -> None:
+        """Adds the time and rows from fetching a result to a statement."""
+        with self._lock:
+            stats.total_time += elapsed
+            stats.rows += rows
+        for span, _ in self._action_stack():
+            span.query_time += elapsed
+
+    @contextmanager
+    def action(self, name: str) -> Iterator[ActionSpan]:
+        """Groups the queries run inside the block under a named action."""
+        with self._lock:
+            span = self.actions.setdefault(name, ActionSpan(name))
+        statement_counts: dict[str, int] = {}
+        stack = self._action_stack()
+        stack.append((span, statement_counts))
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            stack.pop()
+            with self._lock:
+                span.count += 1
+                span.total_time += time.perf_counter() - start
+                # Keep the worst single-action count of each statement
+                for sql, count in statement_counts.items():
+                    span.statement_counts[sql] = max(span.statement_counts.get(sql, 0), count)
+
+    def reset(self) -> None:
+        """Clears everything recorded so far."""
+        with self._lock:
+            self.statements.clear()
+            self.actions.clear()
+
+    def n_plus_one_suspects(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list[dict]:
+        """Returns the statements run more than threshold times in a single action."""
+        suspects = []
+        for span in self.actions.values():
+            for sql, count in span.statement_counts.items():
+                if count > threshold:
+                    suspects.append({"action": span.name, "sql": sql, "executions": count})
+        return sorted(suspects, key=lambda suspect: -suspect["executions"])
+
+    def report(self) -> dict:
+        """Returns everything recorded as a JSON-serialisable dict."""
+        with self._lock:
+            statements = {
+                sql: {"name": STATEMENTS.name_of(sql), **stats.to_dict()}
+                for sql, stats in self.statements.items()
+            }
+            actions = {name: span.to_dict() for name, span in self.actions.items()}
+        return {
+            "statements": statements,
+            "actions": actions,
+            "n_plus_one_suspects": self.n_plus_one_suspects(),
+        }
+
+    def format_report(self, limit: int = 20) -> str:
+        """Returns a human readable summary of the slowest statements and actions."""
+        report = self.report()
+        lines = ["CoDiet database profile", "", "Slowest statements (by total time):"]
+        lines.append(f"{'count':>8}{'total ms':>12}{'mean ms':>10}{'rows':>10}  statement")
+        statements = sorted(report["statements"].items(), key=lambda item: -item[1]["total_ms"])
+        for sql, stats in statements[:limit]:
+            callers = ", ".join(stats["callers"]) or "-"
+            lines.append(
+                f"{stats['count']:>8}{stats['total_ms']:>12.2f}{stats['mean_ms']:>10.3f}"
+                f"{stats['rows']:>10}  {stats['name'] or sql[:80]}  [{callers}]"
+            )
+        lines += ["", "Actions:"]
+        lines.append(f"{'count':>8}{'total ms':>12}{'query ms':>10}{'queries':>10}  action")
+        for name, span in sorted(report["actions"].items(), key=lambda item: -item[1]["total_ms"]):
+            lines.append(
+                f"{span['count']:>8}{span['total_ms']:>12.2f}{span['query_ms']:>10.2f}"
+                f"{span['queries']:>10}  {name}"
+            )
+        if report["n_plus_one_suspects"]:
+            lines += ["", "Possible N+1 patterns:"]
+            for suspect in report["n_plus_one_suspects"]:
+                lines.append(
+                    f"  {suspect['action']}: {suspect['executions']} x {suspect['sql'][:80]}"
+                )
+        return "\n".join(lines)
+
+    def dump_report(self, path: str) -> None:
+        """Writes the report to the given path as JSON."""
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=4)
+
+    def _record(self, query: str, elapsed: float, caller: str | None) -> QueryStats:
+        """Adds one execution of the query to the statistics."""
+        sql = normalise_sql(query)
+        with self._lock:
+            stats = self.statements.get(sql)
+            if stats is None:
+                stats = self.statements[sql] = QueryStats()
+            stats.count += 1
+            stats.total_time += elapsed
+            stats.max_time = max(stats.max_time, elapsed)
+            if caller is not None:
+                stats.callers[caller] = stats.callers.get(caller, 0) + 1
+        for span, statement_counts in self._action_stack():
+            span.queries += 1
+            span.query_time += elapsed
+            statement_counts[sql] = statement_counts.get(sql, 0) + 1
+        return stats
+
+
+class ProfiledCursor:
+    """Wraps a cursor to count the rows and time spent fetching results."""
+
+    def __init__(self, cursor: sqlite3.Cursor, profiler: QueryProfiler, stats: QueryStats):
+        self._cursor = cursor
+        self._profiler = profiler
+        self._stats = stats
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._profiler.record_fetch(self._stats, time.perf_counter() - start, int(row is not None))
+        return row
+
+    def fetchall(self) -> list:
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._profiler.record_fetch(self._stats, time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchmany(self, size: int | None = None) -> list:
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(size if size is not None else self._cursor.arraysize)
+        self._profiler.record_fetch(self._stats, time.perf_counter() - start, len(rows))
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def __getattr__(self, name: str):
+        # Pass everything else (lastrowid, rowcount...) through to the cursor
+        return getattr(self._cursor, name)
+
+
+def _find_repository_caller() -> str | None:
+    """Returns the name of the Repository method on the current call stack."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        if frame.f_globals.get("__name__") == _REPOSITORY_MODULE:
+            return frame.f_code.co_name
+        frame = frame.f_back
+    return None
+
+
+# The active profiler, if profiling has been switched on
+_profiler: QueryProfiler | None = None
+
+
+def get_profiler() -> QueryProfiler | None:
+    """Returns the active profiler, or None if profiling is switched off."""
+    return _profiler
+
+
+def enable_profiling() -> QueryProfiler:
+    """Switches profiling on, and returns the active profiler."""
+    global _profiler
+    if _profiler is None:
+        _profiler = QueryProfiler()
+    return _profiler
+
+
+def disable_profiling() -> None:
+    """Switches profiling off, discarding anything recorded."""
+    global _profiler
+    _profiler = None
+
+
+def profiled_action(name: str) -> Callable:
+    """Decorator grouping the queries run by a controller action under a name.
+    Does nothing beyond a single check when profiling is switched off."""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _profiler
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.action(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _report_on_exit() -> None:
+    """Writes out the report when the application exits."""
+    if _profiler is None:
+        return
+    output_path = os.environ.get(PROFILE_OUTPUT_ENV_VAR)
+    if output_path:
+        _profiler.dump_report(output_path)
+    else:
+        print(_profiler.format_report(), file=sys.stderr)
+
+
+# Switch profiling on from the environment
+if os.environ.get(PROFILE_ENV_VAR, "").lower() not in ("", "0", "false", "no"):
+    enable_profiling()
+    atexit.register(_report_on_exit)
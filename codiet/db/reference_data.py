@@ -0,0 +1,119 @@
+"""Shared cache of the reference lists the editors search over.
+
+The ingredient, recipe, nutrient, flag and tag name lists are needed by
+several controllers. Holding them here means they are fetched once, and can
+be prefetched on a background thread after the window has painted, rather
+than each controller opening its own connection during startup. The editors
+sync the cache against the database's change log as they are shown, which
+drops just the lists whose tables have changed since they were fetched, so
+edits made elsewhere, such as through the server, are picked up.
+"""
+
+import threading
+
+from codiet.db import DB_PATH
+from codiet.db.database_service import DatabaseService
+
+# The DatabaseService method used to fetch each reference list
+REFERENCE_FETCHERS = {
+    "ingredient_names": "fetch_all_ingredient_names",
+    "recipe_names": "fetch_all_recipe_names",
+    "leaf_nutrient_names": "fetch_all_leaf_nutrient_names",
+    "global_flag_names": "fetch_all_global_flag_names",
+    "global_recipe_tags": "fetch_all_global_recipe_tags",
+}
+
+# The change log entity type each reference list is built from
+REFERENCE_ENTITY_TYPES = {
+    "ingredient_names": "ingredient",
+    "recipe_names": "recipe",
+    "leaf_nutrient_names": "leaf_nutrient",
+    "global_flag_names": "flag",
+    "global_recipe_tags": "recipe_tag",
+}
+
+
+class ReferenceDataCache:
+    """Thread-safe, lazily populated cache of the reference lists."""
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        self._data: dict[str, list[str]] = {}
+        # The (database_id, version) of the database when the cache was last synced
+        self._version: tuple[str, int] | None = None
+        # Held while fetching, so a lookup waits for an in-flight prefetch
+        # rather than fetching the same list again
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> list[str]:
+        """Returns a copy of the named list, fetching it if it isn't cached."""
+        with self._lock:
+            if name not in self._data:
+                with DatabaseService(self.db_path) as db_service:
+                    self._fetch(db_service, name)
+            return list(self._data[name])
+
+    def refresh(self, name: str) -> list[str]:
+        """Refetches the named list, and returns a copy of it.
+        Used after an edit has changed the underlying table."""
+        with self._lock:
+            self._data.pop(name, None)
+        return self.get(name)
+
+    def prefetch(self, names: list[str] | None = None) -> None:
+        """Fetches every list not already cached, over a single connection."""
+        if names is None:
+            names = list(REFERENCE_FETCHERS)
+        with self._lock:
+            missing = [name for name in names if name not in self._data]
+            if len(missing) == 0:
+                return
+            with DatabaseService(self.db_path) as db_service:
+                for name in missing:
+                    self._fetch(db_service, name)
+
+    def sync(self) -> list[str]:
+        """Drops the cached lists whose tables have changed since the last sync,
+        so they are refetched on next use. Returns the names of the dropped lists."""
+        with self._lock:
+            if self._version is None:
+                return []
+            with DatabaseService(self.db_path) as db_service:
+                version = db_service.fetch_change_version()
+                if version == self._version:
+                    return []
+                if version[0] != self._version[0]:
+                    # The database has been rebuilt, so nothing is current
+                    dropped = list(self._data)
+                else:
+                    changes = db_service.fetch_changes_since(self._version[1])
+                    dropped = [
+                        name for name in self._data if REFERENCE_ENTITY_TYPES[name] in changes
+                    ]
+            for name in dropped:
+                del self._data[name]
+            self._version = version
+            return dropped
+
+    def prefetch_in_background(self) -> threading.Thread:
+        """Starts prefetching every list on a daemon thread, and returns it."""
+        thread = threading.Thread(target=self.prefetch, name="reference-prefetch", daemon=True)
+        thread.start()
+        return thread
+
+    def clear(self) -> None:
+        """Empties the cache."""
+        with self._lock:
+            self._data.clear()
+            self._version = None
+
+    def _fetch(self, db_service: DatabaseService, name: str) -> None:
+        """Fetches the named list into the cache. Must be called holding the lock."""
+        # Note the version before the first fetch, so later syncs see every change
+        if self._version is None:
+            self._version = db_service.fetch_change_version()
+        self._data[name] = getattr(db_service, REFERENCE_FETCHERS[name])()
+
+
+# The cache shared by the application's controllers
+reference_data = ReferenceDataCache()
@@ -1,6 +1,15 @@
 import sqlite3
 
+from codiet.db.statements import STATEMENTS, pad_in_list
 from codiet.exceptions import ingredient_exceptions as ingredient_exceptions
+from codiet.utils.nutrients import ENERGY_NUTRIENT_NAME
+
+def _get_bounds(min_value: float | None, max_value: float | None) -> tuple[float, float]:
+    """Returns the bounds of a BETWEEN test, with missing bounds made infinite."""
+    return (
+        min_value if min_value is not None else float("-inf"),
+        max_value if max_value is not None else float("inf"),
+    )
 
 class Repository:
     def __init__(self, db):
@@ -16,169 +25,86 @@ class Repository:
         """Returns the cursor for the database."""
         return self._db.cursor
 
+    def _iter_in_list(self, name: str, values: list, extra_params: int = 0):
+        """Yields a (sql, params) pair for each chunk of the values, for the
+        named IN list statement."""
+        return STATEMENTS.iter_in_list_chunks(name, values, extra_params=extra_params)
+
     def fetch_flag_id(self, name: str) -> int:
         """Returns the ID of the given flag name."""
-        return self._db.execute(
-            """
-            SELECT flag_id FROM global_flag_list WHERE flag_name = ?;
-        """,
-            (name,),
-        ).fetchone()[0]
+        return self._db.execute(STATEMENTS["fetch_flag_id"], (name,)).fetchone()[0]
 
     def fetch_all_global_flag_names(self) -> list[str]:
         """Returns a list of all global flags in the database."""
-        rows = self._db.execute(
-            """
-            SELECT flag_name FROM global_flag_list;
-        """
-        ).fetchall()
+        rows = self._db.execute(STATEMENTS["fetch_all_global_flag_names"]).fetchall()
         return [row[0] for row in rows]
 
     def fetch_all_group_nutrient_names(self) -> list[str]:
         """Returns all of the group nutrient (primary - not aliases) names in the database."""
-        rows = self._db.execute(
-            """
-            SELECT nutrient_name FROM global_group_nutrients;
-        """
-        ).fetchall()
+        rows = self._db.execute(STATEMENTS["fetch_all_group_nutrient_names"]).fetchall()
         return [row[0] for row in rows]
 
     def fetch_all_leaf_nutrient_names(self) -> list[str]:
         """Returns all of the leaf nutrient (primary - not aliases) names in the database."""
-        rows = self._db.execute(
-            """
-            SELECT nutrient_name FROM global_leaf_nutrients;
-        """
-        ).fetchall()
+        rows = self._db.execute(STATEMENTS["fetch_all_leaf_nutrient_names"]).fetchall()
         return [row[0] for row in rows]
 
     def fetch_ingredient_name(self, id:int) -> str:
         """Returns the name of the ingredient associated with the given ID."""
-        return self._db.execute(
-            """
-            SELECT ingredient_name FROM ingredient_base WHERE ingredient_id = ?;
-        """,
-            (id,),
-        ).fetchone()[0]
+        return self._db.execute(STATEMENTS["fetch_ingredient_name"], (id,)).fetchone()[0]
 
     def fetch_ingredient_id_by_name(self, name: str) -> int:
         """Returns the ID of the ingredient associated with the given name."""
-        return self._db.execute(
-            """
-            SELECT ingredient_id FROM ingredient_base WHERE ingredient_name = ?;
-        """,
-            (name,),
-        ).fetchone()[0]
+        return self._db.execute(STATEMENTS["fetch_ingredient_id_by_name"], (name,)).fetchone()[0]
 
     def fetch_all_ingredient_names(self) -> list[str]:
         """Returns a list of all the ingredient names in the database."""
-        rows = self._db.execute(
-            """
-            SELECT ingredient_name FROM ingredient_base;
-        """
-        ).fetchall()
+        rows = self._db.execute(STATEMENTS["fetch_all_ingredient_names"]).fetchall()
         return [row[0] for row in rows]
 
     def fetch_all_global_recipe_tags(self) -> list[str]:
         """Returns a list of all global recipe tags in the database."""
-        rows = self._db.execute(
-            """
-            SELECT recipe_tag_name FROM global_recipe_tags;
-        """
-        ).fetchall()
+        rows = self._db.execute(STATEMENTS["fetch_all_global_recipe_tags"]).fetchall()
         return [row[0] for row in rows]
     
     def fetch_recipe_tags_for_recipe(self, recipe_id: int) -> list[str]:
         """Returns a list of all recipe tags for the given recipe ID."""
-        rows = self._db.execute(
-            """
-            SELECT recipe_tag_name
-            FROM global_recipe_tags
-            JOIN recipe_tags ON global_recipe_tags.recipe_tag_id = recipe_tags.recipe_tag_id
-            WHERE recipe_id = ?;
-        """,
-            (recipe_id,),
-        ).fetchall()
+        rows = self._db.execute(STATEMENTS["fetch_recipe_tags_for_recipe"], (recipe_id,)).fetchall()
         return [row[0] for row in rows]
 
     def fetch_ingredient_description(self, id: int) -> str | None:
         """Returns the description of the ingredient associated with the given ID."""
-        return self._db.execute(
-            """
-            SELECT ingredient_description FROM ingredient_base WHERE ingredient_id = ?;
-        """,
-            (id,),
-        ).fetchone()[0]
+        return self._db.execute(STATEMENTS["fetch_ingredient_description"], (id,)).fetchone()[0]
 
     def fetch_ingredient_cost(self, id: int) -> tuple[float | None, str, float | None]:
         """Returns the cost data of the ingredient associated with the given ID."""
-        return self._db.execute(
-            """
-            SELECT cost_value, cost_qty_unit, cost_qty_value
-            FROM ingredient_base
-            WHERE ingredient_id = ?;
-        """,
-            (id,),
-        ).fetchone()
+        return self._db.execute(STATEMENTS["fetch_ingredient_cost"], (id,)).fetchone()
 
     def fetch_ingredient_density(self, id: int) -> tuple[str, float | None, str, float | None]:
         """Returns the density data of the ingredient associated with the given ID."""
-        return self._db.execute(
-            """
-            SELECT density_mass_unit, density_mass_value, density_vol_unit, density_vol_value
-            FROM ingredient_base
-            WHERE ingredient_id = ?;
-        """,
-            (id,),
-        ).fetchone()
+        return self._db.execute(STATEMENTS["fetch_ingredient_density"], (id,)).fetchone()
 
     def fetch_ingredient_pc_mass(self, id: int) -> tuple[float | None, str, float | None]:
         """Returns the piece mass data of the ingredient associated with the given ID."""
-        return self._db.execute(
-            """
-            SELECT pc_qty, pc_mass_unit, pc_mass_value
-            FROM ingredient_base
-            WHERE ingredient_id = ?;
-        """,
-            (id,),
-        ).fetchone()
+        return self._db.execute(STATEMENTS["fetch_ingredient_pc_mass"], (id,)).fetchone()
 
     def fetch_ingredient_flags(self, id: int) -> dict[str, int]:
         """Returns the flags of the ingredient associated with the given ID.
         SQLite stores flags as integers, where 0 is False and 1 is True.
         """
-        rows = self._db.execute(
-            """
-            SELECT flag_name, flag_value
-            FROM global_flag_list
-            JOIN ingredient_flags ON global_flag_list.flag_id = ingredient_flags.flag_id
-            WHERE ingredient_id = ?;
-        """,
-            (id,),
-        ).fetchall()
+        rows = self._db.execute(STATEMENTS["fetch_ingredient_flags"], (id,)).fetchall()
         return {row[0]: row[1] for row in rows}
 
     def fetch_ingredient_gi(self, id: int) -> float | None:
         """Returns the GI of the ingredient associated with the given ID."""
-        return self._db.execute(
-            """
-            SELECT ingredient_gi FROM ingredient_base WHERE ingredient_id = ?;
-        """,
-            (id,),
-        ).fetchone()[0]
+        return self._db.execute(STATEMENTS["fetch_ingredient_gi"], (id,)).fetchone()[0]
 
     def fetch_ingredient_nutrients(
         self, ingredient_id: int
     ) -> dict[str, dict]:
         """Returns a dict of nutrients for the given ingredient ID."""
         rows = self._db.execute(
-            """
-            SELECT nutrient_name, ntr_qty_unit, ntr_qty_value, ing_qty_unit, ing_qty_value
-            FROM global_leaf_nutrients
-            JOIN ingredient_nutrients ON global_leaf_nutrients.nutrient_id = ingredient_nutrients.nutrient_id
-            WHERE ingredient_id = ?;
-        """,
-            (ingredient_id,),
+            STATEMENTS["fetch_ingredient_nutrients"], (ingredient_id,)
         ).fetchall()
         return {
             row[0]: {
@@ -190,61 +116,190 @@ class Repository:
             for row in rows
         }
 
+    def fetch_all_ingredient_quantity_data(self) -> list[tuple]:
+        """Returns the cost, density and piece mass data of every ingredient,
+        ordered by ingredient ID. Each row is (ingredient_id, cost_value,
+        cost_qty_unit, cost_qty_value, density_mass_unit, density_mass_value,
+        density_vol_unit, density_vol_value, pc_qty, pc_mass_unit, pc_mass_value).
+        """
+        return self._db.execute(STATEMENTS["fetch_all_ingredient_quantity_data"]).fetchall()
+
+    def fetch_all_ingredient_gis(self) -> list[tuple[int, float | None]]:
+        """Returns an (ingredient_id, gi) tuple for every ingredient, ordered by ID."""
+        return self._db.execute(STATEMENTS["fetch_all_ingredient_gis"]).fetchall()
+
+    def fetch_all_ingredient_nutrient_quantities(self) -> list[tuple]:
+        """Returns an (ingredient_id, nutrient_id, ntr_qty_value, ntr_qty_unit,
+        ing_qty_value, ing_qty_unit) tuple for every ingredient nutrient."""
+        return self._db.execute(STATEMENTS["fetch_all_ingredient_nutrient_quantities"]).fetchall()
+
+    def fetch_all_unconvertible_ingredient_nutrient_rows(self) -> list[tuple[int, int, str, str]]:
+        """Returns an (ingredient_id, nutrient_id, ntr_qty_unit, ing_qty_unit) tuple
+        for every populated ingredient nutrient which can't be converted to grams per gram."""
+        return self._db.execute(STATEMENTS["fetch_all_unconvertible_ingredient_nutrient_rows"]).fetchall()
+
+    def fetch_all_ingredient_flag_values(self) -> list[tuple[int, int, int]]:
+        """Returns an (ingredient_id, flag_id, flag_value) tuple for every ingredient flag."""
+        return self._db.execute(STATEMENTS["fetch_all_ingredient_flag_values"]).fetchall()
+
+    def fetch_all_global_flag_rows(self) -> list[tuple[int, str]]:
+        """Returns a (flag_id, flag_name) tuple for every global flag, ordered by ID."""
+        return self._db.execute(STATEMENTS["fetch_all_global_flag_rows"]).fetchall()
+
+    def fetch_all_leaf_nutrient_rows(self) -> list[tuple[int, str]]:
+        """Returns a (nutrient_id, nutrient_name) tuple for every leaf nutrient, ordered by ID."""
+        return self._db.execute(STATEMENTS["fetch_all_leaf_nutrient_rows"]).fetchall()
+
+    def fetch_all_nutrient_group_leaf_rows(self) -> list[tuple[int, str]]:
+        """Returns a (leaf_id, group_name) tuple for every group each leaf
+        nutrient belongs to, directly or through other groups."""
+        return self._db.execute(STATEMENTS["fetch_all_nutrient_group_leaf_rows"]).fetchall()
+
+    def fetch_leaf_nutrient_ids(self, nutrient_name: str) -> list[int]:
+        """Returns the IDs of the leaf nutrients making up the named nutrient.
+        A leaf nutrient gives its own ID, and a group nutrient the IDs of
+        every leaf nutrient beneath it."""
+        rows = self._db.execute(
+            STATEMENTS["fetch_leaf_nutrient_ids"], (nutrient_name, nutrient_name)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def fetch_all_ingredient_nutrient_densities(self) -> list[tuple[int, int, float]]:
+        """Returns an (ingredient_id, nutrient_id, grams_per_gram) tuple for
+        every ingredient nutrient which can be converted to grams per gram."""
+        return self._db.execute(STATEMENTS["fetch_all_ingredient_nutrient_densities"]).fetchall()
+
+    def fetch_ingredient_ids_by_nutrient_density(
+        self,
+        nutrient_ids: list[int],
+        min_value: float | None = None,
+        max_value: float | None = None,
+    ) -> list[int]:
+        """Returns the IDs of the ingredients whose total grams per gram of the
+        given leaf nutrients lies within the bounds, ordered by ID."""
+        bounds = _get_bounds(min_value, max_value)
+        if len(nutrient_ids) == 0:
+            return []
+        if len(nutrient_ids) == 1:
+            # A single nutrient is a range scan over the value index
+            rows = self._db.execute(
+                STATEMENTS["fetch_ingredient_ids_by_nutrient_density"], (nutrient_ids[0], *bounds)
+            ).fetchall()
+            return [row[0] for row in rows]
+        rows = self._db.execute(
+            STATEMENTS.in_list("fetch_ingredient_ids_by_nutrient_densities", len(nutrient_ids)),
+            [*pad_in_list(nutrient_ids), *bounds],
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def rebuild_ingredient_nutrient_densities(self) -> None:
+        """Recomputes the whole ingredient nutrient density table."""
+        self._db.execute(STATEMENTS["rebuild_ingredient_nutrient_densities.delete"])
+        self._db.execute(STATEMENTS["rebuild_ingredient_nutrient_densities.insert"])
+
     def fetch_recipe_name(self, id: int) -> str:
         """Returns the name of the recipe associated with the given ID."""
-        return self._db.execute(
-            """
-            SELECT recipe_name FROM recipe_base WHERE recipe_id = ?;
-        """,
-            (id,),
-        ).fetchone()[0]
+        return self._db.execute(STATEMENTS["fetch_recipe_name"], (id,)).fetchone()[0]
 
     def fetch_recipe_id(self, name: str) -> int:
         """Returns the ID of the recipe associated with the given name."""
-        return self._db.execute(
-            """
-            SELECT recipe_id FROM recipe_base WHERE recipe_name = ?;
-        """,
-            (name,),
-        ).fetchone()[0]
+        return self._db.execute(STATEMENTS["fetch_recipe_id"], (name,)).fetchone()[0]
 
     def fetch_all_recipe_names(self) -> list[str]:
         """Returns a list of all the recipe names in the database."""
-        rows = self._db.execute(
-            """
-            SELECT recipe_name FROM recipe_base;
-        """
-        ).fetchall()
+        rows = self._db.execute(STATEMENTS["fetch_all_recipe_names"]).fetchall()
         return [row[0] for row in rows]
 
+    def fetch_all_recipe_ids(self) -> list[int]:
+        """Returns a list of all the recipe IDs in the database, in order."""
+        rows = self._db.execute(STATEMENTS["fetch_all_recipe_ids"]).fetchall()
+        return [row[0] for row in rows]
+
+    def fetch_all_recipe_ingredient_quantities(self) -> list[tuple[int, int, float | None, str]]:
+        """Returns a (recipe_id, ingredient_id, qty_value, qty_unit) tuple
+        for every ingredient of every recipe."""
+        return self._db.execute(STATEMENTS["fetch_all_recipe_ingredient_quantities"]).fetchall()
+
+    def fetch_all_recipe_ingredient_tolerance_rows(
+        self,
+    ) -> list[tuple[int, int, float | None, str, float | None, float | None]]:
+        """Returns a (recipe_id, ingredient_id, qty_value, qty_unit, qty_tol_lower,
+        qty_tol_upper) tuple for every ingredient of every recipe."""
+        return self._db.execute(STATEMENTS["fetch_all_recipe_ingredient_tolerance_rows"]).fetchall()
+
+    def fetch_ingredient_ids_by_names(self, names: list[str]) -> dict[str, int]:
+        """Returns a dict of ingredient IDs keyed by name, for the given names
+        which exist in the database."""
+        ids = {}
+        for query, params in self._iter_in_list("fetch_ingredient_ids_by_names", names):
+            rows = self._db.execute(query, params).fetchall()
+            ids.update(rows)
+        return ids
+
+    def fetch_existing_ingredient_ids(self, ids: list[int]) -> set[int]:
+        """Returns the subset of the given ingredient IDs which exist in the database."""
+        existing = set()
+        for query, params in self._iter_in_list("fetch_existing_ingredient_ids", ids):
+            rows = self._db.execute(query, params).fetchall()
+            existing.update(row[0] for row in rows)
+        return existing
+
+    def fetch_recipe_ids_by_names(self, names: list[str]) -> dict[str, int]:
+        """Returns a dict of recipe IDs keyed by name, for the given names
+        which exist in the database."""
+        ids = {}
+        for query, params in self._iter_in_list("fetch_recipe_ids_by_names", names):
+            rows = self._db.execute(query, params).fetchall()
+            ids.update(rows)
+        return ids
+
+    def fetch_max_recipe_id(self) -> int:
+        """Returns the largest recipe ID in use, or 0 if there are no recipes."""
+        return self._db.execute(STATEMENTS["fetch_max_recipe_id"]).fetchone()[0]
+
+    def iter_recipe_base_rows(self):
+        """Returns a cursor over the (recipe_id, recipe_name, recipe_description,
+        recipe_instructions) of every recipe, ordered by ID."""
+        return self._db.execute(STATEMENTS["iter_recipe_base_rows"])
+
+    def iter_recipe_ingredient_rows(self):
+        """Returns a cursor over the (recipe_id, ingredient_id, ingredient_name,
+        qty_unit, qty_value, qty_tol_upper, qty_tol_lower) of every recipe
+        ingredient, ordered by recipe ID."""
+        return self._db.execute(STATEMENTS["iter_recipe_ingredient_rows"])
+
+    def iter_recipe_serve_time_rows(self):
+        """Returns a cursor over the (recipe_id, start, end) of every recipe
+        serve time, ordered by recipe ID."""
+        return self._db.execute(STATEMENTS["iter_recipe_serve_time_rows"])
+
+    def iter_recipe_tag_rows(self):
+        """Returns a cursor over the (recipe_id, recipe_tag_name) of every
+        recipe tag, ordered by recipe ID."""
+        return self._db.execute(STATEMENTS["iter_recipe_tag_rows"])
+
+    def fetch_recipe_ids_using_ingredients(self, ingredient_ids: list[int]) -> list[int]:
+        """Returns the IDs of the recipes using any of the given ingredients,
+        ordered by ID, using the reverse ingredient index."""
+        recipe_ids = set()
+        for query, params in self._iter_in_list(
+            "fetch_recipe_ids_using_ingredients", ingredient_ids
+        ):
+            rows = self._db.execute(query, params).fetchall()
+            recipe_ids.update(row[0] for row in rows)
+        return sorted(recipe_ids)
+
     def fetch_recipe_description(self, id: int) -> str | None:
         """Returns the description of the recipe associated with the given ID."""
-        return self._db.execute(
-            """
-            SELECT recipe_description FROM recipe_base WHERE recipe_id = ?;
-        """,
-            (id,),
-        ).fetchone()[0]
+        return self._db.execute(STATEMENTS["fetch_recipe_description"], (id,)).fetchone()[0]
 
     def fetch_recipe_instructions(self, id: int) -> str | None:
         """Returns the instructions of the recipe associated with the given ID."""
-        return self._db.execute(
-            """
-            SELECT recipe_instructions FROM recipe_base WHERE recipe_id = ?;
-        """,
-            (id,),
-        ).fetchone()[0]
+        return self._db.execute(STATEMENTS["fetch_recipe_instructions"], (id,)).fetchone()[0]
 
     def fetch_recipe_ingredients(self, recipe_id: int) -> dict[int, dict]:
         """Returns the ingredients of the recipe associated with the given ID."""
-        rows = self._db.execute(
-            """
-            SELECT ingredient_id, qty_value, qty_unit, qty_tol_upper, qty_tol_lower
-            FROM recipe_ingredients
-            WHERE recipe_id = ?;
-        """,
-            (recipe_id,),
-        ).fetchall()
+        rows = self._db.execute(STATEMENTS["fetch_recipe_ingredients"], (recipe_id,)).fetchall()
         return {
             row[0]: {
                 "qty_value": row[1],
@@ -255,73 +310,106 @@ class Repository:
             for row in rows
         }
 
-    def fetch_recipe_serve_times(self, id: int) -> list[str]:
-        """Returns the serve times of the recipe associated with the given ID."""
+    def fetch_recipe_serve_times(self, id: int) -> list[tuple[int, int]]:
+        """Returns the serve times of the recipe associated with the given ID.
+        Each serve time is a (start, end) tuple of minutes past midnight.
+        """
+        rows = self._db.execute(STATEMENTS["fetch_recipe_serve_times"], (id,)).fetchall()
+        return [(row[0], row[1]) for row in rows]
+
+    def fetch_all_recipe_serve_times(self) -> list[tuple[int, int, int]]:
+        """Returns a (recipe_id, start, end) tuple for every recipe serve time."""
+        rows = self._db.execute(STATEMENTS["fetch_all_recipe_serve_times"]).fetchall()
+        return [(row[0], row[1], row[2]) for row in rows]
+
+    def fetch_all_global_recipe_tag_rows(self) -> list[tuple[int, str]]:
+        """Returns a (recipe_tag_id, recipe_tag_name) tuple for every global recipe tag,
+        ordered by ID."""
+        return self._db.execute(STATEMENTS["fetch_all_global_recipe_tag_rows"]).fetchall()
+
+    def fetch_all_recipe_tag_ids(self) -> list[tuple[int, int]]:
+        """Returns a (recipe_id, recipe_tag_id) tuple for every recipe tag."""
+        return self._db.execute(STATEMENTS["fetch_all_recipe_tag_ids"]).fetchall()
+
+    def fetch_recipe_ids_by_serve_time(self, minute: int) -> list[int]:
+        """Returns the IDs of the recipes which can be served at the given
+        minute past midnight, using the serve time interval index."""
         rows = self._db.execute(
-            """
-            SELECT serve_time_window FROM recipe_serve_times WHERE recipe_id = ?;
-        """,
-            (id,),
+            STATEMENTS["fetch_recipe_ids_by_serve_time"], (minute, minute)
         ).fetchall()
         return [row[0] for row in rows]
 
+    def fetch_recipe_nutrient_totals(self, recipe_id: int) -> dict[str, float]:
+        """Returns the cached nutrient totals of the recipe, keyed by nutrient name.
+        Totals are in grams, except energy which is in kcal."""
+        rows = self._db.execute(STATEMENTS["fetch_recipe_nutrient_totals"], (recipe_id,)).fetchall()
+        return dict(rows)
+
+    def fetch_recipe_ids_by_nutrient_ranges(
+        self, ranges: list[tuple[str, float | None, float | None]]
+    ) -> list[int]:
+        """Returns the IDs of the recipes whose nutrient totals lie within every
+        (nutrient_name, min_value, max_value) range, ordered by ID. Each range
+        is a scan over the (nutrient_name, quantity) index, and the scans are
+        intersected."""
+        select = STATEMENTS["fetch_recipe_ids_by_nutrient_ranges.range"]
+        params: list = []
+        for nutrient_name, min_value, max_value in ranges:
+            params += [nutrient_name, *_get_bounds(min_value, max_value)]
+        rows = self._db.execute(
+            " INTERSECT ".join([select] * len(ranges)) + " ORDER BY recipe_id;", params
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def iter_recipe_nutrient_total_rows(self):
+        """Returns a cursor over the (recipe_id, recipe_name, nutrient_name,
+        quantity) of every cached recipe nutrient total, ordered by recipe ID.
+        Recipes without totals give a single row of None nutrient and quantity."""
+        return self._db.execute(STATEMENTS["iter_recipe_nutrient_total_rows"])
+
+    def fetch_recipe_nutrient_totals_version(self) -> int | None:
+        """Returns the change log version the recipe nutrient totals were
+        last brought up to date at, or None if they never have been."""
+        return self._db.execute(STATEMENTS["fetch_recipe_nutrient_totals_version"]).fetchone()[0]
+
+    def fetch_change_version(self) -> tuple[str, int]:
+        """Returns the (database_id, version) of the database. The version
+        increases with every change, and the ID changes if the database is rebuilt."""
+        return self._db.execute(STATEMENTS["fetch_change_version"]).fetchone()
+
+    def fetch_changes_since(self, version: int) -> list[tuple[str, int, str, int]]:
+        """Returns an (entity_type, entity_id, operation, version) tuple for every
+        entity changed after the given version, ordered by version. The operation
+        is 'I', 'U' or 'D', for the entity's most recent change."""
+        return self._db.execute(STATEMENTS["fetch_changes_since"], (version,)).fetchall()
+
     def insert_global_flag(self, name: str) -> int:
         """Adds a flag to the global flag table and returns the ID."""
-        cursor = self._db.execute(
-            """
-            INSERT INTO global_flag_list (flag_name) VALUES (?);
-        """,
-            (name,),
-        )
+        cursor = self._db.execute(STATEMENTS["insert_global_flag"], (name,))
         return cursor.lastrowid
     
     def insert_global_leaf_nutrient(self, name: str, parent_id: int | None = None) -> int:
         """Adds a nutrient to the global leaf nutrient table and returns the ID."""
-        cursor = self._db.execute(
-            """
-            INSERT INTO global_leaf_nutrients (nutrient_name, parent_id) VALUES (?, ?);
-            """,
-            (name, parent_id),
-        )
+        cursor = self._db.execute(STATEMENTS["insert_global_leaf_nutrient"], (name, parent_id))
         return cursor.lastrowid
 
     def insert_global_group_nutrient(self, name: str, parent_id: int | None = None) -> int:
         """Adds a nutrient to the global group nutrient table and returns the ID."""
-        cursor = self._db.execute(
-            """
-            INSERT INTO global_group_nutrients (nutrient_name, parent_id) VALUES (?, ?);
-            """,
-            (name, parent_id),
-        )
+        cursor = self._db.execute(STATEMENTS["insert_global_group_nutrient"], (name, parent_id))
         return cursor.lastrowid
 
     def insert_global_group_nutrient_alias(self, alias: str, primary_nutrient_id: int) -> None:
         """Adds an alias into the global group nutrient alias table."""
-        self._db.execute(
-            """
-            INSERT INTO nutrient_alias (nutrient_alias, primary_nutrient_id) VALUES (?, ?);
-        """,
-            (alias, primary_nutrient_id),
-        )
+        self._db.execute(STATEMENTS["insert_nutrient_alias"], (alias, primary_nutrient_id))
 
     def insert_global_leaf_nutrient_alias(self, alias: str, primary_nutrient_id: int) -> None:
         """Adds an alias into the global leaf nutrient alias table."""
-        self._db.execute(
-            """
-            INSERT INTO nutrient_alias (nutrient_alias, primary_nutrient_id) VALUES (?, ?);
-        """,
-            (alias, primary_nutrient_id),
-        )
+        self._db.execute(STATEMENTS["insert_nutrient_alias"], (alias, primary_nutrient_id))
 
     def insert_ingredient_name(self, name: str) -> None:
         """Adds an ingredient name to the database."""
         try:
-            self._db.execute(
-                """
-                INSERT INTO ingredient_base (ingredient_name) VALUES (?);
-            """,
-                (name,),
-            )
+            self._db.execute(STATEMENTS["insert_ingredient_name"], (name,))
         except sqlite3.IntegrityError as e:
             if "UNIQUE constraint failed" in str(e):
                 raise ingredient_exceptions.IngredientNameExistsError(name)
@@ -330,47 +418,65 @@ class Repository:
 
     def insert_recipe_name(self, name: str) -> int:
         """Adds a recipe name to the database and returns the ID."""
-        cursor = self._db.execute(
-            """
-            INSERT INTO recipe_base (recipe_name) VALUES (?);
-        """,
-            (name,),
-        )
+        cursor = self._db.execute(STATEMENTS["insert_recipe_name"], (name,))
         return cursor.lastrowid
 
     def insert_global_recipe_tag(self, name: str) -> int:
         """Adds a recipe tag to the global recipe tag table and returns the ID."""
-        cursor = self._db.execute(
-            """
-            INSERT INTO global_recipe_tags (recipe_tag_name) VALUES (?);
-        """,
-            (name,),
-        )
+        cursor = self._db.execute(STATEMENTS["insert_global_recipe_tag"], (name,))
         return cursor.lastrowid
 
+    def insert_recipe_base_rows(self, rows: list[tuple]) -> None:
+        """Bulk inserts (recipe_id, recipe_name, recipe_description,
+        recipe_instructions) rows into the recipe base table."""
+        self._db.executemany(STATEMENTS["insert_recipe_base_rows"], rows)
+
+    def insert_recipe_ingredient_rows(self, rows: list[tuple]) -> None:
+        """Bulk inserts (recipe_id, ingredient_id, qty_value, qty_unit,
+        qty_tol_upper, qty_tol_lower) rows into the recipe ingredient table."""
+        self._db.executemany(STATEMENTS["insert_recipe_ingredient_rows"], rows)
+
+    def insert_recipe_serve_time_rows(self, rows: list[tuple[int, int, int]]) -> None:
+        """Bulk inserts (recipe_id, start, end) rows into the recipe serve time table."""
+        self._db.executemany(STATEMENTS["insert_recipe_serve_time_rows"], rows)
+
+    def insert_recipe_tag_rows(self, rows: list[tuple[int, int]]) -> None:
+        """Bulk inserts (recipe_id, recipe_tag_id) rows into the recipe tag table."""
+        self._db.executemany(STATEMENTS["insert_recipe_tag_rows"], rows)
+
+    def refresh_recipe_nutrient_totals(self, recipe_ids: list[int] | None = None) -> None:
+        """Recomputes the nutrient totals of the given recipes, or of every
+        recipe if none are given. Leaf totals come from a single grouped join
+        of the recipe ingredients with the nutrient densities, and the group
+        and energy totals are then derived from them."""
+        steps = ["delete", "leaves", "groups", "energy"]
+        if recipe_ids is None:
+            for step in steps:
+                params = [ENERGY_NUTRIENT_NAME] if step == "energy" else []
+                self._db.execute(STATEMENTS[f"refresh_recipe_nutrient_totals.{step}"], params)
+            return
+        # Chunk once, leaving room for the energy step's extra parameter
+        for _, chunk in self._iter_in_list(
+            "refresh_recipe_nutrient_totals.delete.in", recipe_ids, extra_params=1
+        ):
+            for step in steps:
+                query = STATEMENTS.in_list(f"refresh_recipe_nutrient_totals.{step}.in", len(chunk))
+                params = [ENERGY_NUTRIENT_NAME, *chunk] if step == "energy" else chunk
+                self._db.execute(query, params)
+
+    def update_recipe_nutrient_totals_version(self, version: int) -> None:
+        """Records the change log version the recipe nutrient totals are up to date at."""
+        self._db.execute(STATEMENTS["update_recipe_nutrient_totals_version"], (version,))
+
     def update_ingredient_name(self, ingredient_id: int, name: str) -> None:
         """Updates the name of the ingredient associated with the given ID."""
-        self._db.execute(
-            """
-            UPDATE ingredient_base
-            SET ingredient_name = ?
-            WHERE ingredient_id = ?;
-        """,
-            (name, ingredient_id),
-        )
+        self._db.execute(STATEMENTS["update_ingredient_name"], (name, ingredient_id))
 
     def update_ingredient_description(
         self, ingredient_id: int, description: str | None
     ) -> None:
         """Updates the description of the ingredient associated with the given ID."""
-        self._db.execute(
-            """
-            UPDATE ingredient_base
-            SET ingredient_description = ?
-            WHERE ingredient_id = ?;
-            """,
-            (description, ingredient_id),
-        )
+        self._db.execute(STATEMENTS["update_ingredient_description"], (description, ingredient_id))
 
     def update_ingredient_cost(
         self,
@@ -382,11 +488,7 @@ class Repository:
     ) -> None:
         """Updates the cost data of the ingredient associated with the given ID."""
         self._db.execute(
-            """
-            UPDATE ingredient_base
-            SET cost_value = ?, cost_unit = ?, cost_qty_unit = ?, cost_qty_value = ?
-            WHERE ingredient_id = ?;
-        """,
+            STATEMENTS["update_ingredient_cost"],
             (cost_value, cost_unit, qty_unit, qty_value, ingredient_id),
         )
 
@@ -400,11 +502,7 @@ class Repository:
     ) -> None:
         """Updates the density data of the ingredient associated with the given ID."""
         self._db.execute(
-            """
-            UPDATE ingredient_base
-            SET density_mass_unit = ?, density_mass_value = ?, density_vol_unit = ?, density_vol_value = ?
-            WHERE ingredient_id = ?;
-        """,
+            STATEMENTS["update_ingredient_density"],
             (
                 dens_mass_unit,
                 dens_mass_value,
@@ -423,11 +521,7 @@ class Repository:
     ) -> None:
         """Updates the piece mass data of the ingredient associated with the given ID."""
         self._db.execute(
-            """
-            UPDATE ingredient_base
-            SET pc_qty = ?, pc_mass_unit = ?, pc_mass_value = ?
-            WHERE ingredient_id = ?;
-        """,
+            STATEMENTS["update_ingredient_pc_mass"],
             (pc_qty, pc_mass_unit, pc_mass_value, ingredient_id),
         )
 
@@ -436,32 +530,17 @@ class Repository:
     ) -> None:
         """Updates the flags for the ingredient associated with the given ID."""
         # Clear the existing flags
-        self._db.execute(
-            """
-            DELETE FROM ingredient_flags WHERE ingredient_id = ?;
-        """,
-            (ingredient_id,),
-        )
+        self._db.execute(STATEMENTS["update_ingredient_flags.delete"], (ingredient_id,))
         # Add the new flags
         for flag, value in flags.items():
             flag_id = self.fetch_flag_id(flag)
             self._db.execute(
-                """
-                INSERT INTO ingredient_flags (ingredient_id, flag_id, flag_value) VALUES (?, ?, ?);
-            """,
-                (ingredient_id, flag_id, value),
+                STATEMENTS["update_ingredient_flags.insert"], (ingredient_id, flag_id, value)
             )
 
     def update_ingredient_gi(self, ingredient_id: int, gi: float | None) -> None:
         """Updates the GI of the ingredient associated with the given ID."""
-        self._db.execute(
-            """
-            UPDATE ingredient_base
-            SET ingredient_gi = ?
-            WHERE ingredient_id = ?;
-        """,
-            (gi, ingredient_id),
-        )
+        self._db.execute(STATEMENTS["update_ingredient_gi"], (gi, ingredient_id))
 
     def update_ingredient_nutrient_quantity(
             self,
@@ -475,79 +554,41 @@ class Repository:
         """Updates the nutrient quantity of the ingredient associated with the given ID."""
         # Get the nutrient ID
         nutrient_id = self._db.execute(
-            """
-            SELECT nutrient_id FROM global_leaf_nutrients WHERE nutrient_name = ?;
-        """,
-            (nutrient_name,),
+            STATEMENTS["update_ingredient_nutrient_quantity.select"], (nutrient_name,)
         ).fetchone()[0]
         # Clear the existing nutrient
         self._db.execute(
-            """
-            DELETE FROM ingredient_nutrients WHERE ingredient_id = ? AND nutrient_id = ?;
-        """,
-            (ingredient_id, nutrient_id),
+            STATEMENTS["update_ingredient_nutrient_quantity.delete"], (ingredient_id, nutrient_id)
         )
         # Add the new nutrient
         self._db.execute(
-            """
-            INSERT INTO ingredient_nutrients (ingredient_id, nutrient_id, ntr_qty_unit, ntr_qty_value, ing_qty_unit, ing_qty_value)
-            VALUES (?, ?, ?, ?, ?, ?);
-        """,
+            STATEMENTS["update_ingredient_nutrient_quantity.insert"],
             (ingredient_id, nutrient_id, ntr_qty_unit, ntr_qty_value, ing_qty_unit, ing_qty_value),
         )
 
     def update_recipe_name(self, recipe_id: int, name: str) -> None:
         """Updates the name of the recipe associated with the given ID."""
-        self._db.execute(
-            """
-            UPDATE recipe_base
-            SET recipe_name = ?
-            WHERE recipe_id = ?;
-        """,
-            (name, recipe_id),
-        )
+        self._db.execute(STATEMENTS["update_recipe_name"], (name, recipe_id))
 
     def update_recipe_description(self, recipe_id: int, description: str | None) -> None:
         """Updates the description of the recipe associated with the given ID."""
-        self._db.execute(
-            """
-            UPDATE recipe_base
-            SET recipe_description = ?
-            WHERE recipe_id = ?;
-        """,
-            (description, recipe_id),
-        )
+        self._db.execute(STATEMENTS["update_recipe_description"], (description, recipe_id))
 
     def update_recipe_instructions(self, recipe_id: int, instructions: str | None) -> None:
         """Updates the instructions of the recipe associated with the given ID."""
-        self._db.execute(
-            """
-            UPDATE recipe_base
-            SET recipe_instructions = ?
-            WHERE recipe_id = ?;
-        """,
-            (instructions, recipe_id),
-        )
+        self._db.execute(STATEMENTS["update_recipe_instructions"], (instructions, recipe_id))
 
     def update_recipe_ingredients(
         self, recipe_id: int, ingredients: dict[str, dict]
     ) -> None:
         """Updates the ingredients of the recipe associated with the given ID."""
         # Clear the existing ingredients
-        self._db.execute(
-            """
-            DELETE FROM recipe_ingredients WHERE recipe_id = ?;
-        """,
-            (recipe_id,),
-        )
+        self._db.execute(STATEMENTS["update_recipe_ingredients.delete"], (recipe_id,))
         # Add the new ingredients
         for ingredient_id, data in ingredients.items():
             # Add the ingredient
             self._db.execute(
-                """
-                INSERT INTO recipe_ingredients (recipe_id, ingredient_id, qty_value, qty_unit, qty_tol_upper, qty_tol_lower)
-                VALUES (?, ?, ?, ?, ?, ?);
-            """,
+                STATEMENTS["insert_recipe_ingredient_rows"],
                 (
                     recipe_id,
                     ingredient_id,
@@ -558,26 +599,29 @@ class Repository:
                 ),
             )
 
-    def update_recipe_serve_times(
-        self, recipe_id: int, serve_times: list[str]
+    def update_recipe_ingredient_field(
+        self, recipe_id: int, ingredient_id: int, column: str, value: float | str | None
     ) -> None:
-        """Updates the serve times of the recipe associated with the given ID."""
-        # Clear the existing serve times
+        """Updates one column (qty_value, qty_unit, qty_tol_upper or
+        qty_tol_lower) of an ingredient of the recipe associated with the given ID."""
         self._db.execute(
-            """
-            DELETE FROM recipe_serve_times WHERE recipe_id = ?;
-        """,
-            (recipe_id,),
+            STATEMENTS[f"update_recipe_ingredient_field.{column}"], (value, recipe_id, ingredient_id)
         )
+
+    def update_recipe_serve_times(
+        self, recipe_id: int, serve_times: list[tuple[int, int]]
+    ) -> None:
+        """Updates the serve times of the recipe associated with the given ID.
+        Each serve time is a (start, end) tuple of minutes past midnight.
+        """
+        # Clear the existing serve times
+        self._db.execute(STATEMENTS["update_recipe_serve_times.delete"], (recipe_id,))
         # Add the new serve times
         for serve_time in serve_times:
             # Add the serve time
             self._db.execute(
-                """
-                INSERT INTO recipe_serve_times (recipe_id, serve_time_window)
-                VALUES (?, ?);
-            """,
-                (recipe_id, serve_time),
+                STATEMENTS["insert_recipe_serve_time_rows"],
+                (recipe_id, serve_time[0], serve_time[1]),
             )
 
     def update_recipe_tags(
@@ -585,86 +629,42 @@ class Repository:
     ) -> None:
         """Updates the recipe tags of the recipe associated with the given ID."""
         # Clear the existing recipe tags
-        self._db.execute(
-            """
-            DELETE FROM recipe_tags WHERE recipe_id = ?;
-        """,
-            (recipe_id,),
-        )
+        self._db.execute(STATEMENTS["update_recipe_tags.delete"], (recipe_id,))
         # Add the new recipe tags
         for tag in recipe_tags:
             # Get the tag ID
-            tag_id = self._db.execute(
-                """
-                SELECT recipe_tag_id FROM global_recipe_tags WHERE recipe_tag_name = ?;
-            """,
-                (tag,),
-            ).fetchone()[0]
+            tag_id = self._db.execute(STATEMENTS["update_recipe_tags.select"], (tag,)).fetchone()[0]
             # Add the tag
-            self._db.execute(
-                """
-                INSERT INTO recipe_tags (recipe_id, recipe_tag_id)
-                VALUES (?, ?);
-            """,
-                (recipe_id, tag_id),
-            )
+            self._db.execute(STATEMENTS["insert_recipe_tag_rows"], (recipe_id, tag_id))
+
+    def update_recipe_base_rows(self, rows: list[tuple]) -> None:
+        """Bulk updates recipes from (recipe_name, recipe_description,
+        recipe_instructions, recipe_id) rows."""
+        self._db.executemany(STATEMENTS["update_recipe_base_rows"], rows)
+
+    def delete_recipe_associations(self, recipe_ids: list[int]) -> None:
+        """Deletes the ingredients, serve times and tags of the given recipes."""
+        for table in ["recipe_ingredients", "recipe_serve_times", "recipe_tags"]:
+            name = f"delete_recipe_associations.{table}"
+            for query, params in self._iter_in_list(name, recipe_ids):
+                self._db.execute(query, params)
 
     def delete_ingredient_by_name(self, ingredient_name: str) -> None:
-        """Deletes the given ingredient from the database."""
-        # Grab the ID of the ingredient
-        ingredient_id = self.fetch_ingredient_id_by_name(ingredient_name)
-
-        # Remove all entries against the ID from all ingredient tables.
-        queries = [
-            """
-            DELETE FROM ingredient_base
-            WHERE ingredient_id = ?;
-            """,
-            """
-            DELETE FROM ingredient_nutrients
-            WHERE ingredient_id = ?;
-            """,
-            """
-            DELETE FROM ingredient_flags
-            WHERE ingredient_id = ?;
-            """,
-        ]
-        try:
-            for query in queries:
-                self._db.execute(query, (ingredient_id,))
-                self._db.commit()
-        except Exception as e:
-            self._db.connection.rollback()
-            raise e       
+        """Deletes the given ingredient from the database. Its flags, nutrients
+        and recipe ingredient entries are removed by the cascading foreign keys."""
+        self._db.execute(STATEMENTS["delete_ingredient_by_name"], (ingredient_name,))
 
     def delete_recipe_by_name(self, recipe_name: str) -> None:
-        """Deletes the given recipe from the database."""
-        # Grab the ID of the recipe
-        recipe_id = self.fetch_recipe_id(recipe_name)
-
-        # Remove all entries against the ID from all recipe tables.
-        queries = [
-            """
-            DELETE FROM recipe_base
-            WHERE recipe_id = ?;
-            """,
-            """
-            DELETE FROM recipe_ingredients
-            WHERE recipe_id = ?;
-            """,
-            """
-            DELETE FROM recipe_serve_times
-            WHERE recipe_id = ?;
-            """,
-            """
-            DELETE FROM recipe_tags
-            WHERE recipe_id = ?;
-            """,
-        ]
-        try:
-            for query in queries:
-                self._db.execute(query, (recipe_id,))
-                self._db.commit()
-        except Exception as e:
-            self._db.connection.rollback()
-            raise e     
\ No newline at end of file
+        """Deletes the given recipe from the database. Its ingredients, serve
+        times and tags are removed by the cascading foreign keys."""
+        self._db.execute(STATEMENTS["delete_recipe_by_name"], (recipe_name,))
+
+    def delete_ingredients_by_ids(self, ingredient_ids: list[int]) -> None:
+        """Deletes the given ingredients, and everything depending on them."""
+        for query, params in self._iter_in_list("delete_ingredients_by_ids", ingredient_ids):
+            self._db.execute(query, params)
+
+    def delete_recipes_by_ids(self, recipe_ids: list[int]) -> None:
+        """Deletes the given recipes, and everything depending on them."""
+        for query, params in self._iter_in_list("delete_recipes_by_ids", recipe_ids):
+            self._db.execute(query, params)
@@ -0,0 +1,565 @@
+"""The registry of named SQL statements run by the Repository.
+
+Every statement is registered here once, under a name, with its whitespace
+normalised. Keeping the SQL text fixed means each statement is compiled once
+per connection and then reused from the connection's statement cache, and
+the registry knows how many statements there are, so Database can size that
+cache to hold them all.
+
+Statements filtering on a list of values are registered as IN list templates,
+containing an {in_list} marker. Values are bound in chunks of at most
+SQLite's variable limit, and each chunk is padded (by repeating its last
+value) up to a power of two, so each template only ever compiles to a
+handful of distinct statements, however many values are passed.
+"""
+
+import re
+import sqlite3
+from typing import Iterator, Sequence
+
+# The marker replaced by the placeholders in an IN list template
+IN_LIST_MARKER = "{in_list}"
+# SQLite's default SQLITE_MAX_VARIABLE_NUMBER before version 3.32
+DEFAULT_MAX_VARIABLES = 999
+# Cache slots kept free for statements composed at run time
+DYNAMIC_STATEMENT_HEADROOM = 32
+
+
+def normalise_sql(query: str) -> str:
+    """Returns the query with its whitespace collapsed, for use as a key."""
+    return re.sub(r"\s+", " ", query).strip()
+
+
+def get_max_variables() -> int:
+    """Returns the most parameters SQLite allows in one statement."""
+    connection = sqlite3.connect(":memory:")
+    try:
+        return connection.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+    except AttributeError:
+        # Connection.getlimit was added in Python 3.11
+        return DEFAULT_MAX_VARIABLES
+    finally:
+        connection.close()
+
+
+# The limit is fixed when SQLite is compiled, so it is only looked up once
+MAX_VARIABLES = get_max_variables()
+
+
+def get_in_list_size(count: int) -> int:
+    """Returns the number of placeholders an IN list of count values is padded to."""
+    size = 1
+    while size < count:
+        size *= 2
+    return size
+
+
+def pad_in_list(values: Sequence) -> list:
+    """Returns the values padded to their IN list size by repeating the last
+    value, which leaves the IN test unchanged."""
+    values = list(values)
+    return values + values[-1:] * (get_in_list_size(len(values)) - len(values))
+
+
+class StatementRegistry:
+    """A set of named, normalised SQL statements."""
+
+    def __init__(self):
+        self._statements: dict[str, str] = {}
+        self._templates: dict[str, str] = {}
+        # The IN list statements built so far, keyed by (name, size)
+        self._in_lists: dict[tuple[str, int], str] = {}
+        # The name of every statement, keyed by its SQL
+        self._names: dict[str, str] = {}
+
+    def register(self, name: str, sql: str) -> str:
+        """Adds a statement to the registry, and returns its normalised SQL.
+        Statements containing the IN list marker are registered as templates.
+
+        Raises:
+            ValueError: If the name or the SQL is already registered.
+        """
+        if name in self._statements or name in self._templates:
+            raise ValueError(f"A statement named {name} is already registered.")
+        sql = normalise_sql(sql)
+        if sql in self._names or sql in self._templates.values():
+            raise ValueError(f"The SQL of {name} is already registered.")
+        if IN_LIST_MARKER in sql:
+            self._templates[name] = sql
+        else:
+            self._statements[name] = sql
+            self._names[sql] = name
+        return sql
+
+    def __getitem__(self, name: str) -> str:
+        return self._statements[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._statements or name in self._templates
+
+    def __len__(self) -> int:
+        return len(self._statements) + len(self._templates)
+
+    def names(self) -> list[str]:
+        """Returns the name of every registered statement and template."""
+        return [*self._statements, *self._templates]
+
+    def name_of(self, sql: str) -> str | None:
+        """Returns the name of the statement with the given SQL, or None if
+        it isn't registered. IN list statements are named by their template."""
+        return self._names.get(normalise_sql(sql))
+
+    def in_list(self, name: str, count: int) -> str:
+        """Returns the SQL of the IN list template with the placeholders for
+        count values, padded up to the next power of two."""
+        size = get_in_list_size(count)
+        sql = self._in_lists.get((name, size))
+        if sql is None:
+            sql = self._templates[name].replace(IN_LIST_MARKER, ", ".join("?" * size))
+            self._in_lists[(name, size)] = sql
+            self._names[sql] = name
+        return sql
+
+    def iter_in_list_chunks(
+        self,
+        name: str,
+        values: Sequence,
+        extra_params: int = 0,
+        max_variables: int = MAX_VARIABLES,
+    ) -> Iterator[tuple[str, list]]:
+        """Yields a (sql, params) pair for each chunk of the values, for the
+        IN list template, with each chunk padded to its placeholder count."""
+        chunk_size = get_in_list_size(max(max_variables - extra_params, 1) + 1) // 2
+        for i in range(0, len(values), chunk_size):
+            chunk = list(values[i : i + chunk_size])
+            yield self.in_list(name, len(chunk)), pad_in_list(chunk)
+
+    def get_cache_size(self, max_variables: int = MAX_VARIABLES) -> int:
+        """Returns a statement cache size which holds every registered statement,
+        every padded size of every IN list template, and some headroom."""
+        sizes = get_in_list_size(max_variables + 1).bit_length() - 1
+        return len(self._statements) + len(self._templates) * sizes + DYNAMIC_STATEMENT_HEADROOM
+
+
+STATEMENTS = StatementRegistry()
+
+STATEMENTS.register("fetch_flag_id", """
+    SELECT flag_id FROM global_flag_list WHERE flag_name = ?;
+""")
+STATEMENTS.register("fetch_all_global_flag_names", """
+    SELECT flag_name FROM global_flag_list;
+""")
+STATEMENTS.register("fetch_all_group_nutrient_names", """
+    SELECT nutrient_name FROM global_group_nutrients;
+""")
+STATEMENTS.register("fetch_all_leaf_nutrient_names", """
+    SELECT nutrient_name FROM global_leaf_nutrients;
+""")
+STATEMENTS.register("fetch_ingredient_name", """
+    SELECT ingredient_name FROM ingredient_base WHERE ingredient_id = ?;
+""")
+STATEMENTS.register("fetch_ingredient_id_by_name", """
+    SELECT ingredient_id FROM ingredient_base WHERE ingredient_name = ?;
+""")
+STATEMENTS.register("fetch_all_ingredient_names", """
+    SELECT ingredient_name FROM ingredient_base;
+""")
+STATEMENTS.register("fetch_all_global_recipe_tags", """
+    SELECT recipe_tag_name FROM global_recipe_tags;
+""")
+STATEMENTS.register("fetch_recipe_tags_for_recipe", """
+    SELECT recipe_tag_name
+    FROM global_recipe_tags
+    JOIN recipe_tags ON global_recipe_tags.recipe_tag_id = recipe_tags.recipe_tag_id
+    WHERE recipe_id = ?;
+""")
+STATEMENTS.register("fetch_ingredient_description", """
+    SELECT ingredient_description FROM ingredient_base WHERE ingredient_id = ?;
+""")
+STATEMENTS.register("fetch_ingredient_cost", """
+    SELECT cost_value, cost_qty_unit, cost_qty_value
+    FROM ingredient_base
+    WHERE ingredient_id = ?;
+""")
+STATEMENTS.register("fetch_ingredient_density", """
+    SELECT density_mass_unit, density_mass_value, density_vol_unit, density_vol_value
+    FROM ingredient_base
+    WHERE ingredient_id = ?;
+""")
+STATEMENTS.register("fetch_ingredient_pc_mass", """
+    SELECT pc_qty, pc_mass_unit, pc_mass_value
+    FROM ingredient_base
+    WHERE ingredient_id = ?;
+""")
+STATEMENTS.register("fetch_ingredient_flags", """
+    SELECT flag_name, flag_value
+    FROM global_flag_list
+    JOIN ingredient_flags ON global_flag_list.flag_id = ingredient_flags.flag_id
+    WHERE ingredient_id = ?;
+""")
+STATEMENTS.register("fetch_ingredient_gi", """
+    SELECT ingredient_gi FROM ingredient_base WHERE ingredient_id = ?;
+""")
+STATEMENTS.register("fetch_ingredient_nutrients", """
+    SELECT nutrient_name, ntr_qty_unit, ntr_qty_value, ing_qty_unit, ing_qty_value
+    FROM global_leaf_nutrients
+    JOIN ingredient_nutrients ON global_leaf_nutrients.nutrient_id = ingredient_nutrients.nutrient_id
+    WHERE ingredient_id = ?;
+""")
+STATEMENTS.register("fetch_all_ingredient_quantity_data", """
+    SELECT ingredient_id, cost_value, cost_qty_unit, cost_qty_value,
+        density_mass_unit, density_mass_value, density_vol_unit, density_vol_value,
+        pc_qty, pc_mass_unit, pc_mass_value
+    FROM ingredient_base
+    ORDER BY ingredient_id;
+""")
+STATEMENTS.register("fetch_all_ingredient_gis", """
+    SELECT ingredient_id, ingredient_gi FROM ingredient_base ORDER BY ingredient_id;
+""")
+STATEMENTS.register("fetch_all_ingredient_nutrient_quantities", """
+    SELECT ingredient_id, nutrient_id, ntr_qty_value, ntr_qty_unit, ing_qty_value, ing_qty_unit
+    FROM ingredient_nutrients;
+""")
+STATEMENTS.register("fetch_all_unconvertible_ingredient_nutrient_rows", """
+    SELECT n.ingredient_id, n.nutrient_id, n.ntr_qty_unit, n.ing_qty_unit
+    FROM ingredient_nutrients n
+    LEFT JOIN ingredient_nutrient_densities d
+        ON d.ingredient_id = n.ingredient_id AND d.nutrient_id = n.nutrient_id
+    WHERE n.ntr_qty_value IS NOT NULL AND n.ing_qty_value IS NOT NULL AND d.ingredient_id IS NULL
+    ORDER BY n.ingredient_id;
+""")
+STATEMENTS.register("fetch_all_ingredient_flag_values", """
+    SELECT ingredient_id, flag_id, flag_value FROM ingredient_flags;
+""")
+STATEMENTS.register("fetch_all_global_flag_rows", """
+    SELECT flag_id, flag_name FROM global_flag_list ORDER BY flag_id;
+""")
+STATEMENTS.register("fetch_all_leaf_nutrient_rows", """
+    SELECT nutrient_id, nutrient_name FROM global_leaf_nutrients ORDER BY nutrient_id;
+""")
+STATEMENTS.register("fetch_all_nutrient_group_leaf_rows", """
+    SELECT leaf_id, group_name FROM nutrient_group_leaves ORDER BY group_name, leaf_id;
+""")
+STATEMENTS.register("fetch_leaf_nutrient_ids", """
+    WITH RECURSIVE groups(nutrient_id) AS (
+        SELECT nutrient_id FROM global_group_nutrients WHERE nutrient_name = ?
+        UNION
+        SELECT child.nutrient_id FROM global_group_nutrients child
+        JOIN groups ON child.parent_id = groups.nutrient_id
+    )
+    SELECT nutrient_id FROM global_leaf_nutrients WHERE nutrient_name = ?
+    UNION
+    SELECT leaf.nutrient_id FROM global_leaf_nutrients leaf
+    JOIN groups ON leaf.parent_id = groups.nutrient_id
+    ORDER BY nutrient_id;
+""")
+STATEMENTS.register("fetch_ingredient_ids_by_nutrient_density", """
+    SELECT ingredient_id FROM ingredient_nutrient_densities
+    WHERE nutrient_id = ? AND grams_per_gram BETWEEN ? AND ?
+    ORDER BY ingredient_id;
+""")
+STATEMENTS.register("fetch_ingredient_ids_by_nutrient_densities", """
+    SELECT ingredient_id FROM ingredient_nutrient_densities
+    WHERE nutrient_id IN ({in_list})
+    GROUP BY ingredient_id
+    HAVING SUM(grams_per_gram) BETWEEN ? AND ?
+    ORDER BY ingredient_id;
+""")
+STATEMENTS.register("fetch_all_ingredient_nutrient_densities", """
+    SELECT ingredient_id, nutrient_id, grams_per_gram FROM ingredient_nutrient_densities;
+""")
+STATEMENTS.register("rebuild_ingredient_nutrient_densities.delete", """
+    DELETE FROM ingredient_nutrient_densities;
+""")
+STATEMENTS.register("rebuild_ingredient_nutrient_densities.insert", """
+    INSERT OR REPLACE INTO ingredient_nutrient_densities (ingredient_id, nutrient_id, grams_per_gram)
+    SELECT ingredient_id, nutrient_id, grams_per_gram FROM ingredient_nutrient_density_source
+    WHERE grams_per_gram IS NOT NULL;
+""")
+STATEMENTS.register("fetch_recipe_name", """
+    SELECT recipe_name FROM recipe_base WHERE recipe_id = ?;
+""")
+STATEMENTS.register("fetch_recipe_id", """
+    SELECT recipe_id FROM recipe_base WHERE recipe_name = ?;
+""")
+STATEMENTS.register("fetch_all_recipe_names", """
+    SELECT recipe_name FROM recipe_base;
+""")
+STATEMENTS.register("fetch_all_recipe_ids", """
+    SELECT recipe_id FROM recipe_base ORDER BY recipe_id;
+""")
+STATEMENTS.register("fetch_ingredient_ids_by_names", """
+    SELECT ingredient_name, ingredient_id FROM ingredient_base
+    WHERE ingredient_name IN ({in_list});
+""")
+STATEMENTS.register("fetch_existing_ingredient_ids", """
+    SELECT ingredient_id FROM ingredient_base WHERE ingredient_id IN ({in_list});
+""")
+STATEMENTS.register("fetch_recipe_ids_by_names", """
+    SELECT recipe_name, recipe_id FROM recipe_base WHERE recipe_name IN ({in_list});
+""")
+STATEMENTS.register("fetch_all_recipe_ingredient_quantities", """
+    SELECT recipe_id, ingredient_id, qty_value, qty_unit
+    FROM recipe_ingredients
+    ORDER BY recipe_id;
+""")
+STATEMENTS.register("fetch_all_recipe_ingredient_tolerance_rows", """
+    SELECT recipe_id, ingredient_id, qty_value, qty_unit, qty_tol_lower, qty_tol_upper
+    FROM recipe_ingredients
+    ORDER BY recipe_id;
+""")
+STATEMENTS.register("fetch_max_recipe_id", """
+    SELECT COALESCE(MAX(recipe_id), 0) FROM recipe_base;
+""")
+STATEMENTS.register("iter_recipe_base_rows", """
+    SELECT recipe_id, recipe_name, recipe_description, recipe_instructions
+    FROM recipe_base
+    ORDER BY recipe_id;
+""")
+STATEMENTS.register("iter_recipe_ingredient_rows", """
+    SELECT recipe_id, recipe_ingredients.ingredient_id, ingredient_name,
+        qty_unit, qty_value, qty_tol_upper, qty_tol_lower
+    FROM recipe_ingredients
+    JOIN ingredient_base ON recipe_ingredients.ingredient_id = ingredient_base.ingredient_id
+    ORDER BY recipe_id, recipe_ingredients.rowid;
+""")
+STATEMENTS.register("iter_recipe_serve_time_rows", """
+    SELECT recipe_id, serve_time_start, serve_time_end
+    FROM recipe_serve_times
+    ORDER BY recipe_id, serve_time_id;
+""")
+STATEMENTS.register("fetch_recipe_ids_using_ingredients", """
+    SELECT DISTINCT recipe_id FROM recipe_ingredients WHERE ingredient_id IN ({in_list});
+""")
+STATEMENTS.register("iter_recipe_tag_rows", """
+    SELECT recipe_id, recipe_tag_name
+    FROM recipe_tags
+    JOIN global_recipe_tags ON recipe_tags.recipe_tag_id = global_recipe_tags.recipe_tag_id
+    ORDER BY recipe_id, recipe_tags.rowid;
+""")
+STATEMENTS.register("fetch_recipe_description", """
+    SELECT recipe_description FROM recipe_base WHERE recipe_id = ?;
+""")
+STATEMENTS.register("fetch_recipe_instructions", """
+    SELECT recipe_instructions FROM recipe_base WHERE recipe_id = ?;
+""")
+STATEMENTS.register("fetch_recipe_ingredients", """
+    SELECT ingredient_id, qty_value, qty_unit, qty_tol_upper, qty_tol_lower
+    FROM recipe_ingredients
+    WHERE recipe_id = ?;
+""")
+STATEMENTS.register("fetch_recipe_serve_times", """
+    SELECT serve_time_start, serve_time_end FROM recipe_serve_times WHERE recipe_id = ?;
+""")
+STATEMENTS.register("fetch_all_recipe_serve_times", """
+    SELECT recipe_id, serve_time_start, serve_time_end FROM recipe_serve_times;
+""")
+STATEMENTS.register("fetch_all_global_recipe_tag_rows", """
+    SELECT recipe_tag_id, recipe_tag_name FROM global_recipe_tags ORDER BY recipe_tag_id;
+""")
+STATEMENTS.register("fetch_all_recipe_tag_ids", """
+    SELECT recipe_id, recipe_tag_id FROM recipe_tags;
+""")
+STATEMENTS.register("fetch_recipe_ids_by_serve_time", """
+    SELECT DISTINCT recipe_id FROM recipe_serve_time_index
+    WHERE segment_start <= ? AND segment_end >= ?;
+""")
+# One range of a nutrient range search; a search intersects one per range
+STATEMENTS.register("fetch_recipe_ids_by_nutrient_ranges.range", """
+    SELECT recipe_id FROM recipe_nutrient_totals
+    WHERE nutrient_name = ? AND quantity BETWEEN ? AND ?
+""")
+STATEMENTS.register("fetch_recipe_nutrient_totals", """
+    SELECT nutrient_name, quantity FROM recipe_nutrient_totals WHERE recipe_id = ?;
+""")
+STATEMENTS.register("iter_recipe_nutrient_total_rows", """
+    SELECT recipe_base.recipe_id, recipe_name, nutrient_name, quantity
+    FROM recipe_base
+    LEFT JOIN recipe_nutrient_totals ON recipe_nutrient_totals.recipe_id = recipe_base.recipe_id
+    ORDER BY recipe_base.recipe_id;
+""")
+STATEMENTS.register("fetch_recipe_nutrient_totals_version", """
+    SELECT version FROM recipe_nutrient_totals_state;
+""")
+STATEMENTS.register("fetch_change_version", """
+    SELECT database_id, version FROM change_version;
+""")
+STATEMENTS.register("fetch_changes_since", """
+    SELECT entity_type, entity_id, operation, version FROM change_log
+    WHERE version > ?
+    ORDER BY version;
+""")
+STATEMENTS.register("insert_global_flag", """
+    INSERT INTO global_flag_list (flag_name) VALUES (?);
+""")
+STATEMENTS.register("insert_global_leaf_nutrient", """
+    INSERT INTO global_leaf_nutrients (nutrient_name, parent_id) VALUES (?, ?);
+""")
+STATEMENTS.register("insert_global_group_nutrient", """
+    INSERT INTO global_group_nutrients (nutrient_name, parent_id) VALUES (?, ?);
+""")
+STATEMENTS.register("insert_nutrient_alias", """
+    INSERT INTO nutrient_aliases (nutrient_alias, primary_nutrient_id) VALUES (?, ?);
+""")
+STATEMENTS.register("insert_ingredient_name", """
+    INSERT INTO ingredient_base (ingredient_name) VALUES (?);
+""")
+STATEMENTS.register("insert_recipe_name", """
+    INSERT INTO recipe_base (recipe_name) VALUES (?);
+""")
+STATEMENTS.register("insert_global_recipe_tag", """
+    INSERT INTO global_recipe_tags (recipe_tag_name) VALUES (?);
+""")
+STATEMENTS.register("insert_recipe_base_rows", """
+    INSERT INTO recipe_base (recipe_id, recipe_name, recipe_description, recipe_instructions)
+    VALUES (?, ?, ?, ?);
+""")
+STATEMENTS.register("insert_recipe_ingredient_rows", """
+    INSERT INTO recipe_ingredients (recipe_id, ingredient_id, qty_value, qty_unit, qty_tol_upper, qty_tol_lower)
+    VALUES (?, ?, ?, ?, ?, ?);
+""")
+STATEMENTS.register("insert_recipe_serve_time_rows", """
+    INSERT INTO recipe_serve_times (recipe_id, serve_time_start, serve_time_end)
+    VALUES (?, ?, ?);
+""")
+# Each recipe nutrient total refresh step has a variant for every recipe,
+# and an IN list variant for chosen recipes
+for _suffix, _filter in (("", ""), (".in", "recipe_id IN ({in_list})")):
+    STATEMENTS.register(f"refresh_recipe_nutrient_totals.delete{_suffix}", f"""
+        DELETE FROM recipe_nutrient_totals{" WHERE " + _filter if _filter else ""};
+    """)
+    # Total each leaf nutrient in one grouped join
+    STATEMENTS.register(f"refresh_recipe_nutrient_totals.leaves{_suffix}", f"""
+        INSERT INTO recipe_nutrient_totals (recipe_id, nutrient_name, quantity)
+        SELECT rig.recipe_id, leaf.nutrient_name, SUM(rig.grams * d.grams_per_gram)
+        FROM recipe_ingredient_grams rig
+        JOIN ingredient_nutrient_densities d ON d.ingredient_id = rig.ingredient_id
+        JOIN global_leaf_nutrients leaf ON leaf.nutrient_id = d.nutrient_id
+        WHERE rig.grams IS NOT NULL {"AND rig." + _filter if _filter else ""}
+        GROUP BY rig.recipe_id, d.nutrient_id;
+    """)
+    # Roll the leaf totals up into their groups
+    STATEMENTS.register(f"refresh_recipe_nutrient_totals.groups{_suffix}", f"""
+        INSERT INTO recipe_nutrient_totals (recipe_id, nutrient_name, quantity)
+        SELECT t.recipe_id, groups.group_name, SUM(t.quantity)
+        FROM recipe_nutrient_totals t
+        JOIN global_leaf_nutrients leaf ON leaf.nutrient_name = t.nutrient_name
+        JOIN nutrient_group_leaves groups ON groups.leaf_id = leaf.nutrient_id
+        {"WHERE t." + _filter if _filter else ""}
+        GROUP BY t.recipe_id, groups.group_id;
+    """)
+    # Derive the energy from the totals
+    STATEMENTS.register(f"refresh_recipe_nutrient_totals.energy{_suffix}", f"""
+        INSERT INTO recipe_nutrient_totals (recipe_id, nutrient_name, quantity)
+        SELECT t.recipe_id, ?, SUM(t.quantity * f.kcal_per_gram)
+        FROM recipe_nutrient_totals t
+        JOIN nutrient_energy_factors f ON f.nutrient_name = t.nutrient_name
+        {"WHERE t." + _filter if _filter else ""}
+        GROUP BY t.recipe_id;
+    """)
+STATEMENTS.register("insert_recipe_tag_rows", """
+    INSERT INTO recipe_tags (recipe_id, recipe_tag_id) VALUES (?, ?);
+""")
+STATEMENTS.register("update_recipe_nutrient_totals_version", """
+    UPDATE recipe_nutrient_totals_state SET version = ?;
+""")
+STATEMENTS.register("update_ingredient_name", """
+    UPDATE ingredient_base
+    SET ingredient_name = ?
+    WHERE ingredient_id = ?;
+""")
+STATEMENTS.register("update_ingredient_description", """
+    UPDATE ingredient_base
+    SET ingredient_description = ?
+    WHERE ingredient_id = ?;
+""")
+STATEMENTS.register("update_ingredient_cost", """
+    UPDATE ingredient_base
+    SET cost_value = ?, cost_unit = ?, cost_qty_unit = ?, cost_qty_value = ?
+    WHERE ingredient_id = ?;
+""")
+STATEMENTS.register("update_ingredient_density", """
+    UPDATE ingredient_base
+    SET density_mass_unit = ?, density_mass_value = ?, density_vol_unit = ?, density_vol_value = ?
+    WHERE ingredient_id = ?;
+""")
+STATEMENTS.register("update_ingredient_pc_mass", """
+    UPDATE ingredient_base
+    SET pc_qty = ?, pc_mass_unit = ?, pc_mass_value = ?
+    WHERE ingredient_id = ?;
+""")
+STATEMENTS.register("update_ingredient_flags.delete", """
+    DELETE FROM ingredient_flags WHERE ingredient_id = ?;
+""")
+STATEMENTS.register("update_ingredient_flags.insert", """
+    INSERT INTO ingredient_flags (ingredient_id, flag_id, flag_value) VALUES (?, ?, ?);
+""")
+STATEMENTS.register("update_ingredient_gi", """
+    UPDATE ingredient_base
+    SET ingredient_gi = ?
+    WHERE ingredient_id = ?;
+""")
+STATEMENTS.register("update_ingredient_nutrient_quantity.select", """
+    SELECT nutrient_id FROM global_leaf_nutrients WHERE nutrient_name = ?;
+""")
+STATEMENTS.register("update_ingredient_nutrient_quantity.delete", """
+    DELETE FROM ingredient_nutrients WHERE ingredient_id = ? AND nutrient_id = ?;
+""")
+STATEMENTS.register("update_ingredient_nutrient_quantity.insert", """
+    INSERT INTO ingredient_nutrients (ingredient_id, nutrient_id, ntr_qty_unit, ntr_qty_value, ing_qty_unit, ing_qty_value)
+    VALUES (?, ?, ?, ?, ?, ?);
+""")
+STATEMENTS.register("update_recipe_name", """
+    UPDATE recipe_base
+    SET recipe_name = ?
+    WHERE recipe_id = ?;
+""")
+STATEMENTS.register("update_recipe_description", """
+    UPDATE recipe_base
+    SET recipe_description = ?
+    WHERE recipe_id = ?;
+""")
+STATEMENTS.register("update_recipe_instructions", """
+    UPDATE recipe_base
+    SET recipe_instructions = ?
+    WHERE recipe_id = ?;
+""")
+STATEMENTS.register("update_recipe_ingredients.delete", """
+    DELETE FROM recipe_ingredients WHERE recipe_id = ?;
+""")
+for _column in ["qty_value", "qty_unit", "qty_tol_upper", "qty_tol_lower"]:
+    STATEMENTS.register(f"update_recipe_ingredient_field.{_column}", f"""
+        UPDATE recipe_ingredients
+        SET {_column} = ?
+        WHERE recipe_id = ? AND ingredient_id = ?;
+    """)
+STATEMENTS.register("update_recipe_serve_times.delete", """
+    DELETE FROM recipe_serve_times WHERE recipe_id = ?;
+""")
+STATEMENTS.register("update_recipe_tags.delete", """
+    DELETE FROM recipe_tags WHERE recipe_id = ?;
+""")
+STATEMENTS.register("update_recipe_tags.select", """
+    SELECT recipe_tag_id FROM global_recipe_tags WHERE recipe_tag_name = ?;
+""")
+STATEMENTS.register("update_recipe_base_rows", """
+    UPDATE recipe_base
+    SET recipe_name = ?, recipe_description = ?, recipe_instructions = ?
+    WHERE recipe_id = ?;
+""")
+for _table in ["recipe_ingredients", "recipe_serve_times", "recipe_tags"]:
+    STATEMENTS.register(f"delete_recipe_associations.{_table}", f"""
+        DELETE FROM {_table} WHERE recipe_id IN ({{in_list}});
+    """)
+STATEMENTS.register("delete_ingredients_by_ids", """
+    DELETE FROM ingredient_base WHERE ingredient_id IN ({in_list});
+""")
+STATEMENTS.register("delete_recipes_by_ids", """
+    DELETE FROM recipe_base WHERE recipe_id IN ({in_list});
+""")
+STATEMENTS.register("delete_ingredient_by_name", """
+    DELETE FROM ingredient_base WHERE ingredient_name = ?;
+""")
+STATEMENTS.register("delete_recipe_by_name", """
+    DELETE FROM recipe_base WHERE recipe_name = ?;
+""")
@@ -18,3 +18,5 @@ RECIPE_DATA_DIR = os.path.join(os.path.dirname(__file__), "recipe_data")
 INGREDIENT_WISHLIST_FILEPATH = os.path.join(
     os.path.dirname(__file__), "ingredient_wishlist.json"
 )
+OPENAI_CACHE_FILEPATH = os.path.join(os.path.dirname(__file__), "openai_cache.db")
+INGREDIENT_STORE_FILEPATH = os.path.join(os.path.dirname(__file__), "ingredient_store.db")
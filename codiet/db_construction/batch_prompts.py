@@ -0,0 +1,152 @@
+"""Adaptive batching of nutrient population prompts.
+
+Asking for five nutrients of one ingredient per request takes a dozen
+sequential requests to fill one ingredient. The batch prompt planner
+instead packs the missing (ingredient, nutrient) entries of many
+ingredients into one structured JSON request. Each returned entry is
+checked on its own, so a partly good response keeps its good entries, and
+only the missing or invalid ones are queued again. The batch size grows
+while responses come back complete, and shrinks as soon as the model
+starts leaving entries out.
+"""
+
+import json
+from collections import deque
+from json.decoder import JSONDecodeError
+from typing import Callable, Iterator
+
+from codiet.db_construction import openai
+
+# The nutrient entry format, described once per prompt
+NUTRIENT_ENTRY_FORMAT = """{
+    "ntr_qty_value": null,  # quantity of the nutrient
+    "ntr_qty_unit": "g",  # units used to measure nutrient quantity, must be a mass, can be [g, mg, ug]
+    "ing_qty_value": null,  # quantity of the ingredient
+    "ing_qty_unit": "g",  # units used to measure ingredient quantity, can be mass or vol [g, kg, ml, l]
+}"""
+DEFAULT_BATCH_SIZE = 20
+MIN_BATCH_SIZE = 1
+MAX_BATCH_SIZE = 240
+# The share of entries a response must fill for the batch size to grow
+TARGET_COMPLETENESS = 0.95
+BATCH_GROWTH = 1.5
+# The number of times an entry is asked for before it is given up on
+MAX_ENTRY_ATTEMPTS = 5
+
+
+def build_nutrient_prompt(batch: list[tuple[str, str]]) -> str:
+    """Returns the prompt asking for a batch of (ingredient, nutrient) entries."""
+    requested: dict[str, list[str]] = {}
+    for ingredient_name, nutrient_name in batch:
+        requested.setdefault(ingredient_name, []).append(nutrient_name)
+    return f"""For each ingredient below, populate the listed nutrients: {json.dumps(requested)}
+        Reply with JSON only, as {{ingredient name: {{nutrient name: entry}}}}, where each entry is: {NUTRIENT_ENTRY_FORMAT}
+        Provide a guess if unsure. Please use 0 to represent a zero quantity."""
+
+
+def parse_nutrient_batch(
+    batch: list[tuple[str, str]], response: str
+) -> tuple[dict[tuple[str, str], dict], list[tuple[str, str]]]:
+    """Checks each requested entry of a batch response individually.
+
+    Returns:
+        A tuple of the valid entries keyed by (ingredient, nutrient), and the
+        requested entries which were missing or invalid.
+    """
+    try:
+        response_dict = json.loads(response)
+        if not isinstance(response_dict, dict):
+            raise ValueError
+    except (JSONDecodeError, ValueError):
+        return {}, list(batch)
+    valid = {}
+    rejected = []
+    for ingredient_name, nutrient_name in batch:
+        try:
+            valid[(ingredient_name, nutrient_name)] = openai.parse_nutrient_data(
+                response_dict[ingredient_name][nutrient_name]
+            )
+        except (KeyError, ValueError, TypeError):
+            rejected.append((ingredient_name, nutrient_name))
+    return valid, rejected
+
+
+class BatchPromptPlanner:
+    """Fills (ingredient, nutrient) entries with adaptively sized batch prompts."""
+
+    def __init__(
+        self,
+        complete: Callable[[str, int], str] | None = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        min_batch_size: int = MIN_BATCH_SIZE,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_entry_attempts: int = MAX_ENTRY_ATTEMPTS,
+    ):
+        # The completion function takes the prompt and the attempt number,
+        # and defaults to the cached OpenAI completion
+        self.complete = complete if complete is not None else openai.complete_prompt
+        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.max_entry_attempts = max_entry_attempts
+        # Running totals, for reporting
+        self.num_requests = 0
+        self.num_entries_requested = 0
+        self.num_entries_filled = 0
+        self.batch_sizes: list[int] = []
+        self.failed: list[tuple[str, str]] = []
+
+    def adapt_batch_size(self, completeness: float) -> None:
+        """Grows the batch size after a complete response, and shrinks it in
+        proportion to how much of an incomplete response was missing."""
+        if completeness >= TARGET_COMPLETENESS:
+            new_size = int(self.batch_size * BATCH_GROWTH) + 1
+        else:
+            new_size = int(self.batch_size * completeness)
+        self.batch_size = max(self.min_batch_size, min(self.max_batch_size, new_size))
+
+    def run(self, missing: dict[str, list[str]]) -> Iterator[dict[str, dict[str, dict]]]:
+        """Fills the missing nutrients, given as lists of nutrient names keyed
+        by ingredient name. Yields the entries filled by each request, as
+        {ingredient name: {nutrient name: nutrient data}} dicts, so they can
+        be saved as they arrive. Entries still invalid after the maximum
+        number of attempts are given up on and listed in failed."""
+        # Queue the entries ingredient by ingredient, so batches share ingredients
+        queue = deque(
+            (ingredient_name, nutrient_name)
+            for ingredient_name, nutrient_names in missing.items()
+            for nutrient_name in nutrient_names
+        )
+        entry_attempts: dict[tuple[str, str], int] = {}
+        prompt_attempts: dict[str, int] = {}
+        while queue:
+            batch = [queue.popleft() for _ in range(min(self.batch_size, len(queue)))]
+            prompt = build_nutrient_prompt(batch)
+            # Asking the same prompt again is a new attempt, so isn't answered from the cache
+            attempt = prompt_attempts.get(prompt, 0)
+            prompt_attempts[prompt] = attempt + 1
+            valid, rejected = parse_nutrient_batch(batch, self.complete(prompt, attempt))
+            # Queue the rejected entries again, unless they have run out of attempts
+            for entry in rejected:
+                entry_attempts[entry] = entry_attempts.get(entry, 0) + 1
+                if entry_attempts[entry] < self.max_entry_attempts:
+                    queue.append(entry)
+                else:
+                    self.failed.append(entry)
+            self.num_requests += 1
+            self.num_entries_requested += len(batch)
+            self.num_entries_filled += len(valid)
+            self.batch_sizes.append(len(batch))
+            self.adapt_batch_size(len(valid) / len(batch))
+            filled: dict[str, dict[str, dict]] = {}
+            for (ingredient_name, nutrient_name), nutrient_data in valid.items():
+                filled.setdefault(ingredient_name, {})[nutrient_name] = nutrient_data
+            yield filled
+
+    def format_stats(self) -> str:
+        """Returns a one line summary of the run."""
+        return (
+            f"Batch prompts: {self.num_requests} requests filled {self.num_entries_filled} "
+            f"of {self.num_entries_requested} requested entries, "
+            f"final batch size {self.batch_size}, {len(self.failed)} entries given up on."
+        )
@@ -1,9 +1,11 @@
 """Consctruction script to create the database schema."""
 
 import sqlite3
-from codiet.db import DB_PATH
+from codiet.db import DB_PATH, SCHEMA_VERSION
+from codiet.utils.units import MASS_UNITS, VOLUME_UNITS, PIECE_UNITS
+from codiet.utils.nutrients import ENERGY_COEFFICIENTS
 
-def create_schema() -> None:
+def create_schema(db_path: str = DB_PATH) -> None:
     """
     This module contains a script for creating the database schema.
 
@@ -12,10 +14,24 @@ def create_schema() -> None:
         hence it has been moved to a separate script.
     """
     # Connect to the database
-    connection = sqlite3.connect(DB_PATH)
+    connection = sqlite3.connect(db_path)
+    connection.execute("PRAGMA foreign_keys = ON")
     # Grab the cursor
     cursor = connection.cursor()
     # Create the tables
+    create_tables(cursor)
+    # Log changes to the tables
+    create_change_log(cursor)
+    # Stamp the schema version, which Database checks on opening
+    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    # Commit the changes
+    connection.commit()
+    # Close the connection
+    connection.close()
+
+def create_tables(cursor:sqlite3.Cursor) -> None:
+    """Create every table, index, view and trigger not already in the
+    database, other than the change log."""
     create_global_flag_table(cursor)
     create_global_leaf_nutrient_table(cursor)
     create_global_group_nutrient_table(cursor)
@@ -23,15 +39,15 @@ def create_schema() -> None:
     create_ingredient_base_table(cursor)
     create_ingredient_flag_table(cursor)
     create_ingredient_nutrient_table(cursor)
+    create_unit_conversion_table(cursor)
+    create_ingredient_nutrient_density_table(cursor)
     create_recipe_base_table(cursor)
     create_recipe_ingredient_table(cursor)
     create_recipe_serve_times_table(cursor)
+    create_recipe_serve_time_index(cursor)
     create_global_recipe_tags_table(cursor)
     create_recipe_tags_table(cursor)
-    # Commit the changes
-    connection.commit()
-    # Close the connection
-    connection.close()
+    create_recipe_nutrient_totals_table(cursor)
 
 def create_global_flag_table(cursor:sqlite3.Cursor) -> None:
     """Create the global flag table in the database."""
@@ -68,8 +84,7 @@ def create_nutrient_alias_table(cursor:sqlite3.Cursor) -> None:
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS nutrient_aliases (
             nutrient_alias TEXT NOT NULL UNIQUE,
-            primary_nutrient_id INTEGER NOT NULL,
-            FOREIGN KEY (primary_nutrient_id) REFERENCES nutrient_list(nutrient_id)
+            primary_nutrient_id INTEGER NOT NULL
         )
     """)
 
@@ -102,10 +117,17 @@ def create_ingredient_flag_table(cursor:sqlite3.Cursor) -> None:
             ingredient_id INTEGER,
             flag_id INTEGER,
             flag_value BOOLEAN,
-            FOREIGN KEY (ingredient_id) REFERENCES ingredient_base(ingredient_id),
-            FOREIGN KEY (flag_id) REFERENCES flag_list(flag_id)
+            FOREIGN KEY (ingredient_id) REFERENCES ingredient_base(ingredient_id) ON DELETE CASCADE,
+            FOREIGN KEY (flag_id) REFERENCES global_flag_list(flag_id) ON DELETE CASCADE
         )
     """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS ingredient_flags_ingredient ON ingredient_flags (ingredient_id)
+    """)
+    # Index the flag key too, so deleting a flag doesn't scan every ingredient's flags
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS ingredient_flags_flag ON ingredient_flags (flag_id)
+    """)
 
 def create_ingredient_nutrient_table(cursor:sqlite3.Cursor) -> None:
     """Create the table to associate nutrient quantities with recipes."""
@@ -117,10 +139,139 @@ def create_ingredient_nutrient_table(cursor:sqlite3.Cursor) -> None:
             ntr_qty_value REAL,
             ing_qty_unit TEXT,
             ing_qty_value REAL,
-            FOREIGN KEY (ingredient_id) REFERENCES ingredient_base(ingredient_id),
-            FOREIGN KEY (nutrient_id) REFERENCES nutrient_list(nutrient_id)
+            FOREIGN KEY (ingredient_id) REFERENCES ingredient_base(ingredient_id) ON DELETE CASCADE,
+            FOREIGN KEY (nutrient_id) REFERENCES global_leaf_nutrients(nutrient_id) ON DELETE CASCADE
         )
     """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS ingredient_nutrients_ingredient
+        ON ingredient_nutrients (ingredient_id, nutrient_id)
+    """)
+    # Index the nutrient key too, so deleting a nutrient doesn't scan the table
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS ingredient_nutrients_nutrient ON ingredient_nutrients (nutrient_id)
+    """)
+
+def create_unit_conversion_table(cursor:sqlite3.Cursor) -> None:
+    """Create the table of unit conversion factors, so that SQL can convert
+    quantities in the same way as codiet.utils.units. Mass units are in grams,
+    volume units in millilitres, and piece units count pieces."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS unit_conversions (
+            unit TEXT PRIMARY KEY,
+            unit_kind TEXT NOT NULL,
+            factor REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+    rows = [(unit, "mass", factor) for unit, factor in MASS_UNITS.items()]
+    rows += [(unit, "volume", factor) for unit, factor in VOLUME_UNITS.items()]
+    rows += [(unit, "piece", 1.0) for unit in PIECE_UNITS]
+    cursor.executemany("""
+        INSERT OR REPLACE INTO unit_conversions (unit, unit_kind, factor) VALUES (?, ?, ?)
+    """, rows)
+
+def _grams_per_unit_sql(unit:str) -> str:
+    """Returns the SQL expression for the grams in one of a unit, measuring the
+    ingredient b. Needs the joins from _ingredient_unit_joins. Division by zero
+    gives NULL, so bad densities and piece masses drop out."""
+    return f"""CASE {unit}.unit_kind
+            WHEN 'mass' THEN {unit}.factor
+            WHEN 'volume' THEN {unit}.factor * (b.density_mass_value * dm.factor)
+                / (b.density_vol_value * dv.factor)
+            WHEN 'piece' THEN b.pc_mass_value * pm.factor / b.pc_qty
+        END"""
+
+def _ingredient_unit_joins(ingredient_id:str) -> str:
+    """Returns the joins onto the ingredient b which _grams_per_unit_sql needs."""
+    return f"""JOIN ingredient_base b ON b.ingredient_id = {ingredient_id}
+        LEFT JOIN unit_conversions dm ON dm.unit = b.density_mass_unit AND dm.unit_kind = 'mass'
+        LEFT JOIN unit_conversions dv ON dv.unit = b.density_vol_unit AND dv.unit_kind = 'volume'
+        LEFT JOIN unit_conversions pm ON pm.unit = b.pc_mass_unit AND pm.unit_kind = 'mass'"""
+
+def _nutrient_density_sql(row:str) -> str:
+    """Returns the SQL expression converting an ingredient_nutrients row to
+    grams per gram. Needs the joins from _nutrient_density_joins."""
+    return f"""(({row}.ntr_qty_value * nu.factor)
+        / ({row}.ing_qty_value * {_grams_per_unit_sql("iu")}))"""
+
+def _nutrient_density_joins(row:str) -> str:
+    """Returns the joins needed by the nutrient density expression."""
+    return f"""{_ingredient_unit_joins(f"{row}.ingredient_id")}
+        JOIN unit_conversions nu ON nu.unit = {row}.ntr_qty_unit AND nu.unit_kind = 'mass'
+        JOIN unit_conversions iu ON iu.unit = {row}.ing_qty_unit"""
+
+def create_ingredient_nutrient_density_table(cursor:sqlite3.Cursor) -> None:
+    """Create the materialised table of grams of each leaf nutrient per gram
+    of ingredient. The view converts the stored nutrient ratios, and triggers
+    keep the table in step with ingredient_nutrients and the ingredient's
+    density and piece mass. Ratios which can't be converted, such as a volume
+    for an ingredient with no density, are left out.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ingredient_nutrient_densities (
+            ingredient_id INTEGER NOT NULL,
+            nutrient_id INTEGER NOT NULL,
+            grams_per_gram REAL NOT NULL,
+            PRIMARY KEY (ingredient_id, nutrient_id),
+            FOREIGN KEY (ingredient_id) REFERENCES ingredient_base(ingredient_id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS ingredient_nutrient_densities_value
+        ON ingredient_nutrient_densities (nutrient_id, grams_per_gram)
+    """)
+    cursor.execute(f"""
+        CREATE VIEW IF NOT EXISTS ingredient_nutrient_density_source AS
+        SELECT n.ingredient_id, n.nutrient_id, {_nutrient_density_sql("n")} AS grams_per_gram
+        FROM ingredient_nutrients n
+        {_nutrient_density_joins("n")}
+    """)
+    # Recompute one ingredient nutrient straight from the new row
+    refresh_nutrient = f"""
+        INSERT OR REPLACE INTO ingredient_nutrient_densities (ingredient_id, nutrient_id, grams_per_gram)
+        SELECT NEW.ingredient_id, NEW.nutrient_id, {_nutrient_density_sql("NEW")}
+        FROM (SELECT 1)
+        {_nutrient_density_joins("NEW")}
+        WHERE {_nutrient_density_sql("NEW")} IS NOT NULL;
+    """
+    delete_nutrient = """
+        DELETE FROM ingredient_nutrient_densities
+        WHERE ingredient_id = OLD.ingredient_id AND nutrient_id = OLD.nutrient_id;
+    """
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS ingredient_nutrients_density_insert
+        AFTER INSERT ON ingredient_nutrients
+        BEGIN
+            {refresh_nutrient}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS ingredient_nutrients_density_update
+        AFTER UPDATE ON ingredient_nutrients
+        BEGIN
+            {delete_nutrient}
+            {refresh_nutrient}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS ingredient_nutrients_density_delete
+        AFTER DELETE ON ingredient_nutrients
+        BEGIN
+            {delete_nutrient}
+        END
+    """)
+    # A new density or piece mass changes how volumes and pieces convert
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS ingredient_base_density_update
+        AFTER UPDATE OF density_mass_unit, density_mass_value, density_vol_unit,
+            density_vol_value, pc_qty, pc_mass_unit, pc_mass_value ON ingredient_base
+        BEGIN
+            DELETE FROM ingredient_nutrient_densities WHERE ingredient_id = NEW.ingredient_id;
+            INSERT OR REPLACE INTO ingredient_nutrient_densities (ingredient_id, nutrient_id, grams_per_gram)
+            SELECT ingredient_id, nutrient_id, grams_per_gram FROM ingredient_nutrient_density_source
+            WHERE ingredient_id = NEW.ingredient_id AND grams_per_gram IS NOT NULL;
+        END
+    """)
 
 def create_recipe_base_table(cursor:sqlite3.Cursor) -> None:
     """Create the recipe base table in the database."""
@@ -143,20 +294,91 @@ def create_recipe_ingredient_table(cursor:sqlite3.Cursor) -> None:
             qty_value REAL,
             qty_tol_upper REAL,
             qty_tol_lower REAL,
-            FOREIGN KEY (recipe_id) REFERENCES recipe_base(id),
-            FOREIGN KEY (ingredient_id) REFERENCES ingredient_base(ingredient_id)
+            FOREIGN KEY (recipe_id) REFERENCES recipe_base(recipe_id) ON DELETE CASCADE,
+            FOREIGN KEY (ingredient_id) REFERENCES ingredient_base(ingredient_id) ON DELETE CASCADE
         )
     """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS recipe_ingredients_recipe ON recipe_ingredients (recipe_id)
+    """)
+    # The reverse index, from each ingredient to the recipes using it
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS recipe_ingredients_ingredient
+        ON recipe_ingredients (ingredient_id, recipe_id)
+    """)
 
 def create_recipe_serve_times_table(cursor:sqlite3.Cursor) -> None:
-    """Create the table to associate serve times with recipes."""
+    """Create the table to associate serve times with recipes.
+    Serve times are stored as inclusive start and end minutes past midnight.
+    A window whose end is earlier than its start wraps past midnight.
+    """
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS recipe_serve_times (
+            serve_time_id INTEGER PRIMARY KEY,
             recipe_id INTEGER,
-            serve_time_window TEXT,
-            FOREIGN KEY (recipe_id) REFERENCES recipe_base(id)
+            serve_time_start INTEGER NOT NULL,
+            serve_time_end INTEGER NOT NULL,
+            FOREIGN KEY (recipe_id) REFERENCES recipe_base(recipe_id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS recipe_serve_times_recipe ON recipe_serve_times (recipe_id)
+    """)
+
+def create_recipe_serve_time_index(cursor:sqlite3.Cursor) -> None:
+    """Create the R*Tree interval index over the recipe serve times.
+    Each serve time is stored as one or two non-wrapping segments, so that
+    finding the recipes servable at a given minute is a single index lookup.
+    The index is kept in step with recipe_serve_times by triggers.
+    """
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS recipe_serve_time_index USING rtree(
+            segment_id,
+            segment_start,
+            segment_end,
+            +recipe_id
         )
     """)
+    # Segment ids are derived from the serve time id, the second
+    # segment only exists for windows which wrap past midnight
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS recipe_serve_times_after_insert
+        AFTER INSERT ON recipe_serve_times
+        BEGIN
+            INSERT INTO recipe_serve_time_index (segment_id, segment_start, segment_end, recipe_id)
+            SELECT NEW.serve_time_id * 2, NEW.serve_time_start,
+                CASE WHEN NEW.serve_time_end >= NEW.serve_time_start
+                    THEN NEW.serve_time_end ELSE 1439 END,
+                NEW.recipe_id;
+            INSERT INTO recipe_serve_time_index (segment_id, segment_start, segment_end, recipe_id)
+            SELECT NEW.serve_time_id * 2 + 1, 0, NEW.serve_time_end, NEW.recipe_id
+            WHERE NEW.serve_time_end < NEW.serve_time_start;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS recipe_serve_times_after_delete
+        AFTER DELETE ON recipe_serve_times
+        BEGIN
+            DELETE FROM recipe_serve_time_index
+            WHERE segment_id IN (OLD.serve_time_id * 2, OLD.serve_time_id * 2 + 1);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS recipe_serve_times_after_update
+        AFTER UPDATE ON recipe_serve_times
+        BEGIN
+            DELETE FROM recipe_serve_time_index
+            WHERE segment_id IN (OLD.serve_time_id * 2, OLD.serve_time_id * 2 + 1);
+            INSERT INTO recipe_serve_time_index (segment_id, segment_start, segment_end, recipe_id)
+            SELECT NEW.serve_time_id * 2, NEW.serve_time_start,
+                CASE WHEN NEW.serve_time_end >= NEW.serve_time_start
+                    THEN NEW.serve_time_end ELSE 1439 END,
+                NEW.recipe_id;
+            INSERT INTO recipe_serve_time_index (segment_id, segment_start, segment_end, recipe_id)
+            SELECT NEW.serve_time_id * 2 + 1, 0, NEW.serve_time_end, NEW.recipe_id
+            WHERE NEW.serve_time_end < NEW.serve_time_start;
+        END
+    """)
 
 def create_global_recipe_tags_table(cursor:sqlite3.Cursor) -> None:
     """Create the table for all global recipe tags."""
@@ -173,7 +395,147 @@ def create_recipe_tags_table(cursor:sqlite3.Cursor) -> None:
         CREATE TABLE IF NOT EXISTS recipe_tags (
             recipe_id INTEGER,
             recipe_tag_id INTEGER,
-            FOREIGN KEY (recipe_id) REFERENCES recipe_base(id),
-            FOREIGN KEY (recipe_tag_id) REFERENCES global_recipe_tags(recipe_tag_id)
+            FOREIGN KEY (recipe_id) REFERENCES recipe_base(recipe_id) ON DELETE CASCADE,
+            FOREIGN KEY (recipe_tag_id) REFERENCES global_recipe_tags(recipe_tag_id) ON DELETE CASCADE
         )
-    """)
\ No newline at end of file
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS recipe_tags_recipe ON recipe_tags (recipe_id)
+    """)
+    # Index the tag key too, so deleting a tag doesn't scan every recipe's tags
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS recipe_tags_tag ON recipe_tags (recipe_tag_id)
+    """)
+
+def create_recipe_nutrient_totals_table(cursor:sqlite3.Cursor) -> None:
+    """Create the cached table of each recipe's total nutrients.
+    Totals are in grams for every leaf and group nutrient, and in kcal for
+    energy, and are indexed by (nutrient_name, quantity) for range searches.
+    The table is a cache, rebuilt by Repository.refresh_recipe_nutrient_totals,
+    and the state table records the change log version it was refreshed at.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS recipe_nutrient_totals (
+            recipe_id INTEGER NOT NULL,
+            nutrient_name TEXT NOT NULL,
+            quantity REAL NOT NULL,
+            PRIMARY KEY (recipe_id, nutrient_name),
+            FOREIGN KEY (recipe_id) REFERENCES recipe_base(recipe_id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS recipe_nutrient_totals_quantity
+        ON recipe_nutrient_totals (nutrient_name, quantity)
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS recipe_nutrient_totals_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER
+        )
+    """)
+    cursor.execute("""
+        INSERT OR IGNORE INTO recipe_nutrient_totals_state (id, version) VALUES (1, NULL)
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS nutrient_energy_factors (
+            nutrient_name TEXT PRIMARY KEY,
+            kcal_per_gram REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+    cursor.executemany("""
+        INSERT OR REPLACE INTO nutrient_energy_factors (nutrient_name, kcal_per_gram) VALUES (?, ?)
+    """, list(ENERGY_COEFFICIENTS.items()))
+    # The grams of each ingredient in each recipe, where they can be converted
+    cursor.execute(f"""
+        CREATE VIEW IF NOT EXISTS recipe_ingredient_grams AS
+        SELECT ri.recipe_id, ri.ingredient_id, ri.qty_value * {_grams_per_unit_sql("u")} AS grams
+        FROM recipe_ingredients ri
+        {_ingredient_unit_joins("ri.ingredient_id")}
+        JOIN unit_conversions u ON u.unit = ri.qty_unit
+    """)
+    # Every group each leaf nutrient belongs to, directly or through other groups
+    cursor.execute("""
+        CREATE VIEW IF NOT EXISTS nutrient_group_leaves AS
+        WITH RECURSIVE ancestry(leaf_id, group_id) AS (
+            SELECT nutrient_id, parent_id FROM global_leaf_nutrients
+            WHERE parent_id IS NOT NULL
+            UNION
+            SELECT ancestry.leaf_id, parent.parent_id FROM ancestry
+            JOIN global_group_nutrients parent ON parent.nutrient_id = ancestry.group_id
+            WHERE parent.parent_id IS NOT NULL
+        )
+        SELECT ancestry.leaf_id, ancestry.group_id, groups.nutrient_name AS group_name
+        FROM ancestry
+        JOIN global_group_nutrients groups ON groups.nutrient_id = ancestry.group_id
+    """)
+
+# The tables recorded in the change log. Each entry is the table, the column
+# holding the ID of the entity it belongs to, the entity type, and whether it
+# is the entity's base table (only base table deletes delete the entity).
+CHANGE_LOGGED_TABLES = [
+    ("ingredient_base", "ingredient_id", "ingredient", True),
+    ("ingredient_flags", "ingredient_id", "ingredient", False),
+    ("ingredient_nutrients", "ingredient_id", "ingredient", False),
+    ("recipe_base", "recipe_id", "recipe", True),
+    ("recipe_ingredients", "recipe_id", "recipe", False),
+    ("recipe_serve_times", "recipe_id", "recipe", False),
+    ("recipe_tags", "recipe_id", "recipe", False),
+    ("global_flag_list", "flag_id", "flag", True),
+    ("global_leaf_nutrients", "nutrient_id", "leaf_nutrient", True),
+    ("global_group_nutrients", "nutrient_id", "group_nutrient", True),
+    ("nutrient_aliases", "primary_nutrient_id", "nutrient_alias", False),
+    ("global_recipe_tags", "recipe_tag_id", "recipe_tag", True),
+]
+
+def create_change_log(cursor:sqlite3.Cursor) -> None:
+    """Create the change log and the triggers which maintain it.
+    Every insert, update or delete on a logged table bumps the database
+    version, and records the version against the entity it changed. The log
+    holds one row per entity, so it stays compact, and a cache holding data
+    from version N can find exactly what changed with a single indexed query.
+    """
+    # The current version, and a random ID which distinguishes
+    # this database from any rebuild of it
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS change_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            database_id TEXT NOT NULL,
+            version INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        INSERT OR IGNORE INTO change_version (id, database_id, version)
+        VALUES (1, lower(hex(randomblob(16))), 0)
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            entity_type TEXT NOT NULL,
+            entity_id INTEGER NOT NULL,
+            operation TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            PRIMARY KEY (entity_type, entity_id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS change_log_version ON change_log (version)
+    """)
+    for table, id_column, entity_type, is_base_table in CHANGE_LOGGED_TABLES:
+        for event, row in [("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")]:
+            # Changes to an entity's associations are updates to the entity,
+            # but don't mask the entity's deletion when its associations go after it
+            operation = event[0] if is_base_table else "U"
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_log_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE change_version SET version = version + 1;
+                    INSERT INTO change_log (entity_type, entity_id, operation, version)
+                    VALUES ('{entity_type}', {row}.{id_column}, '{operation}',
+                        (SELECT version FROM change_version))
+                    ON CONFLICT (entity_type, entity_id) DO UPDATE
+                    SET operation = CASE
+                        WHEN change_log.operation = 'D' AND excluded.operation = 'U' THEN 'D'
+                        ELSE excluded.operation
+                    END, version = excluded.version;
+                END
+            """)
@@ -5,6 +5,13 @@ import os, json
 from typing import Callable
 
 from codiet.db_construction import openai
+from codiet.db_construction.batch_prompts import BatchPromptPlanner
+from codiet.db_construction.ingredient_store import (
+    IngredientStore,
+    get_ingredient_datafile_name,
+    using_ingredient_store,
+)
+from codiet.db_construction.response_cache import get_response_cache
 
 from codiet.db_construction import (
     GLOBAL_FLAG_DATA_FILEPATH,
@@ -23,7 +30,12 @@ _cached_nutrient_data_template: dict | None = None
 _cached_leaf_nutrient_names: list[str] | None = None
 
 def apply_to_each_ingredient_datafile(callback: Callable[[dict], None]) -> None:
-    """Loads each ingredient datafile, runs the callback, and writes the data back."""
+    """Loads each ingredient datafile, runs the callback, and writes the data back.
+    If the ingredients are kept in the store, only the changed records are written."""
+    if using_ingredient_store():
+        with IngredientStore() as store:
+            store.update_each(callback)
+        return
     # For each ingredient file in the directory
     for ingredient_filename in os.listdir(INGREDIENT_DATA_DIR):
         # Build its filepath
@@ -145,8 +157,12 @@ def remove_redundant_nutrients_from_ingredient_datafile(ingredient_data: dict) -
             print(f"Deleting nutrient {ingredient_nutrient_name} from {ingredient_data["name"]}")
             del ingredient_data["nutrients"][ingredient_nutrient_name]
 
-def ingredient_datafile_exists(ingredient_datafile_name: str) -> bool:
-    """Check if an ingredient datafile exists."""
+def ingredient_datafile_exists(ingredient_datafile_name: str, ingredient_name: str | None = None) -> bool:
+    """Check if an ingredient datafile exists. If the ingredients are kept in
+    the store, checks for the named ingredient there instead."""
+    if using_ingredient_store() and ingredient_name is not None:
+        with IngredientStore() as store:
+            return ingredient_name in store
     return os.path.isfile(os.path.join(INGREDIENT_DATA_DIR, ingredient_datafile_name))
 
 def remove_ingredient_from_wishlist(ingredient_name: str):
@@ -166,8 +182,13 @@ def insert_new_ingredient_datafile_from_template(ingredient_name: str):
     ingredient_template = get_ingredient_template()
     # Update the name of the ingredient in the template
     ingredient_template["name"] = ingredient_name
+    # Add it to the store, if the ingredients are kept there
+    if using_ingredient_store():
+        with IngredientStore() as store:
+            store.put(ingredient_template)
+        return
     # Create the ingredient file name from the ingredient name
-    ingredient_datafile_name = ingredient_name.replace(" ", "_").lower() + ".json"
+    ingredient_datafile_name = get_ingredient_datafile_name(ingredient_name)
     # Write the template to the new ingredient file
     with open(os.path.join(INGREDIENT_DATA_DIR, ingredient_datafile_name), "w") as f:
         json.dump(ingredient_template, f, indent=4)
@@ -180,9 +201,9 @@ def init_ingredient_datafiles():
     # For each ingredient in the wishlist
     for ingredient_name in ingredient_wishlist:
         # Create the ingredient file name from the ingredient name
-        ingredient_datafile_name = ingredient_name.replace(" ", "_").lower() + ".json"
+        ingredient_datafile_name = get_ingredient_datafile_name(ingredient_name)
         # If the file already exists, skip it
-        if ingredient_datafile_exists(ingredient_datafile_name):
+        if ingredient_datafile_exists(ingredient_datafile_name, ingredient_name):
             # Update the console
             print(f"Skipping {ingredient_name} as it already exists.")
             # Remove the ingredient from the wishlist
@@ -215,8 +236,10 @@ def populate_ingredient_datafiles():
     for_all_ingredients(populate_ingredient_datafile_cost)
     for_all_ingredients(populate_ingredient_datafile_flags)
     for_all_ingredients(populate_ingredient_datafile_gi)
-    for_all_ingredients(populate_ingredient_datafile_nutrients)
+    populate_all_ingredient_datafile_nutrients()
     for_all_ingredients(populate_ingredient_datafile_density)
+    # Report how many of the responses came from the cache
+    print(get_response_cache().format_stats())
 
 
 def populate_ingredient_datafile_description(ingredient_data: dict) -> None:
@@ -282,22 +305,56 @@ def populate_ingredient_datafile_nutrients(ingredient_data: dict) -> None:
     )
     # If we found some nutrients to populate
     if len(nutrients_to_populate) > 0:
-        # Split this list into chunks not longer than 5 items
-        # or GPT seems to get lazy and not return all the data.
-        chunk_length = 5
-        nutrients_chunks = [
-            nutrients_to_populate[i : i + chunk_length]
-            for i in range(0, len(nutrients_to_populate), chunk_length)
-        ]
-        # Cycle through each chunk and populate the nutrient data
-        for chunk in nutrients_chunks:
-            # Use the openai API to get the nutrient data
-            nutrient_data = openai.get_openai_ingredient_nutrients(
-                ingredient_name, chunk
-            )
-            # Add the nutrient_data into the data["nutrients"] dict
-            ingredient_data["nutrients"].update(nutrient_data)
-    # Now update some special nutrient cases based on the flags
+        # Ask for them in adaptively sized batches
+        planner = BatchPromptPlanner()
+        for filled in planner.run({ingredient_name: nutrients_to_populate}):
+            # Add the nutrient data into the data["nutrients"] dict
+            ingredient_data["nutrients"].update(filled.get(ingredient_name, {}))
+    _apply_nutrient_flag_rules(ingredient_data)
+
+def populate_all_ingredient_datafile_nutrients() -> None:
+    """Populate the nutrient data of every ingredient datafile at once.
+    The missing nutrients of all the ingredients are packed into shared batch
+    prompts, and each datafile is written back as soon as its data arrives."""
+    # Load every datafile, with the path it came from, if any
+    if using_ingredient_store():
+        with IngredientStore() as store:
+            datafiles = {data["name"]: (None, data) for data in store.iter_records()}
+    else:
+        datafiles = {}
+        for ingredient_filename in os.listdir(INGREDIENT_DATA_DIR):
+            ingredient_filepath = os.path.join(INGREDIENT_DATA_DIR, ingredient_filename)
+            with open(ingredient_filepath) as file:
+                ingredient_data = json.load(file)
+            datafiles[ingredient_data["name"]] = (ingredient_filepath, ingredient_data)
+    # Find the missing nutrients of each
+    missing = {}
+    for ingredient_name, (_, ingredient_data) in datafiles.items():
+        nutrients_to_populate = get_missing_leaf_nutrient_names(
+            nutrient_names=ingredient_data["nutrients"].keys(),
+            global_leaf_nutrient_names=get_leaf_nutrient_names(),
+        )
+        if len(nutrients_to_populate) > 0:
+            missing[ingredient_name] = nutrients_to_populate
+    # Fill them in batches, writing back the datafiles each batch touched
+    planner = BatchPromptPlanner()
+    for filled in planner.run(missing):
+        for ingredient_name, nutrient_data in filled.items():
+            datafiles[ingredient_name][1]["nutrients"].update(nutrient_data)
+        if using_ingredient_store():
+            with IngredientStore() as store:
+                store.put_many(datafiles[ingredient_name][1] for ingredient_name in filled)
+            continue
+        for ingredient_name in filled:
+            ingredient_filepath, ingredient_data = datafiles[ingredient_name]
+            with open(ingredient_filepath, "w") as file:
+                json.dump(ingredient_data, file, indent=4)
+    print(planner.format_stats())
+    # Apply the flag rules to every datafile
+    for_all_ingredients(_apply_nutrient_flag_rules)
+
+def _apply_nutrient_flag_rules(ingredient_data: dict) -> None:
+    """Update some special nutrient cases based on the flags."""
     # If the alcohol free flag is present, set the alcohol nutrient to 0
     if "alcohol free" in ingredient_data["flags"]:
         ingredient_data["nutrients"]["alcohol"]["nutr_qty_value"] = 0
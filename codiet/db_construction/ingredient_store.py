@@ -0,0 +1,210 @@
+"""Consolidated single-file store of the ingredient datafiles.
+
+Rather than one pretty-printed JSON file per ingredient, the store holds
+every ingredient record in a single SQLite staging file, one compact JSON
+row per ingredient keyed by name. Records have the same shape as the
+datafiles, so everything which works on datafiles works on the store, but
+a maintenance pass streams one file and only rewrites the rows it changed.
+
+The store is opt-in. The tracked datafiles stay the source of truth unless
+the CODIET_INGREDIENT_STORE environment variable is set, when the build and
+the datafile maintenance functions use the store at INGREDIENT_STORE_FILEPATH
+in their place. Exporting writes the store back out as the per-file layout,
+for review or to commit, removing the datafiles of deleted ingredients.
+
+Usage:
+    python -m codiet.db_construction.ingredient_store import
+    CODIET_INGREDIENT_STORE=1 python process_database.py
+    python -m codiet.db_construction.ingredient_store export
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from typing import Callable, Iterable, Iterator
+
+from codiet.db_construction import INGREDIENT_DATA_DIR, INGREDIENT_STORE_FILEPATH
+
+# Set to opt in to keeping the ingredients in the store, rather than the datafiles
+INGREDIENT_STORE_ENV_VAR = "CODIET_INGREDIENT_STORE"
+
+
+def _encode(ingredient_data: dict) -> str:
+    """Returns the compact JSON for an ingredient record."""
+    return json.dumps(ingredient_data, separators=(",", ":"))
+
+
+def get_ingredient_datafile_name(ingredient_name: str) -> str:
+    """Returns the datafile name of an ingredient."""
+    return ingredient_name.replace(" ", "_").lower() + ".json"
+
+
+def using_ingredient_store() -> bool:
+    """Returns True if the ingredients are kept in the consolidated store,
+    which is opted in to with the CODIET_INGREDIENT_STORE environment variable.
+    Raises FileNotFoundError if opted in before the store has been imported."""
+    if os.environ.get(INGREDIENT_STORE_ENV_VAR, "").lower() in ("", "0", "false", "no"):
+        return False
+    if not os.path.exists(INGREDIENT_STORE_FILEPATH):
+        raise FileNotFoundError(
+            f"{INGREDIENT_STORE_ENV_VAR} is set, but there is no ingredient store at "
+            f"{INGREDIENT_STORE_FILEPATH}. Import the datafiles into it first."
+        )
+    return True
+
+
+class IngredientStore:
+    """A single-file store of ingredient records, keyed by ingredient name."""
+
+    def __init__(self, path: str = INGREDIENT_STORE_FILEPATH):
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS ingredients (
+                name TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+        """)
+        self._connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM ingredients;").fetchone()[0]
+
+    def __contains__(self, name: str) -> bool:
+        return self._connection.execute(
+            "SELECT 1 FROM ingredients WHERE name = ?;", (name,)
+        ).fetchone() is not None
+
+    def names(self) -> list[str]:
+        """Returns the names of every ingredient, in name order."""
+        rows = self._connection.execute("SELECT name FROM ingredients ORDER BY name;").fetchall()
+        return [row[0] for row in rows]
+
+    def get(self, name: str) -> dict:
+        """Returns the record of the named ingredient.
+        Raises KeyError if there is no such ingredient."""
+        row = self._connection.execute(
+            "SELECT data FROM ingredients WHERE name = ?;", (name,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(name)
+        return json.loads(row[0])
+
+    def put(self, ingredient_data: dict) -> None:
+        """Inserts or replaces the record of one ingredient."""
+        self.put_many([ingredient_data])
+
+    def put_many(self, records: Iterable[dict]) -> int:
+        """Inserts or replaces the records in one transaction, and returns the count."""
+        rows = [(record["name"], _encode(record)) for record in records]
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO ingredients (name, data) VALUES (?, ?);", rows
+            )
+        return len(rows)
+
+    def delete(self, name: str) -> None:
+        """Deletes the record of the named ingredient."""
+        with self._connection:
+            self._connection.execute("DELETE FROM ingredients WHERE name = ?;", (name,))
+
+    def iter_records(self) -> Iterator[dict]:
+        """Yields every ingredient record, in name order."""
+        cursor = self._connection.execute("SELECT data FROM ingredients ORDER BY name;")
+        for (data,) in cursor:
+            yield json.loads(data)
+
+    def update_each(self, callback: Callable[[dict], None]) -> int:
+        """Runs the callback on each record, and writes back only the records
+        it changed, in one transaction. Returns the number changed."""
+        # Only the changed records are held, and written once the read is done
+        changed = []
+        for name, data in self._connection.execute("SELECT name, data FROM ingredients;"):
+            ingredient_data = json.loads(data)
+            callback(ingredient_data)
+            new_data = _encode(ingredient_data)
+            if new_data != data:
+                changed.append((name, ingredient_data))
+        with self._connection:
+            for name, ingredient_data in changed:
+                # The callback may have renamed the ingredient
+                if ingredient_data["name"] != name:
+                    self._connection.execute("DELETE FROM ingredients WHERE name = ?;", (name,))
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO ingredients (name, data) VALUES (?, ?);",
+                    (ingredient_data["name"], _encode(ingredient_data)),
+                )
+        return len(changed)
+
+    def close(self) -> None:
+        """Closes the store file."""
+        self._connection.close()
+
+
+def read_ingredient_datafiles(ingredient_data_dir: str = INGREDIENT_DATA_DIR) -> Iterator[dict]:
+    """Yields the ingredient records from a directory of ingredient datafiles."""
+    for filename in sorted(os.listdir(ingredient_data_dir)):
+        with open(os.path.join(ingredient_data_dir, filename)) as file:
+            yield json.load(file)
+
+
+def read_ingredient_records(ingredient_data_dir: str = INGREDIENT_DATA_DIR) -> Iterator[dict]:
+    """Yields every ingredient record, from the store if there is one,
+    otherwise from the datafile directory."""
+    if using_ingredient_store():
+        with IngredientStore() as store:
+            yield from store.iter_records()
+    else:
+        yield from read_ingredient_datafiles(ingredient_data_dir)
+
+
+def import_ingredient_datafiles(
+    store: IngredientStore, ingredient_data_dir: str = INGREDIENT_DATA_DIR
+) -> int:
+    """Copies the ingredient datafiles into the store, and returns the count."""
+    return store.put_many(read_ingredient_datafiles(ingredient_data_dir))
+
+
+def export_ingredient_datafiles(
+    store: IngredientStore, ingredient_data_dir: str = INGREDIENT_DATA_DIR
+) -> int:
+    """Writes each record in the store out as a pretty-printed datafile, and
+    deletes the datafiles of ingredients no longer in the store.
+    Returns the number of datafiles written."""
+    os.makedirs(ingredient_data_dir, exist_ok=True)
+    filenames = set()
+    for ingredient_data in store.iter_records():
+        filename = get_ingredient_datafile_name(ingredient_data["name"])
+        with open(os.path.join(ingredient_data_dir, filename), "w") as file:
+            json.dump(ingredient_data, file, indent=4)
+        filenames.add(filename)
+    for filename in os.listdir(ingredient_data_dir):
+        if filename.endswith(".json") and filename not in filenames:
+            os.remove(os.path.join(ingredient_data_dir, filename))
+    return len(filenames)
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Convert between the ingredient datafiles and store.")
+    parser.add_argument("direction", choices=["import", "export"])
+    parser.add_argument("--store", default=INGREDIENT_STORE_FILEPATH, help="Path to the store.")
+    parser.add_argument("--data-dir", default=INGREDIENT_DATA_DIR, help="Datafile directory.")
+    args = parser.parse_args()
+    with IngredientStore(args.store) as store:
+        if args.direction == "import":
+            count = import_ingredient_datafiles(store, args.data_dir)
+        else:
+            count = export_ingredient_datafiles(store, args.data_dir)
+    print(f"{args.direction.title()}ed {count} ingredients.")
+
+
+if __name__ == "__main__":
+    main()
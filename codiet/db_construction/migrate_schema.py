@@ -0,0 +1,95 @@
+"""Upgrades databases built from an older version of the schema.
+
+Each migration upgrades a database from one schema version to the next, in
+place, keeping everything created in the GUI. Database runs them as it opens
+a database stamped with an older version, all in one transaction, so a
+failed upgrade leaves the database as it was.
+
+Version 0 is the schema from before it was stamped. Version 1 stores serve
+times as minutes past midnight, indexed by an R*Tree, adds the cascading
+foreign keys, the nutrient densities and totals, and the change log.
+"""
+
+import sqlite3
+from typing import Callable
+
+from codiet.db import SCHEMA_VERSION
+from codiet.db_construction.create_schema import create_change_log, create_tables
+from codiet.utils.time import convert_time_string_interval_to_minute_interval
+
+# The tables whose definitions changed in version 1, and the columns kept
+_V1_REBUILT_TABLES = {
+    "ingredient_flags": "ingredient_id, flag_id, flag_value",
+    "ingredient_nutrients": "ingredient_id, nutrient_id, ntr_qty_unit, ntr_qty_value, ing_qty_unit, ing_qty_value",
+    "nutrient_aliases": "nutrient_alias, primary_nutrient_id",
+    "recipe_ingredients": "recipe_id, ingredient_id, qty_unit, qty_value, qty_tol_upper, qty_tol_lower",
+    "recipe_tags": "recipe_id, recipe_tag_id",
+}
+
+
+def migrate_from_version_0(cursor: sqlite3.Cursor) -> None:
+    """Upgrades a version 0 database to version 1."""
+    # Move the old tables aside, and create the new ones in their place.
+    # The new tables are built by the current create functions, so this
+    # must run before any later migration.
+    for table in [*_V1_REBUILT_TABLES, "recipe_serve_times"]:
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {table}_v0")
+    create_tables(cursor)
+    # Copy the rows across, which fills the nutrient densities through their triggers
+    for table, columns in _V1_REBUILT_TABLES.items():
+        cursor.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_v0")
+    # Convert the "HH:MM-HH:MM" serve time windows to minutes, which fills the R*Tree
+    windows = cursor.execute("SELECT recipe_id, serve_time_window FROM recipe_serve_times_v0").fetchall()
+    cursor.executemany(
+        "INSERT INTO recipe_serve_times (recipe_id, serve_time_start, serve_time_end) VALUES (?, ?, ?)",
+        [
+            (recipe_id, *convert_time_string_interval_to_minute_interval(window))
+            for recipe_id, window in windows
+            if window is not None
+        ],
+    )
+    for table in [*_V1_REBUILT_TABLES, "recipe_serve_times"]:
+        cursor.execute(f"DROP TABLE {table}_v0")
+    # Version 0 didn't enforce its foreign keys, so drop rows left behind by deletes
+    for table, rowid, _, _ in cursor.execute("PRAGMA foreign_key_check").fetchall():
+        cursor.execute(f"DELETE FROM {table} WHERE rowid = ?", (rowid,))
+    # Start the change log after the copy, so the upgrade itself isn't logged
+    create_change_log(cursor)
+
+
+# The migration from each schema version to the next
+MIGRATIONS: dict[int, Callable[[sqlite3.Cursor], None]] = {
+    0: migrate_from_version_0,
+}
+
+
+def can_migrate(schema_version: int) -> bool:
+    """Returns True if a database at the schema version can be upgraded
+    to the current one."""
+    return schema_version < SCHEMA_VERSION and all(
+        version in MIGRATIONS for version in range(schema_version, SCHEMA_VERSION)
+    )
+
+
+def migrate_database(connection: sqlite3.Connection, schema_version: int) -> None:
+    """Upgrades the database from the schema version to the current one, in
+    one transaction, and stamps it with the current version.
+    Raises ValueError if there is no migration from the version."""
+    if not can_migrate(schema_version):
+        raise ValueError(f"No migration from schema version {schema_version}.")
+    # Tables are rebuilt by renaming, which the foreign keys would block,
+    # and the setting can't change within a transaction
+    foreign_keys = connection.execute("PRAGMA foreign_keys").fetchone()[0]
+    connection.execute("PRAGMA foreign_keys = OFF")
+    cursor = connection.cursor()
+    try:
+        cursor.execute("BEGIN")
+        for version in range(schema_version, SCHEMA_VERSION):
+            MIGRATIONS[version](cursor)
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
@@ -2,31 +2,53 @@ import json
 from json.decoder import JSONDecodeError
 import os
 
-from openai import OpenAI
+from codiet.db_construction.response_cache import get_response_cache, make_cache_key
 
 OPENAI_MODEL = "gpt-3.5-turbo"
 
 
+def _get_client():
+    """Returns an OpenAI client."""
+    # Imported here, as the openai package is slow to import and
+    # only needed when generating data
+    from openai import OpenAI
+    # The base URL can point at a local, OpenAI compatible endpoint
+    return OpenAI(
+        api_key=os.environ.get("CODIET_OPENAI_API_KEY"),
+        base_url=os.environ.get("CODIET_OPENAI_BASE_URL"),
+    )
+
+
+def complete_prompt(prompt: str, attempt: int = 0) -> str:
+    """Returns the model's response to the prompt, from the response cache
+    if it has been asked before. Each retry of a prompt is a separate attempt,
+    so that retries are cached and replayed in order rather than repeating
+    the first response."""
+    messages = [{"role": "user", "content": prompt}]
+    cache = get_response_cache()
+    key = make_cache_key(OPENAI_MODEL, messages, {"attempt": attempt})
+    response = cache.get(key)
+    if response is None:
+        # Only create a client on a miss, so cached runs work offline
+        chat_completion = _get_client().chat.completions.create(
+            messages=messages,  # type: ignore
+            model=OPENAI_MODEL,
+        )
+        response = chat_completion.choices[0].message.content or ""
+        cache.put(key, OPENAI_MODEL, response)
+    return response
+
+
 def get_openai_ingredient_description(ingredient_name: str) -> str:
     """Use the OpenAI API to generate a description for an ingredient."""
-    # Initialize the OpenAI client
-    client = OpenAI(api_key=os.environ.get("CODIET_OPENAI_API_KEY"))
-
     # Print an update
     print(f"Generating description for {ingredient_name}...")
 
     # Set the prompt
     prompt = f"Generate a single sentence description for the ingredient '{ingredient_name}'."
 
-    # Create a chat completion
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {"role": "user", "content": prompt},
-        ],
-        model=OPENAI_MODEL,
-    )
-
-    return chat_completion.choices[0].message.content  # type: ignore
+    # Create a chat completion, or replay it from the cache
+    return complete_prompt(prompt)
 
 
 def get_openai_ingredient_cost(
@@ -36,9 +58,6 @@ def get_openai_ingredient_cost(
 
     print(f"Getting cost data for {ingredient_name}...")
 
-    # Initialize the OpenAI client
-    client = OpenAI(api_key=os.environ.get("CODIET_OPENAI_API_KEY"))
-
     prompt = f"""Can you respond to the prompt by filling in and returning the following dictionary of {ingredient_name}:
         "cost": {{
             "cost_unit": "GBP", # currency of the cost estimate
@@ -49,23 +68,17 @@ def get_openai_ingredient_cost(
     You'll need to return valid JSON because I need to parse it. It is acceptable to guess if you are not sure."""
 
     completed = False
+    attempt = 0
     while not completed:
 
-        # Create a chat completion
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "user", "content": prompt},
-            ],
-            model=OPENAI_MODEL,
-        )
-
-        # Grab the response
-        response = chat_completion.choices[0].message.content  # type: ignore
+        # Create a chat completion, or replay it from the cache
+        response = complete_prompt(prompt, attempt)
+        attempt += 1
 
         # Check the response and populate the output dict
         try:
             # Convert the response to a dict
-            raw_cost_data = json.loads(response)  # type: ignore
+            raw_cost_data = json.loads(response)
             # Init a processed cost data dict
             cost_data = {"cost_unit": "GBP"}
             # Check the fields are populated correctly
@@ -96,9 +109,6 @@ def get_openai_ingredient_density(ingredient_name: str) -> dict[str, str | float
 
     print(f"Getting density data for {ingredient_name}...")
 
-    # Initialize the OpenAI client
-    client = OpenAI(api_key=os.environ.get("CODIET_OPENAI_API_KEY"))
-
     prompt = f"""Can you respond to the prompt by filling in and returning the following dictionary of {ingredient_name}:
         "density": {{
             "mass_unit": "g", # units used to measure mass, can be [g, kg]
@@ -109,23 +119,17 @@ def get_openai_ingredient_density(ingredient_name: str) -> dict[str, str | float
     You'll need to return valid JSON because I need to parse it. It is acceptable to guess if you are not sure."""
 
     completed = False
+    attempt = 0
     while not completed:
 
-        # Create a chat completion
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "user", "content": prompt},
-            ],
-            model=OPENAI_MODEL,
-        )
-
-        # Grab the response
-        response = chat_completion.choices[0].message.content  # type: ignore
+        # Create a chat completion, or replay it from the cache
+        response = complete_prompt(prompt, attempt)
+        attempt += 1
 
         # Check the response and populate the output dict
         try:
             # Convert the response to a dict
-            raw_density_data = json.loads(response)  # type: ignore
+            raw_density_data = json.loads(response)
             # Init a processed density data dict
             density_data = {}
             # Check mass unit is on the approved list
@@ -177,32 +181,24 @@ def get_openai_ingredient_flags(
     # Update the console
     print(f"Getting flags for {ingredient_name}...")
     print(f"Flags: {flag_list}")
-    # Initialize the OpenAI client
-    client = OpenAI(api_key=os.environ.get("CODIET_OPENAI_API_KEY"))
     # Construct the flag dict with False values
     flags_dict = {flag: None for flag in flag_list}
     # Set the prompt
     prompt = f"Can you set each of these flags to True of False for {ingredient_name}: {json.dumps(flags_dict, indent=4)}? If unsure, choose False. Reply with JSON only"
 
     completed = False
+    attempt = 0
     while not completed:
 
-        # Create a chat completion
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "user", "content": prompt},
-            ],
-            model=OPENAI_MODEL,
-        )
-
-        # Grab the response
-        response = chat_completion.choices[0].message.content  # type: ignore
+        # Create a chat completion, or replay it from the cache
+        response = complete_prompt(prompt, attempt)
+        attempt += 1
 
         # Check the response and populate the output dict
         output_dict = {}
         try:
             # Convert the response to a dict
-            flags_dict = json.loads(response)  # type: ignore
+            flags_dict = json.loads(response)
 
             # Check that there are the same number of fields in the response as in the flag list
             if len(flags_dict) != len(flag_list):
@@ -239,29 +235,20 @@ def get_openai_ingredient_flags(
 def get_openai_ingredient_gi(ingredient_name: str) -> float:
     """Use the OpenAI API to generate a description for an ingredient."""
     print(f"Getting GI for {ingredient_name}...")
-    # Initialize the OpenAI client
-    client = OpenAI(api_key=os.environ.get("CODIET_OPENAI_API_KEY"))
-
     # Set the prompt
     prompt = f"By responding with a single decimal only, what is the approximate Glycemic Index (GI) of '{ingredient_name}'? Approximate values are OK."
 
     completed = False
+    attempt = 0
     while not completed:
 
-        # Create a chat completion
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "user", "content": prompt},
-            ],
-            model=OPENAI_MODEL,
-        )
-
-        # Grab the response
-        response = chat_completion.choices[0].message.content
+        # Create a chat completion, or replay it from the cache
+        response = complete_prompt(prompt, attempt)
+        attempt += 1
 
         try:
             # Check the response is a float
-            gi = float(response)  # type: ignore
+            gi = float(response)
 
             # Check the response is in the correct range
             if gi < 0 or gi > 100:
@@ -276,6 +263,35 @@ def get_openai_ingredient_gi(ingredient_name: str) -> float:
     return gi
 
 
+def parse_nutrient_data(nutrient_data: dict) -> dict[str, str | float]:
+    """Checks one nutrient's data from a response and returns it cleaned up.
+    Raises KeyError, ValueError or TypeError if the data is invalid."""
+    # Check there are the correct number of fields in the response
+    if len(nutrient_data) != 4:
+        raise KeyError
+    # Check the nutrient qty unit is on the approve list
+    if nutrient_data["ntr_qty_unit"] not in ["g", "mg", "ug"]:
+        raise ValueError
+    # Check the ingredient qty unit is on the approve list
+    if nutrient_data["ing_qty_unit"] not in ["g", "kg", "ml", "l"]:
+        raise ValueError
+    # Check the quantities are numbers
+    ntr_qty_value = float(nutrient_data["ntr_qty_value"])
+    ing_qty_value = float(nutrient_data["ing_qty_value"])
+    # Check the quantities are positive or zero
+    if ntr_qty_value < 0 or ing_qty_value < 0:
+        raise ValueError
+    # If the ingredient qty is zero, check the nutrient qty is zero
+    if ing_qty_value == 0 and ntr_qty_value != 0:
+        raise ValueError
+    return {
+        "ntr_qty_value": ntr_qty_value,
+        "ntr_qty_unit": nutrient_data["ntr_qty_unit"],
+        "ing_qty_value": ing_qty_value,
+        "ing_qty_unit": nutrient_data["ing_qty_unit"],
+    }
+
+
 def get_openai_ingredient_nutrients(
     ingredient_name: str, nutrient_names: list[str]
 ) -> dict[str, dict[str, str | float]]:
@@ -300,30 +316,21 @@ def get_openai_ingredient_nutrients(
         nutrients_json_str += f'"{nutrient}": {nutrient_json_str},'
     nutrients_json_str += "}"
 
-    # Initialize the OpenAI client
-    client = OpenAI(api_key=os.environ.get("CODIET_OPENAI_API_KEY"))
-
     # Set the prompt
     prompt = f"""Can you populate this nutrient data for {ingredient_name}: {nutrients_json_str}?
         Provide a guess if unsure. Reply with JSON only. Please use 0 to represent a zero quantity."""
 
     completed = False
+    attempt = 0
     while not completed:
 
-        # Create a chat completion
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "user", "content": prompt},
-            ],
-            model=OPENAI_MODEL,
-        )
-
-        # Grab the response
-        response = chat_completion.choices[0].message.content
+        # Create a chat completion, or replay it from the cache
+        response = complete_prompt(prompt, attempt)
+        attempt += 1
 
         try:
             # Parse the response
-            response_dict = json.loads(chat_completion.choices[0].message.content)  # type: ignore
+            response_dict = json.loads(response)
 
             # Check the response and populate the output dict
             output_dict = {}
@@ -332,47 +339,8 @@ def get_openai_ingredient_nutrients(
                 # Check the nutrient was on the original list
                 if nutrient not in nutrient_names:
                     raise KeyError
-                # Add the nutrient to the output dict
-                output_dict[nutrient] = response_dict[nutrient]
-
-                # Check there are the correct number of fields in the response
-                if len(output_dict[nutrient]) != 4:
-                    raise KeyError
-
-                # Check the nutrient qty unit is on the approve list
-                if output_dict[nutrient]["ntr_qty_unit"] not in ["g", "mg", "ug"]:
-                    raise ValueError
-                
-                # Check the ingredient qty unit is on the approve list
-                if output_dict[nutrient]["ing_qty_unit"] not in ["g", "kg", "ml", "l"]:
-                    raise ValueError
-                
-                # Check the nutrient qty value is a float
-                _ = float(output_dict[nutrient]["ntr_qty_value"])
-
-                # Check the ingredient qty value is a float
-                _ = float(output_dict[nutrient]["ing_qty_value"])
-
-                # Check the nutrient qty value is positive or zero
-                if output_dict[nutrient]["ntr_qty_value"] < 0:
-                    raise ValueError
-                
-                # Check the ingredient qty value is positive or zero
-                if output_dict[nutrient]["ing_qty_value"] < 0:
-                    raise ValueError
-                
-                # If the ingredient qty is zero, check the nutrient qty is zero
-                if output_dict[nutrient]["ing_qty_value"] == 0 and output_dict[nutrient]["ntr_qty_value"] != 0:
-                    raise ValueError
-                
-                # Populate the output dict
-                output_dict[nutrient] = {
-                    "ntr_qty_value": float(output_dict[nutrient]["ntr_qty_value"]),
-                    "ntr_qty_unit": output_dict[nutrient]["ntr_qty_unit"],
-                    "ing_qty_value": float(output_dict[nutrient]["ing_qty_value"]),
-                    "ing_qty_unit": output_dict[nutrient]["ing_qty_unit"],
-                }
-                
+                # Check the nutrient data and add it to the output dict
+                output_dict[nutrient] = parse_nutrient_data(response_dict[nutrient])
 
         except JSONDecodeError:
             print(f"Retrying {ingredient_name} nutrients due to JSONDecodeError")
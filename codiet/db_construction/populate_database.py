@@ -4,32 +4,69 @@ into the database.
 """
 
 import os, json
+from typing import Iterable
 
 from codiet.db_construction import (
     INGREDIENT_DATA_DIR,
+    INGREDIENT_STORE_FILEPATH,
     RECIPE_DATA_DIR,
     GLOBAL_FLAG_DATA_FILEPATH,
     GLOBAL_NUTRIENT_DATA_FILEPATH,
     GLOBAL_RECIPE_TAG_DATA_FILEPATH
 )
+from codiet.db import DB_PATH, SNAPSHOT_PATH
 from codiet.utils.tags import flatten_tree
 from codiet.models.ingredients import Ingredient, IngredientNutrientQuantity
-from codiet.models.recipes import Recipe
 from codiet.db.database_service import DatabaseService
+from codiet.db_construction import recipe_io
+from codiet.db_construction.ingredient_store import (
+    IngredientStore,
+    read_ingredient_datafiles,
+    using_ingredient_store,
+)
+from codiet.db_construction.create_schema import create_schema
+from codiet.optimiser.snapshot import export_snapshot
+
+def build_database(db_path: str = DB_PATH, snapshot_path: str = SNAPSHOT_PATH):
+    """Build the database from scratch using the .json datafiles,
+    and export the catalogue snapshot from it."""
+    # Remove any database that exists, and rebuild the schema
+    if os.path.exists(db_path):
+        print(f"Removing existing database at {db_path}")
+        os.remove(db_path)
+    create_schema(db_path)
+    # Push all of the datafile data into the database
+    print("Pushing global flags into database...")
+    push_flags_to_db(db_path)
+    print("Pushing global nutrients into database...")
+    push_nutrients_to_db(db_path)
+    print("Pushing ingredients into database...")
+    # Stream them from the consolidated store, if the ingredients are kept there
+    push_ingredients_to_db(
+        db_path, ingredient_store_path=INGREDIENT_STORE_FILEPATH if using_ingredient_store() else None
+    )
+    print("Pushing global recipe tags into database...")
+    push_global_recipe_tags_to_db(db_path)
+    print("Pushing recipes into database...")
+    push_recipes_to_db(db_path)
+    # Compile the database into the memory-mapped catalogue snapshot
+    print("Exporting catalogue snapshot...")
+    with DatabaseService(db_path) as db_service:
+        export_snapshot(db_service, db_path, snapshot_path)
 
-def push_flags_to_db():
+def push_flags_to_db(db_path: str = DB_PATH):
     """Populate the flags table in the database using the 
     .json flag list file."""
     # Read the flags from the datafile
     with open(GLOBAL_FLAG_DATA_FILEPATH) as file:
         flags = json.load(file)
     # Push the flags to the database
-    with DatabaseService() as db_service:
+    with DatabaseService(db_path) as db_service:
         db_service.insert_global_flags(flags)
         # Save changes
         db_service.commit()
 
-def push_nutrients_to_db():
+def push_nutrients_to_db(db_path: str = DB_PATH):
     """Populate the database with nutrient data."""
     # Read the nutrient data from the file
     with open(GLOBAL_NUTRIENT_DATA_FILEPATH) as file:
@@ -49,28 +86,39 @@ def push_nutrients_to_db():
                 # It's a leaf nutrient, insert it using the leaf nutrient method
                 db_service.insert_global_leaf_nutrient(nutrient_name, parent_id)
     # Call the recursive function
-    with DatabaseService() as db_service:
+    with DatabaseService(db_path) as db_service:
         insert_nutrients(nutrient_data, db_service)
         # Save changes
         db_service.commit()
 
-def push_ingredients_to_db():
-    """Populate the database with ingredients from the .json ingredient files."""
-    with DatabaseService() as db_service:
-        # Work through each .json file in the ingredient_data directory
-        for file in os.listdir(INGREDIENT_DATA_DIR):
-            # Open the file and load the data
-            with open(os.path.join(INGREDIENT_DATA_DIR, file)) as f:
-                data = json.load(f)
-            # Convert the data into an ingredient instance
-            ingredient = _load_ingredient_from_json(data)
-            # Save the ingredient to the database
-            db_service.insert_new_ingredient(ingredient)
-            # Save changes
-            db_service.commit()
+def push_ingredients_to_db(
+    db_path: str = DB_PATH,
+    ingredient_data_dir: str = INGREDIENT_DATA_DIR,
+    ingredient_store_path: str | None = None,
+):
+    """Populate the database with ingredients from the .json ingredient files,
+    or from the ingredient store if its path is given."""
+    with DatabaseService(db_path) as db_service:
+        if ingredient_store_path is not None:
+            # Stream the records out of the single store file
+            with IngredientStore(ingredient_store_path) as store:
+                _push_ingredient_records(store.iter_records(), db_service)
+        else:
+            # Work through each .json file in the ingredient_data directory
+            _push_ingredient_records(read_ingredient_datafiles(ingredient_data_dir), db_service)
+        # Save changes
+        db_service.commit()
+
+def _push_ingredient_records(records: Iterable[dict], db_service: DatabaseService):
+    """Insert each ingredient record into the database."""
+    for data in records:
+        # Convert the data into an ingredient instance
+        ingredient = _load_ingredient_from_json(data, db_service)
+        # Save the ingredient to the database
+        db_service.insert_new_ingredient(ingredient)
 
 
-def push_global_recipe_tags_to_db():
+def push_global_recipe_tags_to_db(db_path: str = DB_PATH):
     """Push the global recipe tags to the database."""
     # Read the global recipe tags from the file
     with open(GLOBAL_RECIPE_TAG_DATA_FILEPATH) as file:
@@ -78,33 +126,25 @@ def push_global_recipe_tags_to_db():
     # Flatten to list
     flat_global_recipe_tags = flatten_tree(global_recipe_tags)
     # Add each recipe tage to the database
-    with DatabaseService() as db_service:
+    with DatabaseService(db_path) as db_service:
         for recipe_tag in flat_global_recipe_tags:
             db_service.insert_global_recipe_tag(recipe_tag)
         # Save changes
         db_service.commit()
     print("Global recipe tags pushed to the database.")
 
-def push_recipes_to_db():
+def push_recipes_to_db(db_path: str = DB_PATH, recipe_data_dir: str = RECIPE_DATA_DIR):
     """Push the recipes to the database."""
-    # For each of the recipe datafiles
-    for file in os.listdir(RECIPE_DATA_DIR):
-        # Open the file and load the data
-        with open(os.path.join(RECIPE_DATA_DIR, file)) as f:
-            data = json.load(f)
-        # Convert the data into a recipe instance
-        recipe = _load_recipe_from_json(data)
-        # Save the recipe to the database
-        with DatabaseService() as db_service:
-            db_service.insert_new_recipe(recipe)
-            # Save changes
-            db_service.commit()
+    # Stream the recipe datafiles into the database in batches
+    with DatabaseService(db_path) as db_service:
+        recipe_io.import_recipe_records(
+            recipe_io.read_recipe_datafiles(recipe_data_dir), db_service
+        )
 
-def _load_ingredient_from_json(json_data) -> Ingredient:
+def _load_ingredient_from_json(json_data, db_service: DatabaseService) -> Ingredient:
     """Load an ingredient object from a json data dict."""
     # Create the ingredient instance
-    with DatabaseService() as db_service:
-        ingredient = db_service.create_empty_ingredient()
+    ingredient = db_service.create_empty_ingredient()
     # Move the ingredient data into the instance
     ingredient.name = json_data["name"]
     ingredient.description = json_data["description"]
@@ -136,12 +176,3 @@ def _load_ingredient_nutrient_qty_from_json(nutrient_name:str, nutrient_data:dic
         ing_qty_unit=nutrient_data["ing_qty_unit"]
     )
     return nutrient_qty
-
-def _load_recipe_from_json(json_data) -> Recipe:
-    """Load a recipe object from a json data dict."""
-    # Create the recipe instance
-    recipe = Recipe()
-    # Move the recipe data into the instance
-    recipe.name = json_data["name"]
-    recipe.description = json_data["description"]
-    return recipe
\ No newline at end of file
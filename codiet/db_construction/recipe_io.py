@@ -0,0 +1,86 @@
+"""Bulk, streaming import and export of recipes.
+
+Recipes are exchanged as JSON Lines, one recipe record per line, where each
+record has the same shape as a recipe datafile. Records are read and written
+lazily, and imported in batches, so catalogues of any size can be moved in
+and out of the database without holding them in memory.
+"""
+
+import json
+import os
+from itertools import islice
+from typing import Iterable, Iterator
+
+from codiet.db import DB_PATH
+from codiet.db.database_service import DatabaseService
+from codiet.db_construction import RECIPE_DATA_DIR
+
+# The number of recipes written in each transaction
+DEFAULT_BATCH_SIZE = 1000
+
+
+def read_recipe_jsonl(filepath: str) -> Iterator[dict]:
+    """Yields the recipe records from a JSON Lines file."""
+    with open(filepath, "r") as file:
+        for line in file:
+            # Skip any blank lines
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_recipe_jsonl(records: Iterable[dict], filepath: str) -> int:
+    """Writes the recipe records to a JSON Lines file, and returns the count."""
+    count = 0
+    with open(filepath, "w") as file:
+        for record in records:
+            file.write(json.dumps(record))
+            file.write("\n")
+            count += 1
+    return count
+
+
+def read_recipe_datafiles(recipe_data_dir: str = RECIPE_DATA_DIR) -> Iterator[dict]:
+    """Yields the recipe records from a directory of recipe datafiles."""
+    for filename in sorted(os.listdir(recipe_data_dir)):
+        with open(os.path.join(recipe_data_dir, filename)) as file:
+            yield json.load(file)
+
+
+def import_recipe_records(
+    records: Iterable[dict],
+    db_service: DatabaseService,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    replace: bool = False,
+) -> int:
+    """Imports the recipe records into the database, committing each batch,
+    then brings the recipe nutrient totals up to date.
+    Returns the number of recipes imported."""
+    count = 0
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if len(batch) == 0:
+            db_service.sync_recipe_nutrient_totals()
+            return count
+        db_service.insert_recipe_records(batch, replace=replace)
+        db_service.commit()
+        count += len(batch)
+
+
+def import_recipes_jsonl(
+    filepath: str,
+    db_path: str = DB_PATH,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    replace: bool = False,
+) -> int:
+    """Imports the recipes in a JSON Lines file, and returns the count."""
+    with DatabaseService(db_path) as db_service:
+        return import_recipe_records(
+            read_recipe_jsonl(filepath), db_service, batch_size=batch_size, replace=replace
+        )
+
+
+def export_recipes_jsonl(filepath: str, db_path: str = DB_PATH) -> int:
+    """Exports every recipe to a JSON Lines file, and returns the count."""
+    with DatabaseService(db_path) as db_service:
+        return write_recipe_jsonl(db_service.iter_recipe_records(), filepath)
@@ -0,0 +1,141 @@
+"""Content-addressed on-disk cache of OpenAI responses.
+
+Each response is stored under the SHA-256 hash of the model, the messages
+and the request parameters, so asking the same question again is answered
+from disk. Retries of a question are cached under their attempt number, so
+a rerun replays every response in the same order, including the invalid
+ones that caused the retries, and a run interrupted part way through only
+pays for the questions it never got answers to. The cache is a single
+SQLite file, and the least recently used responses are evicted once it
+grows beyond its size limit.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from codiet.db_construction import OPENAI_CACHE_FILEPATH
+
+# The default size limit of the cache, in bytes of response text
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# The shared cache, opened on first use
+_response_cache: "ResponseCache | None" = None
+
+
+def make_cache_key(model: str, messages: list[dict], params: dict) -> str:
+    """Returns the content address of a request."""
+    request = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """A size-limited SQLite cache of response text keyed by content address."""
+
+    def __init__(self, path: str = OPENAI_CACHE_FILEPATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            );
+        """)
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used);"
+        )
+        self._connection.commit()
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM responses;").fetchone()[0]
+
+    @property
+    def size(self) -> int:
+        """Returns the total size of the cached responses, in bytes."""
+        return self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses;").fetchone()[0]
+
+    @property
+    def hit_rate(self) -> float:
+        """Returns the fraction of lookups answered from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key: str) -> str | None:
+        """Returns the cached response, or None if it isn't cached."""
+        row = self._connection.execute(
+            "SELECT response FROM responses WHERE key = ?;", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        with self._connection:
+            self._connection.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?;", (time.time(), key)
+            )
+        return row[0]
+
+    def put(self, key: str, model: str, response: str) -> None:
+        """Caches the response, evicting the least recently used responses
+        if the cache has grown beyond its size limit."""
+        size = len(response.encode("utf-8"))
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, last_used) VALUES (?, ?, ?, ?, ?);",
+                (key, model, response, size, time.time()),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        """Deletes the least recently used responses until the cache fits."""
+        excess = self.size - self.max_bytes
+        if excess <= 0:
+            return
+        evicted = []
+        for key, size in self._connection.execute(
+            "SELECT key, size FROM responses ORDER BY last_used;"
+        ).fetchall():
+            if excess <= 0:
+                break
+            evicted.append((key,))
+            excess -= size
+        self._connection.executemany("DELETE FROM responses WHERE key = ?;", evicted)
+
+    def format_stats(self) -> str:
+        """Returns a one line summary of the cache use."""
+        return (
+            f"Response cache: {self.hits} hits, {self.misses} misses "
+            f"({self.hit_rate:.0%} hit rate), {len(self)} responses, {self.size / 1e6:.1f} MB."
+        )
+
+    def close(self) -> None:
+        """Closes the cache file."""
+        self._connection.close()
+
+
+def get_response_cache() -> ResponseCache:
+    """Returns the shared response cache, opening it on first use."""
+    global _response_cache
+    if _response_cache is None:
+        os.makedirs(os.path.dirname(OPENAI_CACHE_FILEPATH), exist_ok=True)
+        _response_cache = ResponseCache()
+    return _response_cache
+
+
+def set_response_cache(cache: ResponseCache | None) -> None:
+    """Replaces the shared response cache, e.g. with one in another file.
+    Passing None reopens the default cache on next use."""
+    global _response_cache
+    _response_cache = cache
@@ -0,0 +1,10 @@
+class SchemaVersionError(RuntimeError):
+    def __init__(self, db_path: str, schema_version: int, expected_version: int):
+        self.db_path = db_path
+        self.schema_version = schema_version
+        self.expected_version = expected_version
+        self.message = (
+            f"Database '{db_path}' has schema version {schema_version}, but version "
+            f"{expected_version} is required. Rebuild it with process_database.py."
+        )
+        super().__init__(self.message)
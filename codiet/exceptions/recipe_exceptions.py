@@ -0,0 +1,12 @@
+class RecipeNameExistsError(ValueError):
+    def __init__(self, recipe_name: str):
+        self.recipe_name = recipe_name
+        self.message = f"Recipe with name '{recipe_name}' already exists."
+        super().__init__(self.message)
+
+class RecipeIngredientNotFoundError(ValueError):
+    def __init__(self, recipe_name: str, ingredient_ref: str | int):
+        self.recipe_name = recipe_name
+        self.ingredient_ref = ingredient_ref
+        self.message = f"Ingredient '{ingredient_ref}' in recipe '{recipe_name}' does not exist."
+        super().__init__(self.message)
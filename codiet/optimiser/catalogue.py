@@ -0,0 +1,193 @@
+"""Array representation of the ingredient and recipe catalogue.
+
+The optimiser and the bulk calculations work on whole columns of data at
+once, rather than on Ingredient and Recipe instances. Ingredients are held
+in ingredient ID order, and recipe ingredient quantities are held as a
+sparse (coordinate format) recipe x ingredient matrix of grams, alongside
+the lower and upper bounds in grams set by each quantity's tolerances,
+which are percentages of the quantity.
+"""
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from codiet.utils.units import calculate_density, calculate_piece_mass, grams_per_unit
+
+if TYPE_CHECKING:
+    from codiet.db.database_service import DatabaseService
+    from codiet.optimiser.snapshot import CatalogueSnapshot
+
+
+def _to_float_array(values) -> np.ndarray:
+    """Converts a sequence which may contain None into a float array of NaN."""
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+def tolerance_bounds(
+    qty_values: np.ndarray, lower_tols: np.ndarray, upper_tols: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the lower and upper bounds of quantities, given their lower
+    and upper tolerances as percentages of the quantity. Missing tolerances
+    mean the quantity is fixed, and the lower bound never goes below zero."""
+    lower_tols = np.nan_to_num(np.asarray(lower_tols, dtype=np.float64))
+    upper_tols = np.nan_to_num(np.asarray(upper_tols, dtype=np.float64))
+    lower = np.maximum(qty_values * (1 - lower_tols / 100), 0.0)
+    upper = qty_values * (1 + upper_tols / 100)
+    return lower, upper
+
+
+def _match_positions(sorted_ids: np.ndarray, ids) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the positions of the IDs in the sorted ID array, and a mask of
+    the IDs found there. The positions of missing IDs are zero."""
+    ids = np.asarray(ids, dtype=np.int64)
+    positions = np.searchsorted(sorted_ids, ids)
+    known = positions < len(sorted_ids)
+    known[known] = sorted_ids[positions[known]] == ids[known]
+    return np.where(known, positions, 0), known
+
+
+def _find_positions(sorted_ids: np.ndarray, ids, entity: str) -> np.ndarray:
+    """Returns the positions of the IDs in the sorted ID array.
+    Raises ValueError naming any IDs which aren't there."""
+    positions, known = _match_positions(sorted_ids, ids)
+    if not known.all():
+        missing = np.asarray(ids, dtype=np.int64)[~known]
+        raise ValueError(f"Unknown {entity} IDs {sorted(set(missing.tolist()))}.")
+    return positions
+
+
+class Catalogue:
+    """Column arrays describing every ingredient and recipe."""
+
+    def __init__(
+        self,
+        ingredient_ids: np.ndarray,
+        densities: np.ndarray,
+        piece_masses: np.ndarray,
+        cost_values: np.ndarray,
+        cost_qty_grams: np.ndarray,
+        recipe_ids: np.ndarray,
+        recipe_rows: np.ndarray,
+        recipe_cols: np.ndarray,
+        recipe_grams: np.ndarray,
+        recipe_grams_lower: np.ndarray | None = None,
+        recipe_grams_upper: np.ndarray | None = None,
+    ):
+        # Ingredient columns, one entry per ingredient
+        self.ingredient_ids = np.asarray(ingredient_ids, dtype=np.int64)
+        self.densities = np.asarray(densities, dtype=np.float64)
+        self.piece_masses = np.asarray(piece_masses, dtype=np.float64)
+        self.cost_values = np.asarray(cost_values, dtype=np.float64)
+        self.cost_qty_grams = np.asarray(cost_qty_grams, dtype=np.float64)
+        # Recipe columns, one entry per recipe
+        self.recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+        # Recipe quantity matrix, one entry per recipe ingredient.
+        # Rows index recipe_ids, columns index ingredient_ids.
+        self.recipe_rows = np.asarray(recipe_rows, dtype=np.int64)
+        self.recipe_cols = np.asarray(recipe_cols, dtype=np.int64)
+        self.recipe_grams = np.asarray(recipe_grams, dtype=np.float64)
+        # The tolerance bands, which default to the quantities themselves
+        self.recipe_grams_lower = (
+            self.recipe_grams if recipe_grams_lower is None
+            else np.asarray(recipe_grams_lower, dtype=np.float64)
+        )
+        self.recipe_grams_upper = (
+            self.recipe_grams if recipe_grams_upper is None
+            else np.asarray(recipe_grams_upper, dtype=np.float64)
+        )
+        # Map the IDs back onto their array positions
+        self.ingredient_index = {int(id): i for i, id in enumerate(self.ingredient_ids)}
+        self.recipe_index = {int(id): i for i, id in enumerate(self.recipe_ids)}
+
+    @property
+    def num_ingredients(self) -> int:
+        """Returns the number of ingredients in the catalogue."""
+        return len(self.ingredient_ids)
+
+    @property
+    def num_recipes(self) -> int:
+        """Returns the number of recipes in the catalogue."""
+        return len(self.recipe_ids)
+
+    def ingredient_positions(self, ingredient_ids) -> np.ndarray:
+        """Returns the array positions of the given ingredient IDs.
+        Raises ValueError if any of the IDs aren't in the catalogue."""
+        return _find_positions(self.ingredient_ids, ingredient_ids, "ingredient")
+
+    def recipe_positions(self, recipe_ids) -> np.ndarray:
+        """Returns the array positions of the given recipe IDs.
+        Raises ValueError if any of the IDs aren't in the catalogue."""
+        return _find_positions(self.recipe_ids, recipe_ids, "recipe")
+
+    def match_recipe_positions(self, recipe_ids) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the array positions of the given recipe IDs, and a mask of
+        the IDs in the catalogue. The positions of the others are zero."""
+        return _match_positions(self.recipe_ids, recipe_ids)
+
+    @classmethod
+    def from_database(cls, db_service: "DatabaseService") -> "Catalogue":
+        """Builds the catalogue arrays using bulk queries on the database."""
+        # Unpack the ingredient data into columns
+        ingredient_rows = db_service.fetch_all_ingredient_quantity_data()
+        ingredient_ids = [row[0] for row in ingredient_rows]
+        densities = _to_float_array(
+            [calculate_density(row[5], row[4], row[7], row[6]) for row in ingredient_rows]
+        )
+        piece_masses = _to_float_array(
+            [calculate_piece_mass(row[8], row[10], row[9]) for row in ingredient_rows]
+        )
+        cost_values = _to_float_array([row[1] for row in ingredient_rows])
+        cost_qty_grams = _to_float_array([row[3] for row in ingredient_rows]) * grams_per_unit(
+            [row[2] for row in ingredient_rows], densities, piece_masses
+        )
+        # Build the recipe quantity matrix
+        recipe_ids = db_service.fetch_all_recipe_ids()
+        recipe_index = {id: i for i, id in enumerate(recipe_ids)}
+        ingredient_index = {id: i for i, id in enumerate(ingredient_ids)}
+        # Skip any rows left behind by deleted recipes or ingredients
+        quantity_rows = [
+            row for row in db_service.fetch_all_recipe_ingredient_tolerance_rows()
+            if row[0] in recipe_index and row[1] in ingredient_index
+        ]
+        rows = np.array([recipe_index[row[0]] for row in quantity_rows], dtype=np.int64)
+        cols = np.array([ingredient_index[row[1]] for row in quantity_rows], dtype=np.int64)
+        factors = grams_per_unit([row[3] for row in quantity_rows], densities[cols], piece_masses[cols])
+        qty_values = _to_float_array([row[2] for row in quantity_rows])
+        lower_qty_values, upper_qty_values = tolerance_bounds(
+            qty_values,
+            _to_float_array([row[4] for row in quantity_rows]),
+            _to_float_array([row[5] for row in quantity_rows]),
+        )
+        return cls(
+            ingredient_ids=np.array(ingredient_ids, dtype=np.int64),
+            densities=densities,
+            piece_masses=piece_masses,
+            cost_values=cost_values,
+            cost_qty_grams=cost_qty_grams,
+            recipe_ids=np.array(recipe_ids, dtype=np.int64),
+            recipe_rows=rows,
+            recipe_cols=cols,
+            recipe_grams=qty_values * factors,
+            recipe_grams_lower=lower_qty_values * factors,
+            recipe_grams_upper=upper_qty_values * factors,
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot: "CatalogueSnapshot") -> "Catalogue":
+        """Builds the catalogue from a memory-mapped snapshot.
+        The arrays are views onto the snapshot, except for the costs, which
+        are copied so that they can be repriced."""
+        return cls(
+            ingredient_ids=snapshot["ingredient_ids"],
+            densities=snapshot["densities"],
+            piece_masses=snapshot["piece_masses"],
+            cost_values=snapshot["cost_values"].copy(),
+            cost_qty_grams=snapshot["cost_qty_grams"].copy(),
+            recipe_ids=snapshot["recipe_ids"],
+            recipe_rows=snapshot["recipe_rows"],
+            recipe_cols=snapshot["recipe_cols"],
+            recipe_grams=snapshot["recipe_grams"],
+            recipe_grams_lower=snapshot["recipe_grams_lower"],
+            recipe_grams_upper=snapshot["recipe_grams_upper"],
+        )
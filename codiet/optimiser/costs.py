@@ -0,0 +1,130 @@
+"""Vectorised pricing of ingredients, recipes and meal plans."""
+
+from typing import Sequence
+
+import numpy as np
+
+from codiet.utils.units import grams_per_unit
+from codiet.optimiser.catalogue import Catalogue
+
+
+class CostEngine:
+    """Prices recipes and plans from a per-gram cost vector.
+
+    The cost of one gram of every ingredient is calculated once, so that
+    pricing any number of recipes or plans is a single vectorised pass.
+    Ingredients without complete cost data have a NaN per-gram cost, and
+    anything containing them is reported as incomplete.
+    """
+
+    def __init__(self, catalogue: Catalogue):
+        self.catalogue = catalogue
+        # Calculate the cost of one gram of every ingredient
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.cost_per_gram = catalogue.cost_values / catalogue.cost_qty_grams
+        # Guard against zero quantities producing infinite costs
+        self.cost_per_gram[~np.isfinite(self.cost_per_gram)] = np.nan
+        # Recipe costs are calculated on first use
+        self._recipe_costs: np.ndarray | None = None
+        self._recipe_costs_incomplete: np.ndarray | None = None
+
+    @property
+    def missing_cost_mask(self) -> np.ndarray:
+        """Returns a boolean mask of the ingredients with no usable cost data."""
+        return np.isnan(self.cost_per_gram)
+
+    @property
+    def missing_cost_ingredient_ids(self) -> np.ndarray:
+        """Returns the IDs of the ingredients with no usable cost data."""
+        return self.catalogue.ingredient_ids[self.missing_cost_mask]
+
+    @property
+    def recipe_costs(self) -> np.ndarray:
+        """Returns the cost of every recipe, in catalogue recipe order.
+        Ingredients with missing costs contribute nothing to the total."""
+        if self._recipe_costs is None:
+            self._price_all_recipes()
+        return self._recipe_costs  # type: ignore
+
+    @property
+    def recipe_costs_incomplete(self) -> np.ndarray:
+        """Returns a boolean mask of the recipes whose cost is incomplete."""
+        if self._recipe_costs_incomplete is None:
+            self._price_all_recipes()
+        return self._recipe_costs_incomplete  # type: ignore
+
+    def reprice(
+        self,
+        ingredient_ids: Sequence[int],
+        cost_values: Sequence[float | None],
+        cost_qty_values: Sequence[float | None],
+        cost_qty_units: Sequence[str | None],
+    ) -> None:
+        """Updates the per-gram costs of the given ingredients in one pass.
+        Intended for use after a price import."""
+        positions = self.catalogue.ingredient_positions(ingredient_ids)
+        # Convert the new cost quantities to grams
+        qty_values = np.array(
+            [np.nan if value is None else value for value in cost_qty_values], dtype=np.float64
+        )
+        qty_grams = qty_values * grams_per_unit(
+            cost_qty_units,
+            self.catalogue.densities[positions],
+            self.catalogue.piece_masses[positions],
+        )
+        values = np.array(
+            [np.nan if value is None else value for value in cost_values], dtype=np.float64
+        )
+        # Write the new costs back into the catalogue and the cost vector
+        self.catalogue.cost_values[positions] = values
+        self.catalogue.cost_qty_grams[positions] = qty_grams
+        with np.errstate(divide="ignore", invalid="ignore"):
+            new_costs = values / qty_grams
+        new_costs[~np.isfinite(new_costs)] = np.nan
+        self.cost_per_gram[positions] = new_costs
+        # Any cached recipe costs are now stale
+        self._recipe_costs = None
+        self._recipe_costs_incomplete = None
+
+    def price_quantities(
+        self, rows: np.ndarray, cols: np.ndarray, grams: np.ndarray, num_rows: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Prices a sparse matrix of ingredient quantities in grams.
+
+        Args:
+            rows: The row (recipe, plan, basket...) of each quantity.
+            cols: The catalogue ingredient position of each quantity.
+            grams: The quantity in grams.
+            num_rows: The total number of rows.
+
+        Returns:
+            A tuple of the cost of each row, and a boolean mask of the rows
+            which contain an ingredient with a missing cost or quantity.
+        """
+        item_costs = grams * self.cost_per_gram[cols]
+        missing = np.isnan(item_costs)
+        costs = np.bincount(rows, weights=np.where(missing, 0.0, item_costs), minlength=num_rows)
+        incomplete = np.bincount(rows, weights=missing, minlength=num_rows) > 0
+        return costs, incomplete
+
+    def price_recipes(self, recipe_ids: Sequence[int]) -> np.ndarray:
+        """Returns the costs of the given recipes."""
+        return self.recipe_costs[self.catalogue.recipe_positions(recipe_ids)]
+
+    def price_plans(self, plans: np.ndarray) -> np.ndarray:
+        """Returns the cost of each plan.
+
+        Args:
+            plans: An integer array with one row per plan, holding the
+                catalogue recipe positions chosen for each meal slot.
+        """
+        return self.recipe_costs[plans].sum(axis=1)
+
+    def _price_all_recipes(self) -> None:
+        """Prices every recipe in the catalogue and caches the result."""
+        self._recipe_costs, self._recipe_costs_incomplete = self.price_quantities(
+            rows=self.catalogue.recipe_rows,
+            cols=self.catalogue.recipe_cols,
+            grams=self.catalogue.recipe_grams,
+            num_rows=self.catalogue.num_recipes,
+        )
@@ -0,0 +1,219 @@
+"""Catalogue-wide data quality scanner.
+
+Rather than checking one ingredient or one nutrient at a time, the scanner
+works on the catalogue snapshot, where every ingredient column and the
+ingredient x nutrient matrix are already flat arrays, and runs each check
+as a single vectorised pass over the whole catalogue. It reports:
+
+- missing data: nutrients, costs, densities and GI,
+- impossible values: negative quantities, GI outside 0 to 100, and leaf
+  nutrient masses adding up to more than the ingredient itself,
+- unit inconsistencies: costs, recipe quantities and nutrient ratios whose
+  units can't be converted to grams,
+- outliers: nutrient values far from the rest of the catalogue, by a
+  robust z-score of their logarithm against the median and median
+  absolute deviation.
+
+The report is a JSON-serialisable dict, with the ingredient IDs found by
+each check.
+
+Usage:
+    python -m codiet.optimiser.data_quality --output quality.json
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from codiet.db import DB_PATH, SNAPSHOT_PATH
+from codiet.db.database_service import DatabaseService
+from codiet.optimiser.snapshot import CatalogueSnapshot, load_snapshot
+
+# Leaf nutrient masses may add up to slightly over the reference mass by rounding
+LEAF_MASS_TOLERANCE = 0.01
+# The robust z-score beyond which a nutrient value is an outlier
+OUTLIER_THRESHOLD = 5.0
+# Scales the median absolute deviation to the standard deviation of a normal distribution
+MAD_SCALE = 1.4826
+
+
+def _ids(ingredient_ids: np.ndarray, mask: np.ndarray) -> list[int]:
+    """Returns the IDs of the ingredients selected by the mask."""
+    return ingredient_ids[mask].tolist()
+
+
+def find_outliers(
+    matrix: np.ndarray, threshold: float = OUTLIER_THRESHOLD
+) -> tuple[np.ndarray, np.ndarray]:
+    """Finds the outliers in each column of the matrix, ignoring NaN.
+    Nutrient contents span orders of magnitude, so the positive values are
+    compared on a log scale, and zeros are never outliers.
+
+    Returns:
+        A tuple of the boolean outlier mask, shaped as the matrix, and the
+        median positive value of each column.
+    """
+    if matrix.size == 0:
+        return np.zeros(matrix.shape, dtype=bool), np.zeros(matrix.shape[1])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logs = np.where(matrix > 0, np.log10(matrix), np.nan)
+        medians = np.nanmedian(logs, axis=0)
+        deviations = np.abs(logs - medians)
+        scales = MAD_SCALE * np.nanmedian(deviations, axis=0)
+        # Columns with no spread, or no data at all, have no outliers
+        scores = deviations / scales
+    outliers = np.nan_to_num(scores, nan=0.0, posinf=0.0) > threshold
+    return outliers, np.nan_to_num(10 ** medians)
+
+
+def scan_snapshot(
+    snapshot: CatalogueSnapshot,
+    unconvertible_nutrient_rows: list[tuple[int, int, str, str]] = (),
+    outlier_threshold: float = OUTLIER_THRESHOLD,
+) -> dict:
+    """Scans the catalogue snapshot for data quality issues.
+
+    Args:
+        snapshot: The catalogue snapshot to scan.
+        unconvertible_nutrient_rows: The (ingredient_id, nutrient_id, ntr_qty_unit,
+            ing_qty_unit) rows of the nutrient ratios which couldn't be converted.
+            These are NaN in the snapshot's nutrient matrix, so are also counted
+            as missing, since there is no usable value for them.
+        outlier_threshold: The robust z-score beyond which a value is an outlier.
+
+    Returns:
+        The report, as a JSON-serialisable dict.
+    """
+    ingredient_ids = snapshot["ingredient_ids"]
+    nutrient_matrix = snapshot["nutrient_matrix"]
+    nutrient_names = snapshot.nutrient_names
+    cost_values = snapshot["cost_values"]
+    cost_qty_grams = snapshot["cost_qty_grams"]
+    densities = snapshot["densities"]
+    piece_masses = snapshot["piece_masses"]
+    gis = snapshot["ingredient_gis"]
+
+    # Missing data, where there is no usable value
+    missing_nutrients = np.isnan(nutrient_matrix)
+    missing_counts = missing_nutrients.sum(axis=1)
+    missing_cost = np.isnan(cost_values)
+    missing_density = np.isnan(densities)
+    missing_gi = np.isnan(gis)
+
+    # Impossible values
+    with np.errstate(invalid="ignore"):
+        negative = (
+            (nutrient_matrix < 0).any(axis=1)
+            | (cost_values < 0)
+            | (cost_qty_grams <= 0)
+            | (densities <= 0)
+            | (piece_masses <= 0)
+        )
+        gi_out_of_range = (gis < 0) | (gis > 100)
+    leaf_masses = np.nansum(nutrient_matrix, axis=1)
+    leaf_mass_exceeded = leaf_masses > 1.0 + LEAF_MASS_TOLERANCE
+
+    # Unit inconsistencies, where there is a quantity but it can't be converted
+    cost_unit_inconsistent = ~missing_cost & np.isnan(cost_qty_grams)
+    recipe_grams = snapshot["recipe_grams"]
+    recipe_unit_inconsistent = np.zeros(len(ingredient_ids), dtype=bool)
+    recipe_unit_inconsistent[snapshot["recipe_cols"][np.isnan(recipe_grams)]] = True
+    unconvertible_recipe_rows = int(np.isnan(recipe_grams).sum())
+
+    # Outliers, per nutrient
+    outliers, medians = find_outliers(nutrient_matrix, outlier_threshold)
+    outlier_rows, outlier_cols = np.nonzero(outliers)
+    outliers_by_nutrient = {}
+    for column in np.unique(outlier_cols).tolist():
+        rows_in_column = outlier_rows[outlier_cols == column]
+        outliers_by_nutrient[nutrient_names[column]] = {
+            "median": float(medians[column]),
+            "ingredient_ids": ingredient_ids[rows_in_column].tolist(),
+            "values": nutrient_matrix[rows_in_column, column].tolist(),
+        }
+
+    checks = {
+        "missing_nutrients": {
+            "ingredient_ids": _ids(ingredient_ids, missing_counts > 0),
+            "missing_counts": missing_counts[missing_counts > 0].tolist(),
+            "by_nutrient": dict(zip(nutrient_names, missing_nutrients.sum(axis=0).tolist())),
+        },
+        "missing_cost": {"ingredient_ids": _ids(ingredient_ids, missing_cost)},
+        "missing_density": {"ingredient_ids": _ids(ingredient_ids, missing_density)},
+        "missing_gi": {"ingredient_ids": _ids(ingredient_ids, missing_gi)},
+        "negative_values": {"ingredient_ids": _ids(ingredient_ids, negative)},
+        "gi_out_of_range": {"ingredient_ids": _ids(ingredient_ids, gi_out_of_range)},
+        "leaf_mass_exceeds_reference": {
+            "ingredient_ids": _ids(ingredient_ids, leaf_mass_exceeded),
+            "grams_per_gram": leaf_masses[leaf_mass_exceeded].tolist(),
+        },
+        "cost_unit_inconsistent": {"ingredient_ids": _ids(ingredient_ids, cost_unit_inconsistent)},
+        "recipe_unit_inconsistent": {
+            "ingredient_ids": _ids(ingredient_ids, recipe_unit_inconsistent),
+            "recipe_ingredients": unconvertible_recipe_rows,
+        },
+        "nutrient_unit_inconsistent": {
+            "ingredient_ids": sorted({row[0] for row in unconvertible_nutrient_rows}),
+            "rows": [
+                {"ingredient_id": row[0], "nutrient_id": row[1], "ntr_qty_unit": row[2], "ing_qty_unit": row[3]}
+                for row in unconvertible_nutrient_rows
+            ],
+        },
+        "nutrient_outliers": {
+            "ingredient_ids": ingredient_ids[np.unique(outlier_rows)].tolist(),
+            "by_nutrient": outliers_by_nutrient,
+        },
+    }
+    return {
+        "db_version": snapshot.db_version,
+        "num_ingredients": len(ingredient_ids),
+        "num_nutrients": len(nutrient_names),
+        "summary": {name: len(check["ingredient_ids"]) for name, check in checks.items()},
+        "checks": checks,
+    }
+
+
+def scan_database(
+    db_path: str = DB_PATH,
+    snapshot_path: str = SNAPSHOT_PATH,
+    outlier_threshold: float = OUTLIER_THRESHOLD,
+) -> dict:
+    """Scans the database for data quality issues, through an up to date snapshot."""
+    snapshot = load_snapshot(snapshot_path, db_path)
+    with DatabaseService(db_path) as db_service:
+        unconvertible_nutrient_rows = db_service.fetch_all_unconvertible_ingredient_nutrient_rows()
+    start = time.perf_counter()
+    report = scan_snapshot(snapshot, unconvertible_nutrient_rows, outlier_threshold)
+    report["scan_seconds"] = time.perf_counter() - start
+    return report
+
+
+def format_summary(report: dict) -> str:
+    """Returns a human readable summary of the report."""
+    lines = [f"Scanned {report['num_ingredients']} ingredients and {report['num_nutrients']} nutrients."]
+    lines += [f"  {name:<30}{count:>8}" for name, count in report["summary"].items()]
+    return "\n".join(lines)
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Scan the catalogue for data quality issues.")
+    parser.add_argument("--db", default=DB_PATH, help="Path to the database.")
+    parser.add_argument("--snapshot", default=SNAPSHOT_PATH, help="Path to the catalogue snapshot.")
+    parser.add_argument("--outlier-threshold", type=float, default=OUTLIER_THRESHOLD)
+    parser.add_argument("--output", help="Path to write the JSON report to, defaults to stdout.")
+    args = parser.parse_args()
+    report = scan_database(args.db, args.snapshot, args.outlier_threshold)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(format_summary(report), file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Glycaemic index and load of recipes, meals and days.
+
+The glycaemic load of a food is its glycaemic index times the grams of
+available carbohydrate it holds, over 100, where available carbohydrate is
+the carbohydrate less the fibre. Loads add up, so a recipe's load is the sum
+of its ingredients' loads, and a meal's or a day's is the sum of its
+recipes'. The glycaemic index of a mixed food is its load per gram of
+available carbohydrate, so is the carbohydrate-weighted mean of its
+ingredients' indices.
+
+The engine works on the snapshot arrays: one pass over the sparse recipe x
+ingredient matrix gives every recipe's available carbohydrate and load,
+which are cached, and meals and days are then gathered from the per-recipe
+arrays, so scoring a population of plans costs the same as scoring cost.
+"""
+
+import numpy as np
+
+from codiet.optimiser.catalogue import Catalogue
+from codiet.optimiser.snapshot import CatalogueSnapshot
+from codiet.utils.nutrients import CARBOHYDRATE_NUTRIENT_NAME, UNAVAILABLE_CARBOHYDRATE_NAMES
+
+
+def _weighted_gis(loads: np.ndarray, carbohydrate: np.ndarray) -> np.ndarray:
+    """Returns the glycaemic index of foods from their loads and available
+    carbohydrate, NaN where there is no carbohydrate."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(carbohydrate > 0, 100.0 * loads / carbohydrate, np.nan)
+
+
+class GlycaemicEngine:
+    """Calculates glycaemic index and load from a catalogue snapshot."""
+
+    def __init__(self, snapshot: CatalogueSnapshot, catalogue: Catalogue | None = None):
+        self.catalogue = catalogue if catalogue is not None else Catalogue.from_snapshot(snapshot)
+        # Sum the available carbohydrate leaves of every ingredient, per gram
+        nutrient_names = snapshot.nutrient_names
+        unavailable = {
+            nutrient_names.index(name) for name in UNAVAILABLE_CARBOHYDRATE_NAMES if name in nutrient_names
+        }
+        columns = [
+            column for column in snapshot.nutrient_groups.get(CARBOHYDRATE_NUTRIENT_NAME, [])
+            if column not in unavailable
+        ]
+        carbohydrate = snapshot["nutrient_matrix"][:, columns]
+        self.available_carbohydrate = np.nansum(carbohydrate, axis=1)
+        # Ingredients with no carbohydrate data at all can't be shown to have none
+        self.available_carbohydrate[np.isnan(carbohydrate).all(axis=1) & (len(columns) > 0)] = np.nan
+        self.gis = np.array(snapshot["ingredient_gis"], dtype=np.float64)
+        # Recipe totals are calculated on first use
+        self._recipe_carbohydrate: np.ndarray | None = None
+        self._recipe_indexed_carbohydrate: np.ndarray | None = None
+        self._recipe_loads: np.ndarray | None = None
+        self._recipe_loads_incomplete: np.ndarray | None = None
+
+    @property
+    def ingredient_loads(self) -> np.ndarray:
+        """Returns the glycaemic load of one gram of every ingredient.
+        Ingredients without carbohydrate have no load, whatever their GI."""
+        loads = self.gis * self.available_carbohydrate / 100.0
+        loads[self.available_carbohydrate == 0] = 0.0
+        return loads
+
+    @property
+    def recipe_carbohydrate(self) -> np.ndarray:
+        """Returns the grams of available carbohydrate in every recipe."""
+        if self._recipe_carbohydrate is None:
+            self._calculate_recipe_loads()
+        return self._recipe_carbohydrate  # type: ignore
+
+    @property
+    def recipe_loads(self) -> np.ndarray:
+        """Returns the glycaemic load of every recipe, in catalogue recipe
+        order. Ingredients with a missing GI or quantity contribute nothing."""
+        if self._recipe_loads is None:
+            self._calculate_recipe_loads()
+        return self._recipe_loads  # type: ignore
+
+    @property
+    def recipe_loads_incomplete(self) -> np.ndarray:
+        """Returns a boolean mask of the recipes whose load is incomplete."""
+        if self._recipe_loads_incomplete is None:
+            self._calculate_recipe_loads()
+        return self._recipe_loads_incomplete  # type: ignore
+
+    @property
+    def recipe_gis(self) -> np.ndarray:
+        """Returns the glycaemic index of every recipe, over the ingredients
+        with a known GI, NaN for recipes without available carbohydrate."""
+        return _weighted_gis(self.recipe_loads, self.recipe_indexed_carbohydrate)
+
+    @property
+    def recipe_indexed_carbohydrate(self) -> np.ndarray:
+        """Returns the grams of available carbohydrate in every recipe from
+        the ingredients with a known GI, which its GI is weighted over."""
+        if self._recipe_indexed_carbohydrate is None:
+            self._calculate_recipe_loads()
+        return self._recipe_indexed_carbohydrate  # type: ignore
+
+    def meal_loads(self, plans: np.ndarray) -> np.ndarray:
+        """Returns the glycaemic load of every meal of each plan.
+
+        Args:
+            plans: An integer array with one row per plan, holding the
+                catalogue recipe positions chosen for each meal slot.
+        """
+        return self.recipe_loads[plans]
+
+    def meal_gis(self, plans: np.ndarray) -> np.ndarray:
+        """Returns the glycaemic index of every meal of each plan."""
+        return self.recipe_gis[plans]
+
+    def day_loads(self, plans: np.ndarray, meals_per_day: int) -> np.ndarray:
+        """Returns the (plan x day) glycaemic load of each day of each plan,
+        where the plans hold their meal slots day by day."""
+        return self.meal_loads(plans).reshape(len(plans), -1, meals_per_day).sum(axis=2)
+
+    def day_gis(self, plans: np.ndarray, meals_per_day: int) -> np.ndarray:
+        """Returns the (plan x day) glycaemic index of each day of each plan."""
+        carbohydrate = self.recipe_indexed_carbohydrate[plans].reshape(len(plans), -1, meals_per_day).sum(axis=2)
+        return _weighted_gis(self.day_loads(plans, meals_per_day), carbohydrate)
+
+    def _calculate_recipe_loads(self) -> None:
+        """Totals every recipe's available carbohydrate and load, and caches them."""
+        catalogue = self.catalogue
+        cols = catalogue.recipe_cols
+        carbohydrate = catalogue.recipe_grams * self.available_carbohydrate[cols]
+        loads = catalogue.recipe_grams * self.ingredient_loads[cols]
+        missing = np.isnan(loads)
+        rows, num_recipes = catalogue.recipe_rows, catalogue.num_recipes
+        carbohydrate = np.where(np.isnan(carbohydrate), 0.0, carbohydrate)
+        self._recipe_carbohydrate = np.bincount(rows, weights=carbohydrate, minlength=num_recipes)
+        self._recipe_indexed_carbohydrate = np.bincount(
+            rows, weights=np.where(missing, 0.0, carbohydrate), minlength=num_recipes
+        )
+        self._recipe_loads = np.bincount(rows, weights=np.where(missing, 0.0, loads), minlength=num_recipes)
+        self._recipe_loads_incomplete = np.bincount(rows, weights=missing, minlength=num_recipes) > 0
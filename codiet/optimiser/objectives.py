@@ -0,0 +1,62 @@
+"""Objectives for the meal plan optimiser.
+
+Each objective is called with a population of candidate plans, as an integer
+array with one row per plan holding the catalogue recipe position chosen for
+each meal slot, and returns one value per plan to be minimised.
+"""
+
+import numpy as np
+
+from codiet.optimiser.costs import CostEngine
+from codiet.optimiser.glycaemic import GlycaemicEngine
+
+
+class CostObjective:
+    """Minimise the total cost of each plan."""
+
+    name = "cost"
+
+    def __init__(self, cost_engine: CostEngine):
+        # Take a copy, so repricing doesn't change the objective mid-solve
+        self.recipe_costs = cost_engine.recipe_costs.copy()
+
+    def __call__(self, plans: np.ndarray) -> np.ndarray:
+        return self.recipe_costs[plans].sum(axis=1)
+
+
+def evaluate_plans(plans: np.ndarray, objectives: list) -> np.ndarray:
+    """Returns a (plans x objectives) array of objective values."""
+    return np.column_stack([objective(plans) for objective in objectives])
+
+
+class NutrientTargetObjective:
+    """Minimise the mean relative deviation of each day's nutrient totals
+    from the daily targets. Plans hold their meal slots day by day."""
+
+    name = "nutrients"
+
+    def __init__(self, recipe_totals: np.ndarray, daily_targets: np.ndarray, meals_per_day: int):
+        # The (recipe x target) totals of each recipe
+        self.recipe_totals = np.asarray(recipe_totals, dtype=np.float64)
+        self.daily_targets = np.asarray(daily_targets, dtype=np.float64)
+        self.meals_per_day = meals_per_day
+
+    def __call__(self, plans: np.ndarray) -> np.ndarray:
+        totals = self.recipe_totals[plans]
+        days = totals.reshape(len(plans), -1, self.meals_per_day, totals.shape[-1]).sum(axis=2)
+        deviations = np.abs(days - self.daily_targets) / self.daily_targets
+        return deviations.mean(axis=(1, 2))
+
+
+class GlycaemicLoadObjective:
+    """Minimise the mean daily glycaemic load of each plan."""
+
+    name = "glycaemic_load"
+
+    def __init__(self, glycaemic_engine: GlycaemicEngine, days: int):
+        # Take a copy, as for costs
+        self.recipe_loads = glycaemic_engine.recipe_loads.copy()
+        self.days = days
+
+    def __call__(self, plans: np.ndarray) -> np.ndarray:
+        return self.recipe_loads[plans].sum(axis=1) / self.days
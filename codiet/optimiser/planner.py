@@ -0,0 +1,218 @@
+"""Greedy meal planning against the catalogue snapshot.
+
+A plan profile describes the meal times to fill, the number of days, the
+flags and tags every recipe must have, the recipes to leave out and, for
+the plan optimiser, the daily nutrient targets and glycaemic load goals.
+The candidate pre-filter narrows each meal slot down to the recipes which
+could fill it, and the planner fills each slot with the cheapest
+candidate, without using any recipe more than the profile allows. It works
+entirely on the snapshot arrays, so it needs no database connection and
+can run in worker processes.
+"""
+
+import hashlib
+import json
+
+import numpy as np
+
+from codiet.utils.time import convert_time_string_to_minutes, convert_minutes_to_time_string
+from codiet.optimiser.catalogue import Catalogue
+from codiet.optimiser.costs import CostEngine
+from codiet.optimiser.glycaemic import GlycaemicEngine
+from codiet.optimiser.objectives import CostObjective, evaluate_plans
+from codiet.optimiser.portions import nutrient_target_coefficients
+from codiet.optimiser.prefilter import CandidatePrefilter
+from codiet.optimiser.snapshot import CatalogueSnapshot
+
+# The planner of a worker process, set up once by init_planner_worker
+_worker_planner: "MealPlanner | None" = None
+
+
+class PlanProfile:
+    """The requirements for one meal plan."""
+
+    def __init__(
+        self,
+        name: str,
+        meal_times: list[int],
+        days: int = 1,
+        flags: list[str] | None = None,
+        max_repeats: int = 1,
+        nutrient_targets: dict[str, float] | None = None,
+        excluded_recipe_ids: list[int] | None = None,
+        tags: list[str] | None = None,
+        meal_tags: dict[int, list[str]] | None = None,
+        minimise_glycaemic_load: bool = False,
+        max_daily_glycaemic_load: float | None = None,
+    ):
+        self.name = name
+        # Meal times, as minutes past midnight
+        self.meal_times = list(meal_times)
+        self.days = days
+        self.flags = list(flags) if flags is not None else []
+        self.max_repeats = max_repeats
+        # Daily targets, keyed by nutrient name, or "energy" in kcal
+        self.nutrient_targets = dict(nutrient_targets) if nutrient_targets is not None else {}
+        self.excluded_recipe_ids = list(excluded_recipe_ids) if excluded_recipe_ids is not None else []
+        # Tags every recipe must have, and tags the recipes at each meal time must have
+        self.tags = list(tags) if tags is not None else []
+        self.meal_tags = {minute: list(names) for minute, names in (meal_tags or {}).items()}
+        # Glycaemic load, as an optimiser objective and a cap on each day
+        self.minimise_glycaemic_load = minimise_glycaemic_load
+        self.max_daily_glycaemic_load = max_daily_glycaemic_load
+
+    @property
+    def uses_glycaemic_load(self) -> bool:
+        """Returns True if the profile's plans depend on glycaemic load."""
+        return self.minimise_glycaemic_load or self.max_daily_glycaemic_load is not None
+
+    @property
+    def num_slots(self) -> int:
+        """Returns the number of meal slots in the plan."""
+        return self.days * len(self.meal_times)
+
+    @property
+    def family(self) -> str:
+        """Returns the key shared by every profile with the same meal slots,
+        whose plans can seed each other."""
+        return json.dumps({"meal_times": self.meal_times, "days": self.days})
+
+    def signature(self) -> str:
+        """Returns a hash of everything which defines the planning problem.
+        The name isn't part of the problem."""
+        problem = {
+            "meal_times": self.meal_times,
+            "days": self.days,
+            "flags": sorted(self.flags),
+            "max_repeats": self.max_repeats,
+            "nutrient_targets": self.nutrient_targets,
+            "excluded_recipe_ids": sorted(self.excluded_recipe_ids),
+            "tags": sorted(self.tags),
+            "meal_tags": {str(minute): sorted(names) for minute, names in self.meal_tags.items()},
+            "minimise_glycaemic_load": self.minimise_glycaemic_load,
+            "max_daily_glycaemic_load": self.max_daily_glycaemic_load,
+        }
+        return hashlib.sha256(json.dumps(problem, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def to_dict(self) -> dict:
+        """Returns the profile as a dict, with meal times as "HH:MM" strings."""
+        return {
+            "name": self.name,
+            "meal_times": [convert_minutes_to_time_string(minute) for minute in self.meal_times],
+            "days": self.days,
+            "flags": self.flags,
+            "max_repeats": self.max_repeats,
+            "nutrient_targets": self.nutrient_targets,
+            "excluded_recipe_ids": self.excluded_recipe_ids,
+            "tags": self.tags,
+            "meal_tags": {
+                convert_minutes_to_time_string(minute): names for minute, names in self.meal_tags.items()
+            },
+            "minimise_glycaemic_load": self.minimise_glycaemic_load,
+            "max_daily_glycaemic_load": self.max_daily_glycaemic_load,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PlanProfile":
+        """Builds a profile from a dict, with meal times as "HH:MM" strings."""
+        return cls(
+            name=data["name"],
+            meal_times=[convert_time_string_to_minutes(time) for time in data["meal_times"]],
+            days=data.get("days", 1),
+            flags=data.get("flags"),
+            max_repeats=data.get("max_repeats", 1),
+            nutrient_targets=data.get("nutrient_targets"),
+            excluded_recipe_ids=data.get("excluded_recipe_ids"),
+            tags=data.get("tags"),
+            meal_tags={
+                convert_time_string_to_minutes(time): names
+                for time, names in data.get("meal_tags", {}).items()
+            },
+            minimise_glycaemic_load=data.get("minimise_glycaemic_load", False),
+            max_daily_glycaemic_load=data.get("max_daily_glycaemic_load"),
+        )
+
+
+class MealPlanner:
+    """Builds meal plans from a catalogue snapshot."""
+
+    def __init__(self, snapshot: CatalogueSnapshot):
+        self.snapshot = snapshot
+        self.catalogue = Catalogue.from_snapshot(snapshot)
+        self.cost_engine = CostEngine(self.catalogue)
+        num_recipes = self.catalogue.num_recipes
+        # A recipe has a flag if every one of its ingredients has it
+        self.recipe_flag_bits = np.full(num_recipes, np.iinfo(np.uint64).max, dtype=np.uint64)
+        np.bitwise_and.at(
+            self.recipe_flag_bits,
+            self.catalogue.recipe_rows,
+            snapshot["flag_true_bits"][self.catalogue.recipe_cols],
+        )
+        # Recipes without ingredients can't be shown to have any flag
+        has_ingredients = np.bincount(self.catalogue.recipe_rows, minlength=num_recipes) > 0
+        self.recipe_flag_bits[~has_ingredients] = 0
+        # The nutrient target totals of each recipe, cached by target names
+        self._recipe_totals: dict[tuple[str, ...], np.ndarray] = {}
+        self.glycaemic_engine = GlycaemicEngine(snapshot, self.catalogue)
+        self.prefilter = CandidatePrefilter(
+            snapshot, self.catalogue, self.cost_engine, self.recipe_flag_bits, self.glycaemic_engine
+        )
+
+    def slot_candidates(self, profile: PlanProfile) -> dict[int, np.ndarray]:
+        """Returns the pre-filtered candidate positions of each meal time in
+        the profile, cheapest first."""
+        return self.prefilter.filter(profile)[0]
+
+    def recipe_target_totals(self, target_names: list[str]) -> np.ndarray:
+        """Returns the (recipe x target) totals of each recipe, where a target
+        is a leaf or group nutrient, or the energy.
+        Raises ValueError for an unknown target."""
+        key = tuple(target_names)
+        if key not in self._recipe_totals:
+            coefficients = nutrient_target_coefficients(self.snapshot, target_names)
+            # Missing nutrient data and unconvertible quantities contribute nothing
+            contents = np.nan_to_num(self.snapshot["nutrient_matrix"]) @ coefficients.T
+            entry_totals = np.nan_to_num(self.catalogue.recipe_grams)[:, None] * contents[self.catalogue.recipe_cols]
+            totals = np.zeros((self.catalogue.num_recipes, len(target_names)))
+            np.add.at(totals, self.catalogue.recipe_rows, entry_totals)
+            self._recipe_totals[key] = totals
+        return self._recipe_totals[key]
+
+    def plan(self, profile: PlanProfile) -> dict:
+        """Returns the cheapest greedy plan for the profile, as a dict of the
+        profile name, the chosen recipe IDs in slot order, the meal times and
+        the total cost.
+        Raises ValueError if a meal slot can't be filled."""
+        candidates = self.slot_candidates(profile)
+        uses = np.zeros(self.catalogue.num_recipes, dtype=np.int64)
+        chosen = []
+        for day in range(profile.days):
+            for minute in profile.meal_times:
+                # Take the cheapest recipe which hasn't been used up
+                available = candidates[minute][uses[candidates[minute]] < profile.max_repeats]
+                if len(available) == 0:
+                    raise ValueError(
+                        f"No recipe can fill the {convert_minutes_to_time_string(minute)} "
+                        f"meal on day {day + 1} of {profile.name}."
+                    )
+                uses[available[0]] += 1
+                chosen.append(available[0])
+        plans = np.array([chosen], dtype=np.int64)
+        cost = evaluate_plans(plans, [CostObjective(self.cost_engine)])[0, 0]
+        return {
+            "name": profile.name,
+            "recipe_ids": [int(id) for id in self.catalogue.recipe_ids[chosen]],
+            "meal_times": [convert_minutes_to_time_string(minute) for minute in profile.meal_times],
+            "cost": float(cost),
+        }
+
+
+def init_planner_worker(snapshot_path: str) -> None:
+    """Maps the snapshot and builds the planner in a worker process."""
+    global _worker_planner
+    _worker_planner = MealPlanner(CatalogueSnapshot(snapshot_path))
+
+
+def plan_in_worker(profile: dict) -> dict:
+    """Plans a profile, given as a dict, with the worker's planner."""
+    return _worker_planner.plan(PlanProfile.from_dict(profile))  # type: ignore
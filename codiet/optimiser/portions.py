@@ -0,0 +1,284 @@
+"""Recipe scaling and portion fitting.
+
+Each recipe ingredient quantity may move within its tolerance band. The
+portion fitter chooses the grams of every ingredient, within its band, so
+that each recipe's nutrient profile comes as close as possible to a target,
+such as a set energy, or energy and macros. Each recipe is a small bounded
+least-squares problem over its ingredients' nutrient contents, and all the
+recipes are solved together as one batch, as a single block-diagonal
+problem, by accelerated projected gradient descent. Each recipe has its own
+step size, so small and large recipes converge at the same rate.
+
+Targets are matched by relative error, so energy in kcal and macros in
+grams count equally. Where more than one set of quantities hits the target,
+descending from the recipe's own quantities keeps the fitted quantities
+close to the ones the recipe was written with.
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+from codiet.models.ingredients import IngredientQuantity
+from codiet.optimiser.catalogue import Catalogue, tolerance_bounds
+from codiet.optimiser.snapshot import CatalogueSnapshot
+from codiet.utils.nutrients import ENERGY_COEFFICIENTS, ENERGY_NUTRIENT_NAME
+from codiet.utils.units import grams_per_unit
+
+# The iteration limit of the solver
+MAX_ITERATIONS = 500
+# A recipe has converged once none of its relative errors changes by more than this in an iteration
+TOLERANCE = 1e-5
+# The number of iterations between dropping converged recipes from the batch
+COMPACT_INTERVAL = 10
+
+
+def nutrient_target_coefficients(snapshot: CatalogueSnapshot, target_names: Sequence[str]) -> np.ndarray:
+    """Returns the (target x leaf nutrient) matrix turning grams of each leaf
+    nutrient into each target quantity. A target can be a leaf or group
+    nutrient, in grams, or the energy, in kcal.
+    Raises ValueError for an unknown target."""
+    nutrient_names = snapshot.nutrient_names
+    nutrient_groups = snapshot.nutrient_groups
+
+    def row(name: str) -> np.ndarray:
+        coefficients = np.zeros(len(nutrient_names))
+        if name in nutrient_groups:
+            coefficients[nutrient_groups[name]] = 1.0
+        elif name in nutrient_names:
+            coefficients[nutrient_names.index(name)] = 1.0
+        elif name == ENERGY_NUTRIENT_NAME:
+            for energy_name, kcal_per_gram in ENERGY_COEFFICIENTS.items():
+                if energy_name in nutrient_groups or energy_name in nutrient_names:
+                    coefficients += kcal_per_gram * row(energy_name)
+        else:
+            raise ValueError(f"Unknown nutrient target {name}.")
+        return coefficients
+
+    return np.array([row(name) for name in target_names]).reshape(len(target_names), -1)
+
+
+def _batch_residuals(
+    rows: np.ndarray, weighted_contents: np.ndarray, weighted_targets: np.ndarray, x: np.ndarray
+) -> np.ndarray:
+    """Returns the (recipe x target) weighted errors of the quantities."""
+    residuals = -weighted_targets
+    for target in range(weighted_targets.shape[1]):
+        residuals[:, target] += np.bincount(
+            rows, weights=weighted_contents[:, target] * x, minlength=len(weighted_targets)
+        )
+    return residuals
+
+
+def _solve_batch(
+    rows: np.ndarray,
+    weighted_contents: np.ndarray,
+    weighted_targets: np.ndarray,
+    steps: np.ndarray,
+    lower: np.ndarray,
+    upper: np.ndarray,
+    x: np.ndarray,
+    max_iterations: int,
+    tolerance: float,
+) -> np.ndarray:
+    """Runs accelerated projected gradient descent on a batch of recipes, and
+    returns the fitted quantities. Recipes whose errors have stopped moving
+    are dropped from the batch as it runs, so the iterations get cheaper as
+    the batch converges."""
+    x = x.copy()
+    # The recipe ingredients and recipes still being fitted
+    entries = np.arange(len(x))
+    recipes = np.arange(len(weighted_targets))
+    x_active = x
+    x_residuals = _batch_residuals(rows, weighted_contents, weighted_targets, x_active)
+    y, y_residuals = x_active, x_residuals
+    momentum = 1.0
+    for iteration in range(max_iterations):
+        gradient = (weighted_contents * y_residuals[rows]).sum(axis=1)
+        x_next = np.clip(y - steps * gradient, lower, upper)
+        next_residuals = _batch_residuals(rows, weighted_contents, weighted_targets, x_next)
+        next_momentum = (1 + np.sqrt(1 + 4 * momentum**2)) / 2
+        # The residuals are linear in the quantities, so extrapolate them with y
+        beta = (momentum - 1) / next_momentum
+        y = x_next + beta * (x_next - x_active)
+        y_residuals = next_residuals + beta * (next_residuals - x_residuals)
+        moving = np.abs(next_residuals - x_residuals).max(axis=1, initial=0.0) >= tolerance
+        x_active, x_residuals, momentum = x_next, next_residuals, next_momentum
+        if not moving.any():
+            break
+        # Every few iterations, drop the recipes which have converged
+        if iteration % COMPACT_INTERVAL == COMPACT_INTERVAL - 1 and not moving.all():
+            x[entries] = x_active
+            keep = moving[rows]
+            # Renumber the remaining recipes from zero
+            new_rows = np.cumsum(moving) - 1
+            entries, recipes = entries[keep], recipes[moving]
+            rows = new_rows[rows[keep]]
+            weighted_contents, steps = weighted_contents[keep], steps[keep]
+            lower, upper = lower[keep], upper[keep]
+            weighted_targets = weighted_targets[moving]
+            x_active, y = x_active[keep], y[keep]
+            x_residuals, y_residuals = x_residuals[moving], y_residuals[moving]
+    x[entries] = x_active
+    return x
+
+
+class PortionFitter:
+    """Fits recipe quantities within their tolerances to nutrient targets."""
+
+    def __init__(self, snapshot: CatalogueSnapshot):
+        self.snapshot = snapshot
+        self.catalogue = Catalogue.from_snapshot(snapshot)
+        # Missing nutrient data contributes nothing
+        self.nutrient_matrix = np.nan_to_num(snapshot["nutrient_matrix"])
+        # The target contents of each ingredient, cached by target names
+        self._contents: dict[tuple[str, ...], np.ndarray] = {}
+
+    def target_coefficients(self, target_names: Sequence[str]) -> np.ndarray:
+        """Returns the (target x leaf nutrient) matrix turning grams of each
+        leaf nutrient into each target quantity.
+        Raises ValueError for an unknown target."""
+        return nutrient_target_coefficients(self.snapshot, target_names)
+
+    def target_contents(self, target_names: Sequence[str]) -> np.ndarray:
+        """Returns the (ingredient x target) matrix of each target quantity
+        in one gram of each ingredient."""
+        key = tuple(target_names)
+        if key not in self._contents:
+            self._contents[key] = self.nutrient_matrix @ self.target_coefficients(target_names).T
+        return self._contents[key]
+
+    def fit(
+        self,
+        rows: np.ndarray,
+        cols: np.ndarray,
+        grams: np.ndarray,
+        lower: np.ndarray,
+        upper: np.ndarray,
+        num_recipes: int,
+        target_names: Sequence[str],
+        targets: np.ndarray,
+        max_iterations: int = MAX_ITERATIONS,
+        tolerance: float = TOLERANCE,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Fits a batch of recipes to their targets.
+
+        Args:
+            rows: The recipe of each recipe ingredient, from 0 to num_recipes - 1.
+            cols: The ingredient position of each recipe ingredient.
+            grams: The starting grams of each recipe ingredient.
+            lower: The lowest grams of each recipe ingredient.
+            upper: The highest grams of each recipe ingredient.
+            num_recipes: The number of recipes in the batch.
+            target_names: The nutrients, or energy, to fit.
+            targets: The (recipe x target) quantities to fit to, or one row of
+                targets for every recipe. NaN leaves a target free.
+            max_iterations: The iteration limit.
+            tolerance: The largest change in any relative error at which to stop.
+
+        Returns:
+            A tuple of the fitted grams of each recipe ingredient, NaN where
+            the starting grams are unknown, and the (recipe x target)
+            quantities the fitted recipes reach.
+        """
+        grams = np.asarray(grams, dtype=np.float64)
+        targets = np.broadcast_to(np.asarray(targets, dtype=np.float64), (num_recipes, len(target_names)))
+        # Quantities which couldn't be converted to grams are left out
+        valid = np.isfinite(grams) & np.isfinite(lower) & np.isfinite(upper)
+        lower = np.where(valid, np.minimum(lower, grams), 0.0)
+        upper = np.where(valid, np.maximum(upper, grams), 0.0)
+        contents = self.target_contents(target_names)[cols] * valid[:, None]
+
+        # Weight each target by its size, so the errors are relative
+        weights = np.where(np.isfinite(targets), 1.0 / np.maximum(np.abs(targets), 1e-9), 0.0)
+        weighted_targets = np.nan_to_num(targets) * weights
+        weighted_contents = contents * weights[rows]
+        # Scale each quantity by the width of its band, so that every quantity
+        # crosses its band at the same rate, and give each recipe a step size
+        # of one over a bound on the Lipschitz constant of its scaled problem
+        widths = upper - lower
+        lipschitz = np.bincount(
+            rows, weights=widths**2 * (weighted_contents**2).sum(axis=1), minlength=num_recipes
+        )
+        steps = widths**2 * np.divide(1.0, lipschitz, out=np.zeros(num_recipes), where=lipschitz > 0)[rows]
+
+        x = _solve_batch(
+            rows=rows,
+            weighted_contents=weighted_contents,
+            weighted_targets=weighted_targets,
+            steps=steps,
+            lower=lower,
+            upper=upper,
+            x=np.clip(np.where(valid, grams, 0.0), lower, upper),
+            max_iterations=max_iterations,
+            tolerance=tolerance,
+        )
+        achieved = np.empty((num_recipes, len(target_names)))
+        for target in range(len(target_names)):
+            achieved[:, target] = np.bincount(rows, weights=contents[:, target] * x, minlength=num_recipes)
+        return np.where(valid, x, np.nan), achieved
+
+    def fit_recipes(
+        self, recipe_ids: Sequence[int], target_names: Sequence[str], targets: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Fits catalogue recipes to their targets, within their tolerances.
+
+        Returns:
+            A tuple of the recipe position in recipe_ids, the ingredient ID and
+            the fitted grams of each recipe ingredient, and the (recipe x
+            target) quantities the fitted recipes reach.
+        """
+        catalogue = self.catalogue
+        # Map the chosen recipes onto rows of the batch
+        batch_rows = np.full(catalogue.num_recipes, -1, dtype=np.int64)
+        batch_rows[catalogue.recipe_positions(recipe_ids)] = np.arange(len(recipe_ids))
+        rows = batch_rows[catalogue.recipe_rows]
+        selected = rows >= 0
+        cols = catalogue.recipe_cols[selected]
+        grams, achieved = self.fit(
+            rows=rows[selected],
+            cols=cols,
+            grams=catalogue.recipe_grams[selected],
+            lower=catalogue.recipe_grams_lower[selected],
+            upper=catalogue.recipe_grams_upper[selected],
+            num_recipes=len(recipe_ids),
+            target_names=target_names,
+            targets=targets,
+        )
+        return rows[selected], catalogue.ingredient_ids[cols], grams, achieved
+
+    def fit_recipe_quantities(
+        self, ingredient_quantities: Sequence[IngredientQuantity], targets: dict[str, float]
+    ) -> list[float | None]:
+        """Fits the quantities of one recipe, as held in the recipe editor, to
+        the targets, keyed by nutrient name or energy.
+        Returns each fitted quantity in its own unit, or None where it can't
+        be converted to grams."""
+        catalogue = self.catalogue
+        cols = catalogue.ingredient_positions([quantity.ingredient.id for quantity in ingredient_quantities])
+        factors = grams_per_unit(
+            [quantity.qty_unit for quantity in ingredient_quantities],
+            catalogue.densities[cols],
+            catalogue.piece_masses[cols],
+        )
+        values = np.array(
+            [np.nan if quantity.qty_value is None else quantity.qty_value for quantity in ingredient_quantities],
+            dtype=np.float64,
+        )
+        lower, upper = tolerance_bounds(
+            values,
+            np.array([quantity.lower_tol or 0.0 for quantity in ingredient_quantities]),
+            np.array([quantity.upper_tol or 0.0 for quantity in ingredient_quantities]),
+        )
+        grams, _ = self.fit(
+            rows=np.zeros(len(cols), dtype=np.int64),
+            cols=cols,
+            grams=values * factors,
+            lower=lower * factors,
+            upper=upper * factors,
+            num_recipes=1,
+            target_names=list(targets),
+            targets=np.array(list(targets.values()), dtype=np.float64),
+        )
+        fitted = grams / factors
+        return [None if np.isnan(value) else float(value) for value in fitted]
@@ -0,0 +1,190 @@
+"""Candidate pre-filtering before meal planning.
+
+Before any search starts, each meal slot's candidates are narrowed down to
+the recipes which could ever fill it, in a fixed series of stages over the
+snapshot arrays:
+
+- served: the recipe has a serve window covering the meal time,
+- flags: every ingredient has each flag the profile requires,
+- tags: the recipe has each tag the profile requires for the meal, or a
+  tag beneath it in the tag tree,
+- cost: every ingredient has usable cost data,
+- nutrients: every ingredient has data towards each of the profile's
+  nutrient targets, if it has any,
+- glycaemic: every ingredient's glycaemic load is known, if the profile
+  minimises or caps it,
+- excluded: the profile doesn't exclude the recipe,
+- duplicates: no cheaper candidate has exactly the same ingredient
+  quantities, since eating one is the same as eating the other.
+
+Each stage records how many candidates are left, so the report shows where
+the search space shrank, along with the size of the search space, the
+product of the number of candidates of every slot, before and after.
+"""
+
+import time
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from codiet.utils.time import convert_minutes_to_time_string
+from codiet.optimiser.catalogue import Catalogue
+from codiet.optimiser.costs import CostEngine
+from codiet.optimiser.glycaemic import GlycaemicEngine
+from codiet.optimiser.portions import nutrient_target_coefficients
+from codiet.optimiser.snapshot import CatalogueSnapshot
+
+if TYPE_CHECKING:
+    from codiet.optimiser.planner import PlanProfile
+
+
+class CandidatePrefilter:
+    """Narrows down the candidate recipes of each meal slot of a profile."""
+
+    def __init__(
+        self,
+        snapshot: CatalogueSnapshot,
+        catalogue: Catalogue,
+        cost_engine: CostEngine,
+        recipe_flag_bits: np.ndarray,
+        glycaemic_engine: GlycaemicEngine,
+    ):
+        self.snapshot = snapshot
+        self.catalogue = catalogue
+        self.cost_engine = cost_engine
+        self.recipe_flag_bits = recipe_flag_bits
+        self.glycaemic_engine = glycaemic_engine
+        # The tags of each recipe, as a (recipe x tag) mask
+        self.recipe_tags = np.zeros((self.catalogue.num_recipes, len(self.snapshot.tag_names)), dtype=bool)
+        self.recipe_tags[self.snapshot["recipe_tag_rows"], self.snapshot["recipe_tag_cols"]] = True
+        # Built on first use, as only some profiles need them
+        self._composition_groups: np.ndarray | None = None
+        self._nutrient_complete: dict[tuple[str, ...], np.ndarray] = {}
+
+    def served_mask(self, minute: int) -> np.ndarray:
+        """Returns a boolean mask of the recipes served at the given minute."""
+        starts = self.snapshot["serve_time_starts"]
+        ends = self.snapshot["serve_time_ends"]
+        # Windows which end before they start wrap past midnight
+        in_window = np.where(
+            starts <= ends,
+            (starts <= minute) & (minute <= ends),
+            (starts <= minute) | (minute <= ends),
+        )
+        served = np.zeros(self.catalogue.num_recipes, dtype=bool)
+        served[self.snapshot["serve_time_rows"][in_window]] = True
+        return served
+
+    def tag_mask(self, tag_names: list[str]) -> np.ndarray:
+        """Returns a boolean mask of the recipes with every tag, where a tag
+        is matched by itself or any tag beneath it.
+        Raises ValueError for an unknown tag."""
+        mask = np.ones(self.catalogue.num_recipes, dtype=bool)
+        all_tag_names = self.snapshot.tag_names
+        for tag_name in tag_names:
+            if tag_name not in all_tag_names:
+                raise ValueError(f"Unknown recipe tag {tag_name}.")
+            columns = [
+                i for i, name in enumerate(all_tag_names)
+                if name == tag_name or name.startswith(tag_name + "/")
+            ]
+            mask &= self.recipe_tags[:, columns].any(axis=1)
+        return mask
+
+    def nutrient_complete(self, target_names: list[str]) -> np.ndarray:
+        """Returns a boolean mask of the recipes whose every ingredient has
+        data for at least one of the nutrients each target depends on.
+        Recipes without ingredients have no nutrient data."""
+        key = tuple(target_names)
+        if key not in self._nutrient_complete:
+            has_data = ~np.isnan(self.snapshot["nutrient_matrix"])
+            depends_on = nutrient_target_coefficients(self.snapshot, target_names) != 0
+            # Count the known nutrients each ingredient has towards each target
+            known = has_data.astype(np.float64) @ depends_on.T
+            ingredient_complete = (known > 0).all(axis=1)
+            num_recipes = self.catalogue.num_recipes
+            rows = self.catalogue.recipe_rows
+            incomplete = np.bincount(
+                rows, weights=~ingredient_complete[self.catalogue.recipe_cols], minlength=num_recipes
+            )
+            has_ingredients = np.bincount(rows, minlength=num_recipes) > 0
+            self._nutrient_complete[key] = has_ingredients & (incomplete == 0)
+        return self._nutrient_complete[key]
+
+    @property
+    def composition_groups(self) -> np.ndarray:
+        """Returns a group number for each recipe, shared by the recipes with
+        exactly the same ingredient quantities."""
+        if self._composition_groups is None:
+            catalogue = self.catalogue
+            order = np.lexsort((catalogue.recipe_cols, catalogue.recipe_rows))
+            bounds = np.cumsum(np.bincount(catalogue.recipe_rows, minlength=catalogue.num_recipes))[:-1]
+            cols = np.split(catalogue.recipe_cols[order], bounds)
+            grams = np.split(catalogue.recipe_grams[order], bounds)
+            groups: dict[bytes, int] = {}
+            self._composition_groups = np.array(
+                [groups.setdefault(c.tobytes() + g.tobytes(), len(groups)) for c, g in zip(cols, grams)],
+                dtype=np.int64,
+            )
+        return self._composition_groups
+
+    def filter(self, profile: "PlanProfile") -> tuple[dict[int, np.ndarray], dict]:
+        """Returns the candidate positions of each meal time in the profile,
+        cheapest first, and a report of how many candidates each stage left.
+        Raises ValueError for an unknown flag, tag or nutrient target."""
+        start = time.perf_counter()
+        num_recipes = self.catalogue.num_recipes
+        flag_mask = self.snapshot.flag_mask(profile.flags)
+        has_flags = (self.recipe_flag_bits & flag_mask) == flag_mask
+        has_cost = ~self.cost_engine.recipe_costs_incomplete
+        has_nutrients = (
+            self.nutrient_complete(list(profile.nutrient_targets)) if profile.nutrient_targets
+            else np.ones(num_recipes, dtype=bool)
+        )
+        has_glycaemic_load = (
+            ~self.glycaemic_engine.recipe_loads_incomplete if profile.uses_glycaemic_load
+            else np.ones(num_recipes, dtype=bool)
+        )
+        included = np.ones(num_recipes, dtype=bool)
+        excluded_ids = [id for id in profile.excluded_recipe_ids if id in self.catalogue.recipe_index]
+        included[[self.catalogue.recipe_index[id] for id in excluded_ids]] = False
+
+        candidates = {}
+        stages = {}
+        for minute in dict.fromkeys(profile.meal_times):
+            counts = {"recipes": num_recipes}
+            mask = self.served_mask(minute)
+            counts["served"] = int(mask.sum())
+            mask &= has_flags
+            counts["flags"] = int(mask.sum())
+            mask &= self.tag_mask(profile.tags + profile.meal_tags.get(minute, []))
+            counts["tags"] = int(mask.sum())
+            mask &= has_cost
+            counts["cost"] = int(mask.sum())
+            mask &= has_nutrients
+            counts["nutrients"] = int(mask.sum())
+            mask &= has_glycaemic_load
+            counts["glycaemic"] = int(mask.sum())
+            mask &= included
+            counts["excluded"] = int(mask.sum())
+            positions = np.flatnonzero(mask)
+            positions = positions[np.argsort(self.cost_engine.recipe_costs[positions], kind="stable")]
+            # Keep the first, so cheapest, of each group of identical recipes
+            _, first = np.unique(self.composition_groups[positions], return_index=True)
+            positions = positions[np.sort(first)]
+            counts["duplicates"] = len(positions)
+            candidates[minute] = positions
+            stages[convert_minutes_to_time_string(minute)] = counts
+
+        slot_counts = np.array([len(candidates[minute]) for minute in profile.meal_times] * profile.days)
+        with np.errstate(divide="ignore"):
+            filtered = float(np.log10(slot_counts).sum())
+        report = {
+            "stages": stages,
+            "log10_search_space": {
+                "unfiltered": profile.num_slots * float(np.log10(max(num_recipes, 1))),
+                "filtered": filtered,
+            },
+            "seconds": time.perf_counter() - start,
+        }
+        return candidates, report
@@ -0,0 +1,467 @@
+"""Multi-objective plan search with warm starts.
+
+The plan optimiser searches for meal plans trading off cost against the
+profile's daily nutrient targets and, if asked, glycaemic load, with an
+elitist non-dominated sorting genetic algorithm, in the style of NSGA-II.
+Each plan is a row of recipe positions, one per meal slot, and every gene
+is kept within its slot's candidate recipes, so variation never builds a
+plan with an unsuitable recipe. The candidates come from the pre-filter,
+which has already removed every recipe that could never fill its slot.
+Using a recipe more often than the profile allows, and going over the
+daily glycaemic load cap, are constraints, and plans breaking them rank
+after every plan which doesn't.
+
+Rather than searching from scratch every time, the final population and
+Pareto front of each run are archived against the profile's signature.
+A new run starts from the archived population of the same problem or, if
+the problem has changed slightly, such as a tweaked target or one more
+excluded recipe, from the closest archived problem with the same meal
+slots, repairing any genes which are no longer candidates. The search
+stops once the front stops improving rather than after a fixed number of
+generations, so a warm start finishes in a fraction of the generations.
+"""
+
+import json
+import sqlite3
+from collections import deque
+from datetime import datetime, timezone
+
+import numpy as np
+
+from codiet.db import PLAN_ARCHIVE_PATH
+from codiet.utils.time import convert_minutes_to_time_string
+from codiet.optimiser.objectives import (
+    CostObjective,
+    GlycaemicLoadObjective,
+    NutrientTargetObjective,
+    evaluate_plans,
+)
+from codiet.optimiser.planner import MealPlanner, PlanProfile
+from codiet.optimiser.snapshot import CatalogueSnapshot
+
+POPULATION_SIZE = 100
+MAX_GENERATIONS = 600
+# The chance of each gene of an offspring being mutated is this over the number of genes
+MUTATION_RATE = 1.0
+# The search stops once the front has moved less than this, relative to its
+# scale, over the given number of generations
+CONVERGENCE_TOLERANCE = 1e-3
+CONVERGENCE_PATIENCE = 20
+
+# The optimiser of a worker process, set up once by init_optimiser_worker
+_worker_optimiser: "PlanOptimiser | None" = None
+
+
+def non_dominated_ranks(values: np.ndarray) -> np.ndarray:
+    """Returns the non-domination rank of each row of objective values,
+    where rank 0 is the Pareto front."""
+    # dominates[i, j] is True if row i dominates row j
+    dominates = (
+        (values[:, None, :] <= values[None, :, :]).all(axis=2)
+        & (values[:, None, :] < values[None, :, :]).any(axis=2)
+    )
+    domination_counts = dominates.sum(axis=0)
+    ranks = np.full(len(values), -1, dtype=np.int64)
+    rank = 0
+    front = np.flatnonzero(domination_counts == 0)
+    while len(front):
+        ranks[front] = rank
+        # Peel the front off, and find the rows it alone was dominating
+        domination_counts = domination_counts - dominates[front].sum(axis=0)
+        domination_counts[ranks >= 0] = -1
+        front = np.flatnonzero(domination_counts == 0)
+        rank += 1
+    return ranks
+
+
+def crowding_distances(values: np.ndarray, ranks: np.ndarray) -> np.ndarray:
+    """Returns the crowding distance of each row within its rank, with the
+    extremes of each rank infinitely far from the rest."""
+    distances = np.zeros(len(values))
+    for rank in np.unique(ranks):
+        members = np.flatnonzero(ranks == rank)
+        for objective in range(values.shape[1]):
+            order = members[np.argsort(values[members, objective], kind="stable")]
+            column = values[order, objective]
+            spread = column[-1] - column[0]
+            distances[order[[0, -1]]] = np.inf
+            if len(order) > 2 and spread > 0:
+                distances[order[1:-1]] += (column[2:] - column[:-2]) / spread
+    return distances
+
+
+def count_repeat_violations(plans: np.ndarray, max_repeats: int) -> np.ndarray:
+    """Returns the number of meals in each plan using a recipe beyond the
+    number of repeats allowed."""
+    if plans.shape[1] <= max_repeats:
+        return np.zeros(len(plans), dtype=np.int64)
+    # In a sorted row, a meal repeats a recipe too often if it matches the
+    # meal max_repeats places before it
+    ordered = np.sort(plans, axis=1)
+    return (ordered[:, max_repeats:] == ordered[:, :-max_repeats]).sum(axis=1)
+
+
+def profile_distance(a: PlanProfile, b: PlanProfile) -> float:
+    """Returns how far apart two profiles with the same meal slots are, as
+    the number of flags, tags and exclusions they differ by, plus the
+    relative difference of each nutrient target and glycaemic load cap."""
+    distance = len(set(a.flags) ^ set(b.flags))
+    distance += len(set(a.tags) ^ set(b.tags))
+    for minute in set(a.meal_tags) | set(b.meal_tags):
+        distance += len(set(a.meal_tags.get(minute, [])) ^ set(b.meal_tags.get(minute, [])))
+    distance += len(set(a.excluded_recipe_ids) ^ set(b.excluded_recipe_ids))
+    distance += abs(a.max_repeats - b.max_repeats)
+    for name in set(a.nutrient_targets) | set(b.nutrient_targets):
+        if name not in a.nutrient_targets or name not in b.nutrient_targets:
+            distance += 1
+            continue
+        target_a, target_b = a.nutrient_targets[name], b.nutrient_targets[name]
+        if max(target_a, target_b) > 0:
+            distance += abs(target_a - target_b) / max(target_a, target_b)
+    distance += a.minimise_glycaemic_load != b.minimise_glycaemic_load
+    cap_a, cap_b = a.max_daily_glycaemic_load, b.max_daily_glycaemic_load
+    if (cap_a is None) != (cap_b is None):
+        distance += 1
+    elif cap_a is not None and cap_b is not None and max(cap_a, cap_b) > 0:
+        distance += abs(cap_a - cap_b) / max(cap_a, cap_b)
+    return float(distance)
+
+
+class PlanArchive:
+    """A single-file store of the final population and Pareto front of each
+    planning problem, keyed by profile signature."""
+
+    def __init__(self, path: str = PLAN_ARCHIVE_PATH):
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS plan_runs (
+                signature TEXT PRIMARY KEY,
+                family TEXT NOT NULL,
+                profile TEXT NOT NULL,
+                db_version TEXT NOT NULL,
+                population TEXT NOT NULL,
+                front TEXT NOT NULL,
+                generations INTEGER NOT NULL,
+                updated TEXT NOT NULL
+            );
+        """)
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_plan_runs_family ON plan_runs (family);"
+        )
+        self._connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM plan_runs;").fetchone()[0]
+
+    def get(self, signature: str) -> dict | None:
+        """Returns the archived run of the signature, or None if there isn't one."""
+        row = self._connection.execute(
+            "SELECT profile, db_version, population, front, generations FROM plan_runs WHERE signature = ?;",
+            (signature,),
+        ).fetchone()
+        return None if row is None else self._decode(row)
+
+    def find_closest(self, profile: PlanProfile) -> tuple[dict, float] | None:
+        """Returns the archived run of the closest profile with the same meal
+        slots, and its distance, or None if there isn't one."""
+        rows = self._connection.execute(
+            "SELECT profile, db_version, population, front, generations FROM plan_runs WHERE family = ?;",
+            (profile.family,),
+        ).fetchall()
+        runs = [self._decode(row) for row in rows]
+        if not runs:
+            return None
+        distances = [profile_distance(profile, PlanProfile.from_dict(run["profile"])) for run in runs]
+        closest = int(np.argmin(distances))
+        return runs[closest], distances[closest]
+
+    def put(
+        self,
+        profile: PlanProfile,
+        db_version: dict,
+        population: list[list[int]],
+        front: list[dict],
+        generations: int,
+    ) -> None:
+        """Archives the final population, as recipe IDs, and front of a run,
+        replacing any earlier run of the same problem."""
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO plan_runs VALUES (?, ?, ?, ?, ?, ?, ?, ?);",
+                (
+                    profile.signature(),
+                    profile.family,
+                    json.dumps(profile.to_dict()),
+                    json.dumps(db_version),
+                    json.dumps(population),
+                    json.dumps(front),
+                    generations,
+                    datetime.now(timezone.utc).isoformat(),
+                ),
+            )
+
+    def close(self) -> None:
+        """Closes the archive file."""
+        self._connection.close()
+
+    @staticmethod
+    def _decode(row: tuple) -> dict:
+        """Returns an archived run as a dict."""
+        return {
+            "profile": json.loads(row[0]),
+            "db_version": json.loads(row[1]),
+            "population": json.loads(row[2]),
+            "front": json.loads(row[3]),
+            "generations": row[4],
+        }
+
+
+class PlanOptimiser:
+    """Searches for the Pareto front of meal plans for a profile."""
+
+    def __init__(
+        self,
+        planner: MealPlanner,
+        archive: PlanArchive | None = None,
+        population_size: int = POPULATION_SIZE,
+        seed: int = 0,
+        prefilter: bool = True,
+    ):
+        self.planner = planner
+        self.catalogue = planner.catalogue
+        self.archive = archive
+        self.population_size = population_size
+        self.rng = np.random.default_rng(seed)
+        # Without the pre-filter every recipe is searched over for every slot,
+        # with unsuitable recipes counted as constraint violations. This is
+        # only useful as a baseline to measure the pre-filter against.
+        self.prefilter = prefilter
+
+    def _objectives(self, profile: PlanProfile) -> list:
+        """Returns the objectives of the profile."""
+        objectives: list = [CostObjective(self.planner.cost_engine)]
+        if profile.nutrient_targets:
+            names = list(profile.nutrient_targets)
+            objectives.append(NutrientTargetObjective(
+                self.planner.recipe_target_totals(names),
+                np.array([profile.nutrient_targets[name] for name in names], dtype=np.float64),
+                len(profile.meal_times),
+            ))
+        if profile.minimise_glycaemic_load:
+            objectives.append(GlycaemicLoadObjective(self.planner.glycaemic_engine, profile.days))
+        return objectives
+
+    def _slot_candidates(self, profile: PlanProfile) -> tuple[np.ndarray, np.ndarray, np.ndarray, dict]:
+        """Returns the padded (slot x candidate) matrix of the positions the
+        search chooses from, the number of them for each slot, the (slot x
+        recipe) mask of the suitable recipes and the pre-filter's report.
+        Raises ValueError if a meal slot has no suitable recipes."""
+        by_minute, report = self.planner.prefilter.filter(profile)
+        for minute, positions in by_minute.items():
+            if len(positions) == 0:
+                raise ValueError(
+                    f"No recipe can fill the {convert_minutes_to_time_string(minute)} meal of {profile.name}."
+                )
+        slots = [by_minute[minute] for minute in profile.meal_times] * profile.days
+        counts = np.array([len(positions) for positions in slots], dtype=np.int64)
+        candidates = np.zeros((len(slots), counts.max()), dtype=np.int64)
+        allowed = np.zeros((len(slots), self.catalogue.num_recipes), dtype=bool)
+        for slot, positions in enumerate(slots):
+            candidates[slot, : len(positions)] = positions
+            allowed[slot, positions] = True
+        if not self.prefilter:
+            num_recipes = self.catalogue.num_recipes
+            candidates = np.tile(np.arange(num_recipes), (len(slots), 1))
+            counts = np.full(len(slots), num_recipes, dtype=np.int64)
+        return candidates, counts, allowed, report
+
+    def _violations(self, plans: np.ndarray, profile: PlanProfile, allowed: np.ndarray) -> np.ndarray:
+        """Returns how badly each plan breaks the constraints: the meals
+        repeating a recipe too often, plus the days over the glycaemic load
+        cap, by the fraction they are over it."""
+        violations = count_repeat_violations(plans, profile.max_repeats).astype(np.float64)
+        if not self.prefilter:
+            violations += (~allowed[np.arange(plans.shape[1]), plans]).sum(axis=1)
+        if profile.max_daily_glycaemic_load is not None:
+            cap = profile.max_daily_glycaemic_load
+            day_loads = self.planner.glycaemic_engine.day_loads(plans, len(profile.meal_times))
+            violations += (np.maximum(day_loads - cap, 0.0) / cap).sum(axis=1)
+        return violations
+
+    def _random_genes(self, candidates: np.ndarray, counts: np.ndarray, num_plans: int) -> np.ndarray:
+        """Returns plans with a random candidate in every slot."""
+        choices = (self.rng.random((num_plans, len(counts))) * counts).astype(np.int64)
+        return candidates[np.arange(len(counts)), choices]
+
+    def _initial_population(
+        self, profile: PlanProfile, candidates: np.ndarray, counts: np.ndarray, allowed: np.ndarray
+    ) -> tuple[np.ndarray, str]:
+        """Returns the starting population and how it was seeded: from the
+        archived run of the same problem, the closest archived problem, or
+        from scratch."""
+        seeds = np.empty((0, len(counts)), dtype=np.int64)
+        warm_start = "cold"
+        run = None
+        if self.archive is not None:
+            run = self.archive.get(profile.signature())
+            warm_start = "exact"
+            if run is None:
+                closest = self.archive.find_closest(profile)
+                run = None if closest is None else closest[0]
+                warm_start = "closest"
+        if run is not None and run["population"]:
+            recipe_ids = np.array(run["population"], dtype=np.int64)
+            # Repair the genes which are no longer candidates for their slot,
+            # including recipes which have since been deleted
+            seeds, known = self.catalogue.match_recipe_positions(recipe_ids)
+            slots = np.broadcast_to(np.arange(len(counts)), seeds.shape)
+            valid = known & (allowed[slots, seeds] | (not self.prefilter))
+            seeds = np.where(valid, seeds, self._random_genes(candidates, counts, len(seeds)))
+        else:
+            warm_start = "cold"
+            # Start from the greedy plan, where there is one
+            try:
+                greedy = self.planner.plan(profile)["recipe_ids"]
+                seeds = self.catalogue.recipe_positions(np.array([greedy], dtype=np.int64))
+            except ValueError:
+                pass
+        seeds = seeds[: self.population_size]
+        fill = self._random_genes(candidates, counts, self.population_size - len(seeds))
+        return np.vstack([seeds, fill]), warm_start
+
+    def _rank(self, values: np.ndarray, violations: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the rank and crowding distance of each plan, with the plans
+        breaking a constraint ranked after all the others, by how badly they
+        break it."""
+        ranks = np.zeros(len(values), dtype=np.int64)
+        feasible = violations == 0
+        if feasible.any():
+            ranks[feasible] = non_dominated_ranks(values[feasible])
+        worst = ranks[feasible].max() + 1 if feasible.any() else 0
+        ranks[~feasible] = worst + np.unique(violations[~feasible], return_inverse=True)[1]
+        return ranks, crowding_distances(values, ranks)
+
+    def _offspring(
+        self, population: np.ndarray, ranks: np.ndarray, distances: np.ndarray,
+        candidates: np.ndarray, counts: np.ndarray,
+    ) -> np.ndarray:
+        """Returns a generation of offspring, by binary tournament, uniform
+        crossover and mutation to other candidates of the same slot."""
+        size, num_slots = population.shape
+        # Binary tournaments, won on rank and then on crowding distance
+        pairs = self.rng.integers(0, size, (2 * size, 2))
+        first, second = pairs[:, 0], pairs[:, 1]
+        first_wins = (ranks[first] < ranks[second]) | (
+            (ranks[first] == ranks[second]) & (distances[first] >= distances[second])
+        )
+        parents = np.where(first_wins, first, second).reshape(2, size)
+        # Each gene comes from either parent, so stays within its slot's candidates
+        from_first = self.rng.random((size, num_slots)) < 0.5
+        children = np.where(from_first, population[parents[0]], population[parents[1]])
+        mutate = self.rng.random((size, num_slots)) < MUTATION_RATE / num_slots
+        return np.where(mutate, self._random_genes(candidates, counts, size), children)
+
+    def optimise(self, profile: PlanProfile, max_generations: int = MAX_GENERATIONS) -> dict:
+        """Searches for the plans of the profile, and archives the result.
+
+        Returns:
+            A dict of the profile name, the recipe IDs of the chosen plan, its
+            cost and objective values, the meal times, the Pareto front, the
+            number of generations run, how the search was seeded and the
+            pre-filter's report of how far it narrowed the search. The
+            chosen plan is the front plan closest to the ideal point, once
+            each objective is scaled to the front's range.
+
+        Raises:
+            ValueError: If a meal slot can't be filled.
+        """
+        objectives = self._objectives(profile)
+        candidates, counts, allowed, prefilter_report = self._slot_candidates(profile)
+        population, warm_start = self._initial_population(profile, candidates, counts, allowed)
+        population = np.unique(population, axis=0)
+        values = evaluate_plans(population, objectives)
+        violations = self._violations(population, profile, allowed)
+        ranks, distances = self._rank(values, violations)
+
+        # The front's ideal and nadir points over the last few generations
+        history: deque[np.ndarray] = deque(maxlen=CONVERGENCE_PATIENCE + 1)
+        generations = 0
+        while generations < max_generations:
+            generations += 1
+            children = self._offspring(population, ranks, distances, candidates, counts)
+            # Merge the generations, dropping duplicate plans
+            population, unique = np.unique(np.vstack([population, children]), axis=0, return_index=True)
+            values = np.vstack([values, evaluate_plans(children, objectives)])[unique]
+            violations = self._violations(population, profile, allowed)
+            ranks, distances = self._rank(values, violations)
+            # Keep the best ranked plans, preferring the less crowded
+            survivors = np.lexsort((-distances, ranks))[: self.population_size]
+            population, values, violations = population[survivors], values[survivors], violations[survivors]
+            ranks, distances = self._rank(values, violations)
+
+            # Converged once the front's ideal and nadir points have barely
+            # moved over the last few generations
+            front_values = values[(ranks == 0) & (violations == 0)]
+            if len(front_values) == 0:
+                history.clear()
+                continue
+            history.append(np.concatenate([front_values.min(axis=0), front_values.max(axis=0)]))
+            if len(history) == history.maxlen:
+                change = np.abs(history[-1] - history[0]) / np.maximum(np.abs(history[0]), 1e-12)
+                if change.max() < CONVERGENCE_TOLERANCE:
+                    break
+
+        front = np.flatnonzero((ranks == 0) & (violations == 0))
+        if len(front) == 0:
+            raise ValueError(f"No plan for {profile.name} keeps within {profile.max_repeats} repeats.")
+        front = front[np.argsort(values[front, 0], kind="stable")]
+        # Choose the front plan closest to the ideal point
+        front_values = values[front]
+        spread = np.ptp(front_values, axis=0)
+        scaled = (front_values - front_values.min(axis=0)) / np.where(spread > 0, spread, 1.0)
+        chosen = front[np.argmin(np.linalg.norm(scaled, axis=1))]
+        names = [objective.name for objective in objectives]
+        front_records = [
+            {
+                "recipe_ids": self.catalogue.recipe_ids[population[i]].tolist(),
+                **dict(zip(names, values[i].tolist())),
+            }
+            for i in front
+        ]
+        if self.archive is not None:
+            self.archive.put(
+                profile,
+                self.planner.snapshot.db_version,
+                self.catalogue.recipe_ids[population].tolist(),
+                front_records,
+                generations,
+            )
+        return {
+            "name": profile.name,
+            "recipe_ids": self.catalogue.recipe_ids[population[chosen]].tolist(),
+            "meal_times": [convert_minutes_to_time_string(minute) for minute in profile.meal_times],
+            "cost": float(values[chosen, 0]),
+            "objectives": dict(zip(names, values[chosen].tolist())),
+            "front": front_records,
+            "generations": generations,
+            "warm_start": warm_start,
+            "prefilter": prefilter_report,
+        }
+
+
+def init_optimiser_worker(snapshot_path: str, archive_path: str) -> None:
+    """Maps the snapshot and opens the archive in a worker process."""
+    global _worker_optimiser
+    _worker_optimiser = PlanOptimiser(MealPlanner(CatalogueSnapshot(snapshot_path)), PlanArchive(archive_path))
+
+
+def optimise_in_worker(profile: dict) -> dict:
+    """Optimises a profile, given as a dict, with the worker's optimiser."""
+    return _worker_optimiser.optimise(PlanProfile.from_dict(profile))  # type: ignore
@@ -0,0 +1,90 @@
+"""Shopping list aggregation across meal plans.
+
+Each plan is a list of recipe IDs, one per meal, and a recipe eaten twice
+is bought twice. The plans are expanded into a sparse (coordinate format)
+plan x ingredient matrix of grams by gathering every recipe's row of the
+catalogue's recipe x ingredient matrix, and duplicate entries are summed in
+one pass. Quantities are held in grams, so an ingredient measured in
+different units across recipes adds up, and each total is then rounded up
+to whole packs, where a pack is the quantity the ingredient's cost is
+quoted for, and priced.
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+from codiet.optimiser.catalogue import Catalogue
+from codiet.optimiser.costs import CostEngine
+
+# Totals within this fraction of a whole number of packs aren't rounded up a pack
+PACK_ROUNDING_TOLERANCE = 1e-6
+
+
+def expand_plans(catalogue: Catalogue, plans: Sequence[Sequence[int]]) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the plan row and recipe position of every meal in the plans.
+    Raises ValueError if a plan contains an unknown recipe ID."""
+    lengths = np.array([len(plan) for plan in plans], dtype=np.int64)
+    plan_rows = np.repeat(np.arange(len(plans)), lengths)
+    recipe_ids = np.array([id for plan in plans for id in plan], dtype=np.int64)
+    return plan_rows, catalogue.recipe_positions(recipe_ids)
+
+
+def aggregate_plan_ingredients(
+    catalogue: Catalogue, plan_rows: np.ndarray, recipe_positions: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Sums the grams of every ingredient in every plan.
+
+    Args:
+        catalogue: The catalogue the recipes are in.
+        plan_rows: The plan of each meal.
+        recipe_positions: The recipe position of each meal.
+
+    Returns:
+        A tuple of the plan row, ingredient position and total grams of
+        each plan ingredient, sorted by plan and then ingredient, and a mask
+        of the totals missing a quantity which couldn't be converted to grams.
+    """
+    # Find each recipe's run of entries in the recipe x ingredient matrix
+    order = np.argsort(catalogue.recipe_rows, kind="stable")
+    sorted_rows = catalogue.recipe_rows[order]
+    starts = np.searchsorted(sorted_rows, recipe_positions, side="left")
+    lengths = np.searchsorted(sorted_rows, recipe_positions, side="right") - starts
+    # Gather every meal's entries in one pass
+    offsets = np.cumsum(lengths) - lengths
+    entries = order[np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())]
+    entry_plans = np.repeat(plan_rows, lengths)
+    entry_cols = catalogue.recipe_cols[entries]
+    entry_grams = catalogue.recipe_grams[entries]
+    # Sum the duplicate (plan, ingredient) entries
+    keys = entry_plans * catalogue.num_ingredients + entry_cols
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    unconvertible = np.isnan(entry_grams)
+    grams = np.bincount(inverse, weights=np.where(unconvertible, 0.0, entry_grams), minlength=len(unique_keys))
+    incomplete = np.bincount(inverse, weights=unconvertible, minlength=len(unique_keys)) > 0
+    return (
+        unique_keys // catalogue.num_ingredients,
+        unique_keys % catalogue.num_ingredients,
+        grams,
+        incomplete,
+    )
+
+
+def round_to_packs(cost_engine: CostEngine, cols: np.ndarray, grams: np.ndarray) -> dict[str, np.ndarray]:
+    """Rounds each ingredient total up to whole packs and prices it.
+
+    Returns:
+        A dict of arrays of the grams in a pack, the number of packs, the
+        cost of the packs and the cost of the exact quantity. Ingredients
+        with no usable cost data are NaN.
+    """
+    catalogue = cost_engine.catalogue
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pack_grams = np.where(catalogue.cost_qty_grams[cols] > 0, catalogue.cost_qty_grams[cols], np.nan)
+        packs = np.ceil(grams / pack_grams - PACK_ROUNDING_TOLERANCE)
+    return {
+        "pack_grams": pack_grams,
+        "packs": packs,
+        "pack_cost": packs * catalogue.cost_values[cols],
+        "exact_cost": grams * cost_engine.cost_per_gram[cols],
+    }
@@ -0,0 +1,268 @@
+"""Read-optimised, memory-mapped snapshot of the whole catalogue.
+
+The snapshot is compiled from the database in a single export pass, and
+holds every column the bulk calculations need as flat arrays. Loading it
+maps the file into memory, and each array is a zero-copy view onto the
+mapping, so the planner, the benchmarks and worker processes can all share
+one copy of the catalogue rather than each rebuilding it with queries.
+
+File layout:
+    8 bytes   magic, b"CODIETSN"
+    8 bytes   little-endian length of the JSON header
+    header    JSON: format version, database version, names and array table
+    arrays    each array's raw bytes, aligned to ARRAY_ALIGNMENT bytes
+"""
+
+import json
+import mmap
+import os
+import struct
+from datetime import datetime, timezone
+
+import numpy as np
+
+from codiet.db.database_service import DatabaseService
+from codiet.optimiser.catalogue import Catalogue, _to_float_array
+
+SNAPSHOT_MAGIC = b"CODIETSN"
+SNAPSHOT_FORMAT_VERSION = 2
+# Arrays are aligned so that every view onto the mapping is aligned
+ARRAY_ALIGNMENT = 64
+# Flags are packed into one unsigned 64 bit mask per ingredient
+MAX_FLAGS = 64
+
+
+def get_database_version(db_path: str) -> dict:
+    """Returns the change log version of the database, used to tell whether a
+    snapshot was compiled from the database as it is now."""
+    with DatabaseService(db_path) as db_service:
+        database_id, version = db_service.fetch_change_version()
+    return {"database_id": database_id, "version": version}
+
+
+def compile_snapshot_arrays(db_service: DatabaseService) -> tuple[dict, dict[str, np.ndarray]]:
+    """Compiles the catalogue into flat arrays using bulk queries.
+
+    Returns:
+        A tuple of the header names (nutrient, flag and tag names, in array
+        order, and the nutrient columns of each nutrient group), and a dict
+        of the named arrays.
+    """
+    # Start from the catalogue, which holds the ingredient and recipe quantities
+    catalogue = Catalogue.from_database(db_service)
+    ingredient_index = catalogue.ingredient_index
+    recipe_index = catalogue.recipe_index
+    arrays = {
+        "ingredient_ids": catalogue.ingredient_ids,
+        "densities": catalogue.densities,
+        "piece_masses": catalogue.piece_masses,
+        "cost_values": catalogue.cost_values,
+        "cost_qty_grams": catalogue.cost_qty_grams,
+        "recipe_ids": catalogue.recipe_ids,
+        "recipe_rows": catalogue.recipe_rows,
+        "recipe_cols": catalogue.recipe_cols,
+        "recipe_grams": catalogue.recipe_grams,
+        "recipe_grams_lower": catalogue.recipe_grams_lower,
+        "recipe_grams_upper": catalogue.recipe_grams_upper,
+    }
+    arrays["ingredient_gis"] = _to_float_array([row[1] for row in db_service.fetch_all_ingredient_gis()])
+
+    # Build the dense ingredient x nutrient matrix of grams per gram from the
+    # materialised densities. Nutrients with no data for an ingredient are NaN.
+    nutrient_rows = db_service.fetch_all_leaf_nutrient_rows()
+    nutrient_index = {id: i for i, (id, _) in enumerate(nutrient_rows)}
+    density_rows = [
+        row for row in db_service.fetch_all_ingredient_nutrient_densities()
+        if row[0] in ingredient_index and row[1] in nutrient_index
+    ]
+    rows = np.array([ingredient_index[row[0]] for row in density_rows], dtype=np.int64)
+    cols = np.array([nutrient_index[row[1]] for row in density_rows], dtype=np.int64)
+    nutrient_matrix = np.full((catalogue.num_ingredients, len(nutrient_rows)), np.nan)
+    nutrient_matrix[rows, cols] = _to_float_array([row[2] for row in density_rows])
+    arrays["nutrient_matrix"] = nutrient_matrix
+
+    # Pack the flags into bitmasks, one bit per flag in flag ID order.
+    # The known mask distinguishes a false flag from a missing one.
+    flag_rows = db_service.fetch_all_global_flag_rows()
+    if len(flag_rows) > MAX_FLAGS:
+        raise ValueError(f"Snapshots support at most {MAX_FLAGS} flags, found {len(flag_rows)}.")
+    flag_bits = {id: np.uint64(1) << np.uint64(i) for i, (id, _) in enumerate(flag_rows)}
+    flag_true_bits = np.zeros(catalogue.num_ingredients, dtype=np.uint64)
+    flag_known_bits = np.zeros(catalogue.num_ingredients, dtype=np.uint64)
+    for ingredient_id, flag_id, flag_value in db_service.fetch_all_ingredient_flag_values():
+        if ingredient_id not in ingredient_index or flag_id not in flag_bits:
+            continue
+        position = ingredient_index[ingredient_id]
+        flag_known_bits[position] |= flag_bits[flag_id]
+        if flag_value:
+            flag_true_bits[position] |= flag_bits[flag_id]
+    arrays["flag_true_bits"] = flag_true_bits
+    arrays["flag_known_bits"] = flag_known_bits
+
+    # Recipe tags, as (recipe position, tag position) pairs
+    tag_rows = db_service.fetch_all_global_recipe_tag_rows()
+    tag_index = {id: i for i, (id, _) in enumerate(tag_rows)}
+    recipe_tags = [
+        (recipe_index[recipe_id], tag_index[tag_id])
+        for recipe_id, tag_id in db_service.fetch_all_recipe_tag_ids()
+        if recipe_id in recipe_index and tag_id in tag_index
+    ]
+    arrays["recipe_tag_rows"] = np.array([tag[0] for tag in recipe_tags], dtype=np.int64)
+    arrays["recipe_tag_cols"] = np.array([tag[1] for tag in recipe_tags], dtype=np.int64)
+
+    # Serve times, as (recipe position, start, end) minutes past midnight
+    serve_times = [
+        (recipe_index[recipe_id], start, end)
+        for recipe_id, start, end in db_service.fetch_all_recipe_serve_times()
+        if recipe_id in recipe_index
+    ]
+    arrays["serve_time_rows"] = np.array([time[0] for time in serve_times], dtype=np.int64)
+    arrays["serve_time_starts"] = np.array([time[1] for time in serve_times], dtype=np.int32)
+    arrays["serve_time_ends"] = np.array([time[2] for time in serve_times], dtype=np.int32)
+
+    # The leaf nutrient columns making up each group nutrient
+    nutrient_groups: dict[str, list[int]] = {}
+    for leaf_id, group_name in db_service.fetch_all_nutrient_group_leaf_rows():
+        if leaf_id in nutrient_index:
+            nutrient_groups.setdefault(group_name, []).append(nutrient_index[leaf_id])
+
+    names = {
+        "nutrient_names": [name for _, name in nutrient_rows],
+        "nutrient_groups": nutrient_groups,
+        "flag_names": [name for _, name in flag_rows],
+        "tag_names": [name for _, name in tag_rows],
+    }
+    return names, arrays
+
+
+def write_snapshot(path: str, db_version: dict, names: dict, arrays: dict[str, np.ndarray]) -> None:
+    """Writes the arrays to a snapshot file."""
+    # Lay the arrays out one after another, each aligned
+    table = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = -(-offset // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+        table[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+    header = json.dumps({
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "db_version": db_version,
+        **names,
+        "arrays": table,
+    }).encode("utf-8")
+    # The array offsets are relative to the aligned end of the header
+    data_start = -(-(len(SNAPSHOT_MAGIC) + 8 + len(header)) // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+    # Write to a temporary file and swap it in, so readers never see half a snapshot
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(SNAPSHOT_MAGIC)
+        file.write(struct.pack("<Q", len(header)))
+        file.write(header)
+        for name, array in arrays.items():
+            file.seek(data_start + table[name]["offset"])
+            file.write(np.ascontiguousarray(array).tobytes())
+    os.replace(temp_path, path)
+
+
+def export_snapshot(db_service: DatabaseService, db_path: str, snapshot_path: str) -> None:
+    """Compiles the database into a snapshot file."""
+    # Read the version first, so a change made during the export makes it stale
+    db_version = get_database_version(db_path)
+    names, arrays = compile_snapshot_arrays(db_service)
+    write_snapshot(snapshot_path, db_version, names, arrays)
+
+
+class CatalogueSnapshot:
+    """A memory-mapped snapshot of the catalogue.
+    Every array is a read-only view onto the mapped file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a catalogue snapshot.")
+        header_length = struct.unpack_from("<Q", self._mmap, len(SNAPSHOT_MAGIC))[0]
+        header_start = len(SNAPSHOT_MAGIC) + 8
+        self.header = json.loads(self._mmap[header_start : header_start + header_length])
+        if self.header["format_version"] != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version {self.header['format_version']}.")
+        data_start = -(-(header_start + header_length) // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+        # Map each array onto the file without copying
+        self.arrays: dict[str, np.ndarray] = {}
+        for name, entry in self.header["arrays"].items():
+            dtype = np.dtype(entry["dtype"])
+            count = int(np.prod(entry["shape"]))
+            # Empty arrays may sit past the end of the file
+            if count == 0:
+                self.arrays[name] = np.empty(entry["shape"], dtype=dtype)
+                continue
+            self.arrays[name] = np.frombuffer(
+                self._mmap, dtype=dtype, count=count, offset=data_start + entry["offset"]
+            ).reshape(entry["shape"])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+
+    @property
+    def db_version(self) -> dict:
+        """Returns the version of the database the snapshot was compiled from."""
+        return self.header["db_version"]
+
+    @property
+    def nutrient_names(self) -> list[str]:
+        """Returns the nutrient names, in nutrient matrix column order."""
+        return self.header["nutrient_names"]
+
+    @property
+    def nutrient_groups(self) -> dict[str, list[int]]:
+        """Returns the nutrient matrix columns of the leaves of each group nutrient."""
+        return self.header["nutrient_groups"]
+
+    @property
+    def flag_names(self) -> list[str]:
+        """Returns the flag names, in bit order."""
+        return self.header["flag_names"]
+
+    @property
+    def tag_names(self) -> list[str]:
+        """Returns the recipe tag names, in tag position order."""
+        return self.header["tag_names"]
+
+    def is_current(self, db_path: str) -> bool:
+        """Returns True if the snapshot matches the database as it is now."""
+        return self.db_version == get_database_version(db_path)
+
+    def flag_mask(self, flag_names: list[str]) -> np.uint64:
+        """Returns the bitmask of the given flags."""
+        mask = np.uint64(0)
+        for name in flag_names:
+            mask |= np.uint64(1) << np.uint64(self.flag_names.index(name))
+        return mask
+
+    def close(self) -> None:
+        """Unmaps the file.
+        Raises BufferError if arrays taken from the snapshot are still in use."""
+        self.arrays.clear()
+        self._mmap.close()
+
+
+def load_snapshot(snapshot_path: str, db_path: str | None = None) -> CatalogueSnapshot:
+    """Maps a snapshot into memory.
+    If a database path is given, the snapshot is recompiled first if it is
+    missing or out of date."""
+    if db_path is not None:
+        if os.path.exists(snapshot_path):
+            try:
+                snapshot = CatalogueSnapshot(snapshot_path)
+            except ValueError:
+                # Written in an older format, so compile it again
+                snapshot = None
+            if snapshot is not None:
+                if snapshot.is_current(db_path):
+                    return snapshot
+                snapshot.close()
+        with DatabaseService(db_path) as db_service:
+            export_snapshot(db_service, db_path, snapshot_path)
+    return CatalogueSnapshot(snapshot_path)
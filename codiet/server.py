@@ -0,0 +1,419 @@
+"""Local asyncio HTTP/JSON API over the catalogue and the planner.
+
+Serves several clients at once without the GUI. Database reads run on a
+pool of threads, each holding its own read connection, plan solves run on a
+pool of worker processes which each map the catalogue snapshot, and the
+event loop only parses requests and serves cached responses. Responses are
+held in an LRU cache, which is cleared whenever the change log version of
+the database moves on, so edits made elsewhere (e.g. in the GUI) are seen
+on the next request. The server binds to localhost and needs no network.
+
+Routes:
+    GET  /health
+    GET  /ingredients?q=<text>&limit=<n>    ingredient names, fuzzy searched by q
+    GET  /ingredients/<name>                the ingredient, in datafile format
+    GET  /recipes?q=<text>&limit=<n>        recipe names, fuzzy searched by q
+    GET  /recipes/<name>                    the recipe, in datafile format
+    GET  /recipes/<name>/nutrients          the recipe nutrient totals
+    POST /plans                             plan a profile, see codiet.optimiser.planner
+
+Usage:
+    python -m codiet.server --port 8080
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Callable
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from codiet.db import DB_PATH, SNAPSHOT_PATH
+from codiet.db.database_service import DatabaseService
+from codiet.optimiser.planner import init_planner_worker, plan_in_worker
+from codiet.optimiser.snapshot import load_snapshot
+from codiet.utils.ingredients import convert_ingredient_to_json
+from codiet.utils.recipes import convert_recipe_to_json
+from codiet.utils.search import filter_text
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_CACHE_SIZE = 4096
+DEFAULT_SEARCH_LIMIT = 10
+# The largest request body accepted, in bytes
+MAX_BODY_SIZE = 1 << 20
+
+# Each read thread's own connection, opened by the pool initialiser
+_thread_local = threading.local()
+
+
+class NotFoundError(LookupError):
+    """Raised by a handler when the requested entity does not exist."""
+
+
+class ResponseCache:
+    """A least recently used cache of encoded responses, keyed by request target."""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> bytes | None:
+        """Returns the cached response, or None if it isn't cached."""
+        response = self._entries.get(key)
+        if response is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return response
+
+    def put(self, key: str, response: bytes) -> None:
+        """Caches the response, evicting the least recently used if full."""
+        self._entries[key] = response
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Empties the cache."""
+        self._entries.clear()
+
+
+def _open_read_connection(db_path: str) -> None:
+    """Opens the calling read thread's connection."""
+    _thread_local.db_service = DatabaseService(db_path)
+
+
+def _run_read(handler: Callable, *args):
+    """Runs a handler with the calling read thread's connection."""
+    return handler(_thread_local.db_service, *args)
+
+
+def _search_names(names: list[str], query: dict) -> dict:
+    """Returns the names, fuzzy searched by the q parameter if there is one."""
+    if "q" in query:
+        limit = int(query.get("limit", [DEFAULT_SEARCH_LIMIT])[0])
+        names = filter_text(query["q"][0], names, limit)
+    return {"results": names}
+
+
+def _list_ingredients(db_service: DatabaseService, query: dict) -> dict:
+    return _search_names(db_service.fetch_all_ingredient_names(), query)
+
+
+def _get_ingredient(db_service: DatabaseService, query: dict, name: str) -> dict:
+    if name not in db_service.fetch_ingredient_ids_by_names([name]):
+        raise NotFoundError(f"Ingredient '{name}' does not exist.")
+    return convert_ingredient_to_json(db_service.fetch_ingredient_by_name(name))
+
+
+def _list_recipes(db_service: DatabaseService, query: dict) -> dict:
+    return _search_names(db_service.fetch_all_recipe_names(), query)
+
+
+def _get_recipe(db_service: DatabaseService, query: dict, name: str) -> dict:
+    if name not in db_service.fetch_recipe_ids_by_names([name]):
+        raise NotFoundError(f"Recipe '{name}' does not exist.")
+    return convert_recipe_to_json(db_service.fetch_recipe_by_name(name))
+
+
+def _get_recipe_nutrients(db_service: DatabaseService, query: dict, name: str) -> dict:
+    recipe_ids = db_service.fetch_recipe_ids_by_names([name])
+    if name not in recipe_ids:
+        raise NotFoundError(f"Recipe '{name}' does not exist.")
+    return {"name": name, "nutrients": db_service.fetch_recipe_nutrient_totals(recipe_ids[name])}
+
+
+def _sync_totals(db_service: DatabaseService) -> None:
+    db_service.sync_recipe_nutrient_totals()
+
+
+def _fetch_change_version(db_service: DatabaseService) -> tuple[str, int]:
+    return db_service.fetch_change_version()
+
+
+# The cached read routes, as (pattern, handler, needs current nutrient totals)
+READ_ROUTES = [
+    (re.compile(r"/ingredients"), _list_ingredients, False),
+    (re.compile(r"/ingredients/(?P<name>[^/]+)"), _get_ingredient, False),
+    (re.compile(r"/recipes"), _list_recipes, False),
+    (re.compile(r"/recipes/(?P<name>[^/]+)"), _get_recipe, False),
+    (re.compile(r"/recipes/(?P<name>[^/]+)/nutrients"), _get_recipe_nutrients, True),
+]
+
+
+def encode_json(payload: dict) -> bytes:
+    """Returns the payload encoded as a JSON body."""
+    return json.dumps(payload).encode("utf-8")
+
+
+def encode_response(status: int, payload: dict, keep_alive: bool = True) -> bytes:
+    """Returns the full HTTP response for a JSON payload."""
+    return encode_body(status, encode_json(payload), keep_alive)
+
+
+def encode_body(status: int, body: bytes, keep_alive: bool = True) -> bytes:
+    """Returns the full HTTP response for an encoded JSON body."""
+    head = (
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+class CatalogueServer:
+    """HTTP/JSON server over the catalogue and the planner."""
+
+    def __init__(
+        self,
+        db_path: str = DB_PATH,
+        snapshot_path: str = SNAPSHOT_PATH,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        read_workers: int = 4,
+        solver_workers: int = 2,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+    ):
+        self.db_path = db_path
+        self.snapshot_path = snapshot_path
+        self.host = host
+        self.port = port
+        self.solver_workers = solver_workers
+        self.cache = ResponseCache(cache_size)
+        self._read_pool = ThreadPoolExecutor(
+            read_workers, initializer=_open_read_connection, initargs=(db_path,)
+        )
+        self._solver_pool: ProcessPoolExecutor | None = None
+        with DatabaseService(db_path) as db_service:
+            self._version = db_service.fetch_change_version()
+        # The version check in flight, which concurrent requests share
+        self._version_check: asyncio.Future | None = None
+        # Derived data is brought up to date lazily after a change
+        self._totals_stale = True
+        self._snapshot_stale = True
+        self._refresh_lock = asyncio.Lock()
+        self._server: asyncio.AbstractServer | None = None
+        # The open connections, so they can be closed cleanly on shutdown
+        self._connections: dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    async def start(self) -> None:
+        """Brings the derived data up to date and starts listening.
+        If the port is 0, a free port is chosen."""
+        await self._refresh_totals()
+        await self._refresh_solver()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        """Serves until cancelled."""
+        if self._server is None:
+            await self.start()
+        async with self._server:  # type: ignore
+            await self._server.serve_forever()  # type: ignore
+
+    async def close(self) -> None:
+        """Stops the server and shuts down the pools."""
+        if self._server is not None:
+            self._server.close()
+            # Closing each connection lets its handler finish its loop
+            for writer in self._connections.values():
+                writer.close()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+        self._read_pool.shutdown()
+        if self._solver_pool is not None:
+            self._solver_pool.shutdown()
+
+    async def check_version(self) -> None:
+        """Clears the cache and marks the derived data stale if the database
+        has changed since the last request. The version is read on a read
+        thread, and requests arriving while a check is running share it."""
+        if self._version_check is None:
+            self._version_check = asyncio.ensure_future(self._read(_fetch_change_version))
+        check = self._version_check
+        try:
+            version = await check
+        finally:
+            if self._version_check is check:
+                self._version_check = None
+        if version != self._version:
+            self._version = version
+            self.cache.clear()
+            self._totals_stale = True
+            self._snapshot_stale = True
+
+    async def _read(self, handler: Callable, *args):
+        """Runs a handler on a read thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._read_pool, _run_read, handler, *args)
+
+    async def _refresh_totals(self) -> None:
+        """Brings the recipe nutrient totals up to date, if they are stale."""
+        async with self._refresh_lock:
+            if self._totals_stale:
+                await self._read(_sync_totals)
+                self._totals_stale = False
+
+    async def _refresh_solver(self) -> ProcessPoolExecutor:
+        """Recompiles the snapshot and restarts the solver pool, if they are stale."""
+        async with self._refresh_lock:
+            if self._snapshot_stale or self._solver_pool is None:
+                loop = asyncio.get_running_loop()
+                snapshot = await loop.run_in_executor(
+                    self._read_pool, load_snapshot, self.snapshot_path, self.db_path
+                )
+                snapshot.close()
+                if self._solver_pool is not None:
+                    self._solver_pool.shutdown(wait=False)
+                self._solver_pool = ProcessPoolExecutor(
+                    self.solver_workers,
+                    initializer=init_planner_worker,
+                    initargs=(self.snapshot_path,),
+                )
+                self._snapshot_stale = False
+            return self._solver_pool
+
+    async def handle_request(self, method: str, target: str, body: bytes) -> tuple[int, bytes]:
+        """Returns the (status, encoded JSON body) response to a request."""
+        await self.check_version()
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        if method == "GET" and path == "/health":
+            return 200, encode_json({"status": "ok", "version": self._version[1]})
+        if method == "POST" and path == "/plans":
+            return await self._solve(body)
+        if method != "GET":
+            return 405, encode_json({"error": f"{method} is not allowed."})
+        # Serve cached reads straight from the event loop
+        cached = self.cache.get(target)
+        if cached is not None:
+            return 200, cached
+        for pattern, handler, needs_totals in READ_ROUTES:
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue
+            if needs_totals:
+                await self._refresh_totals()
+            args = [unquote(value) for value in match.groups()]
+            # Note the version the read starts at, so a response read across
+            # a change isn't cached after the cache has been cleared
+            version = self._version
+            try:
+                payload = await self._read(handler, parse_qs(url.query), *args)
+            except NotFoundError as e:
+                return 404, encode_json({"error": str(e)})
+            except ValueError as e:
+                return 400, encode_json({"error": str(e)})
+            response = encode_json(payload)
+            if self._version == version:
+                self.cache.put(target, response)
+            return 200, response
+        return 404, encode_json({"error": f"No route for {path}."})
+
+    async def _solve(self, body: bytes) -> tuple[int, bytes]:
+        """Plans the profile in the request body on the solver pool."""
+        try:
+            profile = json.loads(body)
+        except ValueError as e:
+            return 400, encode_json({"error": f"Invalid JSON: {e}"})
+        solver_pool = await self._refresh_solver()
+        loop = asyncio.get_running_loop()
+        try:
+            plan = await loop.run_in_executor(solver_pool, plan_in_worker, profile)
+        except (KeyError, ValueError, TypeError) as e:
+            return 400, encode_json({"error": str(e)})
+        return 200, encode_json(plan)
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serves the requests on one connection, keeping it alive between them."""
+        self._connections[asyncio.current_task()] = writer  # type: ignore
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                # Read the headers
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_SIZE:
+                    writer.write(encode_response(413, {"error": "Request body too large."}, False))
+                    break
+                body = await reader.readexactly(length)
+                keep_alive = (
+                    version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                )
+                try:
+                    status, response = await self.handle_request(method, target, body)
+                except Exception as e:
+                    status, response = 500, encode_json({"error": str(e)})
+                writer.write(encode_body(status, response, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # The client went away or sent a malformed request
+            pass
+        finally:
+            del self._connections[asyncio.current_task()]  # type: ignore
+            writer.close()
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="CoDiet local HTTP API.")
+    parser.add_argument("--db", default=DB_PATH, help="Path to the database.")
+    parser.add_argument("--snapshot", default=SNAPSHOT_PATH, help="Path to the catalogue snapshot.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--read-workers", type=int, default=4)
+    parser.add_argument("--solver-workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE)
+    args = parser.parse_args()
+
+    async def serve() -> None:
+        server = CatalogueServer(
+            db_path=args.db,
+            snapshot_path=args.snapshot,
+            host=args.host,
+            port=args.port,
+            read_workers=args.read_workers,
+            solver_workers=args.solver_workers,
+            cache_size=args.cache_size,
+        )
+        await server.start()
+        print(f"Serving on http://{server.host}:{server.port}")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
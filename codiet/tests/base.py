@@ -0,0 +1,45 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from codiet.benchmarks.synthetic import build_synthetic_database
+
+class SyntheticDatabaseMixin:
+    """Builds a synthetic database in a temporary directory, once per class.
+
+    Set num_ingredients and num_recipes to size the catalogue. Tests which
+    change the database set copy_per_test, to run each test against its own
+    copy, in its own temporary directory, rather than rebuilding it.
+    """
+
+    num_ingredients = 20
+    num_recipes = 10
+    copy_per_test = False
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(cls.temp_dir.cleanup)
+        cls.db_path = os.path.join(cls.temp_dir.name, "synthetic.db")
+        cls.snapshot_path = os.path.join(cls.temp_dir.name, "synthetic.snapshot")
+        build_synthetic_database(cls.db_path, num_ingredients=cls.num_ingredients, num_recipes=cls.num_recipes)
+
+    def setUp(self):
+        super().setUp()
+        if self.copy_per_test:
+            test_dir = tempfile.TemporaryDirectory()
+            self.addCleanup(test_dir.cleanup)
+            self.test_dir = test_dir.name
+            self.db_path = os.path.join(self.test_dir, "synthetic.db")
+            self.snapshot_path = os.path.join(self.test_dir, "synthetic.snapshot")
+            shutil.copyfile(type(self).db_path, self.db_path)
+
+
+class SyntheticDatabaseTestCase(SyntheticDatabaseMixin, unittest.TestCase):
+    """Test case run against a synthetic database."""
+
+
+class AsyncSyntheticDatabaseTestCase(SyntheticDatabaseMixin, unittest.IsolatedAsyncioTestCase):
+    """Asyncio test case run against a synthetic database."""
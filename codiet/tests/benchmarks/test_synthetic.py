@@ -0,0 +1,37 @@
+import sqlite3
+import unittest
+
+from codiet.benchmarks.synthetic import generate_ingredient_datafiles, generate_recipe_datafiles
+from codiet.tests.base import SyntheticDatabaseTestCase
+
+class TestGenerateDatafiles(unittest.TestCase):
+    """Test the synthetic datafile generators."""
+
+    def test_same_seed_gives_same_catalogue(self):
+        """Test that the generators are repeatable for a given seed."""
+        self.assertEqual(
+            generate_ingredient_datafiles(20, seed=1), generate_ingredient_datafiles(20, seed=1)
+        )
+        self.assertEqual(
+            generate_recipe_datafiles(20, 20, seed=1), generate_recipe_datafiles(20, 20, seed=1)
+        )
+
+    def test_ingredient_names_are_unique(self):
+        """Test that every synthetic ingredient has a unique name."""
+        names = [datafile["name"] for datafile in generate_ingredient_datafiles(200)]
+        self.assertEqual(len(names), len(set(names)))
+
+class TestBuildSyntheticDatabase(SyntheticDatabaseTestCase):
+    """Test building a synthetic database."""
+
+    num_ingredients = 50
+    num_recipes = 30
+
+    def test_builds_requested_counts(self):
+        """Test that the database holds the requested number of entities."""
+        connection = sqlite3.connect(self.db_path)
+        try:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM ingredient_base").fetchone()[0], 50)
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM recipe_base").fetchone()[0], 30)
+        finally:
+            connection.close()
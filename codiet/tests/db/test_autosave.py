@@ -0,0 +1,71 @@
+import sqlite3
+import time
+
+from codiet.db.autosave import AutosaveQueue
+from codiet.tests.base import SyntheticDatabaseTestCase
+
+class TestAutosaveQueue(SyntheticDatabaseTestCase):
+    """Test the background autosave of field-level edits."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with sqlite3.connect(cls.db_path) as connection:
+            cls.recipe_id, cls.ingredient_id = connection.execute(
+                "SELECT recipe_id, ingredient_id FROM recipe_ingredients LIMIT 1;"
+            ).fetchone()
+
+    def fetch_quantity(self) -> tuple:
+        """Returns the quantity value and upper tolerance of the edited recipe ingredient."""
+        with sqlite3.connect(self.db_path) as connection:
+            return connection.execute(
+                "SELECT qty_value, qty_tol_upper FROM recipe_ingredients WHERE recipe_id = ? AND ingredient_id = ?;",
+                (self.recipe_id, self.ingredient_id),
+            ).fetchone()
+
+    def put_field(self, queue: AutosaveQueue, field: str, value) -> None:
+        """Queues an edit of a field of the recipe ingredient."""
+        queue.put(
+            ("recipe_ingredient", self.recipe_id, self.ingredient_id, field),
+            "update_recipe_ingredient_field",
+            self.recipe_id,
+            self.ingredient_id,
+            field,
+            value,
+        )
+
+    def test_repeated_edits_coalesce(self):
+        """Test that repeated edits to a field are written once, with the last value."""
+        queue = AutosaveQueue(self.db_path, interval=60)
+        for value in range(1, 101):
+            self.put_field(queue, "qty_value", float(value))
+        self.put_field(queue, "qty_utol", 5.0)
+        self.assertEqual(len(queue), 2)
+        self.assertEqual(queue.stats["coalesced"], 99)
+        self.assertEqual(queue.flush(), 2)
+        self.assertEqual(self.fetch_quantity(), (100.0, 5.0))
+        self.assertEqual(queue.flush(), 0)
+        queue.stop()
+
+    def test_bad_edit_does_not_block_the_batch(self):
+        """Test that an edit which fails is dropped, and the rest are written."""
+        queue = AutosaveQueue(self.db_path, interval=60)
+        self.put_field(queue, "qty_value", 42.0)
+        self.put_field(queue, "not_a_field", 1.0)
+        self.put_field(queue, "qty_utol", 7.0)
+        self.assertEqual(queue.flush(), 2)
+        self.assertEqual(queue.stats["failed"], 1)
+        self.assertIsInstance(queue.last_error, ValueError)
+        self.assertEqual(self.fetch_quantity(), (42.0, 7.0))
+        self.assertEqual(len(queue), 0)
+        queue.stop()
+
+    def test_background_thread_flushes(self):
+        """Test that queued edits are written without an explicit flush."""
+        queue = AutosaveQueue(self.db_path, interval=0.01)
+        self.put_field(queue, "qty_value", 250.0)
+        deadline = time.monotonic() + 5
+        while queue.stats["written"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        queue.stop()
+        self.assertEqual(self.fetch_quantity()[0], 250.0)
@@ -0,0 +1,80 @@
+import json
+import random
+import re
+import unittest
+
+from codiet.db_construction.batch_prompts import BatchPromptPlanner, parse_nutrient_batch
+
+def make_entry(value: float = 1.0) -> dict:
+    """Make a valid nutrient entry."""
+    return {"ntr_qty_value": value, "ntr_qty_unit": "g", "ing_qty_value": 100, "ing_qty_unit": "g"}
+
+class FakeModel:
+    """Stands in for the completion endpoint. Like a lazy model, it only
+    answers the first few entries of a prompt, and garbles some of those."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.0, seed: int = 0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.num_calls = 0
+
+    def __call__(self, prompt: str, attempt: int) -> str:
+        self.num_calls += 1
+        requested = json.loads(re.search(r"nutrients: (\{.*\})\n", prompt).group(1))
+        response = {}
+        answered = 0
+        for ingredient_name, nutrient_names in requested.items():
+            for nutrient_name in nutrient_names:
+                if answered == self.capacity:
+                    return json.dumps(response)
+                answered += 1
+                entry = make_entry() if self.rng.random() >= self.error_rate else {"ntr_qty_value": "lots"}
+                response.setdefault(ingredient_name, {})[nutrient_name] = entry
+        return json.dumps(response)
+
+class TestBatchPromptPlanner(unittest.TestCase):
+    """Test the adaptive batch prompt planner."""
+
+    def setUp(self):
+        self.missing = {
+            f"Ingredient {i}": [f"nutrient {j}" for j in range(60)] for i in range(20)
+        }
+
+    def test_entries_are_checked_individually(self):
+        """Test that good entries are kept and bad or missing ones rejected."""
+        batch = [("Apple", "fibre"), ("Apple", "protein"), ("Pear", "fibre")]
+        response = json.dumps({"Apple": {"fibre": make_entry(), "protein": make_entry(-1)}})
+        valid, rejected = parse_nutrient_batch(batch, response)
+        self.assertEqual(list(valid), [("Apple", "fibre")])
+        self.assertEqual(rejected, [("Apple", "protein"), ("Pear", "fibre")])
+        self.assertEqual(parse_nutrient_batch(batch, "not json")[1], batch)
+
+    def test_fills_every_entry_in_few_requests(self):
+        """Test that every entry is filled, with far fewer requests than
+        asking for five nutrients of one ingredient at a time."""
+        model = FakeModel(capacity=80, error_rate=0.05)
+        planner = BatchPromptPlanner(complete=model)
+        filled = {}
+        for batch in planner.run(self.missing):
+            for ingredient_name, nutrients in batch.items():
+                filled.setdefault(ingredient_name, {}).update(nutrients)
+        self.assertEqual({name: sorted(n) for name, n in filled.items()}, {name: sorted(n) for name, n in self.missing.items()})
+        self.assertEqual(planner.failed, [])
+        # Fixed chunks of 5 would take 20 * 12 = 240 requests
+        self.assertLess(model.num_calls, 40)
+
+    def test_batch_size_adapts_to_the_model(self):
+        """Test that the batch size settles near what the model will answer."""
+        planner = BatchPromptPlanner(complete=FakeModel(capacity=30))
+        for _ in planner.run(self.missing):
+            pass
+        self.assertLessEqual(max(planner.batch_sizes[-5:]), 60)
+        self.assertGreaterEqual(planner.num_entries_filled / planner.num_entries_requested, 0.5)
+
+    def test_gives_up_on_entries_that_never_validate(self):
+        """Test that entries are given up on after the maximum attempts."""
+        planner = BatchPromptPlanner(complete=lambda prompt, attempt: "{}", max_entry_attempts=3)
+        for _ in planner.run({"Apple": ["fibre", "protein"]}):
+            pass
+        self.assertEqual(sorted(planner.failed), [("Apple", "fibre"), ("Apple", "protein")])
@@ -0,0 +1,52 @@
+from codiet.db.database_service import DatabaseService
+from codiet.tests.base import SyntheticDatabaseTestCase
+
+class TestCascadingDeletes(SyntheticDatabaseTestCase):
+    """Test the ingredient to recipe reverse index and cascading deletes."""
+
+    num_ingredients = 30
+    num_recipes = 20
+    copy_per_test = True
+
+    def _count(self, db_service: DatabaseService, table: str, column: str, ids: list[int]) -> int:
+        """Returns the number of rows in the table referencing any of the IDs."""
+        return db_service._repo._db.execute(
+            f"SELECT COUNT(*) FROM {table} WHERE {column} IN ({', '.join('?' * len(ids))});",
+            ids,
+        ).fetchone()[0]
+
+    def test_recipes_using_ingredients(self):
+        """Test that the reverse lookup finds every recipe using an ingredient."""
+        with DatabaseService(self.db_path) as db_service:
+            expected = sorted({
+                recipe_id
+                for recipe_id, ingredient_id, _, _ in db_service.fetch_all_recipe_ingredient_quantities()
+                if ingredient_id in (1, 2)
+            })
+            self.assertEqual(db_service.fetch_recipe_ids_using_ingredients([1, 2]), expected)
+
+    def test_ingredient_delete_cascades(self):
+        """Test that deleting ingredients leaves no orphaned rows behind."""
+        with DatabaseService(self.db_path) as db_service:
+            ingredient_ids = [1, 2, 3]
+            recipe_ids = db_service.fetch_recipe_ids_using_ingredients(ingredient_ids)
+            self.assertGreater(len(recipe_ids), 0)
+            db_service.delete_ingredients_by_ids(ingredient_ids)
+        # Check from a fresh connection, so the delete must have been committed
+        with DatabaseService(self.db_path) as db_service:
+            for table in ["ingredient_base", "ingredient_flags", "ingredient_nutrients",
+                          "ingredient_nutrient_densities", "recipe_ingredients"]:
+                self.assertEqual(self._count(db_service, table, "ingredient_id", ingredient_ids), 0)
+            # The recipes themselves are kept
+            self.assertEqual(self._count(db_service, "recipe_base", "recipe_id", recipe_ids), len(recipe_ids))
+
+    def test_recipe_delete_cascades(self):
+        """Test that deleting a recipe removes its ingredients, serve times and tags."""
+        with DatabaseService(self.db_path) as db_service:
+            recipe_name = db_service.fetch_all_recipe_names()[0]
+            recipe_id = db_service._repo.fetch_recipe_id(recipe_name)
+            db_service.delete_recipe_by_name(recipe_name)
+        with DatabaseService(self.db_path) as db_service:
+            for table in ["recipe_base", "recipe_ingredients", "recipe_serve_times", "recipe_tags"]:
+                self.assertEqual(self._count(db_service, table, "recipe_id", [recipe_id]), 0)
+            self.assertNotIn(recipe_id, db_service._repo.fetch_recipe_ids_by_serve_time(12 * 60))
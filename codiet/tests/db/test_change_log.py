@@ -0,0 +1,40 @@
+from codiet.db.database_service import DatabaseService
+from codiet.models.recipes import Recipe
+from codiet.tests.base import SyntheticDatabaseTestCase
+
+class TestChangeLog(SyntheticDatabaseTestCase):
+    """Test the change log triggers and version queries."""
+
+    num_ingredients = 20
+    num_recipes = 10
+    copy_per_test = True
+
+    def test_changes_since_lists_only_changed_entities(self):
+        """Test that only the entities changed after a version are returned."""
+        with DatabaseService(self.db_path) as db_service:
+            database_id, version = db_service.fetch_change_version()
+            # Nothing has changed since the current version
+            self.assertEqual(db_service.fetch_changes_since(version), {})
+            # Change one ingredient's associations and add a recipe
+            db_service._repo.update_ingredient_gi(3, 42)
+            recipe = Recipe()
+            recipe.name = "New Recipe"
+            db_service.insert_new_recipe(recipe)
+            db_service.commit()
+            new_database_id, new_version = db_service.fetch_change_version()
+            changes = db_service.fetch_changes_since(version)
+        self.assertEqual(new_database_id, database_id)
+        self.assertGreater(new_version, version)
+        self.assertEqual(set(changes), {"ingredient", "recipe"})
+        self.assertEqual(changes["ingredient"], {3: "U"})
+        self.assertEqual(list(changes["recipe"]), [recipe.id])
+
+    def test_delete_is_logged_against_the_entity(self):
+        """Test that deleting an entity records a delete for it."""
+        with DatabaseService(self.db_path) as db_service:
+            _, version = db_service.fetch_change_version()
+            recipe_name = db_service.fetch_all_recipe_names()[0]
+            recipe_id = db_service._repo.fetch_recipe_id(recipe_name)
+            db_service.delete_recipe_by_name(recipe_name)
+            changes = db_service.fetch_changes_since(version)
+        self.assertEqual(changes["recipe"], {recipe_id: "D"})
@@ -0,0 +1,91 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from codiet.db.database_service import DatabaseService
+from codiet.db_construction import INGREDIENT_DATA_DIR, populate_database
+from codiet.db_construction.create_schema import create_schema
+from codiet.db_construction import ingredient_store
+from codiet.db_construction.ingredient_store import (
+    INGREDIENT_STORE_ENV_VAR,
+    IngredientStore,
+    export_ingredient_datafiles,
+    import_ingredient_datafiles,
+    read_ingredient_datafiles,
+    using_ingredient_store,
+)
+
+class TestIngredientStore(unittest.TestCase):
+    """Test the consolidated ingredient store and its converters."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = IngredientStore(os.path.join(self.temp_dir.name, "ingredients.db"))
+        self.datafiles = list(read_ingredient_datafiles())
+        import_ingredient_datafiles(self.store)
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_round_trip_preserves_datafiles(self):
+        """Test that importing then exporting reproduces every datafile."""
+        self.assertEqual(len(self.store), len(os.listdir(INGREDIENT_DATA_DIR)))
+        export_dir = os.path.join(self.temp_dir.name, "export")
+        self.assertEqual(export_ingredient_datafiles(self.store, export_dir), len(self.store))
+        exported = sorted(read_ingredient_datafiles(export_dir), key=lambda data: data["name"])
+        self.assertEqual(exported, sorted(self.datafiles, key=lambda data: data["name"]))
+
+    def test_export_removes_deleted_ingredients(self):
+        """Test that exporting deletes the datafiles of ingredients removed from the store."""
+        export_dir = os.path.join(self.temp_dir.name, "export")
+        export_ingredient_datafiles(self.store, export_dir)
+        self.store.delete(self.datafiles[0]["name"])
+        self.assertEqual(export_ingredient_datafiles(self.store, export_dir), len(self.store))
+        self.assertEqual(len(os.listdir(export_dir)), len(self.store))
+
+    def test_store_is_opt_in(self):
+        """Test that the store is only used when opted in to, even once it exists."""
+        with mock.patch.object(ingredient_store, "INGREDIENT_STORE_FILEPATH", self.store.path):
+            with mock.patch.dict(os.environ, {INGREDIENT_STORE_ENV_VAR: ""}):
+                self.assertFalse(using_ingredient_store())
+            with mock.patch.dict(os.environ, {INGREDIENT_STORE_ENV_VAR: "1"}):
+                self.assertTrue(using_ingredient_store())
+        missing_path = os.path.join(self.temp_dir.name, "missing.db")
+        with mock.patch.object(ingredient_store, "INGREDIENT_STORE_FILEPATH", missing_path):
+            with mock.patch.dict(os.environ, {INGREDIENT_STORE_ENV_VAR: "1"}):
+                with self.assertRaises(FileNotFoundError):
+                    using_ingredient_store()
+
+    def test_updates_only_changed_rows(self):
+        """Test that a maintenance pass only writes back the records it changes."""
+        name = self.datafiles[0]["name"]
+
+        def set_gi(ingredient_data: dict) -> None:
+            if ingredient_data["name"] == name:
+                ingredient_data["GI"] = 12.5
+
+        self.assertEqual(self.store.update_each(set_gi), 1)
+        self.assertEqual(self.store.get(name)["GI"], 12.5)
+        self.store.delete(name)
+        self.assertNotIn(name, self.store)
+        with self.assertRaises(KeyError):
+            self.store.get(name)
+
+    def test_builds_the_same_database(self):
+        """Test that pushing from the store matches pushing from the datafiles."""
+        ingredient_names = []
+        for source in ["datafiles", "store"]:
+            db_path = os.path.join(self.temp_dir.name, f"{source}.db")
+            create_schema(db_path)
+            populate_database.push_flags_to_db(db_path)
+            populate_database.push_nutrients_to_db(db_path)
+            populate_database.push_ingredients_to_db(
+                db_path, ingredient_store_path=self.store.path if source == "store" else None
+            )
+            with DatabaseService(db_path) as db_service:
+                ingredient_names.append(sorted(db_service.fetch_all_ingredient_names()))
+        self.assertEqual(ingredient_names[0], ingredient_names[1])
+        self.assertEqual(len(ingredient_names[0]), len(self.datafiles))
@@ -0,0 +1,62 @@
+import unittest
+
+from codiet.db import instrumentation
+from codiet.db.database import Database
+from codiet.db.repository import Repository
+
+class TestQueryProfiler(unittest.TestCase):
+    """Test profiling the statements run through Database.execute."""
+
+    def setUp(self):
+        self.profiler = instrumentation.enable_profiling()
+        self.profiler.reset()
+        self.db = Database(":memory:")
+        self.db.connection.execute(
+            "CREATE TABLE global_flag_list (flag_id INTEGER PRIMARY KEY, flag_name TEXT)"
+        )
+        self.repo = Repository(self.db)
+
+    def tearDown(self):
+        self.db.connection.close()
+        instrumentation.disable_profiling()
+
+    def test_records_counts_rows_and_callers(self):
+        """Test that each statement is counted with its rows and calling method."""
+        for name in ["vegan", "vegetarian", "gluten free"]:
+            self.repo.insert_global_flag(name)
+        self.assertEqual(len(self.repo.fetch_all_global_flag_names()), 3)
+
+        statements = self.profiler.report()["statements"]
+        insert = statements["INSERT INTO global_flag_list (flag_name) VALUES (?);"]
+        self.assertEqual(insert["count"], 3)
+        self.assertEqual(insert["callers"], {"insert_global_flag": 3})
+        select = statements["SELECT flag_name FROM global_flag_list;"]
+        self.assertEqual(select["count"], 1)
+        self.assertEqual(select["rows"], 3)
+
+    def test_cursor_passes_through_attributes(self):
+        """Test that the wrapped cursor still exposes lastrowid."""
+        self.assertEqual(self.repo.insert_global_flag("vegan"), 1)
+
+    def test_actions_flag_repeated_statements(self):
+        """Test that an action repeating a statement is reported as a possible N+1."""
+
+        @instrumentation.profiled_action("load flags")
+        def load_flags():
+            for _ in range(instrumentation.N_PLUS_ONE_THRESHOLD + 1):
+                self.repo.fetch_all_global_flag_names()
+
+        load_flags()
+        report = self.profiler.report()
+        self.assertEqual(report["actions"]["load flags"]["count"], 1)
+        self.assertEqual(
+            report["actions"]["load flags"]["queries"], instrumentation.N_PLUS_ONE_THRESHOLD + 1
+        )
+        self.assertEqual(report["n_plus_one_suspects"][0]["action"], "load flags")
+        self.assertIn("load flags", self.profiler.format_report())
+
+    def test_disabled_profiler_records_nothing(self):
+        """Test that nothing is recorded when profiling is switched off."""
+        instrumentation.disable_profiling()
+        self.repo.fetch_all_global_flag_names()
+        self.assertEqual(self.profiler.statements, {})
@@ -0,0 +1,76 @@
+from codiet.db.database_service import DatabaseService
+from codiet.utils.units import calculate_density, calculate_piece_mass, convert_to_grams
+from codiet.tests.base import SyntheticDatabaseTestCase
+
+class TestNutrientDensities(SyntheticDatabaseTestCase):
+    """Test the materialised ingredient nutrient density table."""
+
+    num_ingredients = 30
+    num_recipes = 5
+    copy_per_test = True
+
+    def _python_densities(self, db_service: DatabaseService) -> dict[tuple[int, int], float]:
+        """Returns the grams per gram of each ingredient nutrient, converted in Python."""
+        quantities = {}
+        for row in db_service.fetch_all_ingredient_quantity_data():
+            quantities[row[0]] = (
+                calculate_density(row[5], row[4], row[7], row[6]),
+                calculate_piece_mass(row[8], row[10], row[9]),
+            )
+        densities = {}
+        for ing_id, nut_id, ntr_value, ntr_unit, ing_value, ing_unit in (
+            db_service.fetch_all_ingredient_nutrient_quantities()
+        ):
+            nutrient_grams = convert_to_grams(ntr_value, ntr_unit)
+            ingredient_grams = convert_to_grams(ing_value, ing_unit, *quantities[ing_id])
+            if nutrient_grams is not None and ingredient_grams:
+                densities[(ing_id, nut_id)] = nutrient_grams / ingredient_grams
+        return densities
+
+    def test_table_matches_python_conversion(self):
+        """Test that the triggers convert every ratio as the units module does."""
+        with DatabaseService(self.db_path) as db_service:
+            expected = self._python_densities(db_service)
+            actual = {
+                (row[0], row[1]): row[2]
+                for row in db_service.fetch_all_ingredient_nutrient_densities()
+            }
+        self.assertEqual(set(actual), set(expected))
+        for key, value in expected.items():
+            self.assertAlmostEqual(actual[key], value)
+
+    def test_group_threshold_query(self):
+        """Test that a group nutrient threshold sums its leaf nutrients."""
+        with DatabaseService(self.db_path) as db_service:
+            leaf_ids = set(db_service._repo.fetch_leaf_nutrient_ids("protein"))
+            totals = {}
+            for (ing_id, nut_id), value in self._python_densities(db_service).items():
+                if nut_id in leaf_ids:
+                    totals[ing_id] = totals.get(ing_id, 0.0) + value
+            threshold = sorted(totals.values())[len(totals) // 2]
+            matched = db_service.fetch_ingredient_ids_by_nutrient_density(
+                "protein", min_grams_per_gram=threshold
+            )
+        self.assertEqual(len(leaf_ids), 20)
+        self.assertEqual(matched, sorted(id for id, total in totals.items() if total >= threshold))
+
+    def test_density_change_updates_volume_ratios(self):
+        """Test that changing an ingredient's density reconverts its volume ratios."""
+        with DatabaseService(self.db_path) as db_service:
+            # Measure one ingredient's nutrients per millilitre
+            db_service._repo._db.execute(
+                "UPDATE ingredient_nutrients SET ing_qty_unit = 'ml' WHERE ingredient_id = 1;"
+            )
+            db_service._repo.update_ingredient_density(1, "g", 2.0, "ml", 1.0)
+            before = dict(
+                (row[1], row[2]) for row in db_service.fetch_all_ingredient_nutrient_densities()
+                if row[0] == 1
+            )
+            db_service._repo.update_ingredient_density(1, "g", 4.0, "ml", 1.0)
+            after = dict(
+                (row[1], row[2]) for row in db_service.fetch_all_ingredient_nutrient_densities()
+                if row[0] == 1
+            )
+        self.assertGreater(len(before), 0)
+        for nutrient_id, value in before.items():
+            self.assertAlmostEqual(after[nutrient_id], value / 2)
@@ -0,0 +1,41 @@
+from codiet.benchmarks.query_plans import (
+    REPOSITORY_CALLS,
+    check_query_plans,
+    find_full_scans,
+    list_repository_methods,
+)
+from codiet.tests.base import SyntheticDatabaseTestCase
+
+class TestQueryPlans(SyntheticDatabaseTestCase):
+    """Test that every Repository query is explained and uses its indexes."""
+
+    num_ingredients = 60
+    num_recipes = 60
+    copy_per_test = True
+
+    def test_every_method_is_covered(self):
+        """Test that the harness knows how to call every public Repository method."""
+        self.assertEqual(
+            [method for method in list_repository_methods() if method not in REPOSITORY_CALLS], []
+        )
+
+    def test_find_full_scans(self):
+        """Test that only scans of catalogue tables are reported."""
+        aliases = {"ri": "recipe_ingredients"}
+        plan = [
+            "SCAN ri",
+            "SCAN global_flag_list",
+            "SEARCH recipe_base USING INTEGER PRIMARY KEY (rowid=?)",
+            "SCAN recipe_serve_time_index VIRTUAL TABLE INDEX 2:D1B0",
+        ]
+        catalogue = {"recipe_ingredients", "recipe_base", "recipe_serve_time_index"}
+        self.assertEqual(find_full_scans(plan, aliases, catalogue), ["recipe_ingredients"])
+
+    def test_no_hot_path_scans(self):
+        """Test that no hot-path query scans a catalogue table."""
+        results = check_query_plans(self.db_path, repeats=1)
+        self.assertEqual(results["violations"], [])
+        self.assertEqual(set(results["latencies"]), set(REPOSITORY_CALLS))
+        # The checks are rolled back, so the database is left unchanged
+        results_again = check_query_plans(self.db_path, repeats=1)
+        self.assertEqual(len(results_again["plans"]), len(results["plans"]))
@@ -0,0 +1,74 @@
+import os
+import shutil
+
+from codiet.benchmarks.synthetic import build_synthetic_database
+from codiet.db.database_service import DatabaseService
+from codiet.db_construction import recipe_io
+from codiet.exceptions.recipe_exceptions import (
+    RecipeIngredientNotFoundError,
+    RecipeNameExistsError,
+)
+from codiet.tests.base import SyntheticDatabaseTestCase
+
+class TestRecipeImportExport(SyntheticDatabaseTestCase):
+    """Test the streaming recipe import and export."""
+
+    num_ingredients = 30
+    num_recipes = 25
+    copy_per_test = True
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Both databases share the same ingredients, only the source has recipes
+        cls.empty_db_path = os.path.join(cls.temp_dir.name, "empty.db")
+        build_synthetic_database(cls.empty_db_path, num_ingredients=cls.num_ingredients, num_recipes=0)
+
+    def setUp(self):
+        super().setUp()
+        self.source_db_path = self.db_path
+        self.target_db_path = os.path.join(self.test_dir, "target.db")
+        self.jsonl_path = os.path.join(self.test_dir, "recipes.jsonl")
+        shutil.copyfile(self.empty_db_path, self.target_db_path)
+
+    def _export_records(self, db_path: str) -> list[dict]:
+        """Returns every recipe record exported from the database."""
+        with DatabaseService(db_path) as db_service:
+            return list(db_service.iter_recipe_records())
+
+    def test_round_trip_preserves_recipes(self):
+        """Test that exporting then importing reproduces every recipe."""
+        self.assertEqual(recipe_io.export_recipes_jsonl(self.jsonl_path, self.source_db_path), 25)
+        self.assertEqual(
+            recipe_io.import_recipes_jsonl(self.jsonl_path, self.target_db_path, batch_size=7), 25
+        )
+        self.assertEqual(
+            self._export_records(self.target_db_path), self._export_records(self.source_db_path)
+        )
+
+    def test_export_includes_associations(self):
+        """Test that the exported records include ingredients, serve times and tags."""
+        record = self._export_records(self.source_db_path)[0]
+        self.assertGreater(len(record["ingredients"]), 0)
+        self.assertGreater(len(record["serve_times"]), 0)
+        self.assertGreater(len(record["tags"]), 0)
+        self.assertIsNotNone(next(iter(record["ingredients"].values()))["name"])
+
+    def test_existing_recipes_need_replace(self):
+        """Test that importing an existing recipe fails unless replace is set."""
+        records = self._export_records(self.source_db_path)[:3]
+        records[0]["description"] = "Changed"
+        with DatabaseService(self.source_db_path) as db_service:
+            with self.assertRaises(RecipeNameExistsError):
+                db_service.insert_recipe_records(records)
+            recipe_io.import_recipe_records(records, db_service, replace=True)
+        self.assertEqual(self._export_records(self.source_db_path)[:3], records)
+
+    def test_unknown_ingredient_is_rejected(self):
+        """Test that a recipe referencing a missing ingredient is not imported."""
+        records = self._export_records(self.source_db_path)[:2]
+        next(iter(records[1]["ingredients"].values()))["name"] = "Not An Ingredient"
+        with DatabaseService(self.target_db_path) as db_service:
+            with self.assertRaises(RecipeIngredientNotFoundError):
+                recipe_io.import_recipe_records(records, db_service)
+        self.assertEqual(self._export_records(self.target_db_path), [])
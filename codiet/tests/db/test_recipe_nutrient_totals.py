@@ -0,0 +1,100 @@
+import numpy as np
+
+from codiet.db.database_service import DatabaseService
+from codiet.optimiser.catalogue import Catalogue
+from codiet.utils.nutrients import ENERGY_FACTORS, ENERGY_NUTRIENT_NAME
+from codiet.tests.base import SyntheticDatabaseTestCase
+
+class TestRecipeNutrientTotals(SyntheticDatabaseTestCase):
+    """Test the SQL recipe nutrient aggregation and range search."""
+
+    num_ingredients = 30
+    num_recipes = 20
+    copy_per_test = True
+
+    def setUp(self):
+        super().setUp()
+        with DatabaseService(self.db_path) as db_service:
+            db_service.sync_recipe_nutrient_totals()
+
+    def _expected_totals(self, db_service: DatabaseService) -> dict[int, dict[str, float]]:
+        """Returns the leaf nutrient totals of each recipe, summed in Python."""
+        catalogue = Catalogue.from_database(db_service)
+        leaf_rows = db_service.fetch_all_leaf_nutrient_rows()
+        leaf_index = {id: i for i, (id, _) in enumerate(leaf_rows)}
+        densities = np.zeros((catalogue.num_ingredients, len(leaf_rows)))
+        for ing_id, nut_id, value in db_service.fetch_all_ingredient_nutrient_densities():
+            densities[catalogue.ingredient_index[ing_id], leaf_index[nut_id]] = value
+        totals = np.zeros((catalogue.num_recipes, len(leaf_rows)))
+        np.add.at(
+            totals,
+            catalogue.recipe_rows,
+            # Quantities which can't be converted to grams are left out
+            np.nan_to_num(catalogue.recipe_grams)[:, None] * densities[catalogue.recipe_cols],
+        )
+        return {
+            int(recipe_id): {name: totals[i, j] for j, (_, name) in enumerate(leaf_rows)}
+            for i, recipe_id in enumerate(catalogue.recipe_ids)
+        }
+
+    def test_totals_match_python_aggregation(self):
+        """Test that leaf, group and energy totals match a Python aggregation."""
+        with DatabaseService(self.db_path) as db_service:
+            expected = self._expected_totals(db_service)
+            protein_leaves = [
+                name for id, name in db_service.fetch_all_leaf_nutrient_rows()
+                if id in db_service._repo.fetch_leaf_nutrient_ids("protein")
+            ]
+            for recipe_id, leaf_totals in expected.items():
+                totals = db_service.fetch_recipe_nutrient_totals(recipe_id)
+                # Nutrients with no data in the recipe have no total
+                self.assertAlmostEqual(totals.get("leucine", 0.0), leaf_totals["leucine"])
+                self.assertAlmostEqual(
+                    totals.get("protein", 0.0), sum(leaf_totals[name] for name in protein_leaves)
+                )
+                # Fibre is in the carbohydrate total, but only counts at its own factor
+                energy = sum(
+                    totals.get(name, 0.0) * factor for name, factor in ENERGY_FACTORS.items()
+                ) - ENERGY_FACTORS["carbohydrate"] * totals.get("fibre", 0.0)
+                self.assertAlmostEqual(totals.get(ENERGY_NUTRIENT_NAME, 0.0), energy)
+
+    def test_range_search_intersects_predicates(self):
+        """Test that a multi-range search matches recipes within every range."""
+        with DatabaseService(self.db_path) as db_service:
+            totals = {
+                recipe_id: db_service.fetch_recipe_nutrient_totals(recipe_id)
+                for recipe_id in db_service.fetch_all_recipe_ids()
+            }
+            max_energy = float(np.median([t["energy"] for t in totals.values()]))
+            min_protein = float(np.median([t["protein"] for t in totals.values()]))
+            matched = db_service.fetch_recipe_ids_by_nutrient_ranges(
+                {"energy": (None, max_energy), "protein": (min_protein, None)}
+            )
+        expected = sorted(
+            recipe_id for recipe_id, t in totals.items()
+            if t["energy"] <= max_energy and t["protein"] >= min_protein
+        )
+        self.assertEqual(matched, expected)
+
+    def test_range_search_rejects_unknown_nutrients(self):
+        """Test that a misspelt nutrient raises, rather than matching nothing."""
+        with DatabaseService(self.db_path) as db_service:
+            with self.assertRaisesRegex(ValueError, "protien"):
+                db_service.fetch_recipe_ids_by_nutrient_ranges({"protien": (1, None)})
+            # Group nutrients and the energy are known
+            db_service.fetch_recipe_ids_by_nutrient_ranges({"carbohydrate": (1, None), "energy": (None, 600)})
+
+    def test_sync_refreshes_changed_recipes(self):
+        """Test that syncing picks up a change to a recipe's ingredients."""
+        with DatabaseService(self.db_path) as db_service:
+            recipe_id = db_service.fetch_all_recipe_ids()[0]
+            before = db_service.fetch_recipe_nutrient_totals(recipe_id)["energy"]
+            # Double every ingredient quantity in the recipe
+            db_service._repo._db.execute(
+                "UPDATE recipe_ingredients SET qty_value = qty_value * 2 WHERE recipe_id = ?;",
+                (recipe_id,),
+            )
+            db_service.commit()
+            db_service.sync_recipe_nutrient_totals()
+            after = db_service.fetch_recipe_nutrient_totals(recipe_id)["energy"]
+        self.assertAlmostEqual(after, 2 * before)
@@ -0,0 +1,46 @@
+from codiet.db.database_service import DatabaseService
+from codiet.models.recipes import Recipe
+from codiet.db.reference_data import REFERENCE_FETCHERS, ReferenceDataCache
+from codiet.tests.base import SyntheticDatabaseTestCase
+
+class TestReferenceDataCache(SyntheticDatabaseTestCase):
+    """Test the shared reference data cache."""
+
+    def test_prefetch_in_background_fills_every_list(self):
+        """Test that a background prefetch caches every reference list."""
+        cache = ReferenceDataCache(self.db_path)
+        cache.prefetch_in_background().join()
+        self.assertEqual(set(cache._data), set(REFERENCE_FETCHERS))
+        self.assertEqual(len(cache.get("ingredient_names")), 20)
+
+    def test_get_returns_a_copy(self):
+        """Test that changing a returned list doesn't change the cache."""
+        cache = ReferenceDataCache(self.db_path)
+        cache.get("recipe_names").append("Not A Recipe")
+        self.assertNotIn("Not A Recipe", cache.get("recipe_names"))
+
+    def test_refresh_picks_up_changes(self):
+        """Test that refreshing a list refetches it from the database."""
+        cache = ReferenceDataCache(self.db_path)
+        self.assertNotIn("Test Recipe", cache.get("recipe_names"))
+        with DatabaseService(self.db_path) as db_service:
+            recipe = Recipe()
+            recipe.name = "Test Recipe"
+            db_service.insert_new_recipe(recipe)
+            db_service.commit()
+        self.assertNotIn("Test Recipe", cache.get("recipe_names"))
+        self.assertIn("Test Recipe", cache.refresh("recipe_names"))
+
+    def test_sync_drops_only_changed_lists(self):
+        """Test that syncing drops just the lists whose tables changed."""
+        cache = ReferenceDataCache(self.db_path)
+        cache.prefetch()
+        self.assertEqual(cache.sync(), [])
+        with DatabaseService(self.db_path) as db_service:
+            recipe = Recipe()
+            recipe.name = "Synced Recipe"
+            db_service.insert_new_recipe(recipe)
+            db_service.commit()
+        self.assertEqual(cache.sync(), ["recipe_names"])
+        self.assertIn("Synced Recipe", cache.get("recipe_names"))
+        self.assertIn("ingredient_names", cache._data)
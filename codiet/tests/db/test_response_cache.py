@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from codiet.db_construction import openai
+from codiet.db_construction.response_cache import ResponseCache, make_cache_key, set_response_cache
+
+class FakeClient:
+    """Stands in for the OpenAI client, replying from a list of responses."""
+
+    def __init__(self, responses: list[str]):
+        self.responses = list(responses)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, model):
+        self.calls += 1
+        content = self.responses.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+class TestResponseCache(unittest.TestCase):
+    """Test the content-addressed OpenAI response cache."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(os.path.join(self.temp_dir.name, "cache.db"), max_bytes=1000)
+        set_response_cache(self.cache)
+
+    def tearDown(self):
+        set_response_cache(None)
+        self.cache.close()
+        self.temp_dir.cleanup()
+
+    def test_keys_depend_on_every_part_of_the_request(self):
+        """Test that the key changes with the model, messages and parameters."""
+        messages = [{"role": "user", "content": "Hello"}]
+        key = make_cache_key("model", messages, {"attempt": 0})
+        self.assertEqual(key, make_cache_key("model", [{"content": "Hello", "role": "user"}], {"attempt": 0}))
+        self.assertNotEqual(key, make_cache_key("other", messages, {"attempt": 0}))
+        self.assertNotEqual(key, make_cache_key("model", messages, {"attempt": 1}))
+
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest responses are evicted to keep within the size limit."""
+        self.cache.put("a", "model", "x" * 400)
+        self.cache.put("b", "model", "x" * 400)
+        self.cache.get("a")
+        self.cache.put("c", "model", "x" * 400)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertIsNotNone(self.cache.get("a"))
+        self.assertLessEqual(self.cache.size, 1000)
+
+    def test_reruns_replay_responses(self):
+        """Test that a rerun replays every response, retries included, without the API."""
+        client = FakeClient(["not a number", "55"])
+        with mock.patch.object(openai, "_get_client", return_value=client):
+            self.assertEqual(openai.get_openai_ingredient_gi("Apple"), 55.0)
+        self.assertEqual(client.calls, 2)
+        # The rerun must not touch the API at all
+        with mock.patch.object(openai, "_get_client", side_effect=AssertionError):
+            self.assertEqual(openai.get_openai_ingredient_gi("Apple"), 55.0)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+        self.assertEqual(self.cache.hit_rate, 0.5)
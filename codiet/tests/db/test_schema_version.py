@@ -0,0 +1,179 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime
+
+from codiet.db import SCHEMA_VERSION
+from codiet.db.database_service import DatabaseService
+from codiet.exceptions.database_exceptions import SchemaVersionError
+from codiet.tests.base import SyntheticDatabaseTestCase
+
+class TestSchemaVersion(SyntheticDatabaseTestCase):
+    """Test the schema version stamped on the database."""
+
+    copy_per_test = True
+
+    def test_current_database_opens(self):
+        """Test that a freshly built database is stamped and opens."""
+        with sqlite3.connect(self.db_path) as connection:
+            self.assertEqual(connection.execute("PRAGMA user_version").fetchone()[0], SCHEMA_VERSION)
+        with DatabaseService(self.db_path) as db_service:
+            self.assertEqual(len(db_service.fetch_all_ingredient_names()), self.num_ingredients)
+
+    def test_unmigratable_database_is_refused(self):
+        """Test that opening a database without a migration asks for a rebuild."""
+        connection = sqlite3.connect(self.db_path)
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+        connection.close()
+        with self.assertRaises(SchemaVersionError) as context:
+            DatabaseService(self.db_path)
+        self.assertEqual(context.exception.schema_version, SCHEMA_VERSION + 1)
+
+
+# The unstamped schema, from before serve times were stored as minutes
+VERSION_0_SCHEMA = """
+    CREATE TABLE global_flag_list (
+        flag_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        flag_name TEXT NOT NULL UNIQUE
+    );
+    CREATE TABLE global_leaf_nutrients (
+        nutrient_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nutrient_name TEXT NOT NULL UNIQUE,
+        parent_id INTEGER,
+        FOREIGN KEY (parent_id) REFERENCES global_group_nutrients(nutrient_id)
+    );
+    CREATE TABLE global_group_nutrients (
+        nutrient_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nutrient_name TEXT NOT NULL UNIQUE,
+        parent_id INTEGER
+    );
+    CREATE TABLE nutrient_aliases (
+        nutrient_alias TEXT NOT NULL UNIQUE,
+        primary_nutrient_id INTEGER NOT NULL,
+        FOREIGN KEY (primary_nutrient_id) REFERENCES nutrient_list(nutrient_id)
+    );
+    CREATE TABLE ingredient_base (
+        ingredient_id INTEGER PRIMARY KEY,
+        ingredient_name TEXT NOT NULL UNIQUE,
+        ingredient_description TEXT,
+        ingredient_gi REAL,
+        cost_unit TEXT,
+        cost_value REAL,
+        cost_qty_unit TEXT,
+        cost_qty_value REAL,
+        density_mass_unit TEXT,
+        density_mass_value REAL,
+        density_vol_unit TEXT,
+        density_vol_value REAL,
+        pc_qty REAL,
+        pc_mass_unit TEXT,
+        pc_mass_value REAL
+    );
+    CREATE TABLE ingredient_flags (
+        ingredient_id INTEGER,
+        flag_id INTEGER,
+        flag_value BOOLEAN,
+        FOREIGN KEY (ingredient_id) REFERENCES ingredient_base(ingredient_id),
+        FOREIGN KEY (flag_id) REFERENCES flag_list(flag_id)
+    );
+    CREATE TABLE ingredient_nutrients (
+        ingredient_id INTEGER,
+        nutrient_id INTEGER,
+        ntr_qty_unit TEXT,
+        ntr_qty_value REAL,
+        ing_qty_unit TEXT,
+        ing_qty_value REAL,
+        FOREIGN KEY (ingredient_id) REFERENCES ingredient_base(ingredient_id),
+        FOREIGN KEY (nutrient_id) REFERENCES nutrient_list(nutrient_id)
+    );
+    CREATE TABLE recipe_base (
+        recipe_id INTEGER PRIMARY KEY,
+        recipe_name TEXT UNIQUE NOT NULL,
+        recipe_description TEXT,
+        recipe_instructions TEXT
+    );
+    CREATE TABLE recipe_ingredients (
+        recipe_id INTEGER,
+        ingredient_id INTEGER,
+        qty_unit TEXT,
+        qty_value REAL,
+        qty_tol_upper REAL,
+        qty_tol_lower REAL,
+        FOREIGN KEY (recipe_id) REFERENCES recipe_base(id),
+        FOREIGN KEY (ingredient_id) REFERENCES ingredient_base(ingredient_id)
+    );
+    CREATE TABLE recipe_serve_times (
+        recipe_id INTEGER,
+        serve_time_window TEXT,
+        FOREIGN KEY (recipe_id) REFERENCES recipe_base(id)
+    );
+    CREATE TABLE global_recipe_tags (
+        recipe_tag_id INTEGER PRIMARY KEY,
+        recipe_tag_name TEXT UNIQUE
+    );
+    CREATE TABLE recipe_tags (
+        recipe_id INTEGER,
+        recipe_tag_id INTEGER,
+        FOREIGN KEY (recipe_id) REFERENCES recipe_base(id),
+        FOREIGN KEY (recipe_tag_id) REFERENCES global_recipe_tags(recipe_tag_id)
+    );
+"""
+
+class TestMigrateFromVersion0(unittest.TestCase):
+    """Test upgrading a database built from the unstamped schema."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.db_path = os.path.join(self.temp_dir.name, "version_0.db")
+        connection = sqlite3.connect(self.db_path)
+        connection.executescript(VERSION_0_SCHEMA)
+        connection.executescript("""
+            INSERT INTO global_flag_list (flag_name) VALUES ('vegan');
+            INSERT INTO global_leaf_nutrients (nutrient_name) VALUES ('protein');
+            INSERT INTO ingredient_base (ingredient_id, ingredient_name) VALUES (1, 'Oats'), (2, 'Milk');
+            INSERT INTO ingredient_flags VALUES (1, 1, 1), (2, 1, 0);
+            INSERT INTO ingredient_nutrients VALUES (1, 1, 'g', 13.0, 'g', 100.0);
+            INSERT INTO recipe_base (recipe_id, recipe_name) VALUES (1, 'Porridge');
+            INSERT INTO recipe_ingredients VALUES (1, 1, 'g', 50.0, 10.0, 10.0), (1, 2, 'g', 200.0, 5.0, 5.0);
+            -- Left behind by deleting a recipe, which version 0 didn't cascade
+            INSERT INTO recipe_ingredients VALUES (9, 1, 'g', 10.0, 0.0, 0.0);
+            INSERT INTO recipe_serve_times VALUES (1, '07:00-09:30'), (1, '22:00 - 01:00');
+            INSERT INTO global_recipe_tags (recipe_tag_id, recipe_tag_name) VALUES (1, 'Breakfast');
+            INSERT INTO recipe_tags VALUES (1, 1);
+        """)
+        connection.close()
+
+    def test_migration_keeps_the_data(self):
+        """Test that opening the database upgrades it, keeping and converting its rows."""
+        with DatabaseService(self.db_path) as db_service:
+            self.assertEqual(sorted(db_service.fetch_all_ingredient_names()), ["Milk", "Oats"])
+            recipe = db_service.fetch_recipe_by_name("Porridge")
+            self.assertEqual(sorted(recipe.ingredient_quantities), [1, 2])
+            self.assertEqual(recipe.tags, ["Breakfast"])
+            self.assertEqual(
+                sorted(db_service.fetch_all_recipe_serve_times()), [(1, 420, 570), (1, 1320, 60)]
+            )
+            # The R*Tree is filled, including the window wrapping past midnight
+            self.assertEqual(db_service.fetch_recipe_ids_by_serve_time(datetime(1900, 1, 1, 0, 30)), [1])
+            self.assertEqual(db_service.fetch_recipe_ids_by_serve_time(datetime(1900, 1, 1, 12, 0)), [])
+            self.assertEqual(db_service.fetch_change_version()[1], 0)
+        with sqlite3.connect(self.db_path) as connection:
+            self.assertEqual(connection.execute("PRAGMA user_version").fetchone()[0], SCHEMA_VERSION)
+            # The orphaned recipe ingredient is dropped
+            self.assertEqual(connection.execute("PRAGMA foreign_key_check").fetchall(), [])
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM recipe_ingredients;").fetchone()[0], 2)
+            self.assertEqual(
+                connection.execute("SELECT grams_per_gram FROM ingredient_nutrient_densities").fetchall(), [(0.13,)]
+            )
+
+    def test_failed_migration_leaves_the_database(self):
+        """Test that a migration which fails rolls back, leaving version 0."""
+        with sqlite3.connect(self.db_path) as connection:
+            connection.execute("INSERT INTO recipe_serve_times VALUES (1, 'not a window');")
+        with self.assertRaises(ValueError):
+            DatabaseService(self.db_path)
+        with sqlite3.connect(self.db_path) as connection:
+            self.assertEqual(connection.execute("PRAGMA user_version").fetchone()[0], 0)
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM recipe_serve_times;").fetchone()[0], 3)
@@ -0,0 +1,55 @@
+import sqlite3
+import unittest
+
+from codiet.db.statements import STATEMENTS, StatementRegistry, get_in_list_size, pad_in_list
+
+class TestStatementRegistry(unittest.TestCase):
+    """Test the registry of named SQL statements."""
+
+    def setUp(self):
+        self.registry = StatementRegistry()
+        self.registry.register("fetch_name", """
+            SELECT name FROM items
+            WHERE id = ?;
+        """)
+        self.registry.register("fetch_names", "SELECT name FROM items WHERE id IN ({in_list});")
+
+    def test_statements_are_normalised_and_named(self):
+        """Test that registered SQL is normalised and can be named from its text."""
+        self.assertEqual(self.registry["fetch_name"], "SELECT name FROM items WHERE id = ?;")
+        self.assertEqual(self.registry.name_of("SELECT name\n FROM items WHERE id = ?;"), "fetch_name")
+        self.assertEqual(self.registry.name_of(self.registry.in_list("fetch_names", 3)), "fetch_names")
+        self.assertIsNone(self.registry.name_of("SELECT 1;"))
+
+    def test_duplicates_are_rejected(self):
+        """Test that a name or SQL can only be registered once."""
+        with self.assertRaises(ValueError):
+            self.registry.register("fetch_name", "SELECT 1;")
+        with self.assertRaises(ValueError):
+            self.registry.register("fetch_name_again", "SELECT name FROM items WHERE id = ?;")
+
+    def test_in_lists_are_padded_to_powers_of_two(self):
+        """Test that IN lists only compile to power of two placeholder counts."""
+        self.assertEqual([get_in_list_size(count) for count in [1, 2, 3, 5, 8, 9]], [1, 2, 4, 8, 8, 16])
+        self.assertEqual(pad_in_list([1, 2, 3]), [1, 2, 3, 3])
+        self.assertEqual(self.registry.in_list("fetch_names", 3), self.registry.in_list("fetch_names", 4))
+
+    def test_chunks_respect_the_variable_limit(self):
+        """Test that chunked IN lists stay within the limit and cover every value."""
+        connection = sqlite3.connect(":memory:")
+        connection.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        connection.executemany("INSERT INTO items VALUES (?, ?)", [(i, str(i)) for i in range(100)])
+        names = []
+        for sql, params in self.registry.iter_in_list_chunks(
+            "fetch_names", list(range(0, 100, 3)), max_variables=10
+        ):
+            self.assertLessEqual(len(params), 10)
+            names += [row[0] for row in connection.execute(sql, params)]
+        connection.close()
+        self.assertEqual(sorted(names, key=int), [str(i) for i in range(0, 100, 3)])
+
+    def test_cache_holds_every_statement(self):
+        """Test that the cache size covers every statement and IN list size."""
+        # 1 statement, plus 1 template in 4 sizes (1, 2, 4, 8) for a limit of 10
+        self.assertGreaterEqual(self.registry.get_cache_size(max_variables=10), 5)
+        self.assertGreater(STATEMENTS.get_cache_size(), len(STATEMENTS))
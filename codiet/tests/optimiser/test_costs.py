@@ -0,0 +1,78 @@
+import unittest
+
+import numpy as np
+
+from codiet.optimiser.catalogue import Catalogue
+from codiet.optimiser.costs import CostEngine
+from codiet.optimiser.objectives import CostObjective
+
+def make_catalogue() -> Catalogue:
+    """Make a small catalogue of three ingredients and two recipes."""
+    return Catalogue(
+        ingredient_ids=np.array([1, 2, 3]),
+        densities=np.array([np.nan, 1.0, np.nan]),
+        piece_masses=np.array([np.nan, np.nan, np.nan]),
+        # 2.00 per kg, 1.00 per litre and no cost data
+        cost_values=np.array([2.0, 1.0, np.nan]),
+        cost_qty_grams=np.array([1000.0, 1000.0, np.nan]),
+        recipe_ids=np.array([10, 20]),
+        # Recipe 10 uses 500g of 1 and 250g of 2, recipe 20 uses 100g of 1 and 3
+        recipe_rows=np.array([0, 0, 1, 1]),
+        recipe_cols=np.array([0, 1, 0, 2]),
+        recipe_grams=np.array([500.0, 250.0, 100.0, 100.0]),
+    )
+
+class TestCostEngine(unittest.TestCase):
+    """Test the CostEngine class."""
+
+    def test_calculates_cost_per_gram(self):
+        """Test that the per-gram cost vector is calculated."""
+        engine = CostEngine(make_catalogue())
+
+        np.testing.assert_allclose(engine.cost_per_gram[:2], [0.002, 0.001])
+        self.assertTrue(np.isnan(engine.cost_per_gram[2]))
+
+    def test_flags_missing_costs(self):
+        """Test that ingredients without cost data are reported."""
+        engine = CostEngine(make_catalogue())
+
+        self.assertEqual(engine.missing_cost_ingredient_ids.tolist(), [3])
+
+    def test_prices_recipes(self):
+        """Test that recipes are priced, with missing costs flagged."""
+        engine = CostEngine(make_catalogue())
+
+        np.testing.assert_allclose(engine.price_recipes([10, 20]), [1.25, 0.2])
+        self.assertEqual(engine.recipe_costs_incomplete.tolist(), [False, True])
+
+    def test_reprices_ingredients(self):
+        """Test that repricing updates the cost vector and recipe costs."""
+        engine = CostEngine(make_catalogue())
+        _ = engine.recipe_costs
+
+        engine.reprice([3, 1], [3.0, 4.0], [1.0, 1.0], ["kg", "kg"])
+
+        np.testing.assert_allclose(engine.price_recipes([10, 20]), [2.25, 0.7])
+        self.assertFalse(engine.recipe_costs_incomplete.any())
+
+    def test_unknown_ids_are_rejected(self):
+        """Test that IDs missing from the catalogue raise, rather than mapping
+        to a neighbouring ingredient or recipe."""
+        engine = CostEngine(make_catalogue())
+
+        with self.assertRaisesRegex(ValueError, r"\[0, 4\]"):
+            engine.reprice([0, 1, 4], [1.0] * 3, [1.0] * 3, ["kg"] * 3)
+        with self.assertRaises(ValueError):
+            engine.price_recipes([10, 30])
+        np.testing.assert_allclose(engine.cost_per_gram[:2], [0.002, 0.001])
+
+    def test_prices_plans(self):
+        """Test that plans are priced as the sum of their recipes."""
+        engine = CostEngine(make_catalogue())
+        plans = np.array([[0, 0], [0, 1], [1, 1]])
+
+        np.testing.assert_allclose(engine.price_plans(plans), [2.5, 1.45, 0.4])
+        np.testing.assert_allclose(CostObjective(engine)(plans), [2.5, 1.45, 0.4])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import sqlite3
+
+import numpy as np
+
+from codiet.optimiser.data_quality import find_outliers, scan_database
+from codiet.tests.base import SyntheticDatabaseTestCase
+
+class TestDataQuality(SyntheticDatabaseTestCase):
+    """Test the catalogue-wide data quality scanner."""
+
+    num_ingredients = 40
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Break a few ingredients in known ways
+        with sqlite3.connect(cls.db_path) as connection:
+            connection.execute("UPDATE ingredient_base SET ingredient_gi = 150 WHERE ingredient_id = 1;")
+            connection.execute("UPDATE ingredient_base SET cost_value = NULL WHERE ingredient_id = 2;")
+            connection.execute("UPDATE ingredient_base SET cost_qty_unit = 'crate' WHERE ingredient_id = 3;")
+            cls.nutrient_id = connection.execute(
+                "SELECT nutrient_id FROM ingredient_nutrients WHERE ingredient_id = 4 AND ntr_qty_value IS NOT NULL;"
+            ).fetchone()[0]
+            connection.execute(
+                "UPDATE ingredient_nutrients SET ing_qty_unit = 'crate' WHERE ingredient_id = 4 AND nutrient_id = ?;",
+                (cls.nutrient_id,),
+            )
+        cls.report = scan_database(cls.db_path, cls.snapshot_path)
+
+    def test_finds_broken_ingredients(self):
+        """Test that each broken ingredient is reported by the right check."""
+        checks = self.report["checks"]
+        self.assertIn(1, checks["gi_out_of_range"]["ingredient_ids"])
+        self.assertIn(2, checks["missing_cost"]["ingredient_ids"])
+        self.assertIn(3, checks["cost_unit_inconsistent"]["ingredient_ids"])
+        self.assertNotIn(3, checks["missing_cost"]["ingredient_ids"])
+        self.assertIn(4, checks["nutrient_unit_inconsistent"]["ingredient_ids"])
+        self.assertIn(
+            {"ingredient_id": 4, "nutrient_id": self.nutrient_id, "ntr_qty_unit": "g", "ing_qty_unit": "crate"},
+            checks["nutrient_unit_inconsistent"]["rows"],
+        )
+
+    def test_summary_counts_each_check(self):
+        """Test that the summary counts the ingredients found by each check."""
+        self.assertEqual(self.report["num_ingredients"], 40)
+        for name, check in self.report["checks"].items():
+            self.assertEqual(self.report["summary"][name], len(check["ingredient_ids"]))
+
+    def test_outliers_are_found_on_a_log_scale(self):
+        """Test that values orders of magnitude from the rest are outliers, and zeros aren't."""
+        rng = np.random.default_rng(0)
+        matrix = 10 ** rng.normal(-3, 0.2, (200, 2))
+        matrix[0, 0] = 0.5
+        matrix[1, 0] = 0.0
+        matrix[2, 1] = np.nan
+        outliers, medians = find_outliers(matrix)
+        self.assertEqual(np.argwhere(outliers).tolist(), [[0, 0]])
+        self.assertAlmostEqual(medians[1], 1e-3, delta=2e-4)
@@ -0,0 +1,66 @@
+import numpy as np
+
+from codiet.optimiser.objectives import GlycaemicLoadObjective
+from codiet.optimiser.planner import MealPlanner, PlanProfile
+from codiet.optimiser.search import PlanOptimiser
+from codiet.optimiser.snapshot import load_snapshot
+from codiet.tests.base import SyntheticDatabaseTestCase
+
+class TestGlycaemicEngine(SyntheticDatabaseTestCase):
+    """Test the glycaemic index and load of recipes, meals and days."""
+
+    num_ingredients = 60
+    num_recipes = 80
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.snapshot = load_snapshot(cls.snapshot_path, cls.db_path)
+        cls.planner = MealPlanner(cls.snapshot)
+        cls.engine = cls.planner.glycaemic_engine
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.planner, cls.engine
+        cls.snapshot.close()
+
+    def test_recipe_loads_match_ingredient_sums(self):
+        """Test that a recipe's load sums GI x available carbohydrate / 100
+        over its ingredients, and its GI is weighted by carbohydrate."""
+        names = self.snapshot.nutrient_names
+        columns = [i for i in self.snapshot.nutrient_groups["carbohydrate"] if names[i] != "fibre"]
+        catalogue = self.planner.catalogue
+        for position in range(10):
+            entries = catalogue.recipe_rows == position
+            cols, grams = catalogue.recipe_cols[entries], catalogue.recipe_grams[entries]
+            carbohydrate = grams * np.nansum(self.snapshot["nutrient_matrix"][cols][:, columns], axis=1)
+            load = (carbohydrate * self.snapshot["ingredient_gis"][cols] / 100).sum()
+            self.assertAlmostEqual(self.engine.recipe_loads[position], load)
+            if carbohydrate.sum() > 0:
+                self.assertAlmostEqual(self.engine.recipe_gis[position], 100 * load / carbohydrate.sum())
+
+    def test_meal_and_day_loads(self):
+        """Test that days sum their meals' loads, and the objective is the mean day."""
+        plans = np.random.default_rng(0).integers(0, self.planner.catalogue.num_recipes, size=(5, 6))
+        meals = self.engine.meal_loads(plans)
+        days = self.engine.day_loads(plans, meals_per_day=3)
+        self.assertEqual(days.shape, (5, 2))
+        np.testing.assert_allclose(days[:, 0], meals[:, :3].sum(axis=1))
+        objective = GlycaemicLoadObjective(self.engine, days=2)
+        np.testing.assert_allclose(objective(plans), days.mean(axis=1))
+        day_gis = self.engine.day_gis(plans, meals_per_day=3)
+        carbohydrate = self.engine.recipe_indexed_carbohydrate[plans][:, 3:].sum(axis=1)
+        np.testing.assert_allclose(day_gis[:, 1], 100 * days[:, 1] / carbohydrate)
+
+    def test_daily_cap_is_kept(self):
+        """Test that the optimiser keeps every day of its plans under the cap."""
+        base = {"name": "Low GL", "meal_times": ["08:00", "12:30", "18:30"], "days": 3}
+        greedy = self.planner.plan(PlanProfile.from_dict(base))
+        positions = self.planner.catalogue.recipe_positions(greedy["recipe_ids"])[None]
+        cap = 0.8 * self.engine.day_loads(positions, 3).max()
+        profile = PlanProfile.from_dict({**base, "max_daily_glycaemic_load": cap, "minimise_glycaemic_load": True})
+        result = PlanOptimiser(self.planner).optimise(profile, max_generations=100)
+        self.assertIn("glycaemic_load", result["objectives"])
+        for plan in result["front"]:
+            positions = self.planner.catalogue.recipe_positions(plan["recipe_ids"])[None]
+            self.assertTrue((self.engine.day_loads(positions, 3) <= cap).all())
@@ -0,0 +1,52 @@
+from codiet.optimiser.planner import MealPlanner, PlanProfile
+from codiet.optimiser.snapshot import load_snapshot
+from codiet.tests.base import SyntheticDatabaseTestCase
+
+class TestMealPlanner(SyntheticDatabaseTestCase):
+    """Test greedy meal planning from the snapshot."""
+
+    num_ingredients = 60
+    num_recipes = 60
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.snapshot = load_snapshot(cls.snapshot_path, cls.db_path)
+        cls.planner = MealPlanner(cls.snapshot)
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.planner
+        cls.snapshot.close()
+
+    def test_profile_from_dict(self):
+        """Test that meal times are parsed into minutes past midnight."""
+        profile = PlanProfile.from_dict({"name": "Weekday", "meal_times": ["07:30", "18:00"], "days": 5})
+        self.assertEqual(profile.meal_times, [450, 1080])
+        self.assertEqual(profile.days, 5)
+        self.assertEqual(profile.flags, [])
+
+    def test_plans_are_cheapest_suitable_recipes(self):
+        """Test that each slot gets a suitable recipe, without repeats."""
+        profile = PlanProfile.from_dict({"name": "Two days", "meal_times": ["08:00", "12:30"], "days": 2})
+        plan = self.planner.plan(profile)
+        self.assertEqual(len(plan["recipe_ids"]), 4)
+        self.assertEqual(len(set(plan["recipe_ids"])), 4)
+        self.assertAlmostEqual(plan["cost"], self.planner.cost_engine.price_recipes(plan["recipe_ids"]).sum())
+        # The first breakfast is the cheapest recipe served at 08:00
+        breakfast = self.planner.slot_candidates(profile)[480]
+        self.assertEqual(plan["recipe_ids"][0], self.planner.catalogue.recipe_ids[breakfast[0]])
+
+    def test_flags_restrict_candidates(self):
+        """Test that only recipes with every required flag are candidates."""
+        flags = self.snapshot.flag_names[:2]
+        mask = self.snapshot.flag_mask(flags)
+        profile = PlanProfile(name="Flagged", meal_times=[720], flags=flags)
+        for position in self.planner.prefilter.filter(profile)[0][720]:
+            self.assertEqual(self.planner.recipe_flag_bits[position] & mask, mask)
+
+    def test_unfillable_slot_raises(self):
+        """Test that a slot without enough candidates raises ValueError."""
+        profile = PlanProfile.from_dict({"name": "Too long", "meal_times": ["12:30"], "days": 1000})
+        with self.assertRaises(ValueError):
+            self.planner.plan(profile)
@@ -0,0 +1,93 @@
+import sqlite3
+
+import numpy as np
+
+from codiet.models.ingredients import Ingredient, IngredientQuantity
+from codiet.optimiser.portions import PortionFitter
+from codiet.optimiser.snapshot import load_snapshot
+from codiet.tests.base import SyntheticDatabaseTestCase
+
+class TestPortionFitter(SyntheticDatabaseTestCase):
+    """Test fitting recipe quantities to nutrient targets."""
+
+    num_ingredients = 60
+    num_recipes = 40
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.snapshot = load_snapshot(cls.snapshot_path, cls.db_path)
+        cls.fitter = PortionFitter(cls.snapshot)
+        cls.catalogue = cls.fitter.catalogue
+
+    def energy_range(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the lowest, starting and highest energy of each recipe."""
+        catalogue = self.catalogue
+        kcal_per_gram = self.fitter.target_contents(["energy"])[catalogue.recipe_cols, 0]
+        return tuple(
+            np.bincount(
+                catalogue.recipe_rows, weights=np.nan_to_num(grams * kcal_per_gram), minlength=catalogue.num_recipes
+            )
+            for grams in [catalogue.recipe_grams_lower, catalogue.recipe_grams, catalogue.recipe_grams_upper]
+        )
+
+    def test_tolerances_are_percentages(self):
+        """Test that each quantity's bounds are its tolerances as percentages of it."""
+        with sqlite3.connect(self.db_path) as connection:
+            rows = connection.execute(
+                "SELECT qty_value, qty_tol_lower, qty_tol_upper FROM recipe_ingredients ORDER BY recipe_id, ingredient_id;"
+            ).fetchall()
+        qty_values, lower_tols, upper_tols = np.array(rows).T
+        order = np.lexsort((self.catalogue.recipe_cols, self.catalogue.recipe_rows))
+        np.testing.assert_allclose(self.catalogue.recipe_grams_lower[order], qty_values * (1 - lower_tols / 100))
+        np.testing.assert_allclose(self.catalogue.recipe_grams_upper[order], qty_values * (1 + upper_tols / 100))
+
+    def test_energy_is_the_sum_of_its_factors(self):
+        """Test that the energy target weights the macro groups by their kcal per gram."""
+        energy, carbohydrate, fibre, fat = self.fitter.target_coefficients(
+            ["energy", "carbohydrate", "fibre", "fat"]
+        )
+        np.testing.assert_array_equal(energy[(carbohydrate > 0) & (fibre == 0)], 4.0)
+        np.testing.assert_array_equal(energy[fibre > 0], 2.0)
+        np.testing.assert_array_equal(energy[fat > 0], 9.0)
+        with self.assertRaises(ValueError):
+            self.fitter.target_coefficients(["not a nutrient"])
+
+    def test_reachable_targets_are_hit_within_tolerances(self):
+        """Test that every recipe reaches a target inside its energy range, in one batch."""
+        lowest, starting, highest = self.energy_range()
+        targets = (starting + highest)[:, None] / 2
+        rows, ingredient_ids, grams, achieved = self.fitter.fit_recipes(
+            self.catalogue.recipe_ids, ["energy"], targets
+        )
+        fitted = highest > starting
+        np.testing.assert_allclose(achieved[fitted, 0], targets[fitted, 0], rtol=1e-3)
+        np.testing.assert_array_equal(ingredient_ids, self.catalogue.ingredient_ids[self.catalogue.recipe_cols])
+        known = np.isfinite(grams)
+        self.assertTrue(np.all(grams[known] >= self.catalogue.recipe_grams_lower[known] - 1e-9))
+        self.assertTrue(np.all(grams[known] <= self.catalogue.recipe_grams_upper[known] + 1e-9))
+
+    def test_unreachable_targets_stop_at_the_bands(self):
+        """Test that a target beyond a recipe's range takes every quantity to its limit."""
+        lowest, starting, highest = self.energy_range()
+        _, _, grams, achieved = self.fitter.fit_recipes(
+            self.catalogue.recipe_ids[:1], ["energy"], [highest[0] * 10]
+        )
+        self.assertAlmostEqual(achieved[0, 0], highest[0], delta=highest[0] * 1e-3)
+
+    def test_fits_recipe_editor_quantities_in_their_units(self):
+        """Test that the editor's quantities are fitted and returned in their own units."""
+        quantities = []
+        for ingredient_id in self.catalogue.ingredient_ids[:3]:
+            ingredient = Ingredient()
+            ingredient.id = int(ingredient_id)
+            quantities.append(
+                IngredientQuantity(ingredient, qty_value=0.1, qty_unit="kg", qty_utol=50.0, qty_ltol=50.0)
+            )
+        kcal_per_gram = self.fitter.target_contents(["energy"])[:3, 0]
+        starting_energy = 100 * kcal_per_gram.sum()
+        fitted = self.fitter.fit_recipe_quantities(quantities, {"energy": starting_energy * 1.2})
+        fitted_energy = 1000 * float(np.dot(fitted, kcal_per_gram))
+        self.assertAlmostEqual(fitted_energy, starting_energy * 1.2, delta=1e-2 * starting_energy)
+        for value in fitted:
+            self.assertTrue(0.05 - 1e-9 <= value <= 0.15 + 1e-9)
@@ -0,0 +1,91 @@
+import sqlite3
+
+import numpy as np
+
+from codiet.optimiser.planner import MealPlanner, PlanProfile
+from codiet.optimiser.snapshot import load_snapshot
+from codiet.tests.base import SyntheticDatabaseTestCase
+
+class TestCandidatePrefilter(SyntheticDatabaseTestCase):
+    """Test pre-filtering the candidates of each meal slot."""
+
+    num_ingredients = 60
+    num_recipes = 80
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Copy the first recipe under another name
+        with sqlite3.connect(cls.db_path) as connection:
+            copy_id = connection.execute(
+                "INSERT INTO recipe_base (recipe_name) VALUES ('Copied Recipe');"
+            ).lastrowid
+            for table, columns in [
+                ("recipe_ingredients", "ingredient_id, qty_unit, qty_value, qty_tol_upper, qty_tol_lower"),
+                ("recipe_serve_times", "serve_time_start, serve_time_end"),
+                ("recipe_tags", "recipe_tag_id"),
+            ]:
+                connection.execute(
+                    f"INSERT INTO {table} (recipe_id, {columns}) SELECT ?, {columns} FROM {table} WHERE recipe_id = 1;",
+                    (copy_id,),
+                )
+        cls.copy_id = copy_id
+        cls.snapshot = load_snapshot(cls.snapshot_path, cls.db_path)
+        cls.planner = MealPlanner(cls.snapshot)
+        cls.prefilter = cls.planner.prefilter
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.planner, cls.prefilter
+        cls.snapshot.close()
+
+    def test_stages_only_narrow(self):
+        """Test that each stage leaves at most as many candidates as the last,
+        and the search space shrinks."""
+        profile = PlanProfile.from_dict({
+            "name": "Tagged",
+            "meal_times": ["08:00", "12:30"],
+            "days": 3,
+            "tags": ["meal"],
+            "nutrient_targets": {"energy": 2000},
+        })
+        candidates, report = self.prefilter.filter(profile)
+        for time, counts in report["stages"].items():
+            values = list(counts.values())
+            self.assertEqual(values, sorted(values, reverse=True))
+        self.assertEqual(report["stages"]["08:00"]["duplicates"], len(candidates[480]))
+        space = report["log10_search_space"]
+        self.assertLess(space["filtered"], space["unfiltered"])
+
+    def test_tags_match_descendants(self):
+        """Test that a required tag is met by the tag or any tag beneath it."""
+        tag_names = self.snapshot.tag_names
+        mask = self.prefilter.tag_mask(["meal/savory"])
+        for position in np.flatnonzero(mask):
+            recipe_tags = [tag_names[i] for i in np.flatnonzero(self.prefilter.recipe_tags[position])]
+            self.assertTrue(any(name.startswith("meal/savory") for name in recipe_tags))
+        self.assertGreaterEqual(mask.sum(), self.prefilter.tag_mask(["meal/savory/lunch"]).sum())
+        with self.assertRaises(ValueError):
+            self.prefilter.tag_mask(["not a tag"])
+
+    def test_nutrient_incomplete_recipes_are_dropped(self):
+        """Test that only recipes whose ingredients all have some data towards
+        the target are kept."""
+        complete = self.prefilter.nutrient_complete(["protein"])
+        columns = self.snapshot.nutrient_groups["protein"]
+        catalogue = self.planner.catalogue
+        for position in range(catalogue.num_recipes):
+            cols = catalogue.recipe_cols[catalogue.recipe_rows == position]
+            known = ~np.isnan(self.snapshot["nutrient_matrix"][cols][:, columns])
+            has_data = len(cols) > 0 and known.any(axis=1).all()
+            self.assertEqual(complete[position], has_data)
+
+    def test_identical_recipes_are_deduplicated(self):
+        """Test that a copy of a recipe is never a candidate alongside it."""
+        positions = self.planner.catalogue.recipe_positions([1, self.copy_id])
+        groups = self.prefilter.composition_groups
+        self.assertEqual(groups[positions[0]], groups[positions[1]])
+        self.assertEqual(len(np.unique(groups)), self.planner.catalogue.num_recipes - 1)
+        profile = PlanProfile.from_dict({"name": "All day", "meal_times": ["08:00", "12:30", "18:30"]})
+        for positions_at_time in self.planner.slot_candidates(profile).values():
+            self.assertFalse(set(positions.tolist()) <= set(positions_at_time.tolist()))
@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+
+from codiet.optimiser.planner import MealPlanner, PlanProfile
+from codiet.optimiser.search import (
+    PlanArchive,
+    PlanOptimiser,
+    count_repeat_violations,
+    non_dominated_ranks,
+)
+from codiet.optimiser.snapshot import load_snapshot
+from codiet.tests.base import SyntheticDatabaseTestCase
+
+class TestPlanOptimiser(SyntheticDatabaseTestCase):
+    """Test the warm-started multi-objective plan search."""
+
+    num_ingredients = 80
+    num_recipes = 120
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.snapshot = load_snapshot(cls.snapshot_path, cls.db_path)
+        cls.planner = MealPlanner(cls.snapshot)
+        cls.profile = {
+            "name": "Week",
+            "meal_times": ["08:00", "12:30", "18:30"],
+            "days": 7,
+            "nutrient_targets": {"energy": 2000, "protein": 60},
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.planner
+        cls.snapshot.close()
+
+    def test_non_dominated_ranks(self):
+        """Test that each rank is dominated only by lower ranks."""
+        values = np.array([[1.0, 4.0], [2.0, 2.0], [4.0, 1.0], [3.0, 3.0], [4.0, 4.0]])
+        self.assertEqual(non_dominated_ranks(values).tolist(), [0, 0, 0, 1, 2])
+
+    def test_count_repeat_violations(self):
+        """Test that only the meals beyond the allowed repeats are counted."""
+        plans = np.array([[1, 2, 3, 4], [1, 1, 2, 2], [5, 5, 5, 1]])
+        self.assertEqual(count_repeat_violations(plans, 1).tolist(), [0, 2, 2])
+        self.assertEqual(count_repeat_violations(plans, 2).tolist(), [0, 0, 1])
+
+    def test_front_plans_are_feasible(self):
+        """Test that every front plan fills its slots with suitable recipes,
+        without repeats or excluded recipes."""
+        excluded = self.planner.plan(PlanProfile.from_dict(self.profile))["recipe_ids"][:3]
+        profile = PlanProfile.from_dict({**self.profile, "excluded_recipe_ids": excluded})
+        result = PlanOptimiser(self.planner).optimise(profile, max_generations=50)
+        candidates = self.planner.slot_candidates(profile)
+        for plan in result["front"]:
+            self.assertEqual(len(set(plan["recipe_ids"])), profile.num_slots)
+            self.assertFalse(set(plan["recipe_ids"]) & set(excluded))
+            positions = self.planner.catalogue.recipe_positions(plan["recipe_ids"])
+            for slot, position in enumerate(positions):
+                self.assertIn(position, candidates[profile.meal_times[slot % len(profile.meal_times)]])
+        costs = [plan["cost"] for plan in result["front"]]
+        self.assertEqual(costs, sorted(costs))
+
+    def test_warm_start_converges_sooner(self):
+        """Test that re-plans start from the archive and need fewer generations."""
+        with PlanArchive(os.path.join(self.temp_dir.name, "archive.db")) as archive:
+            optimiser = PlanOptimiser(self.planner, archive)
+            cold = optimiser.optimise(PlanProfile.from_dict(self.profile))
+            self.assertEqual(cold["warm_start"], "cold")
+            self.assertEqual(len(archive), 1)
+            # The same problem under another name reuses its own run
+            exact = optimiser.optimise(PlanProfile.from_dict({**self.profile, "name": "Again"}))
+            self.assertEqual(exact["warm_start"], "exact")
+            self.assertLess(exact["generations"], cold["generations"])
+            # A tweaked target starts from the closest earlier problem
+            tweaked = PlanProfile.from_dict({**self.profile, "nutrient_targets": {"energy": 2100, "protein": 60}})
+            warm = optimiser.optimise(tweaked)
+            self.assertEqual(warm["warm_start"], "closest")
+            self.assertLess(warm["generations"], cold["generations"])
+            self.assertEqual(len(archive), 2)
@@ -0,0 +1,55 @@
+import numpy as np
+
+from codiet.db.database_service import DatabaseService
+from codiet.optimiser.catalogue import Catalogue
+from codiet.optimiser.costs import CostEngine
+from codiet.optimiser.shopping import aggregate_plan_ingredients, expand_plans, round_to_packs
+from codiet.tests.base import SyntheticDatabaseTestCase
+
+class TestShopping(SyntheticDatabaseTestCase):
+    """Test aggregating meal plans into shopping lists."""
+
+    num_ingredients = 40
+    num_recipes = 30
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with DatabaseService(cls.db_path) as db_service:
+            cls.catalogue = Catalogue.from_database(db_service)
+        rng = np.random.default_rng(0)
+        cls.plans = [rng.choice(cls.catalogue.recipe_ids, size=21).tolist() for _ in range(5)]
+
+    def test_totals_match_a_loop_over_the_meals(self):
+        """Test that the summed grams match adding up each meal in turn."""
+        catalogue = self.catalogue
+        expected = {}
+        for plan_row, plan in enumerate(self.plans):
+            for recipe_id in plan:
+                entries = catalogue.recipe_rows == catalogue.recipe_index[recipe_id]
+                for col, grams in zip(catalogue.recipe_cols[entries], catalogue.recipe_grams[entries]):
+                    key = (plan_row, int(col))
+                    expected[key] = expected.get(key, 0.0) + grams
+        rows, cols, grams, incomplete = aggregate_plan_ingredients(
+            catalogue, *expand_plans(catalogue, self.plans)
+        )
+        self.assertEqual(list(zip(rows.tolist(), cols.tolist())), sorted(expected))
+        np.testing.assert_allclose(grams, [expected[key] for key in sorted(expected)])
+        self.assertFalse(incomplete.any())
+
+    def test_rounds_up_to_whole_packs(self):
+        """Test that each total is bought in whole packs covering it."""
+        cost_engine = CostEngine(self.catalogue)
+        rows, cols, grams, _ = aggregate_plan_ingredients(
+            self.catalogue, *expand_plans(self.catalogue, self.plans)
+        )
+        packs = round_to_packs(cost_engine, cols, grams)
+        priced = np.isfinite(packs["packs"])
+        self.assertTrue(np.all(packs["packs"][priced] * packs["pack_grams"][priced] >= grams[priced] - 1e-6))
+        self.assertTrue(np.all((packs["packs"][priced] - 1) * packs["pack_grams"][priced] < grams[priced]))
+        self.assertTrue(np.all(packs["pack_cost"][priced] >= packs["exact_cost"][priced] - 1e-9))
+
+    def test_unknown_recipes_are_rejected(self):
+        """Test that a plan with an unknown recipe ID raises ValueError."""
+        with self.assertRaises(ValueError):
+            expand_plans(self.catalogue, [[int(self.catalogue.recipe_ids.max()) + 1]])
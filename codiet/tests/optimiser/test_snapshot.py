@@ -0,0 +1,63 @@
+import os
+
+import numpy as np
+
+from codiet.benchmarks.synthetic import build_synthetic_database
+from codiet.db.database_service import DatabaseService
+from codiet.optimiser.catalogue import Catalogue
+from codiet.optimiser.snapshot import CatalogueSnapshot, export_snapshot, load_snapshot
+from codiet.tests.base import SyntheticDatabaseTestCase
+
+class TestCatalogueSnapshot(SyntheticDatabaseTestCase):
+    """Test exporting and mapping the catalogue snapshot."""
+
+    num_ingredients = 40
+    num_recipes = 20
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with DatabaseService(cls.db_path) as db_service:
+            export_snapshot(db_service, cls.db_path, cls.snapshot_path)
+            cls.catalogue = Catalogue.from_database(db_service)
+            cls.flag_values = db_service.fetch_all_ingredient_flag_values()
+            cls.flag_rows = db_service.fetch_all_global_flag_rows()
+
+    def test_catalogue_matches_database(self):
+        """Test that a catalogue built from the snapshot matches the database."""
+        catalogue = Catalogue.from_snapshot(CatalogueSnapshot(self.snapshot_path))
+        for name in ["ingredient_ids", "recipe_ids", "recipe_rows", "recipe_cols"]:
+            np.testing.assert_array_equal(getattr(catalogue, name), getattr(self.catalogue, name))
+        for name in ["densities", "cost_values", "cost_qty_grams", "recipe_grams"]:
+            np.testing.assert_array_equal(getattr(catalogue, name), getattr(self.catalogue, name))
+
+    def test_arrays_are_read_only_views(self):
+        """Test that the arrays are mapped rather than copied."""
+        snapshot = CatalogueSnapshot(self.snapshot_path)
+        self.assertFalse(snapshot["nutrient_matrix"].flags.writeable)
+        self.assertEqual(snapshot["nutrient_matrix"].shape[0], 40)
+        self.assertEqual(snapshot["nutrient_matrix"].shape[1], len(snapshot.nutrient_names))
+
+    def test_flag_bits_match_database(self):
+        """Test that the flag bitmasks hold the flag values."""
+        snapshot = CatalogueSnapshot(self.snapshot_path)
+        flag_names = {id: name for id, name in self.flag_rows}
+        for ingredient_id, flag_id, flag_value in self.flag_values[:50]:
+            position = self.catalogue.ingredient_index[ingredient_id]
+            mask = snapshot.flag_mask([flag_names[flag_id]])
+            self.assertEqual(bool(snapshot["flag_true_bits"][position] & mask), bool(flag_value))
+            self.assertTrue(snapshot["flag_known_bits"][position] & mask)
+
+    def test_stale_snapshot_is_recompiled(self):
+        """Test that loading against a changed database recompiles the snapshot."""
+        db_path = os.path.join(self.temp_dir.name, "stale.db")
+        snapshot_path = os.path.join(self.temp_dir.name, "stale.snapshot")
+        build_synthetic_database(db_path, num_ingredients=10, num_recipes=5)
+        snapshot = load_snapshot(snapshot_path, db_path)
+        self.assertEqual(len(snapshot["recipe_ids"]), 5)
+        snapshot.close()
+        build_synthetic_database(db_path, num_ingredients=10, num_recipes=8, seed=1)
+        snapshot = load_snapshot(snapshot_path, db_path)
+        self.assertTrue(snapshot.is_current(db_path))
+        self.assertEqual(len(snapshot["recipe_ids"]), 8)
+        snapshot.close()
@@ -0,0 +1,132 @@
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+
+from codiet import cli
+from codiet.db.database_service import DatabaseService
+from codiet.tests.base import SyntheticDatabaseTestCase
+
+class TestCli(SyntheticDatabaseTestCase):
+    """Test the headless command line interface."""
+
+    num_ingredients = 60
+    num_recipes = 60
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with DatabaseService(cls.db_path) as db_service:
+            cls.ingredient_names = db_service.fetch_all_ingredient_names()
+
+    def run_cli(self, *args: str) -> str:
+        """Runs the command line and returns what it wrote."""
+        output = io.StringIO()
+        parsed = cli.build_parser().parse_args(
+            ["--db", self.db_path, "--snapshot", self.snapshot_path, *args]
+        )
+        cli.run_command(parsed, output)
+        return output.getvalue()
+
+    def write_jobs(self, name: str, jobs: list[dict]) -> str:
+        """Writes the jobs to a JSON Lines file and returns its path."""
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, "w") as file:
+            for job in jobs:
+                file.write(json.dumps(job) + "\n")
+        return path
+
+    def test_does_not_import_qt(self):
+        """Test that the command line imports without pulling in Qt."""
+        result = subprocess.run(
+            [sys.executable, "-c", "import sys, codiet.cli; print(any(m.startswith('PyQt6') for m in sys.modules))"],
+            capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(result.stdout.strip(), "False")
+
+    def test_nutrient_report(self):
+        """Test that every recipe is reported, as CSV with a column per nutrient."""
+        rows = list(csv.DictReader(io.StringIO(self.run_cli("nutrients"))))
+        self.assertEqual(len(rows), 60)
+        self.assertIn("recipe_name", rows[0])
+
+    def test_options_after_the_subcommand(self):
+        """Test that the common options are accepted after the subcommand too."""
+        output_path = os.path.join(self.temp_dir.name, "nutrients.jsonl")
+        cli.main([
+            "nutrients", "--db", self.db_path, "--snapshot", self.snapshot_path,
+            "--output", output_path, "--format", "jsonl", "--workers", "1",
+        ])
+        with open(output_path) as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual(len(records), 60)
+        # Options given before the subcommand are kept, unless given again after it
+        parser = cli.build_parser()
+        self.assertEqual(parser.parse_args(["--format", "jsonl", "plan", "profiles.jsonl"]).format, "jsonl")
+        self.assertEqual(parser.parse_args(["--workers", "3", "plan", "profiles.jsonl", "--workers", "2"]).workers, 2)
+
+    def test_prices_baskets(self):
+        """Test that baskets are priced, with unknown ingredients reported."""
+        path = self.write_jobs("baskets.jsonl", [
+            {"name": "small", "ingredients": {self.ingredient_names[0]: 100}},
+            {"name": "unknown", "ingredients": {"Not An Ingredient": 100}},
+        ])
+        records = [json.loads(line) for line in self.run_cli("--format", "jsonl", "price", "--baskets", path).splitlines()]
+        self.assertEqual([record["name"] for record in records], ["small", "unknown"])
+        self.assertIn("cost", records[0])
+        self.assertIn("error", records[1])
+
+    def test_parallel_plans_match_serial(self):
+        """Test that plans run across workers come back complete and in order."""
+        profiles = [
+            {"name": f"profile {i}", "meal_times": ["08:00", "12:30"], "days": 1 + i % 3}
+            for i in range(20)
+        ]
+        path = self.write_jobs("profiles.jsonl", profiles)
+        serial = self.run_cli("--format", "jsonl", "--workers", "1", "plan", path)
+        parallel = self.run_cli("--format", "jsonl", "--workers", "2", "plan", path)
+        self.assertEqual(serial, parallel)
+        self.assertEqual(len(serial.splitlines()), 20)
+
+    def test_short_job_files_are_spread_across_workers(self):
+        """Test that a job file shorter than a chunk per worker is split evenly,
+        while long files keep full chunks."""
+        jobs = [{"name": str(i)} for i in range(16)]
+        chunks = list(cli.chunk_jobs(jobs, workers=4, chunk_size=64))
+        self.assertEqual([len(chunk) for chunk in chunks], [2] * 8)
+        self.assertEqual([job for chunk in chunks for job in chunk], jobs)
+        chunks = list(cli.chunk_jobs(({"name": str(i)} for i in range(1000)), workers=4, chunk_size=64))
+        self.assertEqual(len(chunks[0]), 64)
+        self.assertEqual(sum(len(chunk) for chunk in chunks), 1000)
+
+    def test_shopping_list_from_plans(self):
+        """Test that the plans written by the plan command can be shopped for."""
+        profiles = [
+            {"name": f"client {i}", "meal_times": ["08:00", "12:30", "19:00"], "days": 7}
+            for i in range(3)
+        ]
+        plans_path = os.path.join(self.temp_dir.name, "plans.jsonl")
+        with open(plans_path, "w") as file:
+            file.write(self.run_cli(
+                "--format", "jsonl", "--workers", "1", "plan", self.write_jobs("clients.jsonl", profiles)
+            ))
+        rows = list(csv.DictReader(io.StringIO(self.run_cli("shop", plans_path))))
+        self.assertEqual({row["plan"] for row in rows}, {"client 0", "client 1", "client 2"})
+        for row in rows:
+            if row["packs"]:
+                self.assertGreaterEqual(
+                    float(row["packs"]) * float(row["pack_size"]), float(row["quantity"]) - 1e-6
+                )
+        # The output path can be given after the subcommand, as in the usage
+        shopping_path = os.path.join(self.temp_dir.name, "shopping.csv")
+        cli.main(["shop", plans_path, "--db", self.db_path, "--snapshot", self.snapshot_path, "--output", shopping_path])
+        with open(shopping_path, newline="") as file:
+            self.assertEqual(list(csv.DictReader(file)), rows)
+        output = self.run_cli("--format", "jsonl", "shop", "--combine", plans_path)
+        combined = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual({record["plan"] for record in combined}, {"all"})
+        self.assertAlmostEqual(
+            sum(record["grams"] for record in combined), sum(float(row["grams"]) for row in rows), places=3
+        )
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import unittest
+from urllib.parse import quote
+
+from codiet.db.database_service import DatabaseService
+from codiet.server import CatalogueServer, ResponseCache, _get_recipe
+from codiet.tests.base import AsyncSyntheticDatabaseTestCase
+
+class TestResponseCache(unittest.TestCase):
+    """Test the LRU response cache."""
+
+    def test_evicts_least_recently_used(self):
+        """Test that the least recently used response is evicted first."""
+        cache = ResponseCache(max_entries=2)
+        cache.put("/a", b"a")
+        cache.put("/b", b"b")
+        cache.get("/a")
+        cache.put("/c", b"c")
+        self.assertIsNone(cache.get("/b"))
+        self.assertEqual(cache.get("/a"), b"a")
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+class TestCatalogueServer(AsyncSyntheticDatabaseTestCase):
+    """Test the HTTP API end to end on localhost."""
+
+    num_ingredients = 60
+    num_recipes = 60
+
+    async def asyncSetUp(self):
+        self.server = CatalogueServer(
+            db_path=self.db_path,
+            snapshot_path=self.snapshot_path,
+            port=0,
+            read_workers=2,
+            solver_workers=1,
+        )
+        await self.server.start()
+        self.reader, self.writer = await asyncio.open_connection(self.server.host, self.server.port)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        await self.server.close()
+
+    async def request(self, method: str, target: str, payload: dict | None = None) -> tuple[int, dict]:
+        """Sends a request on the keep-alive connection and returns the status and JSON."""
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        self.writer.write(
+            f"{method} {target} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+        )
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while (line := await self.reader.readline()) != b"\r\n":
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.lower()] = value.strip()
+        return status, json.loads(await self.reader.readexactly(int(headers["content-length"])))
+
+    async def test_fetches_are_cached_until_a_write(self):
+        """Test that repeat fetches hit the cache, and a write invalidates it."""
+        with DatabaseService(self.db_path) as db_service:
+            name = db_service.fetch_all_ingredient_names()[0]
+        status, ingredient = await self.request("GET", f"/ingredients/{quote(name)}")
+        self.assertEqual(status, 200)
+        self.assertEqual(ingredient["name"], name)
+        await self.request("GET", f"/ingredients/{quote(name)}")
+        self.assertEqual(self.server.cache.hits, 1)
+        # Delete the ingredient behind the server's back
+        with DatabaseService(self.db_path) as db_service:
+            db_service.delete_ingredient_by_name(name)
+        status, _ = await self.request("GET", f"/ingredients/{quote(name)}")
+        self.assertEqual(status, 404)
+
+    async def test_reads_across_a_change_are_not_cached(self):
+        """Test that a response read before a change, but finished after it,
+        isn't left in the cache."""
+        with DatabaseService(self.db_path) as db_service:
+            name = db_service.fetch_all_recipe_names()[0]
+        read = self.server._read
+
+        async def read_then_change(handler, *args):
+            payload = await read(handler, *args)
+            if handler is not _get_recipe:
+                return payload
+            # Change the database while the read is finishing, and let
+            # another request see the change
+            with DatabaseService(self.db_path) as db_service:
+                db_service.delete_recipe_by_name(name)
+            await self.server.check_version()
+            return payload
+
+        self.server._read = read_then_change
+        status, _ = await self.request("GET", f"/recipes/{quote(name)}")
+        self.assertEqual(status, 200)
+        self.assertEqual(len(self.server.cache), 0)
+
+    async def test_recipe_nutrients_and_search(self):
+        """Test that recipe nutrient totals and searches are served."""
+        status, recipes = await self.request("GET", "/recipes?q=Recipe&limit=3")
+        self.assertEqual(status, 200)
+        self.assertEqual(len(recipes["results"]), 3)
+        status, totals = await self.request("GET", f"/recipes/{quote(recipes['results'][0])}/nutrients")
+        self.assertEqual(status, 200)
+        self.assertIn("energy", totals["nutrients"])
+
+    async def test_solves_plans(self):
+        """Test that plans are solved, and bad profiles are rejected."""
+        status, plan = await self.request("POST", "/plans", {"name": "Test", "meal_times": ["12:30"], "days": 2})
+        self.assertEqual(status, 200)
+        self.assertEqual(len(plan["recipe_ids"]), 2)
+        status, _ = await self.request("POST", "/plans", {"meal_times": ["12:30"]})
+        self.assertEqual(status, 400)
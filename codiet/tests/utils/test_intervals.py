@@ -0,0 +1,53 @@
+import random
+import unittest
+
+from codiet.utils.intervals import IntervalIndex
+
+class TestIntervalIndex(unittest.TestCase):
+    """Test the IntervalIndex class."""
+
+    def test_empty_index_finds_nothing(self):
+        """Test that an empty index returns no matches."""
+        index = IntervalIndex([])
+
+        self.assertEqual(index.query(450), set())
+
+    def test_finds_intervals_containing_point(self):
+        """Test that only the intervals containing the point are returned."""
+        index = IntervalIndex([(360, 720, "breakfast"), (660, 900, "lunch"), (1020, 1320, "dinner")])
+
+        self.assertEqual(index.query(450), {"breakfast"})
+        self.assertEqual(index.query(700), {"breakfast", "lunch"})
+        self.assertEqual(index.query(960), set())
+
+    def test_interval_ends_are_inclusive(self):
+        """Test that the start and end minutes of an interval both match."""
+        index = IntervalIndex([(360, 720, "breakfast")])
+
+        self.assertEqual(index.query(360), {"breakfast"})
+        self.assertEqual(index.query(720), {"breakfast"})
+        self.assertEqual(index.query(721), set())
+
+    def test_finds_intervals_wrapping_past_midnight(self):
+        """Test that an interval wrapping past midnight matches on both sides."""
+        index = IntervalIndex([(1320, 120, "late snack")])
+
+        self.assertEqual(index.query(1400), {"late snack"})
+        self.assertEqual(index.query(60), {"late snack"})
+        self.assertEqual(index.query(600), set())
+
+    def test_matches_brute_force_search(self):
+        """Test the index against a linear scan over random intervals."""
+        rng = random.Random(1)
+        intervals = [(rng.randrange(1440), rng.randrange(1440), i) for i in range(500)]
+        index = IntervalIndex(intervals)
+
+        for point in range(0, 1440, 7):
+            expected = {
+                item for start, end, item in intervals
+                if (start <= point <= end) or (end < start and (point >= start or point <= end))
+            }
+            self.assertEqual(index.query(point), expected)
+
+if __name__ == '__main__':
+    unittest.main()
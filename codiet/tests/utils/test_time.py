@@ -0,0 +1,61 @@
+import unittest
+from datetime import datetime
+
+from codiet.utils.time import (
+    convert_datetime_to_minutes,
+    convert_minutes_to_datetime,
+    convert_time_string_to_minutes,
+    convert_minutes_to_time_string,
+    convert_time_string_interval_to_minute_interval,
+    split_minute_interval,
+)
+
+class TestMinuteConversions(unittest.TestCase):
+    """Test the conversions between times and minutes past midnight."""
+
+    def test_converts_time_string_to_minutes(self):
+        """Test that a HH:MM string is converted to minutes past midnight."""
+        self.assertEqual(convert_time_string_to_minutes("07:30"), 450)
+        self.assertEqual(convert_time_string_to_minutes("00:00"), 0)
+        self.assertEqual(convert_time_string_to_minutes("23:59"), 1439)
+
+    def test_rejects_invalid_time_string(self):
+        """Test that an out of range time string raises a ValueError."""
+        with self.assertRaises(ValueError):
+            convert_time_string_to_minutes("24:00")
+
+    def test_round_trips_minutes_and_time_strings(self):
+        """Test that minutes survive a round trip through a time string."""
+        for minutes in [0, 59, 450, 1439]:
+            self.assertEqual(
+                convert_time_string_to_minutes(convert_minutes_to_time_string(minutes)),
+                minutes,
+            )
+
+    def test_round_trips_minutes_and_datetimes(self):
+        """Test that a datetime survives a round trip through minutes."""
+        dt = datetime.strptime("18:45", "%H:%M")
+
+        result = convert_minutes_to_datetime(convert_datetime_to_minutes(dt))
+
+        self.assertEqual(result, dt)
+
+    def test_converts_interval_string(self):
+        """Test that an interval string is converted to a minute interval."""
+        result = convert_time_string_interval_to_minute_interval("06:00 - 12:00")
+
+        self.assertEqual(result, (360, 720))
+
+class TestSplitMinuteInterval(unittest.TestCase):
+    """Test the split_minute_interval function."""
+
+    def test_leaves_plain_interval_whole(self):
+        """Test that an interval within one day is not split."""
+        self.assertEqual(split_minute_interval((360, 720)), [(360, 720)])
+
+    def test_splits_interval_wrapping_past_midnight(self):
+        """Test that an interval wrapping past midnight is split in two."""
+        self.assertEqual(split_minute_interval((1320, 120)), [(1320, 1439), (0, 120)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+import numpy as np
+
+from codiet.utils.units import (
+    calculate_density,
+    calculate_piece_mass,
+    convert_to_grams,
+    grams_per_unit,
+)
+
+class TestConvertToGrams(unittest.TestCase):
+    """Test the convert_to_grams function."""
+
+    def test_converts_mass_units(self):
+        """Test that mass units are converted without a density."""
+        self.assertEqual(convert_to_grams(2, "kg"), 2000)
+        self.assertAlmostEqual(convert_to_grams(500, "mg"), 0.5)
+
+    def test_converts_volume_units_using_density(self):
+        """Test that volumes are converted using the density."""
+        self.assertAlmostEqual(convert_to_grams(2, "l", density=1.03), 2060)
+
+    def test_returns_none_for_volume_without_density(self):
+        """Test that a volume cannot be converted without a density."""
+        self.assertIsNone(convert_to_grams(2, "l"))
+
+    def test_converts_pieces_using_piece_mass(self):
+        """Test that pieces are converted using the piece mass."""
+        self.assertEqual(convert_to_grams(3, "pc", piece_mass=50), 150)
+
+class TestDensityAndPieceMass(unittest.TestCase):
+    """Test the density and piece mass calculations."""
+
+    def test_calculates_density(self):
+        """Test that the density is returned in g/ml."""
+        self.assertAlmostEqual(calculate_density(1, "kg", 1, "l"), 1.0)
+
+    def test_missing_density_is_none(self):
+        """Test that missing density data gives None."""
+        self.assertIsNone(calculate_density(None, "g", 1, "l"))
+
+    def test_calculates_piece_mass(self):
+        """Test that the mass of a single piece is returned in grams."""
+        self.assertEqual(calculate_piece_mass(2, 240, "g"), 120)
+
+class TestGramsPerUnit(unittest.TestCase):
+    """Test the grams_per_unit function."""
+
+    def test_looks_up_mixed_units(self):
+        """Test that mixed units are converted in one call."""
+        densities = np.array([np.nan, 0.9, np.nan, 1.0])
+        piece_masses = np.array([np.nan, np.nan, 60.0, np.nan])
+
+        result = grams_per_unit(["kg", "ml", "pc", "bushel"], densities, piece_masses)
+
+        np.testing.assert_allclose(result[:3], [1000.0, 0.9, 60.0])
+        self.assertTrue(np.isnan(result[3]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+from codiet.models.ingredients import Ingredient
+
+def convert_ingredient_to_json(ingredient: Ingredient) -> dict:
+    """Convert an ingredient to a JSON serializable dictionary.
+    The dictionary has the shape of the ingredient datafiles."""
+    return {
+        "name": ingredient.name,
+        "description": ingredient.description,
+        "cost": {
+            "cost_unit": ingredient.cost_unit,
+            "cost_value": ingredient.cost_value,
+            "qty_value": ingredient.cost_qty_value,
+            "qty_unit": ingredient.cost_qty_unit,
+        },
+        "bulk": {
+            "density": {
+                "mass_unit": ingredient.density_mass_unit,
+                "mass_value": ingredient.density_mass_value,
+                "vol_unit": ingredient.density_vol_unit,
+                "vol_value": ingredient.density_vol_value,
+            },
+            "piece_mass": {
+                "pc_qty": ingredient.pc_qty,
+                "mass_unit": ingredient.pc_mass_unit,
+                "mass_value": ingredient.pc_mass_value,
+            },
+        },
+        "flags": dict(ingredient.flags),
+        "GI": ingredient.gi,
+        "nutrients": {
+            name: {
+                "ntr_qty_value": nutrient_qty.nutrient_mass,
+                "ntr_qty_unit": nutrient_qty.nutrient_mass_unit,
+                "ing_qty_value": nutrient_qty.ingredient_quantity,
+                "ing_qty_unit": nutrient_qty.ingredient_quantity_unit,
+            }
+            for name, nutrient_qty in ingredient.nutrient_quantities.items()
+        },
+    }
@@ -0,0 +1,90 @@
+"""In-memory interval index, used to look up recipes by serve time."""
+
+from bisect import bisect_right
+from typing import Generic, Hashable, Iterable, TypeVar
+
+from codiet.utils.time import split_minute_interval
+
+T = TypeVar("T", bound=Hashable)
+
+
+class _IntervalNode:
+    """A node of a centred interval tree.
+
+    Holds every interval which contains the node's centre point, sorted twice:
+    once by ascending start and once by descending end, so that a point query
+    can stop scanning as soon as the intervals stop matching.
+    """
+
+    def __init__(self, center: int, intervals: list[tuple[int, int, object]]):
+        self.center = center
+        self.by_start = sorted(intervals, key=lambda interval: interval[0])
+        self.starts = [interval[0] for interval in self.by_start]
+        self.by_end = sorted(intervals, key=lambda interval: -interval[1])
+        self.neg_ends = [-interval[1] for interval in self.by_end]
+        self.left: _IntervalNode | None = None
+        self.right: _IntervalNode | None = None
+
+
+class IntervalIndex(Generic[T]):
+    """Static centred interval tree over inclusive integer intervals.
+
+    Finds every item whose interval contains a point in O(log n + k), where
+    n is the number of intervals and k is the number of matches. Intervals
+    which wrap past midnight (end < start) are split into two segments.
+    """
+
+    def __init__(self, intervals: Iterable[tuple[int, int, T]] = ()):
+        # Split any wrapping intervals into plain segments
+        segments: list[tuple[int, int, T]] = []
+        for start, end, item in intervals:
+            for seg_start, seg_end in split_minute_interval((start, end)):
+                segments.append((seg_start, seg_end, item))
+        self._size = len(segments)
+        self._root = self._build(segments)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _build(self, segments: list[tuple[int, int, T]]) -> _IntervalNode | None:
+        """Recursively build the tree, centring each node on the median endpoint."""
+        if len(segments) == 0:
+            return None
+        # Centre the node on the median of all the endpoints
+        endpoints = sorted([segment[0] for segment in segments] + [segment[1] for segment in segments])
+        center = endpoints[len(endpoints) // 2]
+        # Divide the segments around the centre
+        left, right, overlapping = [], [], []
+        for segment in segments:
+            if segment[1] < center:
+                left.append(segment)
+            elif segment[0] > center:
+                right.append(segment)
+            else:
+                overlapping.append(segment)
+        node = _IntervalNode(center, overlapping)  # type: ignore
+        node.left = self._build(left)
+        node.right = self._build(right)
+        return node
+
+    def query(self, point: int) -> set[T]:
+        """Returns the set of items whose interval contains the point."""
+        matches: set[T] = set()
+        node = self._root
+        while node is not None:
+            if point < node.center:
+                # Only intervals starting at or before the point can match
+                for interval in node.by_start[: bisect_right(node.starts, point)]:
+                    matches.add(interval[2])  # type: ignore
+                node = node.left
+            elif point > node.center:
+                # Only intervals ending at or after the point can match
+                for interval in node.by_end[: bisect_right(node.neg_ends, -point)]:
+                    matches.add(interval[2])  # type: ignore
+                node = node.right
+            else:
+                # Every interval on this node contains its centre
+                for interval in node.by_start:
+                    matches.add(interval[2])  # type: ignore
+                break
+        return matches
@@ -1,5 +1,27 @@
 """Utility functions for working with nutrient data."""
 
+# The name under which a recipe's total energy, in kcal, is stored
+ENERGY_NUTRIENT_NAME = "energy"
+# The carbohydrate nutrient, and the carbohydrates in it which aren't
+# digested, so don't count as available carbohydrate for glycaemic load
+CARBOHYDRATE_NUTRIENT_NAME = "carbohydrate"
+UNAVAILABLE_CARBOHYDRATE_NAMES = ("fibre",)
+# Energy released per gram of each nutrient, in kcal (Atwater general factors,
+# with fibre at 2 kcal/g as it is only partly fermented in the gut)
+ENERGY_FACTORS = {
+    "carbohydrate": 4.0,
+    "fibre": 2.0,
+    "protein": 4.0,
+    "fat": 9.0,
+    "alcohol": 7.0,
+}
+# The kcal per gram applied to each nutrient's total when summing the energy.
+# The unavailable carbohydrates are in the carbohydrate total too, so their
+# factor is applied less the carbohydrate factor already counted for them.
+ENERGY_COEFFICIENTS = dict(ENERGY_FACTORS)
+for _name in UNAVAILABLE_CARBOHYDRATE_NAMES:
+    ENERGY_COEFFICIENTS[_name] -= ENERGY_FACTORS[CARBOHYDRATE_NUTRIENT_NAME]
+
 def ingredient_nutrient_data_is_complete(ingredient_nutrient_data: dict) -> bool:
     """Check if the nutrient data is complete."""
     if ingredient_nutrient_data["ntr_qty_value"] is None:
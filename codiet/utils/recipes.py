@@ -41,35 +41,31 @@ def load_recipe_ingredient_template() -> dict:
     return copy.deepcopy(_recipe_ingredient_template)
 
 def convert_recipe_to_json(recipe: Recipe) -> dict:
-    """Convert a recipe to a JSON serializable dictionary."""
-    # Create a dictionary to store the recipe
-    recipe_data = load_recipe_json_template()
-    # Populate the name, description, and instructions
-    recipe_data["name"] = recipe.name
-    recipe_data["description"] = recipe.description
-    recipe_data["instructions"] = recipe.instructions
-    # Add the ingredients to the recipe dictionary
-    for ingredient_id, ingredient_qty in recipe.ingredient_quantities.items():
-        # Fetch the ingredient quantity template
-        ingredient_template = load_recipe_ingredient_template()
-        # Populate the ingredient template
-        ingredient_template["id"] = ingredient_qty.ingredient.id
-        ingredient_template["qty_unit"] = ingredient_qty.qty_unit
-        ingredient_template["qty_value"] = ingredient_qty.qty_value
-        ingredient_template["qty_upper_tol"] = ingredient_qty.upper_tol
-        ingredient_template["qty_lower_tol"] = ingredient_qty.lower_tol
-        # Add the ingredient to the recipe dictionary
-        recipe_data["ingredients"][ingredient_qty.ingredient.id] = ingredient_template
-    # Add the serve times to the recipe dictionary
-    for serve_time in recipe.serve_times:
-        # Convert the serve time to a string
-        timestring_interval = convert_datetime_interval_to_time_string_interval(serve_time)
-        recipe_data["serve_times"].append(timestring_interval)
-    # Add the recipe types to the recipe dictionary
-    for tag in recipe.tags:
-        recipe_data["tags"].append(tag)
-    # Return the recipe dictionary
-    return recipe_data
+    """Convert a recipe to a JSON serializable dictionary.
+    The dictionary has the shape of the recipe template, and is built
+    directly rather than from copies of the templates."""
+    return {
+        "name": recipe.name,
+        "description": recipe.description,
+        "instructions": recipe.instructions,
+        "ingredients": {
+            str(ingredient_qty.ingredient.id): {
+                "id": ingredient_qty.ingredient.id,
+                "name": ingredient_qty.ingredient.name,
+                "qty_unit": ingredient_qty.qty_unit,
+                "qty_value": ingredient_qty.qty_value,
+                "qty_upper_tol": ingredient_qty.upper_tol,
+                "qty_lower_tol": ingredient_qty.lower_tol,
+            }
+            for ingredient_qty in recipe.ingredient_quantities.values()
+        },
+        # Convert the serve times to strings
+        "serve_times": [
+            convert_datetime_interval_to_time_string_interval(serve_time)
+            for serve_time in recipe.serve_times
+        ],
+        "tags": list(recipe.tags),
+    }
 
 def save_recipe_datafile(datafile:dict, overwrite:bool=False) -> None:
     """Save the datafile into the recipe data directory."""
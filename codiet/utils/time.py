@@ -28,3 +28,74 @@ def convert_time_string_interval_to_datetime_interval(
     start, end = interval.split("-")
     # Convert the start and end times to datetime objects and return as tuple
     return convert_time_string_to_datetime(start), convert_time_string_to_datetime(end)
+
+
+# Serve times are stored as integer minutes past midnight, so that they can be
+# indexed and compared without any string or datetime parsing.
+MINUTES_PER_DAY = 24 * 60
+
+
+def convert_datetime_to_minutes(dt: datetime) -> int:
+    """Convert a datetime object to the number of minutes past midnight."""
+    return dt.hour * 60 + dt.minute
+
+
+def convert_minutes_to_datetime(minutes: int) -> datetime:
+    """Convert a number of minutes past midnight to a datetime object."""
+    return datetime(1900, 1, 1, minutes // 60, minutes % 60)
+
+
+def convert_time_string_to_minutes(time_string: str) -> int:
+    """Convert a HH:MM time string to the number of minutes past midnight."""
+    hours, minutes = time_string.strip().split(":")
+    # Check the values represent a valid time of day
+    if not (0 <= int(hours) < 24 and 0 <= int(minutes) < 60):
+        raise ValueError(f"'{time_string}' is not a valid time.")
+    return int(hours) * 60 + int(minutes)
+
+
+def convert_minutes_to_time_string(minutes: int) -> str:
+    """Convert a number of minutes past midnight to a HH:MM time string."""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def convert_datetime_interval_to_minute_interval(
+    interval: tuple[datetime, datetime]
+) -> tuple[int, int]:
+    """Convert a datetime interval to a (start, end) minute interval."""
+    return convert_datetime_to_minutes(interval[0]), convert_datetime_to_minutes(interval[1])
+
+
+def convert_minute_interval_to_datetime_interval(
+    interval: tuple[int, int]
+) -> tuple[datetime, datetime]:
+    """Convert a (start, end) minute interval to a datetime interval."""
+    return convert_minutes_to_datetime(interval[0]), convert_minutes_to_datetime(interval[1])
+
+
+def convert_time_string_interval_to_minute_interval(interval: str) -> tuple[int, int]:
+    """Convert a HH:MM-HH:MM time string interval to a (start, end) minute interval."""
+    # Strip any whitespace from anywhere in the string
+    interval = interval.replace(" ", "")
+    # Split the string based on the hyphen
+    start, end = interval.split("-")
+    return convert_time_string_to_minutes(start), convert_time_string_to_minutes(end)
+
+
+def split_minute_interval(interval: tuple[int, int]) -> list[tuple[int, int]]:
+    """Split a minute interval into non-wrapping segments.
+
+    Both ends of an interval are inclusive. An interval whose end is earlier
+    than its start wraps past midnight, and is split into a segment running
+    to the end of the day and a segment running from the start of the day.
+    For example, (1320, 120) (22:00-02:00) becomes [(1320, 1439), (0, 120)].
+    """
+    start, end = interval
+    if start <= end:
+        return [(start, end)]
+    return [(start, MINUTES_PER_DAY - 1), (0, end)]
+
+
+def convert_minute_interval_to_time_string_interval(interval: tuple[int, int]) -> str:
+    """Convert a (start, end) minute interval to a HH:MM-HH:MM time string interval."""
+    return f"{convert_minutes_to_time_string(interval[0])}-{convert_minutes_to_time_string(interval[1])}"
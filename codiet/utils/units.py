@@ -0,0 +1,102 @@
+"""Utility functions for converting ingredient quantities to grams."""
+
+from typing import Sequence
+
+import numpy as np
+
+# Mass units, expressed in grams
+MASS_UNITS = {
+    "ug": 1e-6,
+    "mg": 1e-3,
+    "g": 1.0,
+    "kg": 1000.0,
+    "lb": 453.59237,
+}
+
+# Volume units, expressed in millilitres
+VOLUME_UNITS = {
+    "ml": 1.0,
+    "l": 1000.0,
+    "L": 1000.0,
+    "tsp": 4.92892,
+    "tbsp": 14.7868,
+    "cup": 236.588,
+    "fl oz": 29.5735,
+    "pt": 473.176,
+    "qt": 946.353,
+    "gal": 3785.41,
+}
+
+# Units which count whole pieces of an ingredient
+PIECE_UNITS = ["pc"]
+
+
+def calculate_density(
+    mass_value: float | None,
+    mass_unit: str | None,
+    vol_value: float | None,
+    vol_unit: str | None,
+) -> float | None:
+    """Returns the density in grams per millilitre, or None if it is not known."""
+    if mass_value is None or vol_value is None or vol_value == 0:
+        return None
+    if mass_unit not in MASS_UNITS or vol_unit not in VOLUME_UNITS:
+        return None
+    return (mass_value * MASS_UNITS[mass_unit]) / (vol_value * VOLUME_UNITS[vol_unit])
+
+
+def calculate_piece_mass(
+    pc_qty: float | None, pc_mass_value: float | None, pc_mass_unit: str | None
+) -> float | None:
+    """Returns the mass of a single piece in grams, or None if it is not known."""
+    if pc_qty is None or pc_mass_value is None or pc_qty == 0:
+        return None
+    if pc_mass_unit not in MASS_UNITS:
+        return None
+    return pc_mass_value * MASS_UNITS[pc_mass_unit] / pc_qty
+
+
+def convert_to_grams(
+    qty_value: float | None,
+    qty_unit: str | None,
+    density: float | None = None,
+    piece_mass: float | None = None,
+) -> float | None:
+    """Converts a quantity to grams.
+    Volumes need the density (g/ml) and pieces need the piece mass (g).
+    Returns None if the quantity cannot be converted.
+    """
+    if qty_value is None:
+        return None
+    if qty_unit in MASS_UNITS:
+        return qty_value * MASS_UNITS[qty_unit]
+    if qty_unit in VOLUME_UNITS and density is not None:
+        return qty_value * VOLUME_UNITS[qty_unit] * density
+    if qty_unit in PIECE_UNITS and piece_mass is not None:
+        return qty_value * piece_mass
+    return None
+
+
+def grams_per_unit(
+    units: Sequence[str | None],
+    densities: np.ndarray,
+    piece_masses: np.ndarray,
+) -> np.ndarray:
+    """Vectorised lookup of the grams in one of each unit.
+
+    Each unit is paired with the density (g/ml) and piece mass (g) of the
+    ingredient it measures. Entries which cannot be converted, such as a
+    volume for an ingredient with no density, are NaN.
+    """
+    units_array = np.asarray(units, dtype=object)
+    factors = np.full(len(units_array), np.nan)
+    # There are only a handful of distinct units, so mask on each in turn
+    for unit in set(units_array.tolist()):
+        mask = units_array == unit
+        if unit in MASS_UNITS:
+            factors[mask] = MASS_UNITS[unit]
+        elif unit in VOLUME_UNITS:
+            factors[mask] = VOLUME_UNITS[unit] * densities[mask]
+        elif unit in PIECE_UNITS:
+            factors[mask] = piece_masses[mask]
+    return factors
@@ -1,8 +1,9 @@
 import sys
 
 from PyQt6.QtWidgets import QApplication
-from PyQt6.QtCore import qInstallMessageHandler
+from PyQt6.QtCore import QTimer, qInstallMessageHandler
 
+from codiet.db.autosave import autosave
 from codiet.views import load_stylesheet
 from codiet.views.main_window_view import MainWindowView
 from codiet.controllers.main_window_ctrl import MainWindowCtrl
@@ -22,4 +23,8 @@ if __name__ == "__main__":
     window = MainWindowView()
     main_window_ctrl = MainWindowCtrl(window)
     window.show()
+    # Prefetch reference data once the event loop has painted the window
+    QTimer.singleShot(0, main_window_ctrl.start_background_prefetch)
+    # Write any edits still queued for autosave before quitting
+    app.aboutToQuit.connect(autosave.stop)
     sys.exit(app.exec())
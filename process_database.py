@@ -2,13 +2,10 @@
 Module to handle all data sourcing and database population.
 """
 
-import os
-
-from codiet.db import DB_PATH
+from codiet.db import DB_PATH, SNAPSHOT_PATH
 from codiet.db_construction import ingredient_datafile_utils
 from codiet.db_construction.ingredient_datafile_utils import apply_to_each_ingredient_datafile as for_all_ingredients
 from codiet.db_construction import populate_database
-from codiet.db_construction.create_schema import create_schema
 
 if __name__ == '__main__':
     # Update the console
@@ -39,26 +36,9 @@ if __name__ == '__main__':
     # for_all_ingredients(datafile_utils.reset_ingredient_nutrient_data)
 
     # DATABASE CREATION
-    # Remove any database that exists
-    if os.path.exists(DB_PATH):
-        print(f"Removing existing database at {DB_PATH}")
-        os.remove(DB_PATH)
-    # Rebuild the database schema
-    create_schema()
-
-    # DATABASE POPULATION
-    # Push all of the ingredient .json data into the database
-    print("Pushing datafile data into database...")
-    print("Pushing global flags into database...")
-    populate_database.push_flags_to_db()
-    print("Pushing global nutrients into database...")
-    populate_database.push_nutrients_to_db()
-    print("Pushing ingredients into database...")
-    populate_database.push_ingredients_to_db()
-    print("Pushing global recipe tags into database...")
-    populate_database.push_global_recipe_tags_to_db()
-    print("Pushing recipes into database...")
-    populate_database.push_recipes_to_db()
+    # Rebuild the database and snapshot from the datafiles.
+    # This erases everything already in the database.
+    populate_database.build_database(DB_PATH, SNAPSHOT_PATH)
 
     # Update the console
     print("Database processing complete.")
\ No newline at end of file